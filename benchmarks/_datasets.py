@@ -0,0 +1,26 @@
+"""Synthetic datasets shared by the benchmark scripts."""
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.tests._tests_visbrain import write_edf, synthetic_hypno  # noqa
+
+
+def band_limited_noise(shape, rnd, amplitude=50., width=10):
+    """Band-limited noise along the last axis.
+
+    Used instead of generate_eeg, which is too memory hungry for recordings
+    of several hours.
+
+    Parameters
+    ----------
+    shape : int | tuple
+        Shape of the noise.
+    rnd : numpy.random.RandomState
+        Random state.
+    amplitude : float | 50.
+        Amplitude of the white noise before smoothing.
+    width : int | 10
+        Width of the moving average (in samples).
+    """
+    return amplitude * uniform_filter1d(rnd.randn(*np.atleast_1d(shape)),
+                                        width, axis=-1)
@@ -0,0 +1,65 @@
+"""Benchmark the down-sampling of sleep files.
+
+Compare the throughput and the peak memory of :
+
+    * The previous pipeline (full-rate float64 array then data[:, ::dsf])
+    * The chunked stride decimation (read_edf(..., decimation='stride'))
+    * The chunked anti-aliased decimation (read_edf(..., decimation='filter'))
+"""
+import os
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from visbrain.io import path_to_tmp
+from visbrain.io.read_sleep import read_edf
+from visbrain.utils.sleep.edf import Edf
+
+from _datasets import write_edf
+
+
+def legacy_read_edf(path, downsample):
+    """Previous pipeline : load everything then stride."""
+    edf = Edf(path)
+    n = edf.hdr['n_samples_per_record'][0] * edf.hdr['n_records']
+    data = edf.return_dat(edf.hdr['label'], 0, n)
+    dsf = int(np.round(edf.hdr['n_samples_per_record'][0] / downsample))
+    return data[:, ::dsf].astype(np.float32)
+
+
+def _profile(fcn, *args, **kwargs):
+    """Return the duration (s) and the peak of allocated memory (MB)."""
+    tracemalloc.start()
+    t_start = perf_counter()
+    fcn(*args, **kwargs)
+    duration = perf_counter() - t_start
+    peak = tracemalloc.get_traced_memory()[1] / 1024. ** 2
+    tracemalloc.stop()
+    return duration, peak
+
+
+def run(n_chan=32, sf=512, n_hours=1., downsample=100.):
+    """Decimate a synthetic recording with the three methods."""
+    path = path_to_tmp(file='bench_decimation.edf')
+    n_records = int(n_hours * 3600)
+    data = [np.random.randint(-32768, 32767, (sf * n_records,))
+            for k in range(n_chan)]
+    write_edf(path, data, [sf] * n_chan)
+    del data
+    n_hours_total = n_chan * n_hours
+    print("%i channels, %.1fh at %iHz down-sampled to %iHz" % (
+        n_chan, n_hours, sf, downsample))
+
+    bench = [('full load + stride', legacy_read_edf, {}),
+             ('chunked stride', read_edf, dict(decimation='stride')),
+             ('chunked filter', read_edf, dict(decimation='filter'))]
+    for name, fcn, kw in bench:
+        duration, peak = _profile(fcn, path, downsample, **kw)
+        print("- %-20s: %6.2fs (%6.1f channel-hours/s), peak memory "
+              "%7.1fMB" % (name, duration, n_hours_total / duration, peak))
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,84 @@
+"""Benchmark the EDF reader.
+
+Compare the record-level memmap reader of :class:`visbrain.utils.sleep.edf.Edf`
+with the previous per-channel / per-record seek and read loop.
+"""
+import os
+from math import floor
+from time import perf_counter
+
+import numpy as np
+
+from visbrain.io import path_to_tmp
+from visbrain.utils.sleep.edf import Edf
+
+from _datasets import write_edf
+
+
+def legacy_read_dat(edf, i_chan, begsam, endsam):
+    """Previous implementation of Edf._read_dat (one seek per record)."""
+    n_sam_rec = edf.hdr['n_samples_per_record']
+    begrec = int(floor(begsam / n_sam_rec[i_chan]))
+    begsam_rec = int(begsam % n_sam_rec[i_chan])
+    endrec = int(floor(endsam / n_sam_rec[i_chan]))
+    endsam_rec = int(endsam % n_sam_rec[i_chan])
+    dat = np.empty(shape=(int(endsam) - int(begsam)), dtype='int16')
+    i_dat = 0
+    with open(edf.filename, 'rb') as f:
+        for rec in range(begrec, endrec + 1):
+            begpos_rec = begsam_rec if rec == begrec else 0
+            endpos_rec = endsam_rec if rec == endrec else n_sam_rec[i_chan]
+            begpos = begpos_rec + sum(n_sam_rec) * rec + sum(
+                n_sam_rec[:i_chan])
+            endpos = endpos_rec + sum(n_sam_rec) * rec + sum(
+                n_sam_rec[:i_chan])
+            f.seek(begpos * 2 + edf.hdr['header_n_bytes'])
+            samples = f.read(2 * (endpos - begpos))
+            i_dat_end = i_dat + endpos - begpos
+            dat[i_dat:i_dat_end] = np.frombuffer(samples, dtype='<i2')
+            i_dat = i_dat_end
+    return dat
+
+
+def legacy_return_dat(edf, chan, begsam, endsam):
+    """Previous implementation of Edf.return_dat."""
+    hdr = edf.hdr
+    gain = (hdr['physical_max'] - hdr['physical_min']) / (
+        hdr['digital_max'] - hdr['digital_min'])
+    dat = np.empty(shape=(len(chan), endsam - begsam), dtype='float64')
+    for i in range(len(chan)):
+        d = legacy_read_dat(edf, i, begsam, endsam).astype('float64')
+        dat[i, :] = (d - hdr['digital_min'][i]) * gain[i] + \
+            hdr['physical_min'][i]
+    return dat
+
+
+def run(n_chan=32, sf=256, n_hours=1.):
+    """Time a full read of a synthetic recording with both readers."""
+    path = path_to_tmp(file='bench_edf.edf')
+    n_records = int(n_hours * 3600)
+    data = [np.random.randint(-32768, 32767, (sf * n_records,))
+            for k in range(n_chan)]
+    write_edf(path, data, [sf] * n_chan)
+    del data
+    edf = Edf(path)
+    chan, n = edf.hdr['label'], sf * n_records
+    print("%i channels, %i records of %i samples (%.1fh at %iHz)" % (
+        n_chan, n_records, sf, n_hours, sf))
+
+    t_start = perf_counter()
+    new = edf.return_dat(chan, 0, n)
+    t_new = perf_counter() - t_start
+    print("- memmap reader : %.3fs" % t_new)
+
+    t_start = perf_counter()
+    old = legacy_return_dat(edf, chan, 0, n)
+    t_old = perf_counter() - t_start
+    print("- legacy reader : %.3fs (x%.1f)" % (t_old, t_old / t_new))
+
+    assert np.allclose(old, new)
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,50 @@
+"""Benchmark detections sharing a cache of features.
+
+Simulate a user tuning thresholds (each detection is applied three times
+with a different threshold) and compare detections computing their features
+at each call with detections pulling them from a FeatureCache.
+"""
+from time import perf_counter
+
+import numpy as np
+
+from visbrain.utils.sleep import (FeatureCache, kcdetect, spindlesdetect,
+                                  remdetect, slowwavedetect, mtdetect)
+
+from _datasets import band_limited_noise, synthetic_hypno
+
+
+def run(sf=100., n_hours=2.):
+    """Time repeated detections with and without the cache of features."""
+    rnd = np.random.RandomState(0)
+    n_pts = int(n_hours * 3600 * sf)
+    data = band_limited_noise(n_pts, rnd)
+    hypno = synthetic_hypno(n_pts, rnd)
+    detections = [
+        ('spindles', lambda t, **kw: spindlesdetect(
+            data, sf, 2. + t, hypno, True, **kw)),
+        ('kc', lambda t, **kw: kcdetect(data, sf, .8, 2. + t, hypno, True,
+                                        200, 1500, 40, 400, **kw)),
+        ('rem', lambda t, **kw: remdetect(data, sf, hypno, True, 2. + t,
+                                          **kw)),
+        ('sw', lambda t, **kw: slowwavedetect(data, sf, 3. + t, **kw)),
+        ('mt', lambda t, **kw: mtdetect(data, sf, 2. + t, hypno, False,
+                                        **kw))]
+    print("%.1fh at %iHz, 3 thresholds per detection" % (n_hours, sf))
+    cache = FeatureCache()
+    for name, fcn in detections:
+        t_start = perf_counter()
+        for t in [0., .5, 1.]:
+            fcn(t)
+        t_none = perf_counter() - t_start
+        t_start = perf_counter()
+        for t in [0., .5, 1.]:
+            fcn(t, features=cache.channel(0))
+        t_cache = perf_counter() - t_start
+        print("- %-8s : %6.2fs without cache, %6.2fs with cache (x%.1f)" % (
+            name, t_none, t_cache, t_none / t_cache))
+    print("%s" % cache)
+
+
+if __name__ == '__main__':
+    run()
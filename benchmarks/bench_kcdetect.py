@@ -0,0 +1,116 @@
+"""Benchmark the K-complex detection.
+
+Compare the previous loops of kcdetect (soft-threshold search and spindle
+co-occurrence, one pass over the data per candidate) with the interval-based
+implementation on synthetic channels of growing duration, and check that both
+find the same events.
+"""
+from time import perf_counter
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.utils.filtering import filt
+from visbrain.utils.sigproc import tkeo
+from visbrain.utils.sleep.detection import kcdetect, _soft_threshold_bounds
+from visbrain.utils.sleep.event import (IntervalSet, _events_distance_fill,
+                                        _events_to_index, _index_to_events)
+
+from _datasets import band_limited_noise
+
+# Above this duration (in hours), the legacy loops are not timed anymore :
+MAX_LEGACY_HOURS = 8.
+
+
+def legacy_soft_bounds(idx_hard, idx_soft, n_pts):
+    """Previous soft-threshold search (one pass per candidate).
+
+    The only change is the initial value of the reductions, which avoids the
+    error raised when no crossing is found before or after a candidate.
+    """
+    idx_zc_soft = _events_to_index(idx_soft).flatten()
+    idx_start, idx_stop = _events_to_index(idx_hard).T
+    idx_kc = np.array([], dtype=int)
+    for s in idx_start:
+        d = s - idx_zc_soft
+        soft_beg = d[d > 0].min(initial=s)
+        soft_end = np.abs(d[d < 0]).min(initial=n_pts - s)
+        idx_kc = np.append(idx_kc, np.arange(s - soft_beg, s + soft_end))
+    return idx_kc
+
+
+def legacy_spindle_match(idx_kc, idx_spin, sf, range_spin_sec=20):
+    """Previous spindle co-occurrence (one window membership per event)."""
+    idx_start, idx_stop = _events_to_index(idx_kc).T
+    spin_bool = np.array([], dtype=bool)
+    for idx, val in enumerate(idx_start):
+        step = 0.5 * range_spin_sec * sf
+        is_spin = np.in1d(np.arange(val - step, val + step, 1),
+                          idx_spin, assume_unique=True)
+        spin_bool = np.append(spin_bool, any(is_spin))
+    kc_spin = np.where(spin_bool)[0]
+    return _index_to_events(np.c_[idx_start, idx_stop][kc_spin])
+
+
+def _candidates(data, sf, amp_thr=3., min_distance_ms=500.):
+    """Get hard and soft threshold crossings, as done by kcdetect."""
+    sig_tkeo = tkeo(filt(sf, np.array([.5, 4.]), data))
+    hard_thr = np.nanmean(sig_tkeo) + amp_thr * np.nanstd(sig_tkeo)
+    idx_hard = np.where(sig_tkeo > hard_thr)[0]
+    idx_soft = np.where(sig_tkeo > .8 * hard_thr)[0]
+    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
+    return idx_hard, idx_soft
+
+
+def _spindles(data, sf):
+    """Cheap synthetic spindles : bursts of the 12-14Hz envelope."""
+    sigma = uniform_filter1d(filt(sf, np.array([12., 14.]), data) ** 2,
+                             int(sf / 2))
+    return IntervalSet.from_mask(sigma > sigma.mean() + 2. * sigma.std())
+
+
+def run(sf=100., hours=(.5, 1., 2., 4., 8.), range_spin_sec=20):
+    """Time both implementations on channels of growing duration."""
+    rnd = np.random.RandomState(0)
+    n_max = int(max(hours) * 3600 * sf)
+    full = band_limited_noise(n_max, rnd)
+    print("%-6s %-11s %-9s %-9s %-9s %-9s %-9s" % (
+        'hours', 'candidates', 'soft_old', 'soft_new', 'spin_old',
+        'spin_new', 'kcdetect'))
+    for n_hours in hours:
+        n_pts = int(n_hours * 3600 * sf)
+        data = full[:n_pts]
+        idx_hard, idx_soft = _candidates(data, sf)
+        spin = _spindles(data, sf)
+        n_cand = len(_events_to_index(idx_hard))
+        # ---------- INTERVALS ----------
+        t_start = perf_counter()
+        kc = _soft_threshold_bounds(IntervalSet.from_index(idx_hard),
+                                    IntervalSet.from_index(idx_soft), n_pts)
+        t_soft = perf_counter() - t_start
+        t_start = perf_counter()
+        kc_spin = kc[kc.near(spin, .5 * range_spin_sec * sf)]
+        t_spin = perf_counter() - t_start
+        # ---------- LEGACY ----------
+        t_soft_old = t_spin_old = np.nan
+        if n_hours <= MAX_LEGACY_HOURS:
+            t_start = perf_counter()
+            idx_kc = legacy_soft_bounds(idx_hard, idx_soft, n_pts)
+            t_soft_old = perf_counter() - t_start
+            t_start = perf_counter()
+            idx_kc_spin = legacy_spindle_match(idx_kc, spin.indices(), sf,
+                                               range_spin_sec)
+            t_spin_old = perf_counter() - t_start
+            assert np.array_equal(np.unique(idx_kc), kc.indices())
+            assert np.array_equal(np.unique(idx_kc_spin), kc_spin.indices())
+        # ---------- FULL DETECTION ----------
+        t_start = perf_counter()
+        kcdetect(data, sf, .8, 3., np.zeros((n_pts,)), False, 200., 2500.,
+                 10., 400., range_spin_sec=range_spin_sec)
+        t_kc = perf_counter() - t_start
+        print("%-6.1f %-11i %-9.3f %-9.4f %-9.3f %-9.4f %-9.2f" % (
+            n_hours, n_cand, t_soft_old, t_soft, t_spin_old, t_spin, t_kc))
+
+
+if __name__ == '__main__':
+    run()
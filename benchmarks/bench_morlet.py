@@ -0,0 +1,59 @@
+"""Benchmark the Morlet filter bank.
+
+Compare the previous time-domain convolution (one np.convolve per frequency)
+with the FFT filter bank on a time-frequency map and on the band powers of a
+multi-channel sleep recording.
+"""
+from time import perf_counter
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.utils.filtering import _morlet_wlt, morlet_bank
+
+
+def legacy_morlet(x, sf, f, width=7.0):
+    """Previous implementation (time-domain convolution)."""
+    m = _morlet_wlt(sf, f, width)
+    y = np.convolve(x, m)
+    return y[int(np.ceil(len(m) / 2)) - 1:int(len(y) - np.floor(len(m) / 2))]
+
+
+def legacy_power(x, sf, freqs):
+    """Power of each channel / frequency, one convolution at a time."""
+    xpow = np.zeros((x.shape[0], len(freqs), x.shape[1]))
+    for c in range(x.shape[0]):
+        for k, f in enumerate(freqs):
+            xpow[c, k, :] = np.square(np.abs(legacy_morlet(x[c, :], sf, f)))
+    return xpow
+
+
+def _compare(name, x, sf, freqs):
+    t_start = perf_counter()
+    legacy = legacy_power(x, sf, freqs)
+    t_legacy = perf_counter() - t_start
+    for dtype in [np.float64, np.float32]:
+        t_start = perf_counter()
+        new = morlet_bank(x, sf, freqs, get='power', dtype=dtype)
+        t_new = perf_counter() - t_start
+        np.testing.assert_allclose(new, legacy, rtol=1e-3,
+                                   atol=1e-3 * legacy.max())
+        print("- %-34s np.convolve %7.2fs, bank (%s) %6.2fs (x%.0f)" % (
+            name, t_legacy, np.dtype(dtype).name, t_new, t_legacy / t_new))
+
+
+def run():
+    """Time both implementations."""
+    rnd = np.random.RandomState(0)
+    # Time-frequency map (1-160Hz, 1Hz step) of 30s at 1kHz :
+    x = rnd.randn(1, 30000)
+    _compare("TF map, 159 freqs, 30s at 1kHz :", x, 1000.,
+             np.arange(1., 160., 1.))
+    # Band powers (as in the detections) of 8 channels, 1h at 100Hz :
+    x = 50. * uniform_filter1d(rnd.randn(8, 360000), 10, axis=-1)
+    _compare("Bands, 8 channels, 1h at 100Hz :", x, 100.,
+             [2.05, 6., 10., 14., 23.])
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,152 @@
+"""Benchmark the peak detection.
+
+Compare the previous sample by sample loop with the vectorized peakdetect
+on a single channel and on several channels at once, and check that both
+implementations find the same peaks.
+"""
+from time import perf_counter
+
+import numpy as np
+from scipy.signal import detrend
+
+from visbrain.utils.sleep.detection import peakdetect
+
+from _datasets import band_limited_noise
+
+
+def legacy_peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1.,
+                      get='max', threshold='auto'):
+    """Previous implementation (loop over every sample)."""
+    # ============== CHECK DATA ==============
+    if x_axis is None:
+        x_axis = range(len(y_axis))
+    # Check length :
+    if len(y_axis) != len(x_axis):
+        raise ValueError("Input vectors y_axis and x_axis must have same "
+                         "length")
+    # Needs to be a numpy array
+    y_axis, x_axis = np.asarray(y_axis), np.asarray(x_axis)
+
+    # store data length for later use
+    length = len(y_axis)
+
+    # Lookahead  & delta checking :
+    if lookahead < 1:
+        raise ValueError("Lookahead must be '1' or above in value")
+    if not (np.isscalar(delta) and delta >= 0):
+        raise ValueError("delta must be a positive number")
+
+    # Check get :
+    if get not in ['min', 'max', 'minmax']:
+        raise ValueError("The get parameter must either be 'min', 'max' or"
+                         " 'minmax'")
+
+    # ============== PRE-ALLOCATION ==============
+    max_peaks, min_peaks = [], []
+    dump = []   # Used to pop the first hit which almost always is false
+
+    # maxima and minima candidates are temporarily stored in
+    # mx and mn respectively
+    mn, mx = np.Inf, -np.Inf
+
+    # ============== THRESHOLD ==============
+    if threshold is not None:
+        if threshold == 'auto':
+            threshold = np.std(y_axis)
+        # Detrend / demean y-axis :
+        y_axisp = detrend(y_axis)
+        y_axisp -= y_axisp.mean()
+        # Find values above threshold :
+        above = np.abs(y_axisp) >= threshold
+        zp = zip(np.arange(length)[above], x_axis[above], y_axis[above])
+    else:
+        zp = zip(np.arange(length)[:-lookahead], x_axis[:-lookahead],
+                 y_axis[:-lookahead])
+
+    # ============== FIND MIN / MAX PEAKS ==============
+    # Only detect peak if there is 'lookahead' amount of points after it
+    for index, x, y in zp:
+        if y > mx:
+            mx = y
+        if y < mn:
+            mn = y
+
+        # ==== Look for max ====
+        if y < mx - delta and mx != np.Inf:
+            # Maxima peak candidate found
+            # look ahead in signal to ensure that this is a peak and not jitter
+            if y_axis[index:index + lookahead].max() < mx:
+                max_peaks.append(index)
+                dump.append(True)
+                # set algorithm to only find minima now
+                mx = np.Inf
+                mn = np.Inf
+                if index + lookahead >= length:
+                    # end is within lookahead no more peaks can be found
+                    break
+                continue
+
+        # ==== Look for max ====
+        if y > mn + delta and mn != -np.Inf:
+            # Minima peak candidate found
+            # look ahead in signal to ensure that this is a peak and not jitter
+            if y_axis[index:index + lookahead].min() > mn:
+                min_peaks.append(index)
+                dump.append(False)
+                # set algorithm to only find maxima now
+                mn = -np.Inf
+                mx = -np.Inf
+                if index + lookahead >= length:
+                    # end is within lookahead no more peaks can be found
+                    break
+
+    if min_peaks and max_peaks:
+        # ============== CLEAN ==============
+        # Remove the false hit on the first value of the y_axis
+        if threshold is None:
+            if dump[0]:
+                max_peaks.pop(0)
+            else:
+                min_peaks.pop(0)
+            del dump
+
+        # ============== MIN / MAX / MINMAX ==============
+        if get == 'max':
+            index = np.array(max_peaks)
+        elif get == 'min':
+            index = np.array(min_peaks)
+        elif get == 'minmax':
+            index = np.vstack((min_peaks, max_peaks))
+
+        return np.c_[index, index]
+    else:
+        return np.array([])
+
+
+def run(n_chan=8, sf=100., n_hours=8., lookahead=20):
+    """Detect peaks on a synthetic recording with both implementations."""
+    n_pts = int(n_hours * 3600 * sf)
+    data = band_limited_noise((n_chan, n_pts), np.random.RandomState(0))
+    print("%i channels, %.1fh at %iHz (lookahead=%i)" % (n_chan, n_hours, sf,
+                                                         lookahead))
+    for get, thr in [('max', 'auto'), ('min', 'auto'), ('max', None)]:
+        kw = dict(lookahead=lookahead, get=get, threshold=thr)
+        t_start = perf_counter()
+        legacy = legacy_peakdetect(sf, data[0, :], **kw)
+        t_legacy = perf_counter() - t_start
+        t_start = perf_counter()
+        new = peakdetect(sf, data[0, :], **kw)
+        t_new = perf_counter() - t_start
+        assert np.array_equal(legacy, new)
+        print("- get=%-4s, threshold=%-4s, one channel : loop %6.2fs, "
+              "vectorized %6.2fs (x%.0f)" % (get, thr, t_legacy, t_new,
+                                             t_legacy / t_new))
+    t_start = perf_counter()
+    peakdetect(sf, data, lookahead=lookahead)
+    duration = perf_counter() - t_start
+    print("- %i channels in one call : %6.2fs (%.1f channel-hours/s)" % (
+        n_chan, duration, n_chan * n_hours / duration))
+
+
+if __name__ == '__main__':
+    run()
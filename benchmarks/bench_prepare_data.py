@@ -0,0 +1,62 @@
+"""Benchmark the filtering of the displayed window.
+
+Simulate a slider moving over a recording with filtering turned on and
+compare the previous per-window filtering (filter designed and applied in
+transfer-function form at each move) with PrepareData, with and without
+whole-channel filtering.
+"""
+from time import perf_counter
+
+import numpy as np
+from scipy.signal import butter, lfilter
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.utils.filtering import PrepareData
+
+
+def legacy_window(sf, data, fstart, fend, order=3):
+    """Previous filtering of a window (design + lfilter)."""
+    b, a = butter(order, np.divide([fstart, fend], .5 * sf), btype='bandpass')
+    return lfilter(b, a, data, axis=1)
+
+
+def run(sf=100., n_chan=8, n_hours=8., win_s=30., n_moves=500):
+    """Time successive windows of a filtered recording."""
+    rnd = np.random.RandomState(0)
+    n_pts = int(n_hours * 3600 * sf)
+    data = (50. * uniform_filter1d(rnd.randn(n_chan, n_pts), 10,
+                                   axis=-1)).astype(np.float32)
+    n_win = int(win_s * sf)
+    starts = rnd.randint(0, n_pts - n_win, n_moves)
+    rows = np.arange(n_chan)
+    print("%i channels, %.1fh at %iHz, %i moves of a %is window" % (
+        n_chan, n_hours, sf, n_moves, win_s))
+
+    t_start = perf_counter()
+    for s in starts:
+        legacy_window(sf, data[:, s:s + n_win], 12., 16.)
+    print("- legacy (design + lfilter)   : %6.2fms / move" % (
+        1000. * (perf_counter() - t_start) / n_moves))
+
+    prep = PrepareData(axis=1, filt=True, fstart=12., fend=16.)
+    t_start = perf_counter()
+    for s in starts:
+        prep.prepare_window(sf, data, slice(s, s + n_win), rows)
+    print("- cached design + sosfilt     : %6.2fms / move" % (
+        1000. * (perf_counter() - t_start) / n_moves))
+
+    prep.whole = True
+    t_start = perf_counter()
+    prep.precompute(sf, data, rows, wait_jobs=True)
+    t_whole = perf_counter() - t_start
+    t_start = perf_counter()
+    for s in starts:
+        prep.prepare_window(sf, data, slice(s, s + n_win), rows)
+    print("- whole channels (slice)      : %6.2fms / move (filtering the "
+          "whole channels took %.2fs)" % (
+              1000. * (perf_counter() - t_start) / n_moves, t_whole))
+    prep.clear_cache()
+
+
+if __name__ == '__main__':
+    run()
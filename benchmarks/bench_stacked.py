@@ -0,0 +1,66 @@
+"""Benchmark the creation and update of high-density channel traces.
+
+Compare the previous per-channel visuals of the Sleep GUI (one node, line,
+markers, location line and grid per channel) with a single StackedSignal
+visual packing all channels into one vertex buffer. Only the cost on the
+Python side is measured (the number of draw calls drops from one per channel
+to one).
+"""
+from time import perf_counter
+
+import numpy as np
+from vispy import scene
+
+from visbrain.visuals import StackedSignal
+
+
+def legacy_traces(parent, n_chan):
+    """Previous implementation (several visuals per channel)."""
+    pos = np.zeros((1, 3), dtype=np.float32)
+    lines = []
+    for k in range(n_chan):
+        node = scene.Node(name='%iplot' % k, parent=parent)
+        lines.append(scene.visuals.Line(pos, parent=node))
+        scene.visuals.Markers(pos=pos, parent=node)
+        scene.visuals.Line(pos, connect='segments', parent=node)
+        scene.visuals.GridLines(scale=(1., .1), parent=parent)
+    return lines
+
+
+def run(n_chan=256, n_times=3000):
+    """Time both implementations."""
+    data = np.random.RandomState(0).randn(n_chan, n_times).astype(np.float32)
+    time = np.arange(n_times, dtype=np.float32) / 100.
+    canvas = scene.SceneCanvas(show=False)
+    view = canvas.central_widget.add_view()
+    print("%i channels, %i time points" % (n_chan, n_times))
+
+    t_start = perf_counter()
+    lines = legacy_traces(view.scene, n_chan)
+    t_legacy = perf_counter() - t_start
+    t_start = perf_counter()
+    for k, line in enumerate(lines):
+        line.set_data(np.c_[time, data[k, :], np.full_like(time, .5)])
+    t_legacy_set = perf_counter() - t_start
+
+    t_start = perf_counter()
+    stacked = StackedSignal(n_chan, parent=view.scene)
+    t_new = perf_counter() - t_start
+    t_start = perf_counter()
+    stacked.set_data(data, time)
+    t_new_set = perf_counter() - t_start
+    t_start = perf_counter()
+    stacked.visible_channels = np.arange(n_chan) % 2 == 0
+    stacked.ylim = np.c_[-np.ones(n_chan), np.ones(n_chan)]
+    t_uniform = perf_counter() - t_start
+
+    print("- per-channel visuals : creation %8.1fms, set_data %8.1fms" % (
+        1000. * t_legacy, 1000. * t_legacy_set))
+    print("- stacked visual      : creation %8.1fms, set_data %8.1fms "
+          "(x%.0f / x%.0f)" % (1000. * t_new, 1000. * t_new_set,
+                               t_legacy / t_new, t_legacy_set / t_new_set))
+    print("- show / hide + amplitudes : %.2fms" % (1000. * t_uniform))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,52 @@
+"""Benchmark the detections processed by chunks.
+
+Compare the peak memory (traced numpy allocations) and the duration of the
+default detections on a whole synthetic night with detections processed by
+overlapping chunks under a memory budget.
+"""
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from visbrain.utils.sleep.detection import (kcdetect, spindlesdetect,
+                                            remdetect, slowwavedetect,
+                                            mtdetect)
+
+from _datasets import band_limited_noise, synthetic_hypno
+
+
+def run(sf=100., n_hours=8., budgets=(None, 2 ** 28, 2 ** 26)):
+    """Time detections and trace their peak memory."""
+    n_pts = int(n_hours * 3600 * sf)
+    rnd = np.random.RandomState(0)
+    data = band_limited_noise(n_pts, rnd)
+    hypno = synthetic_hypno(n_pts, rnd)
+    detections = {
+        'kc': lambda **kw: kcdetect(data, sf, .8, 3., hypno, True, 200.,
+                                    2500., 10., 400., **kw),
+        'spindle': lambda **kw: spindlesdetect(data, sf, 2., hypno, True,
+                                               **kw),
+        'rem': lambda **kw: remdetect(data, sf, hypno, True, 2., **kw),
+        'sw': lambda **kw: slowwavedetect(data, sf, .3, **kw),
+        'mt': lambda **kw: mtdetect(data, sf, 2., hypno, True, **kw)}
+    print("%.1fh at %iHz (%.0fMB of float64 data)" % (n_hours, sf,
+                                                      data.nbytes / 2 ** 20))
+    print("%-8s" % 'method' + ''.join(["%-22s" % (
+        'at once' if b is None else 'budget %iMB' % (b // 2 ** 20))
+        for b in budgets]))
+    for name, fcn in detections.items():
+        line = "%-8s" % name
+        for budget in budgets:
+            tracemalloc.start()
+            t_start = perf_counter()
+            fcn(max_memory=budget)
+            t_det = perf_counter() - t_start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            line += "%-22s" % ("%5.2fs, %5.0fMB" % (t_det, peak / 2 ** 20))
+        print(line)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,85 @@
+"""Benchmark the thin-plate spline interpolation of topographies.
+
+Compare the previous per-pixel loop (weights solved and kernel evaluated for
+every new topography) with the cached interpolation operator, for a single
+topography and for a stack of topographies.
+"""
+from time import perf_counter
+
+import numpy as np
+
+from visbrain.visuals.topo_visual import TopoMesh, _thin_plate_cached
+
+
+def legacy_griddata(x, y, v, xi, yi):
+    """Previous implementation (loop over the pixels of the grid)."""
+    xy = x.ravel() + y.ravel() * -1j
+    d = xy[None, :] * np.ones((len(xy), 1))
+    d = np.abs(d - d.T)
+    n = d.shape[0]
+    d.flat[::n + 1] = 1.
+
+    g = (d * d) * (np.log(d) - 1.)
+    g.flat[::n + 1] = 0.
+    weights = np.linalg.solve(g, v.ravel())
+
+    m, n = xi.shape
+    zi = np.zeros_like(xi)
+    xy = xy.T
+
+    g = np.empty(xy.shape)
+    for i in range(m):
+        for j in range(n):
+            d = np.abs(xi[i, j] + -1j * yi[i, j] - xy)
+            mask = np.where(d == 0)[0]
+            if len(mask):
+                d[mask] = 1.
+            np.log(d, out=g)
+            g -= 1.
+            g *= d * d
+            if len(mask):
+                g[mask] = 0.
+            zi[i, j] = g.dot(weights)
+    return zi
+
+
+def run(n_chan=19, pix=64, n_topo=20, n_stack=1000):
+    """Time both implementations."""
+    rnd = np.random.RandomState(0)
+    theta = 2 * np.pi * rnd.rand(n_chan)
+    r = 400. * np.sqrt(rnd.rand(n_chan))
+    x, y = r * np.cos(theta), r * np.sin(theta)
+    xi, yi = np.meshgrid(np.linspace(x.min(), x.max(), pix),
+                         np.linspace(y.min(), y.max(), pix))
+    data = rnd.randn(n_chan, n_stack)
+    print("%i channels, %ix%i grid" % (n_chan, pix, pix))
+
+    t_start = perf_counter()
+    for k in range(n_topo):
+        legacy = legacy_griddata(x, y, data[:, k], xi, yi)
+    t_legacy = (perf_counter() - t_start) / n_topo
+
+    _thin_plate_cached.cache_clear()
+    t_start = perf_counter()
+    TopoMesh._griddata(x, y, data[:, 0], xi, yi)
+    t_first = perf_counter() - t_start
+    t_start = perf_counter()
+    for k in range(n_topo):
+        new = TopoMesh._griddata(x, y, data[:, k], xi, yi)
+    t_new = (perf_counter() - t_start) / n_topo
+    np.testing.assert_allclose(new, legacy, rtol=1e-6,
+                               atol=1e-9 * np.abs(legacy).max())
+    print("- legacy loop       : %8.3fms / topography" % (1000. * t_legacy))
+    print("- cached operator   : %8.3fms / topography (x%.0f, operator "
+          "built in %.2fms)" % (1000. * t_new, t_legacy / t_new,
+                                1000. * t_first))
+
+    t_start = perf_counter()
+    TopoMesh._griddata(x, y, data, xi, yi)
+    t_stack = (perf_counter() - t_start) / n_stack
+    print("- stack of %-8i : %8.3fms / topography" % (n_stack,
+                                                      1000. * t_stack))
+
+
+if __name__ == '__main__':
+    run()
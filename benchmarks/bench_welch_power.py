@@ -0,0 +1,69 @@
+"""Benchmark the band power computed using Welch's method.
+
+Compare the previous epoch by epoch loop (one scipy.signal.welch call per
+epoch, then one argmin lookup per band) with the strided implementation on a
+synthetic night.
+"""
+from time import perf_counter
+
+import numpy as np
+from scipy.signal import welch
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.utils.filtering import welch_power
+
+
+def legacy_welch_power(x, freqs, sf, window_s=10, norm=True):
+    """Previous implementation (loop over epochs and bands)."""
+    sf = int(sf)
+    freq_spacing = .1
+    n_epoch = max(1, int(len(x) / (window_s * sf)))
+
+    xpow = np.zeros((len(freqs) - 1, n_epoch), dtype=float)
+
+    for i in np.arange(0, len(x), window_s * sf):
+        f, pxx_spec = welch(x[int(i):int(i + window_s * sf)], sf,
+                            nperseg=sf * (1. / freq_spacing),
+                            scaling='spectrum')
+        epoch = int(i / (window_s * sf))
+
+        for num, k in enumerate(freqs[:-1]):
+            fmin = np.abs(f - k).argmin()
+            fmax = np.abs(f - freqs[num + 1]).argmin()
+            xpow[num, epoch] = np.mean(pxx_spec[fmin:fmax])
+
+    # Normalize by the band sum :
+    if norm:
+        sum_pow = xpow.sum(0).reshape(1, -1)
+        np.divide(xpow, sum_pow, out=xpow)
+
+    # Oversample
+    xpow = np.repeat(xpow, int(window_s * sf), axis=1)
+    return xpow
+
+
+def run(sf=100., n_hours=8., freqs=(.5, 4., 8., 12., 16., 30.)):
+    """Time both implementations on a synthetic night."""
+    n_pts = int(n_hours * 3600 * sf)
+    rnd = np.random.RandomState(0)
+    x = 50. * uniform_filter1d(rnd.randn(n_pts), 10)
+    print("%.1fh at %iHz, %i bands" % (n_hours, sf, len(freqs) - 1))
+    for window_s in [10, 30]:
+        t_start = perf_counter()
+        legacy = legacy_welch_power(x, freqs, sf, window_s)
+        t_legacy = perf_counter() - t_start
+        t_start = perf_counter()
+        epochs = welch_power(x, freqs, sf, window_s, oversample=False)
+        t_epochs = perf_counter() - t_start
+        t_start = perf_counter()
+        new = welch_power(x, freqs, sf, window_s)
+        t_new = perf_counter() - t_start
+        np.testing.assert_allclose(new, legacy, rtol=1e-8)
+        print("- window_s=%i : loop %6.2fs, strided %6.3fs per epoch (x%.0f),"
+              " %6.3fs per sample (x%.0f), %i epochs" % (
+                  window_s, t_legacy, t_epochs, t_legacy / t_epochs, t_new,
+                  t_legacy / t_new, epochs.shape[1]))
+
+
+if __name__ == '__main__':
+    run()
@@ -1,11 +1,15 @@
 """Main class for sleep tools managment."""
+import os
+from inspect import signature
+
 import numpy as np
 from PyQt5 import QtWidgets, QtCore
 import logging
 
-from visbrain.utils import (remdetect, spindlesdetect, slowwavedetect,
-                            kcdetect, peakdetect, mtdetect)
-from visbrain.utils.sleep.event import _events_to_index
+from visbrain.utils.sleep.detection_pool import (apply_detection,
+                                                 check_detection_index,
+                                                 DetectionPool)
+from visbrain.utils.sleep.features import FeatureCache
 
 logger = logging.getLogger('visbrain')
 
@@ -46,6 +50,17 @@ class UiDetection(object):
         self._DetectLocations.cellChanged.connect(self._fcn_edit_detection)
         self._DetectionTab.setTabEnabled(1, False)
 
+        # -------------------------------------------------
+        # Parallel detections (results are polled from the event loop) :
+        self._detect_pool = None
+        self._detect_timer = QtCore.QTimer()
+        self._detect_timer.setInterval(50)
+        self._detect_timer.timeout.connect(self._fcn_poll_detection)
+
+        # -------------------------------------------------
+        # Features shared by successive detections :
+        self._features = FeatureCache()
+
     # =====================================================================
     # ENABLE / DISABLE GUI COMPONENTS (based on selected channels)
     # =====================================================================
@@ -78,7 +93,7 @@ class UiDetection(object):
         # Visible channels :
         elif self._ToolRdViz.isChecked():
             idx = [
-                k for k in range(len(self)) if self._chanWidget[k].isVisible()]
+                k for k in range(len(self)) if self._canvas_is_visible(k)]
 
         # All channels :
         elif self._ToolRdAll.isChecked():
@@ -87,6 +102,49 @@ class UiDetection(object):
         return idx
 
     # -------------- Get the function to run --------------
+    def _fcn_get_detection_kwargs(self, method):
+        """Get the inputs of a default detection from the GUI.
+
+        Parameters
+        ----------
+        method : string
+            Method to use.
+
+        Returns
+        -------
+        kwargs : dict
+            Inputs to send to apply_detection.
+        """
+        if method == 'REM':
+            kwargs = dict(threshold=self._ToolRemTh.value(),
+                          rem_only=self._ToolRemOnly.isChecked())
+        elif method == 'Spindles':
+            kwargs = dict(threshold=self._ToolSpinTh.value(),
+                          fmin=self._ToolSpinFmin.value(),
+                          fmax=self._ToolSpinFmax.value(),
+                          tmin=self._ToolSpinTmin.value(),
+                          tmax=self._ToolSpinTmax.value(),
+                          nrem_only=self._ToolSpinRemOnly.isChecked())
+        elif method == 'Slow waves':
+            kwargs = dict(threshold=self._ToolWaveTh.value())
+        elif method == 'K-complexes':
+            kwargs = dict(proba_thr=self._ToolKCProbTh.value(),
+                          amp_thr=self._ToolKCAmpTh.value(),
+                          tmin=self._ToolKCMinDur.value(),
+                          tmax=self._ToolKCMaxDur.value(),
+                          kc_min_amp=self._ToolKCMinAmp.value(),
+                          kc_max_amp=self._ToolKCMaxAmp.value(),
+                          nrem_only=self._ToolKCNremOnly.isChecked())
+        elif method == 'Muscle twitches':
+            kwargs = dict(threshold=self._ToolMTTh.value(),
+                          rem_only=self._ToolMTOnly.isChecked())
+        elif method == 'Peaks':
+            _disp = self._ToolPeakMinMax.currentIndex()
+            kwargs = dict(lookahead=int(self._ToolPeakLook.value() * self._sf),
+                          delta=1., get=['max', 'min', 'minmax'][_disp],
+                          threshold='auto')
+        return kwargs
+
     def _fcn_get_detection_function(self, method):
         """Get the method to use for the detection (default or custom).
 
@@ -99,129 +157,133 @@ class UiDetection(object):
         if user_method in self._custom_detections.keys():
             logger.warning("Custom method used for %s detection" % method)
             fcn = self._custom_detections[user_method]
+            use_features = 'features' in signature(fcn).parameters
+
+            def fcn_check(data, sf, time, hypno, features=None):
+                """Wrap fcn with type checking."""
+                assert isinstance(data, np.ndarray)
+                kw = dict(features=features) if use_features else {}
+                return check_detection_index(fcn(data, sf, time, hypno, **kw),
+                                             len(data))
         else:
             logger.info("Default method used for %s detection" % method)
-            # Switch between detection types :
-            if method == 'REM':
-                th = self._ToolRemTh.value()
-                rem_only = self._ToolRemOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return remdetect(data, sf, hypno, rem_only, th)
-            elif method == 'Spindles':
-                thr = self._ToolSpinTh.value()
-                fmin = self._ToolSpinFmin.value()
-                fmax = self._ToolSpinFmax.value()
-                tmin = self._ToolSpinTmin.value()
-                tmax = self._ToolSpinTmax.value()
-                nrem_only = self._ToolSpinRemOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return spindlesdetect(data, sf, thr, hypno, nrem_only,
-                                          fmin, fmax, tmin, tmax)
-            elif method == 'Slow waves':
-                thr = self._ToolWaveTh.value()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return slowwavedetect(data, sf, thr)
-            elif method == 'K-complexes':
-                proba_thr = self._ToolKCProbTh.value()
-                amp_thr = self._ToolKCAmpTh.value()
-                tmin = self._ToolKCMinDur.value()
-                tmax = self._ToolKCMaxDur.value()
-                min_amp = self._ToolKCMinAmp.value()
-                max_amp = self._ToolKCMaxAmp.value()
-                nrem_only = self._ToolKCNremOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return kcdetect(data, sf, proba_thr, amp_thr, hypno,
-                                    nrem_only, tmin, tmax, min_amp, max_amp)
-            elif method == 'Muscle twitches':
-                th = self._ToolMTTh.value()
-                rem_only = self._ToolMTOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return mtdetect(data, sf, th, hypno, rem_only)
-            elif method == 'Peaks':
-                look = int(self._ToolPeakLook.value() * self._sf)
-                _disp = self._ToolPeakMinMax.currentIndex()
-                disp = ['max', 'min', 'minmax'][_disp]
-                def fcn(data, sf, time, hypno):  # noqa
-                    return peakdetect(sf, data, self._time, look, 1., disp,
-                                      'auto')
-
-        def fcn_check(data, sf, time, hypno):
-            """Wrap fcn with type checking."""
-            assert isinstance(data, np.ndarray)
-            idx = fcn(data, sf, time, hypno)
-            idx = np.asarray(idx)
-            if not idx.size:
-                return idx
-            # Check indices shape and format to (n_events, 2) :
-            if (idx.ndim == 2) and (idx.shape[1] == 2):  # (n_events, 2)
-                return idx.astype(int)
-            elif idx.ndim == 1:  # 1d vector
-                if idx.dtype == bool:  # boolean array
-                    assert len(idx) == len(data)
-                    idx = np.arange(len(data))[idx]
-                return _events_to_index(idx)
-            else:
-                raise ValueError("Return indices should either be an (n_events"
-                                 ", 2) array or a boolean array of shape "
-                                 "(n_time_points,) or an array with "
-                                 "consecutive detected events.")
+            kwargs = self._fcn_get_detection_kwargs(method)
+
+            def fcn_check(data, sf, time, hypno, features=None):
+                """Apply the default detection."""
+                return apply_detection(user_method, data, sf, time, hypno,
+                                       features=features, **kwargs)
 
         return fcn_check
 
     # -------------- Run detection (only on selected channels) --------------
-    def _fcn_apply_detection(self):
-        """Apply detection (either REM/Spindles/Peaks/SlowWave/KC/MT)."""
+    def _fcn_apply_detection(self, *args):
+        """Apply detection (either REM/Spindles/Peaks/SlowWave/KC/MT).
+
+        Default detections on several channels run in a pool of processes
+        (one task per channel) and results are collected from the event loop.
+        Clicking again on the apply button cancels them.
+        """
+        if self._detect_pool is not None:
+            self._fcn_cancel_detection()
+            return
         # Get channels to apply detection and the detection method :
-        idx = self._fcn_get_chan_detection()
+        idx = list(self._fcn_get_chan_detection())
         method = str(self._ToolDetectType.currentText())
-
-        fcn = self._fcn_get_detection_function(method)
-
-        ############################################################
-        # RUN DETECTION
-        ############################################################
-        for i, k in enumerate(idx):
-            # Display progress bar (only if needed):
-            if len(idx) > 1:
-                self._ToolDetectProgress.show()
-
-            # Run detection :
-            index = fcn(self._data[k, :], self._sf, self._time, self._hypno)
-            nb = index.shape[0]
-            dty = nb / (len(self._time) / self._sf / 60.)
-            # dur = (index[:, 1] - index[:, 0]) * (1000. / self._sf)
-
-            logger.info(("Perform %s detection on channel %s. %i events "
-                         "detected.") % (method, self._channels[k], nb))
-
-            if index.size:
-                # Enable detection tab :
-                self._DetectionTab.setTabEnabled(1, True)
-                self._detect.dict[(self._channels[k], method)]['index'] = index
-                # Be sure panel is displayed :
-                if not self._canvas_is_visible(k):
-                    self._canvas_set_visible(k, True)
-                    self._chan.visible[k] = True
-                self._chan.loc[k].visible = True
-                # Update plot :
-                self._fcn_slider_move()
-
-            # Update progress bar :
-            self._ToolDetectProgress.setValue(100. * (i + 1) / len(self))
+        user_method = USER_METHOD[method]
+        self._detect_run = dict(method=method, n=len(idx), done=0, last=None,
+                                found=False)
+        # Display progress bar (only if needed):
+        if len(idx) > 1:
+            self._ToolDetectProgress.setValue(0)
+            self._ToolDetectProgress.show()
+
+        if (len(idx) > 1) and (user_method not in self._custom_detections):
+            logger.info("Default method used for %s detection (parallel "
+                        "detection on %i channels)" % (method, len(idx)))
+            kwargs = self._fcn_get_detection_kwargs(method)
+            self._detect_pool = DetectionPool(
+                self._data, self._sf, self._time, self._hypno,
+                n_jobs=min(os.cpu_count(), len(idx)))
+            self._detect_pool.submit(user_method, idx, **kwargs)
+            self._ToolDetectApply.setText('Cancel')
+            self._detect_timer.start()
+        else:
+            fcn = self._fcn_get_detection_function(method)
+            for k in idx:
+                index = fcn(self._data[k, :], self._sf, self._time,
+                            self._hypno, features=self._features.channel(k))
+                self._fcn_add_detection(k, index)
+            self._fcn_end_detection()
+
+    def _fcn_add_detection(self, k, index):
+        """Add the detection of a channel (without refreshing the plot)."""
+        method = self._detect_run['method']
+        nb = index.shape[0]
+        logger.info(("Perform %s detection on channel %s. %i events "
+                     "detected.") % (method, self._channels[k], nb))
+        if index.size:
+            # Enable detection tab :
+            self._DetectionTab.setTabEnabled(1, True)
+            self._detect.dict[(self._channels[k], method)]['index'] = index
+            # Be sure panel is displayed :
+            if not self._canvas_is_visible(k):
+                self._canvas_set_visible(k, True)
+                self._chan.visible[k] = True
+            self._chan.loc[k].visible = True
+            self._detect_run['found'] = True
+        self._detect_run['last'] = (k, index)
+        # Update progress bar :
+        self._detect_run['done'] += 1
+        self._ToolDetectProgress.setValue(int(
+            100. * self._detect_run['done'] / self._detect_run['n']))
+
+    def _fcn_poll_detection(self):
+        """Collect finished parallel detections."""
+        for k, future in self._detect_pool.poll():
+            try:
+                index = future.result()
+            except Exception as e:
+                logger.error("%s detection failed on channel %s (%s)" % (
+                    self._detect_run['method'], self._channels[k], e))
+                continue
+            self._fcn_add_detection(k, index)
+        if not len(self._detect_pool):
+            self._fcn_end_detection()
+
+    def _fcn_cancel_detection(self):
+        """Cancel running parallel detections."""
+        logger.warning("%s detection cancelled" % self._detect_run['method'])
+        self._detect_pool.cancel()
+        self._fcn_end_detection()
+
+    def _fcn_end_detection(self):
+        """Report detections and refresh the GUI once."""
+        if self._detect_pool is not None:
+            self._detect_timer.stop()
+            self._detect_pool.shutdown(wait=False)
+            self._detect_pool = None
+            self._ToolDetectApply.setText('Apply')
+        method, last = self._detect_run['method'], self._detect_run['last']
 
         ############################################################
         # NUMBER // DENSITY
         ############################################################
-        if index.size:
+        if (last is not None) and last[1].size:
+            nb = last[1].shape[0]
+            dty = nb / (len(self._time) / self._sf / 60.)
             # Report results on table :
             self._ToolDetectTable.setRowCount(1)
             self._ToolDetectTable.setItem(0, 0, QtWidgets.QTableWidgetItem(
                 str(nb)))
             self._ToolDetectTable.setItem(0, 1, QtWidgets.QTableWidgetItem(
                 str(round(dty, 2))))
-        else:
+        elif last is not None:
             logger.error("No %s detected on channel %s. Adjust "
-                         "parameters." % (method, self._channels[k]))
+                         "parameters." % (method, self._channels[last[0]]))
+        # Update plot (once for all channels) :
+        if self._detect_run['found']:
+            self._fcn_slider_move()
 
         ############################################################
         # LINE REPORT :
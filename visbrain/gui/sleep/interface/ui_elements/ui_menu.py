@@ -7,8 +7,7 @@ from PyQt5 import QtWidgets
 from visbrain.utils import HelpMenu
 from visbrain.io import (dialog_save, dialog_load, write_fig_hyp, write_csv,
                          write_txt, write_hypno, read_hypno,
-                         annotations_to_array, oversample_hypno,
-                         save_config_json)
+                         annotations_to_array, save_config_json)
 
 
 class UiMenu(HelpMenu):
@@ -321,8 +320,10 @@ class UiMenu(HelpMenu):
                                    "All files (*.*)")
         if filename:
             # Load the hypnogram :
-            self._hypno, _ = read_hypno(filename, time=self._time)
-            self._hypno = oversample_hypno(self._hypno, self._N)[::self._dsf]
+            hypno, _ = read_hypno(filename, time=self._time,
+                                  run_length=True)
+            hypno = hypno.oversample(self._N).decimate(self._dsf)
+            self._hypno = np.asarray(hypno)
             self._hyp.set_data(self._sf, self._hypno, self._time)
             # Update info table :
             self._fcn_info_update()
@@ -517,6 +518,8 @@ class UiMenu(HelpMenu):
         viz = self.menuDispSpec.isChecked()
         self._SpecW.setVisible(viz)
         self._specLabel.setVisible(viz)
+        if viz:
+            self._slRedraw.request()
 
     def _disptog_hyp(self):
         """Toggle method for display / hide the hypnogram.
@@ -526,6 +529,8 @@ class UiMenu(HelpMenu):
         viz = self.menuDispHypno.isChecked()
         self._HypW.setVisible(viz)
         self._hypLabel.setVisible(viz)
+        if viz:
+            self._slRedraw.request()
 
     def _disptog_navbar(self):
         """Toggle method for display / hide the navigation bar.
@@ -543,6 +548,8 @@ class UiMenu(HelpMenu):
         viz = self.menuDispTimeax.isChecked()
         self._TimeAxisW.setVisible(viz)
         self._timeLabel.setVisible(viz)
+        if viz:
+            self._slRedraw.request()
 
     def _disptog_topo(self):
         """Toggle method for display / hide the topoplot.
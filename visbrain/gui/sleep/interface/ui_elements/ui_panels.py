@@ -4,7 +4,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 import numpy as np
 
 from ..ui_init import AxisCanvas, TimeAxis
-from visbrain.utils import mpl_cmap, color2vb
+from visbrain.utils import mpl_cmap, color2vb, SpectrogramPool
 from visbrain.config import PROFILER
 from visbrain.io.dependencies import is_lspopt_installed
 
@@ -98,6 +98,16 @@ class UiPanels(object):
         self._PanSpecCmapInv.clicked.connect(self._fcn_spec_compat)
         self._PanSpecNorm.currentIndexChanged.connect(self._fcn_spec_compat)
         self._PanSpecInterp.currentIndexChanged.connect(self._fcn_spec_interp)
+        # Spectrograms of every channel (computed in the background) :
+        self._spec_pool = None
+        self._spec_timer = QtCore.QTimer()
+        self._spec_timer.setInterval(50)
+        self._spec_timer.timeout.connect(self._fcn_spec_poll)
+        self._PanSpecProgress = QtWidgets.QProgressBar(self._spec_page)
+        self._PanSpecProgress.setObjectName(_fromUtf8("_PanSpecProgress"))
+        self._PanSpecProgress.setFormat("Spectrograms %p%")
+        self._PanSpecProgress.setVisible(False)
+        self.horizontalLayout_25.insertWidget(2, self._PanSpecProgress)
         PROFILER("Spectrogram", level=2)
 
         # =====================================================================
@@ -216,6 +226,18 @@ class UiPanels(object):
                                         QtWidgets.QSizePolicy.Expanding,
                                         QtWidgets.QSizePolicy.Minimum)
 
+        # Single widget / canvas for all channels :
+        if self._stacked:
+            widget, layout = self._create_compatible_w("_widgetChanStacked",
+                                                       "_LayoutChanStacked")
+            self._chanGrid.addWidget(widget, 0, 1, 1, 1)
+            canvas = AxisCanvas(axis=self._ax, name='Canvas_stacked',
+                                fcn=[self.on_mouse_wheel])
+            layout.addWidget(canvas.canvas.native)
+            self._chanWidget = [widget] * len(self)
+            self._chanLayout = [layout] * len(self)
+            self._chanCanvas = [canvas] * len(self)
+
         # Loop over channels :
         for i, k in enumerate(self._channels):
             # ============ CHECKBOX ============
@@ -257,6 +279,9 @@ class UiPanels(object):
             # Connect buttons :
             self._yminSpin[i].valueChanged.connect(self._fcn_chan_amplitude)
             self._ymaxSpin[i].valueChanged.connect(self._fcn_chan_amplitude)
+            # Channel names are displayed inside the stacked canvas :
+            if self._stacked:
+                continue
 
             # ============ WIDGETS / LAYOUTS ============
             # Create a widget :
@@ -332,10 +357,14 @@ class UiPanels(object):
                 self._ylims[k, :] = np.array([-ma.value(), ma.value()])
             else:
                 self._ylims[k, :] = np.array([mi.value(), ma.value()])
+            if self._stacked:
+                continue
             rect = (self._chan.x[0], self._ylims[k, 0],
                     self._chan.x[1] - self._chan.x[0],
                     self._ylims[k, 1] - self._ylims[k, 0])
             self._chanCam[k].rect = rect
+        # Channels in a single canvas :
+        self._chan.set_ylim(self._ylims)
         # Redraw scoring window indicators
         self._update_scorwin_indicator()
 
@@ -378,11 +407,17 @@ class UiPanels(object):
         """Control visible panels of channels."""
         for i, k in enumerate(self._chanChecks):
             viz = k.isChecked()
+            self._chan.visible[i] = viz
+            if self._stacked:
+                continue
             self._chanWidget[i].setVisible(viz)
             self._chanLabels[i].setVisible(viz)
-            self._chan.visible[i] = viz
             if viz:
                 self._chanCanvas[i].set_camera(self._chanCam[i])
+        # The single canvas is displayed if any channel is visible :
+        if self._stacked:
+            self._chanWidget[0].setVisible(self._chan.visible.any())
+            self._chanCanvas[0].set_camera(self._chanCam[0])
         self._chan.update()
 
     def _fcn_select_all_chan(self):
@@ -410,6 +445,8 @@ class UiPanels(object):
         visible : bool
             A boolean value indicating if the canvas is visible.
         """
+        if self._stacked:  # all channels in a single canvas
+            return self._chanWidget[k].isVisible() and self._chan.visible[k]
         return self._chanWidget[k].isVisible()
 
     def _canvas_set_visible(self, k, value):
@@ -423,44 +460,94 @@ class UiPanels(object):
             Boolean value if the canvas has to be visible.
         """
         self._chanChecks[k].setChecked(value)
-        self._chanWidget[k].setVisible(value)
-        self._chanLabels[k].setVisible(value)
+        if self._stacked:  # the channel is shown in the single canvas
+            self._chanWidget[k].setVisible(value or self._chan.visible.any())
+        else:
+            self._chanWidget[k].setVisible(value)
+            self._chanLabels[k].setVisible(value)
         self._chanCanvas[k].set_camera(self._chanCam[k])
 
     # =====================================================================
     # SPECTROGRAM
     # =====================================================================
-    def _fcn_spec_set_data(self):
-        """Set data to the spectrogram."""
+    def _fcn_spec_get_settings(self):
+        """Get the spectrogram settings from the panel.
+
+        Returns
+        -------
+        kwargs : dict
+            Computation settings (see visbrain.utils.compute_spectrogram).
+        display : dict
+            Display settings (colormap, contrast and interpolation).
+        """
         # Get nfft and overlap :
         nfft, over = self._PanSpecNfft.value(), self._PanSpecStep.value()
         # Get starting / ending frequency :
         fstart, fend = self._PanSpecFstart.value(), self._PanSpecFend.value()
+        # Use spectrogram / tf :
+        method = str(self._PanSpecMethod.currentText())
+        # Normalization :
+        norm = int(self._PanSpecNorm.currentIndex())
+        kwargs = dict(method=method, nfft=nfft, overlap=over, fstart=fstart,
+                      fend=fend, norm=norm)
         # Get contrast :
         contrast = self._PanSpecCon.value()
         contrast = 1. if contrast < .1 else contrast
         # Get colormap :
         cmap = str(self._PanSpecCmap.currentText())
-        # Get channel to get spectrogram :
-        chan = self._PanSpecChan.currentIndex()
-        # Use spectrogram / tf :
-        method = str(self._PanSpecMethod.currentText())
-        # Interpolation :
-        interp = str(self._PanSpecInterp.currentText())
-        # Normalization :
-        norm = int(self._PanSpecNorm.currentIndex())
         # Get reversed colormap :
         if self._PanSpecCmapInv.isChecked():
             cmap += '_r'
+        # Interpolation :
+        interp = str(self._PanSpecInterp.currentText())
+        display = dict(cmap=cmap, contrast=contrast, interp=interp)
+        return kwargs, display
+
+    def _fcn_spec_set_data(self):
+        """Set data to the spectrogram."""
+        kwargs, display = self._fcn_spec_get_settings()
+        # Get channel to get spectrogram :
+        chan = self._PanSpecChan.currentIndex()
         self._specLabel.setText(self._addspace + self._channels[chan])
         # Set data :
-        self._spec.set_data(self._sf, self._data[chan, ...], self._time,
-                            nfft=nfft, overlap=over, fstart=fstart, fend=fend,
-                            cmap=cmap, contrast=contrast, interp=interp,
-                            norm=norm, method=method)
+        if self._spec:
+            # Pre-processed data are not cached :
+            self._spec.set_data(self._sf, self._data[chan, ...], self._time,
+                                **kwargs, **display)
+        else:
+            if self._spec_pool is None:
+                self._spec_pool = SpectrogramPool(self._data, self._sf)
+            # Spectrograms of other channels are computed in the background
+            # (those of previous settings are dropped) :
+            if self._spec_pool.get(chan, **kwargs) is None:
+                self._spec_pool.cancel()
+                self._spec_pool.submit(range(len(self)), **kwargs)
+            image = self._spec_pool.get(chan, wait=True, **kwargs)
+            self._spec.set_data(self._sf, None, self._time, image=image,
+                                **kwargs, **display)
+            self._fcn_spec_poll()
+            if len(self._spec_pool):
+                self._PanSpecProgress.setVisible(True)
+                self._spec_timer.start()
         # Set apply button disable :
         self._PanSpecApply.setEnabled(False)
 
+    def _fcn_spec_poll(self):
+        """Update the progress of background spectrograms."""
+        self._spec_pool.poll()
+        self._PanSpecProgress.setValue(int(100. * self._spec_pool.progress))
+        if not len(self._spec_pool):
+            self._spec_timer.stop()
+            self._PanSpecProgress.setVisible(False)
+
+    def _fcn_spec_reset(self):
+        """Drop spectrograms (e.g when data are modified)."""
+        if self._spec_pool is not None:
+            self._spec_timer.stop()
+            self._spec_pool.shutdown(wait=False)
+            self._spec_pool = None
+            self._PanSpecProgress.setVisible(False)
+
     def _fcn_spec_compat(self):
         """Check compatibility between spectro parameters."""
         # Get nfft and overlap :
@@ -1,10 +1,13 @@
 """Main class for settings managment."""
 import numpy as np
 import datetime
+from PyQt5 import QtCore
 from PyQt5.QtCore import QObjectCleanupHandler
 
 import vispy.visuals.transforms as vist
 
+from visbrain.utils.guitools import RedrawScheduler
+
 
 class UiSettings(object):
     """Main class for settings managment."""
@@ -18,7 +21,14 @@ class UiSettings(object):
         # Function applied when the slider move :
         self._slOnStart = False
         self._fcn_slider_settings()
-        self._SlVal.valueChanged.connect(self._fcn_slider_move)
+        # Slider, wheel and key events are coalesced into one update per
+        # frame :
+        self._slRedraw = RedrawScheduler(self._fcn_slider_move)
+        self._SlVal.valueChanged.connect(self._slRedraw.request)
+        # Redraw once the envelope of the data is built (in background) :
+        self._pyramid_timer = QtCore.QTimer()
+        self._pyramid_timer.setInterval(100)
+        self._pyramid_timer.timeout.connect(self._fcn_pyramid_poll)
         # Function applied when the display window changed :
         self._SigWin.valueChanged.connect(self._fcn_sigwin_settings)
         self._SigWin.setKeyboardTracking(False)
@@ -84,6 +94,22 @@ class UiSettings(object):
         t[1] = int(round(np.abs(self._time - xlim[1]).argmin()))
         return t
 
+    def _adjacent_slices(self):
+        """Get the slices of windows around the display window.
+
+        Windows are ordered by distance to the display window (next window
+        first) and limited to the prefetch depth of channels.
+        """
+        val, step = self._SlVal.value(), self._SigSlStep.value()
+        win = self._SigWin.value()
+        slices = []
+        for k in range(1, self._chan._prefetch.depth + 1):
+            for v in [val + k, val - k]:
+                if self._SlVal.minimum() <= v <= self._SlVal.maximum():
+                    t = self.data_index((v * step, v * step + win))
+                    slices.append(slice(t[0], t[1]))
+        return slices
+
     @property
     def _hypref(self):
         """Return ref value of "current" stage."""
@@ -177,7 +203,13 @@ class UiSettings(object):
                                                barwidth=barwidth())
 
     def _fcn_slider_move(self):
-        """Function applied when the slider move."""
+        """Function applied when the slider move.
+
+        Only visible panels are updated. Slider events go through
+        self._slRedraw, which skips intermediate positions.
+        """
+        # The pending update (if any) is performed now :
+        self._slRedraw.cancel()
         # ================= INDEX =================
         # Get slider variables :
         win = self._SigWin.value()
@@ -196,19 +228,22 @@ class UiSettings(object):
         sl = slice(t[0], t[1])
         self._chan.set_data(self._sf, self._data, self._time, sl=sl,
                             ylim=self._ylims)
+        # Prepare adjacent windows in the background :
+        self._chan.prefetch(self._sf, self._data, self._time,
+                            self._adjacent_slices())
         # Redraw the scoring window indicators
         self._update_scorwin_indicator()
 
         # ---------------------------------------
         is_indic_checked = self.menuDispIndic.isChecked()
         # Update spectrogram indicator :
-        if is_indic_checked and not iszoom:
+        if is_indic_checked and not iszoom and not self._SpecW.isHidden():
             ylim = (self._PanSpecFstart.value(), self._PanSpecFend.value())
             self._specInd.set_data(xlim=xlim, ylim=ylim)
 
         # ---------------------------------------
         # Update hypnogram indicator :
-        if is_indic_checked and not iszoom:
+        if is_indic_checked and not iszoom and not self._HypW.isHidden():
             self._hypInd.set_data(xlim=xlim, ylim=(-6., 2.))
 
         # ---------------------------------------
@@ -229,7 +264,7 @@ class UiSettings(object):
 
         # ---------------------------------------
         # Update Time indicator :
-        if is_indic_checked:
+        if is_indic_checked and not self._TimeAxisW.isHidden():
             self._TimeAxis.set_data(xlim[0], win, self._time, unit=unit,
                                     markers=self._annot_mark)
 
@@ -258,6 +293,18 @@ class UiSettings(object):
             k.setStyleSheet("QLabel")
         self._hypYLabels[hypconv + 2].setStyleSheet("QLabel {color: " +
                                                     hypcol + ";}")
+        self._slRedraw.done()
+
+    def _fcn_build_pyramid(self):
+        """Build the min / max envelope of the data in the background."""
+        self._chan.build_pyramid(self._data, self._time)
+        self._pyramid_timer.start()
+
+    def _fcn_pyramid_poll(self):
+        """Redraw the signals once their min / max envelope is built."""
+        if not self._chan.pyramid_pending:
+            self._pyramid_timer.stop()
+            self._slRedraw.request()
 
     def _fcn_slider_settings(self):
         """Function applied to change slider settings."""
@@ -456,7 +503,8 @@ class UiSettings(object):
             self._yminSpin[k].deleteLater(), self._ymaxSpin[k].deleteLater()
             self._chanWidget[k].deleteLater()
             self._chanLayout[k].deleteLater()
-            self._chanLabels[k].deleteLater()
+            if not self._stacked:
+                self._chanLabels[k].deleteLater()
             self._amplitudeTxt[k].deleteLater()
             self._chanCanvas[k].parent = None
         QObjectCleanupHandler().add(self._chanGrid)
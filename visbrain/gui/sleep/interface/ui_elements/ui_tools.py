@@ -2,8 +2,8 @@
 
 import numpy as np
 from PyQt5 import QtWidgets
-from visbrain.utils import (rereferencing, bipolarization, find_non_eeg,
-                            commonaverage)
+from visbrain.utils import find_non_eeg
+from visbrain.utils.sleep import Montage
 
 
 class UiTools(object):
@@ -17,6 +17,10 @@ class UiTools(object):
         # =====================================================================
         # RE-REFERENCING
         # =====================================================================
+        # Montages are applied on the fly to the raw data :
+        self._raw = (self._data, list(self._channels))
+        self._montage = Montage.raw(self._channels)
+        self._ToolsRefMeth.addItem("None (raw data)")
         # Add channels to scrolling area :
         self._ToolsRefIgnArea.setVisible(False)
         self._reChecks = []
@@ -68,7 +72,7 @@ class UiTools(object):
             self._ToolsRefSingleW.setVisible(True)
         elif idx == 1:  # Common average
             self._ToolsRefSingleW.setVisible(False)
-        elif idx == 2:  # Bipolarization
+        elif idx in [2, 3]:  # Bipolarization / raw data
             self._ToolsRefSingleW.setVisible(False)
 
     def _fcn_ref_chan_ignore(self):
@@ -76,13 +80,19 @@ class UiTools(object):
         self._ToolsRefIgnArea.setVisible(self._ToolsRefIgn.isChecked())
 
     def _fcn_ref_apply(self):
-        """Apply re-referencing."""
+        """Apply re-referencing.
+
+        The montage is always defined on the raw data and applied on the fly
+        (see Montage), so that the raw data are neither copied nor modified
+        and switching between montages is instantaneous.
+        """
+        data, channels = self._raw
         # By default, ingore non-eeg channel :
         to_ignore = list(self._noneeg)
         if self._ToolsRefIgn.isChecked():
             for num, k in enumerate(self._reChecks):
                 # Get the position of this channel :
-                idinlst = self._channels.index(str(k.text()))
+                idinlst = channels.index(str(k.text()))
                 # Set to ignore :
                 to_ignore[idinlst] = k.isChecked()
 
@@ -96,22 +106,27 @@ class UiTools(object):
             # overall index of reference channel
             idchan_all = np.where(~self._noneeg)[0][idchan_eeg]
             # Re-referencing :
-            self._data, self._channels, consider = rereferencing(
-                self._data, self._channels, idchan_all,
-                to_ignore)
+            self._montage = Montage.reference(channels, idchan_all,
+                                              to_ignore)
             self._chanChecks[idx].setChecked(False)
         elif idx == 1:  # Common average
-            self._data, self._channels, consider = commonaverage(
-                self._data, self._channels, to_ignore)
+            self._montage = Montage.average(channels, to_ignore)
         elif idx == 2:  # Bipolarization
-            self._data, self._channels, consider = bipolarization(
-                self._data, self._channels,
-                to_ignore)
+            self._montage = Montage.bipolar(channels, to_ignore)
+        elif idx == 3:  # Raw data
+            self._montage = Montage.raw(channels)
+        is_raw = self._montage.is_identity
+        self._data = data if is_raw else self._montage(data)
+        self._channels = list(self._montage.channels)
+        consider = self._montage.consider
 
         # ____________________ Update ____________________
         a_max = np.argmax(consider)
-        # Update data info :
+        # Update data info and envelope :
         self._get_data_info()
+        self._fcn_build_pyramid()
+        self._fcn_spec_reset()
+        self._features.clear()
 
         # Update and clear detections :
         self._DetectLocations.setRowCount(0)
@@ -132,7 +147,9 @@ class UiTools(object):
         # Update channel names :
         for num, k in enumerate(self._channels):
             self._chanChecks[num].setText(k)
-            self._chanLabels[num].setText(k)
+            if not self._stacked:
+                self._chanLabels[num].setText(k)
+        self._chan.set_labels(self._channels)
 
         # Ignore non re-referenced channels :
         if self._ToolsRefIgnore.isChecked():
@@ -140,7 +157,8 @@ class UiTools(object):
                 # Remove from visible channels :
                 self._chanChecks[num].setChecked(False)
                 self._chanChecks[num].setVisible(k)
-                self._chanLabels[num].setVisible(k)
+                if not self._stacked:
+                    self._chanLabels[num].setVisible(k)
                 self._yminSpin[num].setVisible(k)
                 self._ymaxSpin[num].setVisible(k)
                 self._amplitudeTxt[num].setVisible(k)
@@ -49,6 +49,10 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         The sampling frequency of raw data.
     downsample : float | 100.
         The downsampling frequency for the data and hypnogram raw data.
+    decimation : {'stride', 'filter'}
+        Down-sampling method. Use 'stride' to keep one sample over the
+        down-sampling factor or 'filter' to apply an anti-aliasing low-pass
+        FIR filter before (this is ignored when loading files using MNE).
     axis : bool | False
         Specify if each axis have to contains its own axis. Be carefull
         with this option, the rendering can be much slower.
@@ -57,19 +61,35 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         order into the GUI.
     preload : bool | True
         Preload data into memory. For large datasets, turn this parameter to
-        True.
+        False : .vhdr, .eeg, .trc, .edf, .bdf and .rec files are then read
+        on demand (only the displayed window is loaded) while other formats
+        are loaded using MNE-python.
     use_mne : bool | False
         Force to load the file using mne.io functions.
     kwargs_mne : dict | {}
         Dictionary to pass to the mne.io loading function.
+    cache : bool | False
+        Cache the converted dataset inside the visbrain_data folder (see
+        visbrain.io.clean_sleep_cache to invalidate it). Opening the same
+        .vhdr, .eeg, .trc, .edf, .bdf or .rec file again with the same
+        down-sampling settings then only requires to memory-map it.
+    prefetch : int | 1
+        Number of display windows prepared in the background on each side
+        of the current one, so that paging through the recording does not
+        wait for slicing and filtering. Use 0 to disable it.
+    stacked : bool | False
+        Plot all channels in a single canvas (one visual drawn in a single
+        call) instead of one canvas per channel. This is faster to render
+        when many channels are displayed.
 
     Notes
     -----
     .. note::
         * Supported polysomnographic files : by default, Sleep support .vhdr
-          (BrainVision), .eeg (Elan), .trc (Micromed) and .edf (European Data
-          Format). If mne-python is installed, this default list of supported
-          files is extended to .cnt, .egi, .mff, .edf, .bdf, .gdf, .set, .vhdr.
+          (BrainVision), .eeg (Elan), .trc (Micromed), .edf (European Data
+          Format) and .bdf (BioSemi). If mne-python is installed, this
+          default list of supported files is extended to .cnt, .egi, .mff,
+          .edf, .bdf, .gdf, .set, .vhdr.
         * Supported hypnogram files : by default, Sleep support .txt, .csv and
           .hyp hypnogram files.
 
@@ -81,7 +101,9 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
     def __init__(self, data=None, hypno=None, config_file=None,
                  annotations=None, channels=None, sf=None, downsample=100.,
                  axis=True, href=['art', 'wake', 'rem', 'n1', 'n2', 'n3'],
-                 preload=True, use_mne=False, kwargs_mne={}, verbose=None):
+                 preload=True, use_mne=False, kwargs_mne={},
+                 decimation='stride', cache=False, prefetch=1, stacked=False,
+                 verbose=None):
         """Init."""
         _PyQtModule.__init__(self, verbose=verbose, icon='sleep_icon.svg')
         # ====================== APP CREATION ======================
@@ -97,7 +119,7 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         PROFILER("Import file", as_type='title')
         ReadSleepData.__init__(self, data, channels, sf, hypno, href, preload,
                                use_mne, downsample, kwargs_mne,
-                               annotations)
+                               annotations, decimation, cache)
 
         # ====================== VARIABLES ======================
         # Check all data :
@@ -105,6 +127,8 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         self._annot_mark = np.array([])
         self._hconvinv = {v: k for k, v in self._hconv.items()}
         self._ax = axis
+        self._prefetch_depth = prefetch
+        self._stacked = stacked
         # ---------- Default line width ----------
         self._lw = 1.
         self._lwhyp = 2
@@ -186,6 +210,11 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
                 * The time vector of shape (n_time_points,)
                 * A vector array for the hypnogram of shape (n_time_points,)
 
+            If the function also accepts a `features` keyword argument, it
+            receives the ChannelFeatures of the channel, a cache of features
+            shared with the other detections (see
+            visbrain.utils.sleep.FeatureCache).
+
             Then, the function should return indices of relevant events.
             Returned indices should either be :
 
@@ -238,9 +267,12 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
     def _cam_creation(self):
         """Create a set of cameras."""
         # ------------------- Channels -------------------
-        self._chanCam = []
-        for k in range(len(self)):
-            self._chanCam.append(FixedCam())  # viscam.PanZoomCamera()
+        if self._stacked:  # a single canvas for all channels
+            self._chanCam = [FixedCam()] * len(self)
+        else:
+            self._chanCam = []
+            for k in range(len(self)):
+                self._chanCam.append(FixedCam())  # viscam.PanZoomCamera()
         # ------------------- Spectrogram -------------------
         self._speccam = FixedCam()  # viscam.PanZoomCamera()
         self._specCanvas.set_camera(self._speccam)
@@ -260,6 +292,10 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
 
     def _fcns_on_creation(self):
         """Applied on creation."""
+        # Set objects visible (hidden panels are not updated) :
+        self._SpecW.setVisible(True)
+        self._HypW.setVisible(True)
+        self._TimeAxisW.setVisible(True)
         self._fcn_grid_toggle()
         self._fcn_scorwin_indicator_toggle()
         self._fcn_sigwin_settings()
@@ -270,10 +306,6 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         self._fcn_chan_sym_amp()
         self._fcn_info_update()
         self._fcn_hypno_to_score()
-        # Set objects visible :
-        self._SpecW.setVisible(True)
-        self._HypW.setVisible(True)
-        self._TimeAxisW.setVisible(True)
         # File to load :
         if self._config_file is not None:  # Config file
             self._load_config(filename=self._config_file)
@@ -81,6 +81,21 @@ class TestSleep(_TestVisbrain):
         sp._LockScorSigWins.setChecked(True)
         sp._fcn_lock_scorwin_sigwin()
 
+    def test_ui_envelope(self):
+        """Test the min / max envelope built in the background."""
+        chan = sp._chan
+        sp._fcn_build_pyramid()
+        # Strided samples are displayed until the envelope is ready :
+        time, data = chan._strided_window(sp._data, sp._time,
+                                          slice(0, 100000), 1000, [0, 1])
+        assert len(time) == data.shape[1] == 2000
+        chan._pyramids.wait()
+        sp._fcn_pyramid_poll()
+        assert not chan.pyramid_pending
+        assert not sp._pyramid_timer.isActive()
+        assert chan._get_pyramid(sp._data)[0] is not None
+        sp._fcn_slider_move()
+
     ###########################################################################
     #                                SAVE
     ###########################################################################
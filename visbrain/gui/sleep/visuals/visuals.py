@@ -4,17 +4,21 @@ This file contains and initialize visual objects (channel plot, spectrogram,
 hypnogram, indicator, shortcuts)
 """
 import numpy as np
-import scipy.signal as scpsig
 import itertools
 import logging
+import weakref
 
 from vispy import scene
 import vispy.visuals.transforms as vist
 
 from .marker import Markers
-from visbrain.utils import (color2vb, PrepareData, cmap_to_glsl)
+from visbrain.utils import (color2vb, PrepareData, cmap_to_glsl,
+                            BackgroundCache)
 from visbrain.utils.sleep.event import _index_to_events
-from visbrain.visuals import TopoMesh, TFmapsMesh
+from visbrain.utils.sleep.envelope import MinMaxPyramid
+from visbrain.utils.sleep.prefetch import WindowPrefetcher
+from visbrain.utils.sleep.spectro_pool import compute_spectrogram
+from visbrain.visuals import TopoMesh, TFmapsMesh, StackedSignal
 from visbrain.config import PROFILER
 
 logger = logging.getLogger('visbrain')
@@ -215,13 +219,25 @@ class Detection(object):
 
 
 class ChannelPlot(PrepareData):
-    """Plot each channel."""
+    """Plot each channel.
+
+    Vertices of the windows adjacent to the displayed one are prepared in a
+    background thread (see prefetch). prefetch is the number of windows
+    prepared on each side (0 to disable it).
+
+    By default, each channel is plotted in its own canvas. If stacked is
+    True, all channels are plotted in the canvas parent[0] using a single
+    visual (see visbrain.visuals.StackedSignal). The visuals of each channel
+    (peaks, locations, detections) are then attached to the nodes in
+    parents, which map the data of the channel into its row.
+    """
 
     def __init__(self, channels, time, color=(.2, .2, .2), width=1.5,
                  color_detection='red', method='gl', camera=None,
-                 parent=None, fcn=None):
-        # Initialize PrepareData :
-        PrepareData.__init__(self, axis=1)
+                 parent=None, fcn=None, prefetch=1, stacked=False):
+        # Initialize PrepareData (channels are filtered once, in the
+        # background) :
+        PrepareData.__init__(self, axis=1, whole=True)
 
         # Variables :
         self._camera = camera
@@ -232,16 +248,26 @@ class ChannelPlot(PrepareData):
         self._fcn = fcn
         self.visible = np.array([True] + [False] * (len(channels) - 1))
         self.consider = np.ones((len(channels),), dtype=bool)
+        self._pyramids = BackgroundCache(1, on_error=self._pyramid_failed)
+        self._pyramid_data = None
+        self._prefetch = WindowPrefetcher(self._compute_window, prefetch)
+        self.stacked = stacked
 
         # Get color :
         self.color = color2vb(color)
         self.color_detection = color2vb(color_detection)
 
-        # Create one line per channel :
-        pos = np.zeros((1, 3), dtype=np.float32)
         self.mesh, self.report, self.grid, self.peak, self.scorwin_ind = \
             [], [], [], [], []
-        self.loc, self.node = [], []
+        self.loc, self.node, self.labels = [], [], []
+        if stacked:
+            self._create_stacked(channels, method, parent[0])
+        else:
+            self._create_channels(channels, method, parent)
+
+    def _create_channels(self, channels, method, parent):
+        """Create one line per channel, each in its own canvas."""
+        pos = np.zeros((1, 3), dtype=np.float32)
         for i, k in enumerate(channels):
             # ----------------------------------------------
             # Create a node parent :
@@ -286,6 +312,57 @@ class ChannelPlot(PrepareData):
                                            name=k + '_scorwin_ind',
                                            visible=True)
             self.scorwin_ind.append(scorwin_ind)
+        self.parents = self.node
+
+    def _create_stacked(self, channels, method, parent):
+        """Create a single visual for all channels, in the canvas parent."""
+        n_chan = len(channels)
+        pos = np.zeros((1, 3), dtype=np.float32)
+        # All channels share the same node (magnify) :
+        node = scene.Node(name='stackedplot')
+        node.parent = parent.wc.scene
+        self.node = [node] * n_chan
+
+        # Main visual (for channel plot) :
+        stack = StackedSignal(n_chan, color=self.color, width=self.width,
+                              method=method, parent=node)
+        self.mesh = [stack] * n_chan
+
+        # Grid (one line between channels) :
+        grid = scene.visuals.GridLines(color=(.1, .1, .1, .5),
+                                       scale=(1., 1.),
+                                       parent=parent.wc.scene)
+        grid.set_gl_state('translucent')
+        self.grid = [grid] * n_chan
+
+        # Scoring window indicator :
+        scorwin_ind = ScorWinIndicator(parent=node, name='stacked_scorwin_ind',
+                                       visible=True)
+        self.scorwin_ind = [scorwin_ind] * n_chan
+
+        # One node per channel, mapping its data into its row :
+        self.parents = []
+        for k in channels:
+            row = scene.Node(name=k + 'plot', parent=node)
+            row.transform = vist.STTransform()
+            self.parents.append(row)
+            # Marker peaks :
+            mark = Markers(pos=np.zeros((1, 3), dtype=np.float32),
+                           parent=row)
+            mark.set_gl_state('translucent')
+            mark.visible = False
+            self.peak.append(mark)
+            # Locations :
+            loc = scene.visuals.Line(pos, name=k + 'location', method=method,
+                                     color=(.1, .1, .1, .3), parent=row,
+                                     connect='segments')
+            loc.set_gl_state('translucent')
+            self.loc.append(loc)
+            # Channel name (top left corner of the row) :
+            label = scene.visuals.Text(k, color='black', font_size=9,
+                                       anchor_x='left', anchor_y='top',
+                                       parent=node)
+            self.labels.append(label)
 
     def __iter__(self):
         """Iterate over visible mesh."""
@@ -297,9 +374,162 @@ class ChannelPlot(PrepareData):
         """Return the number of channels."""
         return len(self.mesh)
 
+    def build_pyramid(self, data, time, wait=False):
+        """Compute the min / max envelope pyramid of the data.
+
+        The pyramid is built in a background thread. Until it is ready, long
+        windows are drawn using a strided subset of their samples (see
+        pyramid_pending). The pyramid of previous data is dropped.
+
+        Parameters
+        ----------
+        data: array_like
+            Array of data of shape (n_channels, n_points)
+        time: array_like
+            The time vector.
+        wait : bool | False
+            Wait for the pyramid to be built.
+        """
+        self._pyramids.clear()
+        self._pyramid_data = weakref.ref(data)
+        self._pyramids.submit(id(data), MinMaxPyramid, data, time)
+        if wait:
+            self._pyramids.wait()
+        # Prepared windows may come from previous data :
+        self._prefetch.clear()
+
+    @property
+    def pyramid_pending(self):
+        """Get if the min / max envelope pyramid is being built."""
+        self._pyramids.collect()
+        return bool(len(self._pyramids.pending))
+
+    @staticmethod
+    def _pyramid_failed(key, e):
+        """Log a min / max envelope pyramid that could not be built."""
+        logger.error("Envelope of the data failed (%s)" % e)
+
+    def _get_pyramid(self, data):
+        """Get the min / max envelope pyramid of the data.
+
+        Returns
+        -------
+        pyramid : MinMaxPyramid | None
+            The pyramid (None if it is not built).
+        pending : bool
+            Specify if the pyramid of the data is being built.
+        """
+        if (self._pyramid_data is None) or (self._pyramid_data() is not data):
+            return None, False
+        self._pyramids.collect()
+        key = id(data)
+        return self._pyramids.get(key), key in self._pyramids.pending
+
+    @staticmethod
+    def _strided_window(data, time, sl, n_pixels, rows):
+        """Get a strided subset of the samples of a window.
+
+        About two samples per pixel are kept. This is used while the min /
+        max envelope pyramid is being built. None is returned if the window
+        doesn't have much more samples than pixels.
+        """
+        start, stop, _ = sl.indices(data.shape[1])
+        step = (stop - start) // (2 * n_pixels)
+        if step < 2:
+            return None
+        sl = slice(start, stop, step)
+        return time[sl], data[rows, sl]
+
+    def _window_inputs(self, sf, data, time):
+        """Get the inputs of _compute_window that do not depend on the window.
+
+        Inputs are a snapshot of the visible channels and of the
+        preprocessing settings, so that a window prepared in the background
+        matches its key even if they change in the meantime.
+
+        Returns
+        -------
+        key : tuple
+            What defines the vertices of a window, except its slice.
+        inputs : tuple
+            Inputs of _compute_window (except the slice).
+        """
+        rows = np.arange(len(self))[self.visible]
+        preproc_channel = self._preproc_channel
+        prep_rows = rows if preproc_channel == -1 else np.array(
+            [preproc_channel])
+        prep, channels, n_pixels, pyramid = None, None, None, None
+        if self:
+            prep = self._settings(sf)
+            if self.filt and self.whole:
+                channels = self.precompute(sf, data, prep_rows)
+        else:  # envelopes can't be used on preprocessed data
+            pyramid, pending = self._get_pyramid(data)
+            if (pyramid is not None) or pending:
+                canvas = self.node[0].canvas if len(self.node) else None
+                n_pixels = canvas.size[0] if canvas is not None else 1000
+        key = (id(data), id(time), tuple(rows), preproc_channel, prep,
+               channels is not None, n_pixels, pyramid is not None)
+        return key, (data, time, rows, prep_rows, preproc_channel, prep,
+                     channels, n_pixels, pyramid)
+
+    def _compute_window(self, sl, data, time, rows, prep_rows,
+                        preproc_channel, prep, channels, n_pixels, pyramid):
+        """Compute the vertices of visible channels on a window.
+
+        This method can be called from a background thread. It only uses its
+        inputs (see _window_inputs) and not the attributes of the object.
+
+        Returns
+        -------
+        x : tuple
+            Time limits of the window.
+        pos : list
+            float32 vertices of shape (n_vertices, 3) of each visible
+            channel.
+        ylim : list
+            (min, max) of each visible channel.
+        """
+        # Slice selection (of time and data) :
+        time_sl = time[sl]
+        x = (time_sl.min(), time_sl.max())
+        envelope = None
+        if pyramid is not None:  # min / max envelope of the window
+            envelope = pyramid.get(sl, n_pixels, rows=rows)
+        elif n_pixels is not None:  # envelope not built yet
+            envelope = self._strided_window(data, time, sl, n_pixels, rows)
+        if envelope is not None:
+            time_sl, data_sl = envelope
+        else:
+            data_sl = data[rows, sl]
+
+        # Prepare the data (only if needed) :
+        if prep is not None:
+            window = self._prepare_rows(data, sl, prep_rows, prep, channels)
+            if preproc_channel == -1:  # prepare all channels
+                data_sl = window
+            else:  # filt only one channel
+                # Get on which visible channel to apply preprocessing :
+                to_chan = list(rows).index(preproc_channel)
+                data_sl[[to_chan], :] = window
+
+        # Concatenate time / data / z axis of each channel :
+        pos, ylim = [], []
+        for datchan in data_sl:
+            dat = np.empty((len(time_sl), 3), dtype=np.float32)
+            dat[:, 0], dat[:, 1], dat[:, 2] = time_sl, datchan, .5
+            pos.append(dat)
+            ylim.append((datchan.min(), datchan.max()))
+        return x, pos, ylim
+
     def set_data(self, sf, data, time, sl=None, ylim=None, autoamp=True):
         """Set data to channels.
 
+        When the window contains much more samples than pixels, the min / max
+        envelope of the data is displayed instead of the raw samples (see
+        build_pyramid). Windows prepared in the background (see prefetch) are
+        used when available.
+
         Parameters
         ----------
         data: array_like
@@ -317,38 +547,23 @@ class ChannelPlot(PrepareData):
         # Manage slice :
         sl = slice(0, data.shape[1]) if sl is None else sl
 
-        # Slice selection (of time and data) :
-        time_sl = time[sl]
-        self.x = (time_sl.min(), time_sl.max())
-        data_sl = data[self.visible, sl]
-        z = np.full_like(time_sl, .5, dtype=np.float32)
+        # Get the vertices of the window :
+        key, inputs = self._window_inputs(sf, data, time)
+        self.x, pos, ylim_chan = self._prefetch.get(
+            key + (sl.start, sl.stop), sl, *inputs)
 
-        # Prepare the data (only if needed) :
-        if self:
-            if self._preproc_channel == -1:  # prepare all channels
-                data_sl = self._prepare_data(sf, data_sl.copy(), time_sl)
-            else:  # filt only one channel
-                # Get on which visible channel to apply preprocessing :
-                chan_lst_viz = list(np.arange(len(self))[self.visible])
-                to_chan = chan_lst_viz.index(self._preproc_channel)
-                data_sl[[to_chan], :] = self._prepare_data(sf, data_sl[
-                    [to_chan], :].copy(), time_sl)
+        if self.stacked:
+            self._set_stacked_data(pos, ylim, ylim_chan)
+            return
 
         # Set data to each plot :
         for l, (i, k) in enumerate(self):
-            # ________ MAIN DATA ________
-            # Select channel ;
-            datchan = data_sl[l, :]
-
-            # Concatenate time / data / z axis :
-            dat = np.vstack((time_sl, datchan, z)).T
-
             # Set main ligne :
-            k.set_data(dat, width=self.width)
+            k.set_data(pos[l], width=self.width)
 
             # ________ CAMERA ________
             # Use either auto / fixed adaptative camera :
-            ycam = (datchan.min(), datchan.max()) if self.autoamp else ylim[i]
+            ycam = ylim_chan[l] if self.autoamp else ylim[i]
 
             # Get camera rectangle and set it:
             rect = (self.x[0], ycam[0], self.x[1] - self.x[0],
@@ -357,6 +572,105 @@ class ChannelPlot(PrepareData):
             k.update()
             self.rect.append(rect)
 
+    def _set_stacked_data(self, pos, ylim, ylim_chan):
+        """Set the vertices of visible channels to the stacked visual."""
+        stack = self.mesh[0]
+        rows = np.arange(len(self))[self.visible]
+        if len(rows):
+            data = np.array([k[:, 1] for k in pos])
+            stack.set_data(data, pos[0][:, 0], channels=rows)
+        stack.width = self.width
+        # Use either auto / fixed amplitudes :
+        ylim_all = np.array(stack.ylim)
+        ylim_all[rows, :] = ylim_chan if self.autoamp else ylim[rows, :]
+        stack.visible_channels = self.visible
+        stack.ylim = ylim_all
+        self._update_rows()
+        self._camera[0].rect = stack.rect
+
+    def _update_rows(self):
+        """Update the node and the name of each channel of the stack."""
+        stack = self.mesh[0]
+        rows = stack.rows
+        for i, (row, label) in enumerate(zip(self.parents, self.labels)):
+            scale, offset = stack.row_mapping(i)
+            row.transform.scale = (1., scale)
+            row.transform.translate = (0., offset)
+            row.visible = label.visible = bool(self.visible[i])
+            label.pos = (stack.rect[0], rows[i] + 1.)
+
+    def set_ylim(self, ylim):
+        """Set the amplitude of channels plotted in a single canvas.
+
+        This is ignored for channels plotted in their own canvas (use the
+        camera of each channel instead) or when automatic amplitudes are
+        used.
+
+        Parameters
+        ----------
+        ylim : array_like
+            Y-limits of each channel. Must be a (n_channels, 2) array.
+        """
+        if self.stacked and not self.autoamp:
+            self.mesh[0].ylim = ylim
+            self._update_rows()
+
+    def set_labels(self, labels):
+        """Set channel names displayed in a single canvas.
+
+        Parameters
+        ----------
+        labels : list
+            Name of each channel.
+        """
+        for label, k in zip(self.labels, labels):
+            label.text = k
+
+    def channel_at(self, pos):
+        """Get the channel under the mouse (channels in a single canvas).
+
+        Parameters
+        ----------
+        pos : array_like
+            Position of the mouse in canvas coordinates.
+
+        Returns
+        -------
+        chan : int | None
+            Index of the channel or None if there's no channel under the
+            mouse.
+        """
+        node = self.node[0]
+        tr = node.canvas.scene.node_transform(node.parent)
+        return self.mesh[0].channel_at(tr.map(pos)[1])
+
+    def prefetch(self, sf, data, time, slices):
+        """Prepare windows in the background.
+
+        Parameters
+        ----------
+        data: array_like
+            Array of data of shape (n_channels, n_points)
+        time: array_like
+            The time vector.
+        slices : list
+            Slices of the windows to prepare, by decreasing priority.
+        """
+        key, inputs = self._window_inputs(sf, data, time)
+        self._prefetch.prefetch([(key + (sl.start, sl.stop), (sl,) + inputs)
+                                 for sl in slices])
+
+    def prefetch_stats(self):
+        """Get statistics of the cache of prepared windows.
+
+        Returns
+        -------
+        stats : dict
+            Number of hits and misses, hit rate and number of cached and
+            pending windows (see WindowPrefetcher.stats).
+        """
+        return self._prefetch.stats()
+
     def set_location(self, sf, data, channel, start, end, factor=100.):
         """Set vertical lines for detections."""
         # Get data limits :
@@ -441,7 +755,7 @@ class Spectrogram(PrepareData):
 
     def set_data(self, sf, data, time, method='Fourier transform',
                  cmap='rainbow', nfft=30., overlap=0., fstart=.5, fend=20.,
-                 contrast=.5, interp='nearest', norm=0):
+                 contrast=.5, interp='nearest', norm=0, image=None):
         """Set data to the spectrogram.
 
         Use this method to change data, colormap, spectrogram settings, the
@@ -473,59 +787,36 @@ class Spectrogram(PrepareData):
             Interpolation method.
         norm : int | 0
             Normalization method for TF.
+        image : tuple | None
+            Precomputed (image, freq) spectrogram (see
+            visbrain.utils.compute_spectrogram). If None, the spectrogram is
+            computed from data.
         """
-        # =================== PREPARE DATA ===================
-        # Prepare data (only if needed)
-        if self:
-            data = self._prepare_data(sf, data.copy(), time)
-
-        nperseg = int(round(nfft * sf))
-
         # =================== TF // SPECTRO ===================
+        if image is None:
+            # Prepare data (only if needed)
+            if self:
+                data = self._prepare_data(sf, data.copy(), time)
+            image = compute_spectrogram(data, sf, method=method, nfft=nfft,
+                                        overlap=overlap, fstart=fstart,
+                                        fend=fend, norm=norm)
+        _mesh, freq = image
+
         if method == 'Wavelet':
-            self.tf.set_data(data, sf, f_min=fstart, f_max=fend, cmap=cmap,
-                             contrast=contrast, n_window=nperseg,
-                             overlap=overlap, window='hamming', norm=norm)
+            self.tf.set_tf(_mesh, time, freq, cmap=cmap, contrast=contrast)
             self.tf._image.interpolation = interp
             self.rect = self.tf.rect
             self.freq = self.tf.freqs
         else:
-            # =================== CONVERSION ===================
-            overlap = int(round(overlap * nperseg))
-
-            if method == 'Multitaper':
-                from lspopt import spectrogram_lspopt
-                freq, _, mesh = spectrogram_lspopt(data, fs=sf,
-                                                   nperseg=nperseg,
-                                                   c_parameter=20,
-                                                   noverlap=overlap)
-            elif method == 'Fourier transform':
-                freq, _, mesh = scpsig.spectrogram(data, fs=sf,
-                                                   nperseg=nperseg,
-                                                   noverlap=overlap,
-                                                   window='hamming')
-            mesh = 20 * np.log10(mesh)
-
-            # =================== FREQUENCY SELECTION ===================
-            # Find where freq is [fstart, fend] :
-            f = [0., 0.]
-            f[0] = np.abs(freq - fstart).argmin() if fstart else 0
-            f[1] = np.abs(freq - fend).argmin() if fend else len(freq)
-            # Build slicing and select frequency vector :
-            sls = slice(f[0], f[1] + 1)
-            freq = freq[sls]
             self._fstart, self._fend = freq[0], freq[-1]
 
             # =================== COLOR ===================
             # Get clim :
-            _mesh = mesh[sls, :]
-            is_finite = np.isfinite(_mesh)
-            _mesh[~is_finite] = np.percentile(_mesh[is_finite], 5)
             contrast = 1. if contrast is None else contrast
-            clim = (contrast * _mesh.min(), contrast * _mesh.max())
+            _min, _max = _mesh.min(), _mesh.max()
+            clim = (contrast * _min, contrast * _max)
             # Turn mesh into color array for selected frequencies:
             self.mesh.set_data(_mesh)
-            _min, _max = _mesh.min(), _mesh.max()
             _cmap = cmap_to_glsl(limits=(_min, _max), clim=clim, cmap=cmap)
             self.mesh.cmap = _cmap
             self.mesh.clim = 'auto'
@@ -535,7 +826,7 @@ class Spectrogram(PrepareData):
             tm, th = time.min(), time.max()
             # Re-scale the mesh for fitting in time / frequency :
             fact = (freq.max() - freq.min()) / len(freq)
-            sc = (th / mesh.shape[1], fact, 1)
+            sc = (th / _mesh.shape[1], fact, 1)
             tr = [0., freq.min(), 0.]
             self.mesh.transform.translate = tr
             self.mesh.transform.scale = sc
@@ -1037,10 +1328,11 @@ class CanvasShortcuts(object):
             name = canvas.title
             condition = bool(name.find('Canvas') + 1)
             if condition and not self._slMagnify.isChecked():
-                # Get channel name :
-                chan = name.split('Canvas_')[1]
-                # Get index :
-                idx = self._channels.index(chan)
+                # Get index (channels in a single canvas share one node) :
+                if self._stacked:
+                    idx = 0
+                else:
+                    idx = self._canvas_channel(canvas, event)
                 # Build transformation :
                 self._chan.node[idx].transform = vist.NullTransform()
 
@@ -1052,7 +1344,13 @@ class CanvasShortcuts(object):
             """
             # Get canvas title :
             is_sp_hyp = canvas.title in ['Hypnogram', 'Spectrogram']
-            title = canvas.title if is_sp_hyp else canvas.title.split('_')[1]
+            if is_sp_hyp:
+                title = canvas.title
+            else:
+                idx = self._canvas_channel(canvas, event)
+                if idx is None:
+                    return
+                title = self._channels[idx]
             # Annotate the timing :
             if is_sp_hyp:
                 cursor = self._time[-1] * event.pos[0] / canvas.size[0]
@@ -1107,10 +1405,10 @@ class CanvasShortcuts(object):
             is_ctrl = self._is_modifier(event, 'Control')
             condition = bool(name.find('Canvas') + 1) and is_left and is_ctrl
             if condition and not self._slMagnify.isChecked():
-                # Get channel name :
-                chan = name.split('Canvas_')[1]
                 # Get index :
-                idx = self._channels.index(chan)
+                idx = self._canvas_channel(canvas, event)
+                if idx is None:
+                    return
                 # Get cursor position :
                 val = self._SlVal.value()
                 step = self._SigSlStep.value()
@@ -1126,6 +1424,26 @@ class CanvasShortcuts(object):
         def on_mouse_wheel(event):
             pass
 
+    def _canvas_channel(self, canvas, event):
+        """Get the index of the channel under the mouse.
+
+        Parameters
+        ----------
+        canvas : vispy.scene.SceneCanvas
+            The canvas of channels.
+        event : vispy.util.event.Event
+            The mouse event.
+
+        Returns
+        -------
+        idx : int | None
+            Index of the channel or None if there's no channel under the
+            mouse.
+        """
+        if self._stacked:  # all channels in a single canvas
+            return self._chan.channel_at(event.pos)
+        return self._channels.index(canvas.title.split('Canvas_')[1])
+
 
 class Visuals(CanvasShortcuts):
     """Create the visual objects to be added to the scene."""
@@ -1133,7 +1451,7 @@ class Visuals(CanvasShortcuts):
     def __init__(self):
         """Init."""
         # =================== VARIABLES ===================
-        sf, data, time = self._sf, self._data, self._time
+        sf, time = self._sf, self._time
         channels, hypno, cameras = self._channels, self._hypno, self._allCams
 
         # =================== CHANNELS ===================
@@ -1141,15 +1459,20 @@ class Visuals(CanvasShortcuts):
                                  color=self._chancolor, width=self._lw,
                                  color_detection=self._indicol,
                                  parent=self._chanCanvas,
-                                 fcn=self._fcn_slider_move)
+                                 fcn=self._fcn_slider_move,
+                                 prefetch=self._prefetch_depth,
+                                 stacked=self._stacked)
         PROFILER('Channels', level=1)
+        # The envelope is built in the background :
+        self._fcn_build_pyramid()
+        PROFILER('Channels envelope', level=1)
 
         # =================== SPECTROGRAM ===================
         # Create a spectrogram object :
         self._spec = Spectrogram(camera=cameras[1],
                                  fcn=self._fcn_spec_set_data,
                                  parent=self._specCanvas.wc.scene)
-        self._spec.set_data(sf, data[0, ...], time, cmap=self._defcmap)
+        self._fcn_spec_set_data()
         PROFILER('Spectrogram', level=1)
         # Create a visual indicator for spectrogram :
         self._specInd = Indicator(name='spectro_indic', visible=True, alpha=.3,
@@ -1176,7 +1499,7 @@ class Visuals(CanvasShortcuts):
                                  self._defsw, self._defpeaks, self._defmt,
                                  self._spinsym, self._remsym, self._kcsym,
                                  self._swsym, self._peaksym, self._mtsym,
-                                 self._chan.node, self._hypCanvas.wc.scene)
+                                 self._chan.parents, self._hypCanvas.wc.scene)
         PROFILER('Detections', level=1)
 
         # =================== TOPOPLOT ===================
@@ -1189,7 +1512,10 @@ class Visuals(CanvasShortcuts):
         PROFILER('Topoplot', level=1)
 
         # =================== SHORTCUTS ===================
-        vbcanvas = self._chanCanvas + [self._specCanvas, self._hypCanvas]
+        # Channels in a single canvas share the same AxisCanvas :
+        chancanvas = self._chanCanvas[:1] if self._stacked else \
+            self._chanCanvas
+        vbcanvas = chancanvas + [self._specCanvas, self._hypCanvas]
         for k in vbcanvas:
             CanvasShortcuts.__init__(self, k.canvas)
         self._shpopup.set_shortcuts(self.sh)
@@ -5,6 +5,7 @@ from .dependencies import (is_mne_installed, is_nibabel_installed,  # noqa
                            is_tensorpac_installed, is_sc_image_installed)
 from .dialog import *  # noqa
 from .download import *  # noqa
+from .lazy_sleep import (LazySleepData, MemmapReader)  # noqa
 from .mneio import *  # noqa
 from .path import *  # noqa
 from .read_annotations import *  # noqa
@@ -14,6 +15,8 @@ from .read_sleep import (ReadSleepData, get_sleep_stats)  # noqa
 from .rw_config import *  # noqa
 from .rw_hypno import *  # noqa
 from .rw_utils import *  # noqa
+from .sleep_batch import *  # noqa
+from .sleep_cache import *  # noqa
 from .write_data import *  # noqa
 from .write_image import *  # noqa
 from .write_table import *  # noqa
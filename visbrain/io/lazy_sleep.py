@@ -0,0 +1,281 @@
+"""Lazy, window-on-demand access to sleep datasets.
+
+- LazySleepData : array-like object returning calibrated (and down-sampled)
+  data only for the requested window.
+- MemmapReader : read calibrated windows of a memory-mapped raw array.
+"""
+import logging
+
+import numpy as np
+
+from visbrain.utils.filtering import StreamDecimator
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('LazySleepData', 'MemmapReader')
+
+# Maximum number of raw samples (all channels included) read at once :
+CHUNK_SIZE = 2 ** 22
+
+
+class MemmapReader(object):
+    """Read calibrated windows of a memory-mapped raw array.
+
+    Parameters
+    ----------
+    raw : array_like
+        Raw (uncalibrated) data of shape (n_channels, n_times). Typically a
+        numpy.memmap (or a transposed view of it for multiplexed files).
+    gain : array_like
+        Gain of each channel, of shape (n_channels,).
+    offset : array_like | 0.
+        Digital offset of each channel, of shape (n_channels,). Calibrated
+        data are computed as (raw - offset) * gain.
+    """
+
+    def __init__(self, raw, gain, offset=0.):
+        """Init."""
+        self._raw = raw
+        n_chan = raw.shape[0]
+        self._gain = np.broadcast_to(np.asarray(gain, dtype=np.float32),
+                                     (n_chan,))
+        self._offset = np.broadcast_to(np.asarray(offset, dtype=np.float32),
+                                       (n_chan,))
+
+    def __call__(self, chans, begsam, endsam):
+        """Read calibrated data.
+
+        Parameters
+        ----------
+        chans : array_like
+            Indices of the channels to read.
+        begsam : int
+            Index of the first sample.
+        endsam : int
+            Index of the last sample (excluded).
+
+        Returns
+        -------
+        data : array_like
+            Calibrated float32 data of shape (len(chans), endsam - begsam).
+        """
+        data = np.asarray(self._raw[chans, begsam:endsam], dtype=np.float32)
+        if np.any(self._offset[chans]):
+            data -= self._offset[chans, np.newaxis]
+        data *= self._gain[chans, np.newaxis]
+        return data
+
+
+class LazySleepData(object):
+    """Array-like sleep dataset read on demand.
+
+    This object mimics a (n_channels, n_points) float32 array of
+    down-sampled data. Nothing is loaded into memory until it is indexed and
+    only the requested window is then read (by chunks of at most CHUNK_SIZE
+    raw samples) and down-sampled.
+
+    Parameters
+    ----------
+    reader : callable
+        Function that read calibrated data. It is called with
+        `reader(chans, begsam, endsam)` where `chans` is an array of file
+        channel indices and should return an array of shape
+        (len(chans), endsam - begsam) at the original sampling rate.
+    chans : array_like
+        File indices of the channels to expose.
+    n_times : int
+        Number of time points in the file (before down-sampling).
+    dsf : int | 1
+        Down-sampling factor.
+    decimation : {'stride', 'filter'}
+        Use either 'stride' to down-sample data by keeping one sample every
+        dsf or 'filter' to low-pass filter data before (anti-aliasing).
+    """
+
+    def __init__(self, reader, chans, n_times, dsf=1, decimation='stride'):
+        """Init."""
+        if decimation not in ['stride', 'filter']:
+            raise ValueError("decimation should either be 'stride' or "
+                             "'filter'.")
+        self._reader = reader
+        self._chans = np.asarray(chans, dtype=int)
+        self._n_times = int(n_times)
+        self._dsf = int(dsf)
+        self._filter = (decimation == 'filter') and (self._dsf > 1)
+        self._scale = np.ones((len(self._chans),), dtype=np.float32)
+
+    def __repr__(self):
+        """Represent the object."""
+        return "LazySleepData(n_channels=%i, n_points=%i, dsf=%i)" % (
+            self.shape + (self._dsf,))
+
+    def __len__(self):
+        """Return the number of channels."""
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        """Load the full (down-sampled) dataset."""
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __imul__(self, value):
+        """Multiply each channel by a factor, without reading data."""
+        self._scale *= np.asarray(value, dtype=np.float32).ravel()
+        return self
+
+    def __getitem__(self, key):
+        """Read a window of data."""
+        rows, cols = self._split_key(key)
+        # ---------- CHANNELS ----------
+        idx = np.arange(self.shape[0])[rows]
+        squeeze_rows = np.ndim(idx) == 0
+        idx = np.atleast_1d(idx)
+        chans = self._chans[idx]
+        # ---------- TIME ----------
+        squeeze_cols = isinstance(cols, (int, np.integer))
+        if squeeze_cols:
+            cols = np.array([cols])
+        if isinstance(cols, slice) and (cols.indices(self.shape[1])[2] > 0):
+            start, stop, step = cols.indices(self.shape[1])
+            n_out = len(range(start, stop, step))
+            if self._filter:
+                stop = start + (n_out - 1) * step + 1 if n_out else start
+                data = self._read_decimated(chans, start, stop)[:, ::step]
+            else:
+                data = self._read_range(chans, start * self._dsf,
+                                        step * self._dsf, n_out)
+        else:
+            cols = np.arange(self.shape[1])[cols]
+            if self._filter and cols.size:
+                start, stop = cols.min(), cols.max() + 1
+                data = self._read_decimated(chans, start, stop)[:, cols -
+                                                                start]
+            else:
+                data = self._read_index(chans, cols * self._dsf)
+        data *= self._scale[idx, np.newaxis]
+        # ---------- SHAPE ----------
+        if squeeze_cols:
+            data = data[:, 0]
+        return data[0, ...] if squeeze_rows else data
+
+    ###########################################################################
+    # READING
+    ###########################################################################
+    @staticmethod
+    def _split_key(key):
+        """Split an indexing key into (channels, time) keys."""
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            if len(key) > 2:
+                raise IndexError("Only one Ellipsis can be used.")
+            key = tuple(slice(None) if k is Ellipsis else k for k in key)
+        if len(key) == 1:
+            key += (slice(None),)
+        if len(key) != 2:
+            raise IndexError("Too many indices for a 2D array.")
+        return key
+
+    def _chunk_len(self, n_chans):
+        """Number of raw time points that can be read at once."""
+        return max(int(CHUNK_SIZE // max(n_chans, 1)), 1)
+
+    def _read_range(self, chans, begsam, step, n_out):
+        """Read samples begsam + k * step for k in range(n_out)."""
+        data = np.empty((len(chans), n_out), dtype=np.float32)
+        n_chunk = max(self._chunk_len(len(chans)) // step, 1)
+        for k in range(0, n_out, n_chunk):
+            n_k = min(n_chunk, n_out - k)
+            beg = begsam + k * step
+            end = beg + (n_k - 1) * step + 1
+            data[:, k:k + n_k] = self._reader(chans, beg, end)[:, ::step]
+        return data
+
+    def _read_index(self, chans, index):
+        """Read samples at arbitrary (raw) time indices."""
+        data = np.empty((len(chans), len(index)), dtype=np.float32)
+        if not len(index):
+            return data
+        order = np.argsort(index, kind='mergesort')
+        sorted_idx = index[order]
+        chunk_len = self._chunk_len(len(chans))
+        k = 0
+        while k < len(sorted_idx):
+            beg = sorted_idx[k]
+            k_end = np.searchsorted(sorted_idx, beg + chunk_len)
+            block = self._reader(chans, beg, sorted_idx[k_end - 1] + 1)
+            data[:, order[k:k_end]] = block[:, sorted_idx[k:k_end] - beg]
+            k = k_end
+        return data
+
+    def _read_decimated(self, chans, start, stop):
+        """Read low-pass filtered and decimated samples [start, stop)."""
+        data = np.empty((len(chans), stop - start), dtype=np.float32)
+        if stop <= start:
+            return data
+        dec = StreamDecimator(self._dsf)
+        dec.reset(start)
+        beg = max(dec.first_sample, 0)
+        end = min(dec.stop_sample(stop - 1), self._n_times)
+        chunk_len, k = self._chunk_len(len(chans)), 0
+        for b in range(beg, end, chunk_len):
+            e = min(b + chunk_len, end)
+            y = dec(self._reader(chans, b, e), final=e == self._n_times)
+            n_y = min(y.shape[1], data.shape[1] - k)
+            data[:, k:k + n_y] = y[:, :n_y]
+            k += n_y
+        return data
+
+    ###########################################################################
+    # REDUCTIONS
+    ###########################################################################
+    def _reduce(self, fcn, axis):
+        """Apply a reduction chunk by chunk along the time axis."""
+        if axis not in [1, -1]:
+            raise ValueError("Reductions of lazy data are only supported "
+                             "along the time axis (axis=1).")
+        n_cols = max(self._chunk_len(len(self)) // self._dsf, 1)
+        return [fcn(self[:, k:k + n_cols]) for k in range(
+            0, self.shape[1], n_cols)]
+
+    def min(self, axis=1):
+        """Minimum of each channel."""
+        return np.min(self._reduce(lambda x: x.min(1), axis), axis=0)
+
+    def max(self, axis=1):
+        """Maximum of each channel."""
+        return np.max(self._reduce(lambda x: x.max(1), axis), axis=0)
+
+    def mean(self, axis=1):
+        """Mean of each channel."""
+        sums = self._reduce(lambda x: x.sum(1, dtype=np.float64), axis)
+        return (np.sum(sums, axis=0) / self.shape[1]).astype(np.float32)
+
+    def std(self, axis=1):
+        """Standard deviation of each channel."""
+        mean = self.mean(axis).astype(np.float64)[:, np.newaxis]
+        sq = self._reduce(lambda x: ((x - mean) ** 2).sum(1), axis)
+        return np.sqrt(np.sum(sq, axis=0) / self.shape[1]).astype(np.float32)
+
+    ###########################################################################
+    # PROPERTIES
+    ###########################################################################
+    @property
+    def shape(self):
+        """Get the (n_channels, n_points) shape of down-sampled data."""
+        return (len(self._chans), len(range(0, self._n_times, self._dsf)))
+
+    @property
+    def ndim(self):
+        """Get the number of dimensions."""
+        return 2
+
+    @property
+    def dtype(self):
+        """Get the data type."""
+        return np.dtype(np.float32)
+
+    @property
+    def size(self):
+        """Get the number of elements."""
+        return self.shape[0] * self.shape[1]
@@ -2,6 +2,7 @@
 
 This file contain functions to load :
 - European Data Format (*.edf)
+- BioSemi Data Format (*.bdf)
 - Micromed (*.trc)
 - BrainVision (*.vhdr)
 - ELAN (*.eeg)
@@ -12,15 +13,18 @@ import io
 from warnings import warn
 import logging
 import datetime
+from functools import partial
 
 import numpy as np
 from scipy.stats import iqr
 
 from visbrain.io.dependencies import is_mne_installed
 from visbrain.io.dialog import dialog_load
+from visbrain.io.lazy_sleep import LazySleepData, MemmapReader
 from visbrain.io.mneio import mne_switch
 from visbrain.io.rw_hypno import (read_hypno, oversample_hypno)
 from visbrain.io.rw_utils import get_file_ext
+from visbrain.io.sleep_cache import read_sleep_cache, write_sleep_cache
 from visbrain.io.write_data import write_csv
 from visbrain.io import merge_annotations
 
@@ -39,7 +43,8 @@ class ReadSleepData(object):
     """Main class for reading sleep data."""
 
     def __init__(self, data, channels, sf, hypno, href, preload, use_mne,
-                 downsample, kwargs_mne, annotations):
+                 downsample, kwargs_mne, annotations, decimation='stride',
+                 cache=False):
         """Init."""
         # ========================== LOAD DATA ==========================
         # Dialog window if data is None :
@@ -59,10 +64,8 @@ class ReadSleepData(object):
             # ---------- USE SLEEP or MNE ----------
             # Find file extension :
             file, ext = get_file_ext(data)
-            # Force to use MNE if preload is False :
-            use_mne = True if not preload else use_mne
             # Get if the file has to be loaded using Sleep or MNE python :
-            sleep_ext = ['.eeg', '.vhdr', '.edf', '.trc', '.rec']
+            sleep_ext = ['.eeg', '.vhdr', '.edf', '.bdf', '.trc', '.rec']
             use_mne = True if ext not in sleep_ext else use_mne
 
             if use_mne:
@@ -75,7 +78,16 @@ class ReadSleepData(object):
                 args = mne_switch(file, ext, downsample, **kwargs_mne)
             else:  # Load using Sleep functions
                 logger.debug("Load file using Sleep")
-                args = sleep_switch(file, ext, downsample)
+                args = None
+                if cache:
+                    args = read_sleep_cache(file + ext, downsample,
+                                            decimation)
+                if args is None:
+                    args = sleep_switch(file, ext, downsample, preload,
+                                        decimation)
+                    if cache:
+                        args = write_sleep_cache(file + ext, downsample,
+                                                 decimation, args)
             # Get output arguments :
             (sf, downsample, dsf, data, channels, n, offset, annot) = args
             info = ("Data successfully loaded (%s):"
@@ -99,7 +111,11 @@ class ReadSleepData(object):
             offset = datetime.time(0, 0, 0)
             dsf, downsample = get_dsf(downsample, sf)
             n = data.shape[1]
-            data = data[:, ::dsf]
+            if decimation == 'filter':  # anti-aliasing filter
+                data = LazySleepData(MemmapReader(data, 1.), range(len(data)),
+                                     n, dsf, decimation)[:, :]
+            else:
+                data = data[:, ::dsf]
         else:
             raise IOError("The data should either be a string which refer to "
                           "the path of a file or an array of raw data of shape"
@@ -131,9 +147,11 @@ class ReadSleepData(object):
                 raise ValueError("Then length of the hypnogram must be the "
                                  "same as raw data")
         if isinstance(hypno, str):  # (*.hyp / *.txt / *.csv)
-            hypno, _ = read_hypno(hypno, time=time, datafile=file)
-            # Oversample then downsample :
-            hypno = oversample_hypno(hypno, self._N)[::dsf]
+            hypno, _ = read_hypno(hypno, time=time, datafile=file,
+                                  run_length=True)
+            # Oversample then downsample (without expanding the hypnogram at
+            # the original sampling rate) :
+            hypno = np.asarray(hypno.oversample(self._N).decimate(dsf))
             PROFILER("Hypnogram file loaded", level=1)
 
         # ========================== CHECKING ==========================
@@ -187,20 +205,19 @@ class ReadSleepData(object):
                 hypno = np.zeros((npts,), dtype=np.float32)
 
         # ---------- SCALING ----------
-        # Assume that the inter-quartile amplitude of EEG data is ~50 uV
-        iqr_chan = iqr(data[:, :int(data.shape[1] / 4)], axis=-1)
-        bad_iqr = iqr_chan < 1.
-
-        if np.any(bad_iqr):
-            mult_fact = np.zeros_like(iqr_chan)
-            iqr_chan[iqr_chan == 0.] = 1.
-            mult_fact[bad_iqr] = np.floor(np.log10(50. / iqr_chan[bad_iqr]))
-            data *= 10. ** mult_fact[..., np.newaxis]
+        n_iqr = int(data.shape[1] / 4)
+        if isinstance(data, LazySleepData):  # only read the first minutes
+            n_iqr = min(n_iqr, int(600 * self._sf))
+        mult_fact = _amplitude_factor(data[:, :n_iqr])
+        if np.any(mult_fact != 1.):
+            data *= mult_fact[..., np.newaxis]
             warn("Wrong channel data amplitude. ")
 
         # ---------- CONVERSION ----------=
         # Convert data and hypno to be contiguous and float 32 (for vispy):
-        self._data = vispy_array(data)
+        if isinstance(data, np.ndarray):
+            data = vispy_array(data)
+        self._data = data
         self._hypno = vispy_array(hypno)
         self._time = vispy_array(time)
         self._channels = channels
@@ -209,7 +226,30 @@ class ReadSleepData(object):
         PROFILER("Check data", level=1)
 
 
-def sleep_switch(file, ext, downsample):
+def _amplitude_factor(data):
+    """Get the factor to apply to channels with a wrong amplitude.
+
+    Assume that the inter-quartile amplitude of EEG data is ~50 uV.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of shape (n_channels, n_pts).
+
+    Returns
+    -------
+    mult_fact : array_like
+        Multiplicative factor (power of 10) of each channel.
+    """
+    iqr_chan = iqr(data, axis=-1)
+    bad_iqr = iqr_chan < 1.
+    mult_fact = np.zeros_like(iqr_chan)
+    iqr_chan[iqr_chan == 0.] = 1.
+    mult_fact[bad_iqr] = np.floor(np.log10(50. / iqr_chan[bad_iqr]))
+    return 10. ** mult_fact
+
+
+def sleep_switch(file, ext, downsample, preload=True, decimation='stride'):
     """Switch between sleep data files.
 
     Parameters
@@ -220,6 +260,10 @@ def sleep_switch(file, ext, downsample):
         Extension name (e.g. '.eeg')
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, a LazySleepData is returned instead.
+    decimation : {'stride', 'filter'}
+        Down-sampling method (see LazySleepData).
 
     Returns
     -------
@@ -244,16 +288,20 @@ def sleep_switch(file, ext, downsample):
     path = file + ext
 
     if ext == '.vhdr':  # BrainVision
-        return read_bva(path, downsample)
+        return read_bva(path, downsample, preload=preload,
+                        decimation=decimation)
 
     if ext == '.eeg':  # Elan
-        return read_elan(path, downsample)
+        return read_elan(path, downsample, preload=preload,
+                         decimation=decimation)
 
-    elif ext in ['.edf', '.rec']:  # European Data Format
-        return read_edf(path, downsample)
+    elif ext in ['.edf', '.bdf', '.rec']:  # European / BioSemi Data Format
+        return read_edf(path, downsample, preload=preload,
+                        decimation=decimation)
 
     elif ext == '.trc':  # Micromed
-        return read_trc(path, downsample)
+        return read_trc(path, downsample, preload=preload,
+                        decimation=decimation)
 
     else:  # None
         raise ValueError("*" + ext + " files are currently not supported.")
@@ -265,18 +313,26 @@ def sleep_switch(file, ext, downsample):
 ###############################################################################
 ###############################################################################
 
-def read_edf(path, downsample):
+def read_edf(path, downsample, preload=True, decimation='stride'):
     """Read data from a European Data Format (edf) file.
 
     Use phypno class for reading EDF files:
         http: // phypno.readthedocs.io / api / phypno.ioeeg.edf.html
 
+    BioSemi (bdf, 24-bit) files are read the same way. For discontinuous
+    EDF+ / BDF+ files, records are placed at their onset and gaps between
+    records are filled with zeros.
+
     Parameters
     ----------
     path: str
         Filename(with full path) to EDF file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, a LazySleepData is returned instead.
+    decimation : {'stride', 'filter'}
+        Down-sampling method (see LazySleepData).
 
     Returns
     -------
@@ -295,7 +351,7 @@ def read_edf(path, downsample):
     """
     assert os.path.isfile(path)
 
-    from ..utils.sleep.edf import Edf
+    from ..utils.sleep.edf import Edf, ANNOTATIONS
 
     edf = Edf(path)
 
@@ -303,31 +359,31 @@ def read_edf(path, downsample):
     _, start_time, sf, chan, n_samples, _ = edf.return_hdr()
     start_time = start_time.time()
 
-    # Keep only data channels (e.g excludes marker chan)
-    freqs = np.unique(edf.hdr['n_samples_per_record']) / edf.hdr[
-        'record_length']
-    sf = freqs.max()
-
-    if len(freqs) != 1:
-        bad_chans = np.where(edf.hdr['n_samples_per_record'] < sf)
-        chan = np.delete(chan, bad_chans)
+    # Keep only data channels (e.g excludes marker and annotation chan)
+    n_sam_rec = np.asarray(edf.hdr['n_samples_per_record'])
+    is_data = np.array([k not in ANNOTATIONS for k in chan])
+    sf = n_sam_rec[is_data].max() / edf.hdr['record_length']
+    i_chan = np.flatnonzero((n_sam_rec == n_sam_rec[is_data].max()) &
+                            is_data)
+    chan = [chan[k] for k in i_chan]
 
-    # Load all samples of selected channels
-    np.seterr(divide='ignore', invalid='ignore')
-    data = edf.return_dat(chan, 0, n_samples)
-
-    # Get original signal length :
-    n = data.shape[1]
+    # Get original signal length (gaps between records included) :
+    n = edf.n_samples(i_chan[0])
 
     # Get down-sample factor :
     sf = float(sf)
-    chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, None
+    # Samples of selected channels are read on demand
+    np.seterr(divide='ignore', invalid='ignore')
+    reader = partial(edf.return_dat, dtype=np.float32)
+    data = LazySleepData(reader, i_chan, n, dsf, decimation)
+    data = data[:, :] if preload else data
+
+    return sf, downsample, dsf, data, chan, n, start_time, None
 
 
-def read_trc(path, downsample):
+def read_trc(path, downsample, preload=True, decimation='stride'):
     """Read data from a Micromed (trc) file (version 4).
 
     Poor man's version of micromedio.py from Neo package
@@ -339,6 +395,10 @@ def read_trc(path, downsample):
         Filename(with full path) to .trc file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, a LazySleepData is returned instead.
+    decimation : {'stride', 'filter'}
+        Down-sampling method (see LazySleepData).
 
     Returns
     -------
@@ -375,16 +435,10 @@ def read_trc(path, downsample):
         day, month, year, hour, minute, sec = read_f(f, 'bbbbbb')
         start_time = datetime.time(hour, minute, sec)
 
-        # Raw data
-        f.seek(data_start_offset, 0)
-        m_raw = np.fromstring(f.read(), dtype='u' + str(nbytes))
-        m_raw = m_raw.reshape((int(m_raw.size / n_chan), n_chan)).transpose()
-
         # Read label / gain
         gain = []
         chan = []
         logical_ground = []
-        data = np.empty(shape=m_raw.shape, dtype=np.float32)
 
         f.seek(176, 0)
         zone_names = ['ORDER', 'LABCOD']
@@ -410,22 +464,26 @@ def read_trc(path, downsample):
             gain = np.append(gain, float(physical_max - physical_min) /
                              float(logical_max - logical_min + 1))
 
-    # Multiply by gain
-    m_raw = m_raw - logical_ground[:, np.newaxis]
-    data = m_raw * gain[:, np.newaxis].astype(np.float32)
-
-    # Get original signal length :
-    n = data.shape[1]
+    # Raw data (multiplexed)
+    n = int((os.path.getsize(path) - data_start_offset) / (nbytes * n_chan))
+    m_raw = np.memmap(path, dtype='u' + str(nbytes), mode='r',
+                      offset=data_start_offset, shape=(n, n_chan))
 
     # Get down-sample factor :
     sf = float(sf)
     chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, None
+    # Remove the logical ground and multiply by gain
+    reader = MemmapReader(m_raw.T, gain, logical_ground)
+    data = LazySleepData(reader, np.arange(n_chan), n, dsf, decimation)
+    data = data[:, :] if preload else data
+
+    return sf, downsample, dsf, data, chan, n, start_time, None
 
 
-def read_bva(path, downsample, read_markers=False):
+def read_bva(path, downsample, read_markers=False, preload=True,
+             decimation='stride'):
     """Read data from a BrainVision (*.vhdr) file.
 
     Poor man's version of https: // gist.github.com / breuderink / 6266871
@@ -444,6 +502,10 @@ def read_bva(path, downsample, read_markers=False):
         Down-sampling frequency.
     read_markers : bool | False
         Import markers from the .vmrk files as annotations
+    preload : bool | True
+        Load data into memory. If False, a LazySleepData is returned instead.
+    decimation : {'stride', 'filter'}
+        Down-sampling method (see LazySleepData).
 
     Returns
     -------
@@ -536,27 +598,24 @@ def read_bva(path, downsample, read_markers=False):
         else:
             anot = None
 
-    with io.open(data_path, 'rb') as f:
-        raw = f.read()
-        size = int(len(raw) / 2)
-
-        ints = np.ndarray((n_chan, int(size / n_chan)),
-                          dtype='<i2', order='F', buffer=raw)
-
-        data = np.float32(np.diag(resolution)).dot(ints)
-
-    # Get original signal length :
-    n = data.shape[1]
+    # Raw data (multiplexed)
+    n = int(os.path.getsize(data_path) / (2 * n_chan))
+    ints = np.memmap(data_path, dtype='<i2', mode='r', shape=(n, n_chan))
 
     # Get down-sample factor :
     sf = float(sf)
     chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, anot
+    # Multiply by resolution
+    reader = MemmapReader(ints.T, resolution)
+    data = LazySleepData(reader, np.arange(n_chan), n, dsf, decimation)
+    data = data[:, :] if preload else data
+
+    return sf, downsample, dsf, data, chan, n, start_time, anot
 
 
-def read_elan(path, downsample):
+def read_elan(path, downsample, preload=True, decimation='stride'):
     """Read data from a ELAN (eeg) file.
 
     Elan format specs: http: // elan.lyon.inserm.fr/
@@ -567,6 +626,10 @@ def read_elan(path, downsample):
         Filename(with full path) to Elan .eeg file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, a LazySleepData is returned instead.
+    decimation : {'stride', 'filter'}
+        Down-sampling method (see LazySleepData).
 
     Returns
     -------
@@ -619,7 +682,6 @@ def read_elan(path, downsample):
 
     # Last 2 channels do not contain data
     nb_chan_data = nb_chan - 2
-    chan_list = slice(nb_chan_data)
     chan = ent[10:10 + nb_chan_data]
 
     # Gain
@@ -656,8 +718,10 @@ def read_elan(path, downsample):
     dsf, downsample = get_dsf(downsample, sf)
 
     # Multiply by gain :
-    data = m_raw[chan_list, ::dsf] * \
-        gain[chan_list][..., np.newaxis]
+    reader = MemmapReader(m_raw, gain)
+    data = LazySleepData(reader, np.arange(nb_chan_data), n, dsf,
+                         decimation)
+    data = data[:, :] if preload else data
 
     return sf, downsample, dsf, data, chan, n, start_time, None
 
@@ -698,7 +762,7 @@ def get_sleep_stats(hypno_file, output_file=None):
             output_file = output_file + '.csv'
 
     # Load hypnogram
-    hypno, sf_hyp = read_hypno(hypno_file)
+    hypno, sf_hyp = read_hypno(hypno_file, run_length=True)
     if sf_hyp < 1:
         mult = int(np.round(len(hypno) / sf_hyp))
         hypno = oversample_hypno(hypno, mult)
@@ -21,7 +21,7 @@ import os
 import logging
 import numpy as np
 
-from ..utils.sleep.hypnoprocessing import transient
+from ..utils.sleep.hypnoprocessing import transient, RunLengthHypno
 from ..utils.mesh import vispy_array
 from ..io import is_pandas_installed, is_xlrd_installed
 
@@ -36,7 +36,7 @@ logger = logging.getLogger('visbrain')
 ###############################################################################
 ###############################################################################
 
-def hypno_time_to_sample(df, npts):
+def hypno_time_to_sample(df, npts, run_length=False):
     """Convert the hypnogram from a defined timings to a number of samples.
 
     Parameters
@@ -46,10 +46,12 @@ def hypno_time_to_sample(df, npts):
     npts : int, array_like
         Number of time points in the final hypnogram. Alternatively, if npts is
         an array it will be interprated as the time vector.
+    run_length : bool | False
+        Return a RunLengthHypno instead of a per-sample hypnogram.
 
     Returns
     -------
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         Hypnogram data of shape (npts,).
     time : array_like
         Time vector of shape (npts,).
@@ -73,18 +75,16 @@ def hypno_time_to_sample(df, npts):
     elif isinstance(npts, int):
         time = np.arange(npts) * time_idx[-1] / (npts - 1)
     sf_hyp = 1. / (time[1] - time[0])
-    # Find closest time index :
-    try:
-        index = np.abs(time.reshape(-1, 1) - time_idx.reshape(1, -1))
-        index = np.r_[0, index.argmin(0) + 1]
-    except MemoryError:
-        index = np.zeros((len(time_idx) + 1), dtype=int)
-        for ii, t in enumerate(time_idx):
-            index[ii + 1] = np.argmin(np.abs(time - t)) + 1
-    # Fill the hypnogram :
-    hypno = np.zeros((len(time),), dtype=int)
-    for k in range(len(index) - 1):
-        hypno[index[k]:index[k + 1]] = int(stages[k])
+    # Find closest time index (sorted search, ties to the first sample) :
+    right = np.clip(np.searchsorted(time, time_idx), 1, len(time) - 1)
+    left = right - 1
+    closest = np.where(time_idx - time[left] <= time[right] - time_idx, left,
+                       right)
+    # Build runs (stages that go back in time are ignored and samples after
+    # the last transition are set to 0) :
+    index = np.maximum.accumulate(np.r_[0, closest + 1])
+    hypno = RunLengthHypno(index, np.r_[stages.astype(int), 0], len(time))
+    hypno = hypno if run_length else np.asarray(hypno)
     return hypno, time, sf_hyp
 
 
@@ -118,16 +118,18 @@ def oversample_hypno(hypno, n):
 
     Parameters
     ----------
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         Hypnogram data of shape (N,) with N < n.
     n : int
         The destination length.
 
     Returns
     -------
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         The hypnogram of shape (n,)
     """
+    if isinstance(hypno, RunLengthHypno):
+        return hypno.oversample(n)
     # Get the repetition number :
     rep_nb = int(np.round(n / len(hypno)))
 
@@ -158,7 +160,7 @@ def write_hypno(filename, hypno, version='time', sf=100., npts=1, window=1.,
     ----------
     filename : str
         Filename (with full path) of the file to save
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         Hypnogram array, same length as data
     sf : float | 100.
         Original sampling rate of the raw data
@@ -175,7 +177,7 @@ def write_hypno(filename, hypno, version='time', sf=100., npts=1, window=1.,
     """
     # Checking :
     assert isinstance(filename, str)
-    assert isinstance(hypno, np.ndarray)
+    assert isinstance(hypno, (np.ndarray, RunLengthHypno))
     assert version in ['time', 'sample']
     # Extract file extension :
     _, ext = os.path.splitext(filename)
@@ -274,7 +276,7 @@ def _write_hypno_hyp_sample(filename, hypno, sf=100., npts=1):
 ###############################################################################
 
 
-def read_hypno(filename, time=None, datafile=None):
+def read_hypno(filename, time=None, datafile=None, run_length=False):
     """Load hypnogram file.
 
     Sleep stages in the hypnogram should be scored as follow
@@ -295,10 +297,13 @@ def read_hypno(filename, time=None, datafile=None):
         The time vector (used to interpolate Excel files).
     datafile : string | None
         Filename (with full path) to the data file.
+    run_length : bool | False
+        Return a run-length encoded hypnogram (RunLengthHypno) instead of
+        the hypnogram vector.
 
     Returns
     -------
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         The hypnogram vector in its original length.
     sf_hyp: float
         The hypnogram original sampling frequency (Hz)
@@ -322,14 +327,20 @@ def read_hypno(filename, time=None, datafile=None):
             import pandas as pd
             df = pd.read_csv(filename, delim_whitespace=True, header=None,
                              names=['Stage', 'Time'])
-            hypno, _, sf_hyp = hypno_time_to_sample(df, len(time))
+            hypno, _, sf_hyp = hypno_time_to_sample(df, len(time),
+                                                    run_length)
     elif ext == '.xlsx':  # v2 = Excel
         import pandas as pd
         df = pd.read_excel(filename, header=None, names=['Stage', 'Time'])
-        hypno, _, sf_hyp = hypno_time_to_sample(df, len(time))
+        hypno, _, sf_hyp = hypno_time_to_sample(df, len(time), run_length)
 
     logger.info("Hypnogram successfully loaded (%s)" % filename)
 
+    if run_length:
+        if not isinstance(hypno, RunLengthHypno):
+            hypno = RunLengthHypno.from_array(hypno)
+        return RunLengthHypno(hypno.onsets, hypno.stages.astype(np.float32),
+                              len(hypno)), sf_hyp
     return vispy_array(hypno), sf_hyp
 
 
@@ -511,7 +522,7 @@ def _read_hypno_edf_sample(hypno_file_path, data_file_path):
     tr = {'Sleep stage ?': -1, 'Movement time': -1, 'Sleep stage W': 0,
           'Sleep stage 1': 1, 'Sleep stage 2': 2, 'Sleep stage 3': 3,
           'Sleep stage 4': 3, 'Sleep stage R': 4}
-    hypno_s = []
+    stages, n_epochs = [], []
     for i in range(ln):
         in_start = data_hypno_spl[i].find('\x15')
         if in_start == -1:
@@ -526,11 +537,10 @@ def _read_hypno_edf_sample(hypno_file_path, data_file_path):
 
             sleepstage = data_hypno_spl[i][in_stop + 1:-1]
 
-            nr = int(int(duration) / 30)
-            entry = [tr[sleepstage]] * nr
-            hypno_s.extend(entry)
+            stages.append(tr[sleepstage])
+            n_epochs.append(int(int(duration) / 30))
 
-    hypno_s = np.array(hypno_s).astype(int)
+    hypno_s = np.repeat(np.array(stages, dtype=int), n_epochs)
     sf_hyp = 1. / time
     return hypno_s, sf_hyp
 
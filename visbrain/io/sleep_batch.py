@@ -0,0 +1,356 @@
+"""Headless batch detection of sleep events.
+
+Run one of the detections of Sleep over several recordings (or whole
+directories of recordings), without any graphical interface. Each
+recording and its hypnogram are read once, then the detection of each
+channel is an independent task, hence tasks can be spread across processes.
+Recordings read using Sleep functions are memory-mapped again by the worker
+processes rather than sending them the data.
+
+- batch_detection : run a detection over a list of recordings
+- main : command line interface (python -m visbrain.io.sleep_batch)
+"""
+import os
+import ast
+import logging
+import argparse
+import multiprocessing
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from visbrain.io.dependencies import is_mne_installed
+from visbrain.io.lazy_sleep import LazySleepData
+from visbrain.io.mneio import mne_switch
+from visbrain.io.read_sleep import sleep_switch, _amplitude_factor
+from visbrain.io.rw_hypno import read_hypno
+from visbrain.io.rw_utils import get_file_ext
+from visbrain.io.write_data import write_csv
+from visbrain.utils.sleep.detection_pool import (apply_detection,
+                                                 START_METHOD)
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('batch_detection',)
+
+# Extensions loaded using Sleep functions (the others require MNE-python) :
+SLEEP_EXT = ['.eeg', '.vhdr', '.edf', '.bdf', '.trc', '.rec']
+# Extensions searched when a directory is given :
+BATCH_EXT = SLEEP_EXT[1:] + ['.gdf', '.set', '.cnt']
+# Extensions of hypnograms automatically associated with a recording :
+HYPNO_EXT = ['.txt', '.csv', '.hyp']
+# Stage names indexed by the hypnogram values (-1 -> Art) :
+STAGES = ['Wake', 'N1', 'N2', 'N3', 'REM', 'Art']
+
+
+def _find_recordings(files):
+    """Expand directories into (recording, hypnogram) pairs.
+
+    Recordings found inside a directory are associated with a hypnogram named
+    <recording>_hypno.{txt, csv, hyp} in the same directory (if any).
+    """
+    found = []
+    for path in files:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for name in sorted(os.listdir(path)):
+            base, ext = os.path.splitext(name)
+            if (ext.lower() in BATCH_EXT) and not base.endswith('_hypno'):
+                found.append(os.path.join(path, name))
+    hypnos = []
+    for path in found:
+        base = os.path.splitext(path)[0] + '_hypno'
+        match = [base + k for k in HYPNO_EXT if os.path.isfile(base + k)]
+        hypnos.append(match[0] if len(match) else None)
+    return found, hypnos
+
+
+def _read_recording(path, hypno, downsample, decimation):
+    """Open a recording (lazily when possible) and load its hypnogram.
+
+    Returns
+    -------
+    data : array_like
+        Data of shape (n_channels, n_pts). A LazySleepData for files loaded
+        using Sleep functions.
+    sf : float
+        Sampling frequency (after down-sampling).
+    time : array_like
+        Time vector of shape (n_pts,).
+    hypno : array_like
+        Hypnogram of shape (n_pts,).
+    channels : list
+        List of channel names.
+    """
+    file, ext = get_file_ext(path)
+    if ext in SLEEP_EXT:
+        args = sleep_switch(file, ext, downsample, preload=False,
+                            decimation=decimation)
+    else:
+        is_mne_installed(raise_error=True)
+        args = mne_switch(file, ext, downsample, preload=True)
+    sf, downsample, dsf, data, channels, n, _, _ = args
+    time = np.arange(n)[::dsf] / sf
+    n_pts = data.shape[1]
+    if hypno is None:
+        hypno = np.zeros((n_pts,), dtype=np.float32)
+    else:
+        hypno, _ = read_hypno(hypno, time=time, datafile=file,
+                              run_length=True)
+        hypno = np.asarray(hypno.oversample(n).decimate(dsf))
+        if len(hypno) != n_pts:
+            logger.warning("Hypnogram of %s ignored (wrong length)" % path)
+            hypno = np.zeros((n_pts,), dtype=np.float32)
+    sf = float(downsample) if downsample is not None else float(sf)
+    return data, sf, time, hypno, list(channels)
+
+
+_LAZY = {}
+
+
+def _open_lazy(path, downsample, decimation):
+    """Reopen the memory-mapped data of a recording (inside a worker).
+
+    Only the header is read. The last recording is kept, as channels of a
+    recording are usually processed one after the other.
+    """
+    key = (path, downsample, decimation)
+    if key not in _LAZY:
+        file, ext = get_file_ext(path)
+        _LAZY.clear()
+        _LAZY[key] = sleep_switch(file, ext, downsample, preload=False,
+                                  decimation=decimation)[3]
+    return _LAZY[key]
+
+
+def _detect_channel(x, sf, time, hypno, method, kwargs):
+    """Run the detection on the data of a single channel.
+
+    Parameters
+    ----------
+    x : array_like | tuple
+        Data of the channel of shape (n_pts,). For recordings read using
+        Sleep functions, (path, downsample, decimation, index) of the
+        channel, in which case the file is memory-mapped again rather than
+        sending the data to the worker.
+
+    Returns
+    -------
+    events : list
+        List of (start, end, duration, amplitude, stage) of each event.
+    summary : list
+        Channel summary [n_events, density, mean duration].
+    """
+    if isinstance(x, tuple):
+        x = _open_lazy(*x[:-1])[x[-1], :]
+    x = np.array(x, dtype=np.float32)
+    # Same amplitude correction as the graphical interface :
+    n_iqr = min(int(len(x) / 4), int(600 * sf))
+    x *= _amplitude_factor(x[np.newaxis, :n_iqr])[0]
+    index = apply_detection(method, x, sf, time, hypno, **kwargs)
+    # ---------- EVENTS ----------
+    events = []
+    for start, end in index:
+        amp = np.ptp(x[start:end + 1])
+        events.append((time[start], time[end], 1000. * (end - start) / sf,
+                       amp, STAGES[int(hypno[start])]))
+    # ---------- SUMMARY ----------
+    duration = len(x) / sf / 60.
+    n_events = len(events)
+    mean_dur = np.mean([k[2] for k in events]) if n_events else 0.
+    return events, [n_events, n_events / duration, mean_dur]
+
+
+def _channel_tasks(path, hypno, channels, method, kwargs, downsample,
+                   decimation):
+    """Get the detection task of each channel of a recording.
+
+    The recording and its hypnogram are only read once per file.
+
+    Returns
+    -------
+    tasks : dict
+        Dictionary {channel: args} where args are the inputs of
+        _detect_channel, in the order of the channels in the file.
+    duration : float
+        Duration of the recording (in seconds).
+    """
+    data, sf, time, hypno, names = _read_recording(path, hypno, downsample,
+                                                   decimation)
+    lazy = isinstance(data, LazySleepData)
+    tasks = {}
+    for k, chan in enumerate(names):
+        if (channels is None) or (chan in channels):
+            x = (path, downsample, decimation, k) if lazy else data[k, :]
+            tasks[chan] = (x, sf, time, hypno, method, kwargs)
+    return tasks, data.shape[1] / sf
+
+
+def _write_tables(path, method, output_dir, results):
+    """Write the tables of events and the summary of a recording."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    events = [['Channel', 'Start (s)', 'End (s)', 'Duration (ms)',
+               'Amplitude (uV)', 'Stage']]
+    summary = [['Channel', 'Events', 'Density (events / min)',
+                'Mean duration (ms)']]
+    for chan, (ev, summ) in results.items():
+        events += [[chan, '%.3f' % s, '%.3f' % e, '%.1f' % d, '%.3f' % a,
+                    st] for s, e, d, a, st in ev]
+        summary += [[chan, str(summ[0]), '%.3f' % summ[1], '%.1f' % summ[2]]]
+    base = os.path.join(output_dir, '%s_%s' % (name, method))
+    write_csv(base + '_events.csv', events)
+    write_csv(base + '_summary.csv', summary)
+    logger.info("    Tables of %s saved (%s_{events, summary}.csv)" % (
+        name, base))
+
+
+def batch_detection(files, method, hypnos=None, channels=None, n_jobs=1,
+                    output_dir=None, downsample=100., decimation='stride',
+                    **kwargs):
+    """Run a detection over a list of recordings.
+
+    The detection of each channel is an independent task. Once every channel
+    of a recording is processed, two tables are saved :
+
+        * <name>_<method>_events.csv : channel, start (s), end (s),
+          duration (ms), peak-to-peak amplitude (uV) and sleep stage at the
+          beginning of each event.
+        * <name>_<method>_summary.csv : number of events, density (events per
+          minute) and mean duration of each channel.
+
+    Parameters
+    ----------
+    files : list
+        List of paths to recordings. Directories can also be used, in which
+        case every supported recording inside is used.
+    method : {'spindle', 'sw', 'kc', 'rem', 'mt', 'peak'}
+        Detection method.
+    hypnos : list | None
+        List of paths to the hypnograms of each recording (None for no
+        hypnogram). If None, hypnograms are searched next to each recording
+        (<recording>_hypno.{txt, csv, hyp}).
+    channels : list | None
+        Names of the channels to use. If None, all channels are used.
+    n_jobs : int | 1
+        Number of worker processes. If None, the number of CPUs is used.
+    output_dir : string | None
+        Folder where to save the tables. If None, tables are saved next to
+        each recording.
+    downsample : float | 100.
+        Down-sampling frequency.
+    decimation : {'stride', 'filter'}
+        Down-sampling method.
+    kwargs : dict | {}
+        Parameters of the detection (same as the ones of the graphical
+        interface, e.g threshold, nrem_only...).
+
+    Returns
+    -------
+    results : dict
+        Dictionary {file: {channel: events}} where events is the list of
+        (start, end, duration, amplitude, stage) of each event.
+    """
+    if isinstance(files, str):
+        files = [files]
+    found, auto_hypnos = _find_recordings(files)
+    if hypnos is None:
+        hypnos = auto_hypnos
+    elif len(hypnos) != len(found):
+        raise ValueError("One hypnogram per recording is required (%i "
+                         "hypnograms for %i recordings)" % (
+                             len(hypnos), len(found)))
+    logger.info("Run %s detection on %i recordings" % (method, len(found)))
+    start = perf_counter()
+    outputs, hours = {}, {}
+
+    def _write(path):
+        folder = os.path.dirname(path) if output_dir is None else output_dir
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        _write_tables(path, method, folder, outputs[path])
+
+    # ---------- SERIAL ----------
+    if (n_jobs is not None) and (n_jobs <= 1):
+        for path, hyp in zip(found, hypnos):
+            tasks, duration = _channel_tasks(path, hyp, channels, method,
+                                             kwargs, downsample, decimation)
+            hours[path] = duration / 3600.
+            outputs[path] = {c: _detect_channel(*t) for c, t in tasks.items()}
+            _write(path)
+    # ---------- ONE TASK PER CHANNEL ----------
+    else:
+        context = multiprocessing.get_context(START_METHOD)
+        with ProcessPoolExecutor(n_jobs, mp_context=context) as executor:
+            futures, remaining = {}, {}
+            for path, hyp in zip(found, hypnos):
+                tasks, duration = _channel_tasks(path, hyp, channels, method,
+                                                 kwargs, downsample,
+                                                 decimation)
+                hours[path] = duration / 3600.
+                outputs[path] = dict.fromkeys(tasks.keys())
+                remaining[path] = len(tasks)
+                for chan, args in tasks.items():
+                    f = executor.submit(_detect_channel, *args)
+                    futures[f] = (path, chan)
+                if not len(tasks):
+                    _write(path)
+            # Tables are written once every channel of a file is done :
+            for f in as_completed(futures):
+                path, chan = futures.pop(f)
+                outputs[path][chan] = f.result()
+                remaining[path] -= 1
+                if not remaining[path]:
+                    _write(path)
+    elapsed = max(perf_counter() - start, 1e-9) / 60.
+    logger.info("%.2f recording hours processed in %.2f minutes (%.2f "
+                "recording hours / minute)" % (sum(hours.values()), elapsed,
+                                               sum(hours.values()) / elapsed))
+    return {path: {c: ev for c, (ev, _) in out.items()}
+            for path, out in outputs.items()}
+
+
+def _parse_param(param):
+    """Convert a key=value command line parameter."""
+    key, value = param.split('=', 1)
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+    return key, value
+
+
+def main(argv=None):
+    """Command line interface of batch_detection."""
+    parser = argparse.ArgumentParser(
+        prog='python -m visbrain.io.sleep_batch',
+        description="Run a Sleep detection over several recordings.")
+    parser.add_argument('files', nargs='+',
+                        help="Recordings or directories of recordings")
+    parser.add_argument('-m', '--method', required=True,
+                        choices=['spindle', 'sw', 'kc', 'rem', 'mt', 'peak'],
+                        help="Detection method")
+    parser.add_argument('--hypnos', nargs='+', default=None,
+                        help="Hypnogram of each recording")
+    parser.add_argument('-c', '--channels', nargs='+', default=None,
+                        help="Channels to use (default: all)")
+    parser.add_argument('-j', '--n-jobs', type=int, default=1,
+                        help="Number of worker processes")
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help="Folder where to save the tables")
+    parser.add_argument('-d', '--downsample', type=float, default=100.,
+                        help="Down-sampling frequency")
+    parser.add_argument('-p', '--param', action='append', default=[],
+                        type=_parse_param, metavar='KEY=VALUE',
+                        help="Detection parameter (e.g threshold=2.)")
+    args = parser.parse_args(argv)
+    logging.getLogger('visbrain').setLevel(logging.INFO)
+    batch_detection(args.files, args.method, hypnos=args.hypnos,
+                    channels=args.channels, n_jobs=args.n_jobs,
+                    output_dir=args.output_dir, downsample=args.downsample,
+                    **dict(args.param))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Persistent cache of converted sleep datasets.
+
+Native sleep files (*.edf, *.trc, *.eeg, *.vhdr...) have to be parsed,
+calibrated, converted to float32 and down-sampled each time they are opened.
+This module stores the result of this conversion inside the visbrain_data
+folder so that opening the same file again only requires to memory-map it.
+
+- read_sleep_cache : Get a converted dataset from the cache
+- write_sleep_cache : Add a converted dataset to the cache
+- clean_sleep_cache : Invalidate cached datasets
+- sleep_cache_size : Get the size of the cache
+"""
+import os
+import json
+import hashlib
+import datetime
+import logging
+
+import numpy as np
+
+from visbrain.io.path import path_to_visbrain_data
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('read_sleep_cache', 'write_sleep_cache', 'clean_sleep_cache',
+           'sleep_cache_size')
+
+# Name of the cache folder inside visbrain_data :
+CACHE_FOLDER = 'sleep_cache'
+# Default maximum size of the cache (in bytes) :
+CACHE_MAX_SIZE = 5 * 2 ** 30
+# Increment when the layout of cached files changes :
+CACHE_VERSION = 1
+# Maximum number of samples (all channels included) written at once :
+CHUNK_SIZE = 2 ** 22
+
+
+def _cache_folder(folder=None):
+    """Get the path to the cache folder."""
+    if folder is None:
+        folder = path_to_visbrain_data(folder=CACHE_FOLDER)
+    elif not os.path.exists(folder):
+        os.makedirs(folder)
+    return folder
+
+
+def _cache_key(path, downsample, decimation):
+    """Get the key of a file for given down-sampling settings.
+
+    The key depends on the full path, the size and the modification time of
+    the file so that a modified file is never read from the cache.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    infos = [CACHE_VERSION, path, stat.st_size, stat.st_mtime_ns,
+             None if downsample is None else float(downsample), decimation]
+    return hashlib.sha1(json.dumps(infos).encode('utf-8')).hexdigest()
+
+
+def _cache_entries(folder):
+    """Get the list of (key, size, last_access, source) of cached datasets."""
+    entries = []
+    for file in os.listdir(folder):
+        if not file.endswith('.json'):
+            continue
+        key = file[:-len('.json')]
+        meta_path = os.path.join(folder, file)
+        data_path = os.path.join(folder, key + '.npy')
+        try:
+            with open(meta_path, 'r') as f:
+                source = json.load(f)['path']
+            size = os.path.getsize(data_path) + os.path.getsize(meta_path)
+            entries.append((key, size, os.path.getmtime(meta_path), source))
+        except (OSError, ValueError, KeyError):
+            entries.append((key, 0, 0., None))  # broken entry
+    return entries
+
+
+def _remove_entry(folder, key):
+    """Remove a dataset from the cache."""
+    for ext in ['.json', '.npy']:
+        file = os.path.join(folder, key + ext)
+        if os.path.isfile(file):
+            os.remove(file)
+
+
+def read_sleep_cache(path, downsample, decimation='stride', folder=None):
+    """Get a converted dataset from the cache.
+
+    Parameters
+    ----------
+    path : string
+        Path to the sleep file.
+    downsample : float | None
+        Down-sampling frequency.
+    decimation : {'stride', 'filter'}
+        Down-sampling method.
+    folder : string | None
+        Path to the cache folder. If None, a sleep_cache folder inside
+        visbrain_data is used.
+
+    Returns
+    -------
+    args : tuple | None
+        Tuple (sf, downsample, dsf, data, channels, n, start_time,
+        annotations) similar to the one returned by the sleep readers, where
+        data is a copy-on-write memory-mapped float32 array. None if the
+        dataset is not in the cache.
+    """
+    folder = _cache_folder(folder)
+    key = _cache_key(path, downsample, decimation)
+    meta_path = os.path.join(folder, key + '.json')
+    data_path = os.path.join(folder, key + '.npy')
+    if not (os.path.isfile(meta_path) and os.path.isfile(data_path)):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        data = np.load(data_path, mmap_mode='c')
+    except (OSError, ValueError, KeyError):
+        logger.warning("Corrupted cache entry for %s removed" % path)
+        _remove_entry(folder, key)
+        return None
+    # Keep track of the last access (used for eviction) :
+    os.utime(meta_path)
+    start_time = datetime.time(*meta['start_time'])
+    annot = meta['annotations']
+    annot = None if annot is None else np.asarray(annot)
+    logger.debug("%s loaded from the cache (%s)" % (path, key))
+    return (meta['sf'], meta['downsample'], meta['dsf'], data,
+            meta['channels'], meta['n'], start_time, annot)
+
+
+def write_sleep_cache(path, downsample, decimation, args, folder=None,
+                      max_size=CACHE_MAX_SIZE):
+    """Add a converted dataset to the cache.
+
+    Data are written chunk by chunk, hence lazy datasets are never fully
+    loaded into memory.
+
+    Parameters
+    ----------
+    path : string
+        Path to the sleep file.
+    downsample : float | None
+        Down-sampling frequency requested when the file has been loaded.
+    decimation : {'stride', 'filter'}
+        Down-sampling method.
+    args : tuple
+        Tuple (sf, downsample, dsf, data, channels, n, start_time,
+        annotations) returned by the sleep readers.
+    folder : string | None
+        Path to the cache folder. If None, a sleep_cache folder inside
+        visbrain_data is used.
+    max_size : int | CACHE_MAX_SIZE
+        Maximum size of the cache (in bytes). The least recently used
+        datasets are removed to keep the cache below this size.
+
+    Returns
+    -------
+    args : tuple
+        Same tuple as the input, where data is replaced by its
+        memory-mapped cached version.
+    """
+    folder = _cache_folder(folder)
+    key = _cache_key(path, downsample, decimation)
+    sf, ds, dsf, data, channels, n, start_time, annot = args
+    n_chan, n_pts = data.shape
+    # Do not cache datasets that could never fit :
+    if n_chan * n_pts * 4 > max_size:
+        logger.warning("%s is too large to be cached" % path)
+        return args
+    _evict(folder, max_size - n_chan * n_pts * 4)
+    # ---------- DATA ----------
+    # Write into a temporary file first, so that a crash never leaves a
+    # truncated dataset in the cache :
+    data_path = os.path.join(folder, key + '.npy')
+    tmp_path = os.path.join(folder, key + '.tmp.npy')
+    mm = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                   shape=(n_chan, n_pts))
+    n_cols = max(int(CHUNK_SIZE // max(n_chan, 1)), 1)
+    for k in range(0, n_pts, n_cols):
+        mm[:, k:k + n_cols] = data[:, k:k + n_cols]
+    mm.flush()
+    del mm
+    os.replace(tmp_path, data_path)
+    # ---------- METADATA ----------
+    annot = None if annot is None else np.asarray(annot).tolist()
+    meta = dict(path=os.path.abspath(path), sf=float(sf),
+                downsample=None if ds is None else float(ds), dsf=int(dsf),
+                channels=[str(k) for k in channels], n=int(n),
+                start_time=[start_time.hour, start_time.minute,
+                            start_time.second],
+                annotations=annot)
+    with open(os.path.join(folder, key + '.json'), 'w') as f:
+        json.dump(meta, f)
+    logger.info("%s added to the sleep cache (%s)" % (path, folder))
+    return read_sleep_cache(path, downsample, decimation, folder)
+
+
+def _evict(folder, max_size):
+    """Remove least recently used datasets until the cache fits max_size."""
+    entries = sorted(_cache_entries(folder), key=lambda e: e[2])
+    total = sum([k[1] for k in entries])
+    for key, size, _, source in entries:
+        if total <= max_size:
+            break
+        _remove_entry(folder, key)
+        total -= size
+        logger.debug("%s evicted from the sleep cache" % source)
+
+
+def clean_sleep_cache(path=None, folder=None):
+    """Invalidate cached datasets.
+
+    Parameters
+    ----------
+    path : string | None
+        Path to a sleep file. All of the cached versions of this file (i.e
+        for every down-sampling settings) are removed. If None, the whole
+        cache is cleaned.
+    folder : string | None
+        Path to the cache folder. If None, a sleep_cache folder inside
+        visbrain_data is used.
+    """
+    folder = _cache_folder(folder)
+    source = None if path is None else os.path.abspath(path)
+    for key, _, _, src in _cache_entries(folder):
+        if (source is None) or (src == source):
+            _remove_entry(folder, key)
+    if source is None:  # also remove interrupted writings
+        for file in os.listdir(folder):
+            if file.endswith('.tmp.npy'):
+                os.remove(os.path.join(folder, file))
+
+
+def sleep_cache_size(folder=None):
+    """Get the size of the cache.
+
+    Parameters
+    ----------
+    folder : string | None
+        Path to the cache folder. If None, a sleep_cache folder inside
+        visbrain_data is used.
+
+    Returns
+    -------
+    size : int
+        Size of the cache (in bytes).
+    """
+    return sum([k[1] for k in _cache_entries(_cache_folder(folder))])
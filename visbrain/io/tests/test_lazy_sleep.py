@@ -0,0 +1,71 @@
+"""Test functions in lazy_sleep.py."""
+import numpy as np
+
+from visbrain.tests._tests_visbrain import _TestVisbrain
+from visbrain.io.lazy_sleep import LazySleepData, MemmapReader
+
+
+class TestLazySleep(_TestVisbrain):
+    """Test functions in lazy_sleep.py."""
+
+    def _get_data(self, n_chan=5, n_times=10001, dsf=3):
+        """Get a lazy dataset and its in-memory equivalent."""
+        path = self.to_tmp_dir('lazy_sleep.dat')
+        raw = np.random.randint(0, 2 ** 16, (n_times, n_chan)).astype('<u2')
+        raw.tofile(path)
+        m_raw = np.memmap(path, dtype='<u2', mode='r', shape=raw.shape)
+        gain, offset = np.random.rand(n_chan), np.full((n_chan,), 32768.)
+        reader = MemmapReader(m_raw.T, gain, offset)
+        lazy = LazySleepData(reader, np.arange(1, n_chan), n_times, dsf)
+        full = ((raw.T - offset[:, np.newaxis]) * gain[:, np.newaxis])
+        return lazy, full[1:, ::dsf].astype(np.float32)
+
+    def test_shape(self):
+        """Test shape and dtype."""
+        lazy, full = self._get_data()
+        assert lazy.shape == full.shape
+        assert lazy.ndim == 2
+        assert len(lazy) == full.shape[0]
+        assert lazy.dtype == np.float32
+
+    def test_getitem(self, monkeypatch):
+        """Test indexing."""
+        import visbrain.io.lazy_sleep as lz
+        lazy, full = self._get_data()
+        for chunk in [2 ** 22, 100]:  # single read / chunked read
+            monkeypatch.setattr(lz, 'CHUNK_SIZE', chunk)
+            mask = np.array([True, False, True, True])
+            keys = [(slice(None), slice(None)), (1, slice(10, 2000)),
+                    (mask, slice(5, 3000, 7)), (2, ...), (..., 41),
+                    ([3, 0], slice(None, None, -2)), 0,
+                    (1, np.array([3000, 12, 12, 800, 5]))]
+            for k in keys:
+                np.testing.assert_allclose(lazy[k], full[k], rtol=1e-5)
+        monkeypatch.undo()
+        np.testing.assert_allclose(np.asarray(lazy), full, rtol=1e-5)
+
+    def test_filter_decimation(self, monkeypatch):
+        """Test anti-aliasing decimation."""
+        from visbrain.utils.filtering import StreamDecimator
+        import visbrain.io.lazy_sleep as lz
+        lazy, _ = self._get_data()
+        lazy_filt = LazySleepData(lazy._reader, lazy._chans, lazy._n_times,
+                                  lazy._dsf, 'filter')
+        raw = lazy._reader(lazy._chans, 0, lazy._n_times)
+        full = StreamDecimator(lazy._dsf)(raw, final=True)
+        assert lazy_filt.shape == full.shape
+        for chunk in [2 ** 22, 100]:
+            monkeypatch.setattr(lz, 'CHUNK_SIZE', chunk)
+            for k in [(slice(None), slice(None)), (1, slice(10, 2000)),
+                      (..., slice(5, 3000, 7)), (2, np.array([900, 8, 8]))]:
+                np.testing.assert_allclose(lazy_filt[k], full[k], rtol=1e-4,
+                                           atol=1e-2)
+
+    def test_reductions(self):
+        """Test min, max, mean, std and scaling."""
+        lazy, full = self._get_data()
+        for meth in ['min', 'max', 'mean', 'std']:
+            np.testing.assert_allclose(getattr(lazy, meth)(1),
+                                       getattr(full, meth)(1), rtol=1e-4)
+        lazy *= np.array([1., 10., 100., 1000.])[:, np.newaxis]
+        np.testing.assert_allclose(lazy[3, :], 1000. * full[3, :], rtol=1e-5)
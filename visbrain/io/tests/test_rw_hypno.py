@@ -31,6 +31,22 @@ class TestRwHypno(_TestVisbrain):
         np.testing.assert_array_almost_equal(time, time_new)
         assert sf == sf_new
 
+    def test_hypno_time_to_sample_scale(self):
+        """Test hypno_time_to_sample on a long recording."""
+        import pandas as pd
+        npts, n_tr = 10 ** 7, 1000
+        time = np.arange(npts) / 100.
+        # Random transitions (in samples) and stages :
+        tr = np.sort(np.random.choice(np.arange(1, npts - 1), n_tr - 1,
+                                      replace=False))
+        tr = np.r_[tr, npts - 1]
+        stages = np.random.randint(-1, 5, (n_tr,))
+        df = pd.DataFrame({'Stage': stages.astype(str), 'Time': time[tr]})
+        hyp, _, _ = hypno_time_to_sample(df, time)
+        # Each stage lasts until its transition (included) :
+        lengths = np.diff(np.r_[0, tr + 1])
+        np.testing.assert_array_equal(hyp, np.repeat(stages, lengths))
+
     def test_oversample_hypno(self):
         """Test function oversample_hypno."""
         hyp = self._get_hypno()
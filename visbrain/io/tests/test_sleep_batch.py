@@ -0,0 +1,140 @@
+"""Test functions in sleep_batch.py."""
+import os
+import csv
+
+import numpy as np
+
+from visbrain.tests._tests_visbrain import _TestVisbrain, write_edf
+from visbrain.io.read_sleep import ReadSleepData
+from visbrain.io.rw_hypno import write_hypno
+from visbrain.io.sleep_batch import batch_detection, main
+from visbrain.utils import generate_eeg
+from visbrain.utils.sleep.detection_pool import apply_detection
+
+sf, n_chan, n_sec = 100., 3, 600
+
+
+def _write_recording(path, data, bdf=False):
+    """Write data (in uV) into an EDF (or BDF) file with 1s records."""
+    d_max = 2 ** 23 if bdf else 2 ** 15
+    raw = np.round(data / (6400. / (2 * d_max - 1))).astype(int)
+    write_edf(path, list(raw), [int(sf)] * len(raw), bdf=bdf)
+
+
+class TestSleepBatch(_TestVisbrain):
+    """Test functions in sleep_batch.py."""
+
+    def _get_files(self, n_files=2):
+        """Write recordings (and hypnograms) into a folder."""
+        folder = os.path.join(self.to_tmp_dir(), 'sleep_batch')
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        files = []
+        for k in range(n_files):
+            data = generate_eeg(sf=sf, n_pts=int(n_sec * sf),
+                                n_channels=n_chan, random_state=k)[0]
+            path = os.path.join(folder, 'rec_%i.edf' % k)
+            _write_recording(path, 30. * data / data.std())
+            hypno = np.repeat([0, 1, 2, 3, 2, 4, 0, 2, 3, 4], 60)
+            write_hypno(path.replace('.edf', '_hypno.txt'), hypno,
+                        version='sample', sf=1., npts=n_sec, window=1.)
+            files.append(path)
+        return folder, files
+
+    @staticmethod
+    def _read_csv(path):
+        with open(path, 'r') as f:
+            return [k for k in csv.reader(f) if len(k)]
+
+    def test_batch_detection(self):
+        """Test that batch detections match the ones of Sleep."""
+        folder, files = self._get_files()
+        out_dir = os.path.join(folder, 'out')
+        kw = dict(threshold=2., nrem_only=False)
+        for n_jobs in [1, 2]:
+            res = batch_detection([folder], 'spindle', n_jobs=n_jobs,
+                                  output_dir=out_dir, **kw)
+            assert sorted(res.keys()) == files
+        for path in files:
+            hyp = path.replace('.edf', '_hypno.txt')
+            sleep = ReadSleepData(path, None, None, hyp, ['art', 'wake',
+                                  'n1', 'n2', 'n3', 'rem'], False, False,
+                                  100., {}, None)
+            name = os.path.join(out_dir, os.path.basename(path)[:-4])
+            table = self._read_csv(name + '_spindle_events.csv')
+            for k, chan in enumerate(sleep._channels):
+                index = apply_detection('spindle', sleep._data[k, :],
+                                        sleep._sf, sleep._time, sleep._hypno,
+                                        **kw)
+                starts = [ev[0] for ev in res[path][chan]]
+                np.testing.assert_allclose(starts, sleep._time[index[:, 0]])
+                rows = [r for r in table[1:] if r[0] == chan]
+                assert len(rows) == len(index)
+            summary = self._read_csv(name + '_spindle_summary.csv')
+            assert len(summary) == n_chan + 1
+
+    def test_main(self):
+        """Test the command line interface."""
+        folder, files = self._get_files(1)
+        main([files[0], '-m', 'sw', '-c', 'chan0', 'chan2', '-p',
+              'threshold=1.5', '-o', os.path.join(folder, 'cli')])
+        summary = self._read_csv(os.path.join(folder, 'cli',
+                                              'rec_0_sw_summary.csv'))
+        assert [k[0] for k in summary[1:]] == ['chan0', 'chan2']
+
+    def test_read_once(self):
+        """Test that each recording is only opened once."""
+        import visbrain.io.sleep_batch as sb
+        folder, files = self._get_files(2)
+        read, calls = sb._read_recording, []
+
+        def _read(path, *args):
+            calls.append(path)
+            return read(path, *args)
+        sb._read_recording = _read
+        try:
+            batch_detection(files, 'sw', output_dir=os.path.join(folder,
+                            'once'), threshold=1.5)
+        finally:
+            sb._read_recording = read
+        assert sorted(calls) == sorted(files)
+
+    def test_bdf(self):
+        """Test that BDF files are read by Sleep functions."""
+        import visbrain.io.sleep_batch as sb
+        folder = os.path.join(self.to_tmp_dir(), 'sleep_batch_bdf')
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        data = generate_eeg(sf=sf, n_pts=int(n_sec * sf), n_channels=n_chan,
+                            random_state=0)[0]
+        data = 30. * data / data.std()
+        _write_recording(os.path.join(folder, 'rec.edf'), data)
+        _write_recording(os.path.join(folder, 'rec.bdf'), data, bdf=True)
+        assert '.bdf' in sb.SLEEP_EXT
+        res = [batch_detection(os.path.join(folder, 'rec' + k), 'sw',
+                               output_dir=os.path.join(folder, k[1:]),
+                               threshold=1.5) for k in ['.edf', '.bdf']]
+        for chan in res[0][os.path.join(folder, 'rec.edf')].keys():
+            starts = [[ev[0] for ev in r[os.path.join(folder, 'rec' + k)][
+                chan]] for r, k in zip(res, ['.edf', '.bdf'])]
+            assert starts[0] == starts[1]
+
+    def test_channel_tasks(self):
+        """Test that workers memory-map recordings again."""
+        import visbrain.io.sleep_batch as sb
+        folder, files = self._get_files(1)
+        tasks, duration = sb._channel_tasks(files[0], None, ['chan0', 'chan2'],
+                                            'sw', dict(threshold=1.5), 100.,
+                                            'stride')
+        assert list(tasks.keys()) == ['chan0', 'chan2']
+        assert duration == n_sec
+        x, sf_t, time, hypno, _, _ = tasks['chan2']
+        assert x == (files[0], 100., 'stride', 2)
+        sb._LAZY.clear()
+        lazy = sb._detect_channel(*tasks['chan2'])
+        assert len(sb._LAZY) == 1
+        data = np.asarray(sb._LAZY[x[:-1]][2, :])
+        loaded = sb._detect_channel(data, sf_t, time, hypno, 'sw',
+                                    dict(threshold=1.5))
+        assert lazy[1] == loaded[1]
+        np.testing.assert_array_equal(data, sb._LAZY[x[:-1]][2, :])
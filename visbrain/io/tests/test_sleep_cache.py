@@ -0,0 +1,93 @@
+"""Test functions in sleep_cache.py."""
+import os
+import datetime
+
+import numpy as np
+
+from visbrain.tests._tests_visbrain import _TestVisbrain
+from visbrain.io.lazy_sleep import LazySleepData, MemmapReader
+from visbrain.io.sleep_cache import (read_sleep_cache, write_sleep_cache,
+                                     clean_sleep_cache, sleep_cache_size,
+                                     _cache_key)
+
+
+class TestSleepCache(_TestVisbrain):
+    """Test functions in sleep_cache.py."""
+
+    def _get_args(self, file='sleep_cache.dat', n_chan=3, n_times=5000):
+        """Write a fake sleep file and get its reading output."""
+        path = self.to_tmp_dir(file)
+        raw = np.random.rand(n_chan, n_times).astype(np.float32)
+        raw.tofile(path)
+        data = LazySleepData(MemmapReader(raw, 2.), range(n_chan), n_times, 2)
+        annot = np.c_[[1., 2.], [3., 4.], ['a', 'b']]
+        args = (100., 50., 2, data, ['c%i' % k for k in range(n_chan)],
+                n_times, datetime.time(22, 30, 5), annot)
+        return path, args, 2. * raw[:, ::2]
+
+    def _folder(self):
+        """Get a cache folder for the tests."""
+        folder = os.path.join(self.to_tmp_dir(), 'sleep_cache')
+        clean_sleep_cache(folder=folder)
+        return folder
+
+    def test_read_write(self):
+        """Test writing then reading a dataset."""
+        folder = self._folder()
+        path, args, full = self._get_args()
+        assert read_sleep_cache(path, 50., 'stride', folder) is None
+        out = write_sleep_cache(path, 50., 'stride', args, folder)
+        for cached in [out, read_sleep_cache(path, 50., 'stride', folder)]:
+            assert isinstance(cached[3], np.memmap)
+            np.testing.assert_array_equal(cached[3], full)
+            assert cached[:3] == args[:3]
+            assert cached[4:7] == args[4:7]
+            np.testing.assert_array_equal(cached[7], args[7])
+        # Data can be modified without modifying the cache :
+        out[3][:] = 0.
+        np.testing.assert_array_equal(read_sleep_cache(
+            path, 50., 'stride', folder)[3], full)
+        # Other down-sampling settings :
+        assert read_sleep_cache(path, 100., 'stride', folder) is None
+        assert read_sleep_cache(path, 50., 'filter', folder) is None
+
+    def test_invalidation(self):
+        """Test that modified or cleaned files are not read from the cache."""
+        folder = self._folder()
+        path, args, _ = self._get_args()
+        write_sleep_cache(path, 50., 'stride', args, folder)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        assert read_sleep_cache(path, 50., 'stride', folder) is None
+        write_sleep_cache(path, 50., 'stride', args, folder)
+        write_sleep_cache(path, 100., 'stride', args, folder)
+        clean_sleep_cache(path, folder=folder)
+        assert sleep_cache_size(folder) == 0
+
+    def test_eviction(self):
+        """Test that the least recently used datasets are evicted."""
+        folder = self._folder()
+        paths, args = [], []
+        for k in range(3):
+            path, arg, _ = self._get_args('sleep_cache_%i.dat' % k)
+            paths += [path]
+            args += [arg]
+        write_sleep_cache(paths[0], 50., 'stride', args[0], folder)
+        write_sleep_cache(paths[1], 50., 'stride', args[1], folder)
+        size = sleep_cache_size(folder)
+        # Make the first dataset the least recently used one :
+        key = _cache_key(paths[0], 50., 'stride')
+        os.utime(os.path.join(folder, key + '.json'), (0, 0))
+        # Only two datasets fit in the cache :
+        write_sleep_cache(paths[2], 50., 'stride', args[2], folder,
+                          max_size=size)
+        cached = [read_sleep_cache(k, 50., 'stride', folder) is not None
+                  for k in paths]
+        assert cached == [False, True, True]
+        assert sleep_cache_size(folder) <= size
+        # Datasets larger than the cache are not cached :
+        clean_sleep_cache(folder=folder)
+        out = write_sleep_cache(paths[0], 50., 'stride', args[0], folder,
+                                max_size=10)
+        assert out[3] is args[0][3]
+        assert sleep_cache_size(folder) == 0
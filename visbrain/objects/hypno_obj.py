@@ -16,7 +16,7 @@ class HypnogramObj(VisbrainObject):
     ----------
     name : string
         Name of the hypnogram object or path to a *.txt or *.csv file.
-    data : array_like
+    data : array_like | RunLengthHypno
         Array of data of shape (n_pts,).
     time : array_like | None
         Array of time points of shape (n_pts,)
@@ -75,7 +75,8 @@ class HypnogramObj(VisbrainObject):
             if (ext == '.xlsx') and (time is None):
                 raise ValueError("The `time` input should not be None with "
                                  "excel files. Use a NumPy array instead.")
-            data, sf = read_hypno(name, time=time, datafile=datafile)
+            data, sf = read_hypno(name, time=time, datafile=datafile,
+                                  run_length=True)
             name, time = os.path.split(name)[1], np.arange(len(data)) / sf
         # Initialize VisbrainObject and Hypnogram visuam creation :
         VisbrainObject.__init__(self, name, parent, transform, verbose, **kw)
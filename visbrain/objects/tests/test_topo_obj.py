@@ -1,5 +1,9 @@
 """Test BrainObj."""
+import sys
+from types import SimpleNamespace
+
 import numpy as np
+import pytest
 
 from visbrain.objects import TopoObj
 from visbrain.objects.tests._testing_objects import _TestObjects
@@ -11,6 +15,24 @@ data = [10, 20, 30, 10, 10]
 t_obj = TopoObj('topo', data, channels=channels)
 
 
+class _Writer(object):
+    """Record the frames sent to an imageio writer."""
+
+    def __init__(self, fail_at=None):
+        self.frames, self.closed, self._fail_at = [], False, fail_at
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def append_data(self, im):
+        if len(self.frames) == self._fail_at:
+            raise RuntimeError("Disk full")
+        self.frames.append(im)
+
+
 class TestTopoObj(_TestObjects):
     """Test TopoObj."""
 
@@ -52,3 +74,60 @@ class TestTopoObj(_TestObjects):
         t_obj = TopoObj('topo', data, channels=channels, xyz=xyz)
         t_obj.connect(connect, select=select, cmap='inferno', antialias=True,
                       line_width=4.)
+
+    def test_griddata(self):
+        """Test the thin-plate spline interpolation."""
+        rnd = np.random.RandomState(0)
+        x, y, v = rnd.rand(10), rnd.rand(10), rnd.rand(10, 4)
+        # Channels are interpolated exactly :
+        grid = TopoObj._griddata(x, y, v[:, 0], x.reshape(2, 5),
+                                 y.reshape(2, 5))
+        np.testing.assert_allclose(grid.ravel(), v[:, 0], atol=1e-8)
+        # Stack of topographies :
+        xi, yi = np.meshgrid(np.linspace(0., 1., 8), np.linspace(0., 1., 8))
+        grids = TopoObj._griddata(x, y, v, xi, yi)
+        assert grids.shape == (8, 8, 4)
+        np.testing.assert_allclose(grids[..., 2],
+                                   TopoObj._griddata(x, y, v[:, 2], xi, yi))
+
+    def test_playback(self):
+        """Test the playback of a time series."""
+        xyz, data, channels = self._get_coordinates()
+        ts = data.reshape(-1, 1) + np.random.rand(len(data), 20)
+        t_obj = TopoObj('topo', ts, channels=channels, xyz=xyz)
+        assert (t_obj.n_frames == 20) and (t_obj.frame == 0)
+        t_obj.seek(5)
+        assert t_obj.frame == 5
+        t_obj.seek(-1)
+        assert t_obj.frame == 19
+        t_obj.play(fps=30.)
+        t_obj.pause()
+        # Frames match single topographies (up to the lookup table) :
+        clim = (ts.min(), ts.max())
+        for k in [0, 7, 19]:
+            t_obj.seek(k)
+            ref = TopoObj('topo', ts[:, k], channels=channels, xyz=xyz,
+                          clim=clim)
+            np.testing.assert_allclose(t_obj.disc._data, ref.disc._data,
+                                       atol=.015)
+        # Topography without time series :
+        t_obj = TopoObj('topo', data, channels=channels, xyz=xyz)
+        assert t_obj.n_frames == 1
+        with pytest.raises(ValueError):
+            t_obj.seek(1)
+
+    def test_record_animation(self, monkeypatch):
+        """Test that the writer is closed, even if the recording fails."""
+        xyz, data, channels = self._get_coordinates()
+        ts = data.reshape(-1, 1) + np.random.rand(len(data), 6)
+        t_obj = TopoObj('topo', ts, channels=channels, xyz=xyz)
+        for fail_at, n_frames in [(None, 3), (1, 1)]:
+            writer = _Writer(fail_at)
+            imageio = SimpleNamespace(get_writer=lambda name, **kw: writer)
+            monkeypatch.setitem(sys.modules, 'imageio', imageio)
+            if fail_at is None:
+                t_obj.record_animation(self.to_tmp_dir('topo.gif'), step=2)
+            else:
+                with pytest.raises(RuntimeError):
+                    t_obj.record_animation(self.to_tmp_dir('topo.gif'))
+            assert writer.closed and (len(writer.frames) == n_frames)
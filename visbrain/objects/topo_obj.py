@@ -10,9 +10,11 @@ import vispy.visuals.transforms as vist
 
 from .visbrain_obj import VisbrainObject
 from ..objects import ConnectObj
+from ..visuals.topo_visual import _thin_plate_operator
 from ..io import download_file, is_sc_image_installed
 from ..utils import (array2colormap, color2vb, mpl_cmap, normalize,
                      vpnormalize, vprecenter)
+from ..config import CONFIG
 
 logger = logging.getLogger('visbrain')
 
@@ -25,7 +27,9 @@ class TopoObj(VisbrainObject):
     name : string
         The name of the connectivity object.
     data : array_like
-        Array of data of shape (n_channels)
+        Array of data of shape (n_channels) or time series of shape
+        (n_channels, n_times). Time series can be played back (see play and
+        record_animation).
     xyz : array_like | None
         Array of source's coordinates.
     channels : list | None
@@ -86,6 +90,13 @@ class TopoObj(VisbrainObject):
 
         * **s** : save the figure
         * **<delete>** : reset camera
+
+    Examples
+    --------
+    >>> # Play back a time series of shape (n_channels, n_times) :
+    >>> t_obj = TopoObj('topo', data, channels=channels)
+    >>> t_obj.play(fps=30.)
+    >>> t_obj.preview()
     """
 
     ###########################################################################
@@ -260,7 +271,11 @@ class TopoObj(VisbrainObject):
         Parameters
         ----------
         data : array_like
-            Array of data of shape (n_channels)
+            Array of data of shape (n_channels) or time series of shape
+            (n_channels, n_times). For time series, the first frame is
+            displayed, markers and levels are defined using this frame and
+            the colorbar limits default to the limits of the whole time
+            series.
         levels : array_like/int | None
             The levels at which the isocurve is constructed.
         level_colors : string/array_like | 'white'
@@ -287,7 +302,16 @@ class TopoObj(VisbrainObject):
         # ================== XYZ / CHANNELS / DATA ==================
         xyz = self._xyz[self._keeponly]
         channels = list(np.array(self._channels)[self._keeponly])
-        data = np.asarray(data, dtype=float).ravel()
+        data = np.asarray(data, dtype=float)
+        self.pause()
+        self._frames, self._frame = None, 0
+        if (data.ndim == 2) and (data.shape[1] > 1):  # time series
+            if data.shape[0] == len(self):
+                data = data[self._keeponly, :]
+            self._frames = data
+            logger.info("    %i time points" % data.shape[1])
+            data = data[:, 0]
+        data = data.ravel()
         if len(data) == len(self):
             data = data[self._keeponly]
         logger.info("    %i channels detected" % len(channels))
@@ -310,26 +334,27 @@ class TopoObj(VisbrainObject):
         xi = np.linspace(xmin, xmax, self._pix)
         yi = np.linspace(ymin, ymax, self._pix)
         xh, yi = np.meshgrid(xi, yi)
-        grid = self._griddata(pos_x, pos_y, data, xh, yi)
-
-        # =================== INTERPOLATION ===================
-        if self._interp is not None:
-            grid = self._grid_interpolation(grid)
+        self._op = _thin_plate_operator(pos_x, pos_y, xh, yi)
+        grid = self._frame_grid(data)
         csize = max(self._pix, grid.shape[0])
         # Variables :
         l = csize / 2  # noqa
         y, x = np.ogrid[-l:l, -l:l]
         mask = x**2 + y**2 < l**2
         nmask = np.invert(mask)
+        self._nmask = nmask
 
         # =================== DISC ===================
         # Force min < off-disc values < max :
         d_min, d_max = data.min(), data.max()
-        grid = normalize(grid, d_min, d_max)
+        if (self._frames is not None) and (clim is None):
+            clim = (self._frames.min(), self._frames.max())
         clim = (d_min, d_max) if clim is None else clim
         self._update_cbar_args(cmap, clim, vmin, vmax, under, over)
         grid_color = array2colormap(grid, **self.to_kwargs())
         grid_color[nmask, -1] = 0.
+        if self._frames is not None:
+            self._set_frame_colormap()
         # grid[nmask] = d_min
         # self.disc.clim = clim
         # self.disc.cmap = cmap_to_glsl(limits=(d_min, d_max),
@@ -353,6 +378,142 @@ class TopoObj(VisbrainObject):
                                         width=2.)
             self.iso.transform = vist.STTransform(translate=(0., 0., -5.))
 
+    ###########################################################################
+    ###########################################################################
+    #                                PLAYBACK
+    ###########################################################################
+    ###########################################################################
+
+    def _frame_grid(self, data):
+        """Get the normalized grid of a single topography."""
+        grid = self._op.dot(data).reshape(self._pix, self._pix)
+        if self._interp is not None:
+            grid = self._grid_interpolation(grid)
+        return normalize(grid, data.min(), data.max())
+
+    def _set_frame_colormap(self, n_colors=1024):
+        """Sample the colormap of frames over the range of the time series.
+
+        Frames are then colored using a lookup table instead of calling
+        array2colormap on every frame.
+        """
+        f_min, f_max = self._frames.min(), self._frames.max()
+        values = np.linspace(f_min, f_max, n_colors)
+        self._lut = array2colormap(values, **self.to_kwargs()).astype(
+            np.float32)
+        f_range = max(f_max - f_min, np.finfo(float).eps)
+        self._lut_range = (f_min, (n_colors - 1) / f_range)
+
+    def _frame_image(self, idx):
+        """Get the RGBA image of a frame of the time series."""
+        grid = self._frame_grid(self._frames[:, idx])
+        f_min, scale = self._lut_range
+        lut_idx = ((grid - f_min) * scale + .5).astype(np.intp)
+        np.clip(lut_idx, 0, len(self._lut) - 1, out=lut_idx)
+        image = self._lut.take(lut_idx, axis=0)
+        image[self._nmask, -1] = 0.
+        return image
+
+    @property
+    def n_frames(self):
+        """Get the number of frames of the time series (1 otherwise)."""
+        return 1 if self._frames is None else self._frames.shape[1]
+
+    @property
+    def frame(self):
+        """Get the index of the displayed frame."""
+        return self._frame
+
+    def seek(self, idx):
+        """Display a frame of the time series.
+
+        Only the image of the disc is updated (markers, levels and the
+        colorbar are not rebuilt).
+
+        Parameters
+        ----------
+        idx : int
+            Index of the frame (negative values count from the end).
+        """
+        if self._frames is None:
+            raise ValueError("Playback requires data of shape (n_channels, "
+                             "n_times)")
+        self._frame = int(idx) % self.n_frames
+        self.disc.set_data(self._frame_image(self._frame))
+        self.disc.update()
+
+    def play(self, fps=30., step=1, loop=True):
+        """Play back the time series.
+
+        Parameters
+        ----------
+        fps : float | 30.
+            Number of frames displayed per second. Use 'auto' to match the
+            refresh rate of the monitor.
+        step : int | 1
+            Number of time points between two displayed frames.
+        loop : bool | True
+            Start again from the first frame at the end of the time series.
+        """
+        from vispy.app import Timer
+        self.pause()
+        interval = 'auto' if fps == 'auto' else 1. / fps
+
+        def on_timer(event):  # noqa
+            nxt = self._frame + step
+            if not loop and not (0 <= nxt < self.n_frames):
+                self.pause()
+                return
+            self.seek(nxt)
+        self.seek(self._frame)
+        self._play_timer = Timer(connect=on_timer, app=CONFIG['VISPY_APP'],
+                                 interval=interval)
+        self._play_timer.start()
+
+    def pause(self):
+        """Pause the playback."""
+        if getattr(self, '_play_timer', None) is not None:
+            self._play_timer.stop()
+            self._play_timer = None
+
+    def record_animation(self, name, n_pic=None, step=1, bgcolor=None,
+                         **kwargs):
+        """Record the playback of the time series (e.g *.gif or *.mp4).
+
+        Frames are rendered and written one by one so that the whole
+        animation is never kept in memory. Without time series, the
+        animation of the object is recorded (see
+        VisbrainObject.record_animation). Requires the python package
+        imageio.
+
+        Parameters
+        ----------
+        name : string
+            Name of the file (e.g 'myfile.gif' or 'myfile.mp4')
+        n_pic : int | None
+            Number of frames to record. If None, the whole time series is
+            recorded.
+        step : int | 1
+            Number of time points between two recorded frames.
+        bgcolor : string, tuple, list | None
+            Background color.
+        kwargs : dict | {}
+            Additional arguments sent to imageio.get_writer (e.g fps).
+        """
+        if self._frames is None:
+            return VisbrainObject.record_animation(
+                self, name, 10 if n_pic is None else n_pic, bgcolor)
+        import imageio
+        self.pause()
+        frames = range(0, self.n_frames, step)
+        if n_pic is not None:
+            frames = frames[:n_pic]
+        canvas = self._get_parent(bgcolor, False, False)
+        with imageio.get_writer(name, **kwargs) as writer:
+            for k in frames:
+                self.seek(k)
+                writer.append_data(canvas.canvas.render())
+
     def connect(self, connect, **kwargs):
         """Draw connectivity lines between channels.
 
@@ -502,35 +663,18 @@ class TopoObj(VisbrainObject):
 
     @staticmethod
     def _griddata(x, y, v, xi, yi):
-        """Make griddata."""
-        xy = x.ravel() + y.ravel() * -1j
-        d = xy[None, :] * np.ones((len(xy), 1))
-        d = np.abs(d - d.T)
-        n = d.shape[0]
-        d.flat[::n + 1] = 1.
-
-        g = (d * d) * (np.log(d) - 1.)
-        g.flat[::n + 1] = 0.
-        weights = np.linalg.solve(g, v.ravel())
-
-        m, n = xi.shape
-        zi = np.zeros_like(xi)
-        xy = xy.T
-
-        g = np.empty(xy.shape)
-        for i in range(m):
-            for j in range(n):
-                d = np.abs(xi[i, j] + -1j * yi[i, j] - xy)
-                mask = np.where(d == 0)[0]
-                if len(mask):
-                    d[mask] = 1.
-                np.log(d, out=g)
-                g -= 1.
-                g *= d * d
-                if len(mask):
-                    g[mask] = 0.
-                zi[i, j] = g.dot(weights)
-        return zi
+        """Make griddata.
+
+        The thin-plate spline operator of the channel layout and grid is
+        computed once (see _thin_plate_operator). v is either a vector of
+        shape (n_channels,) or a stack of topographies of shape
+        (n_channels, n_times), in which case grids are stacked along the
+        last axis.
+        """
+        op = _thin_plate_operator(x, y, xi, yi)
+        v = np.asarray(v, dtype=float)
+        v = v.reshape(op.shape[1], -1) if v.ndim > 1 else v.ravel()
+        return op.dot(v).reshape(xi.shape + v.shape[1:])
 
     @staticmethod
     def _array_project_radial_to3d(points_2d):
@@ -46,3 +46,89 @@ class _TestVisbrain(object):
         """Test setting parent."""
         obj.parent = parent
         assert obj.parent.name == parent.name
+
+
+def write_edf(path, data, n_samples_per_record, record_length=1.,
+              physical_max=3200., bdf=False, onsets=None):
+    """Write a minimal EDF file.
+
+    Parameters
+    ----------
+    path : string
+        Path to the file to write.
+    data : list
+        List of integer arrays of digital values (one per channel).
+    n_samples_per_record : list
+        Number of samples per record of each channel.
+    record_length : float | 1.
+        Duration of a data record (in seconds).
+    physical_max : float | array_like | 3200.
+        Physical maximum of each channel (the physical minimum is its
+        opposite).
+    bdf : bool | False
+        Write a BDF file with 24-bit data instead.
+    onsets : array_like | None
+        Onset of each record (in seconds). If not None, an EDF+D (or BDF+D)
+        file with an annotation channel is written.
+    """
+    n_bytes, d_max = (3, 2 ** 23) if bdf else (2, 2 ** 15)
+    n_chan = len(n_samples_per_record)
+    n_records = int(data[0].size / n_samples_per_record[0])
+    labels = ['chan%i' % k for k in range(n_chan)]
+    p_max = list(np.broadcast_to(physical_max, (n_chan,)))
+    # Records of shape (n_records, n_bytes * n_samples) :
+    records = []
+    for d in data:
+        d = np.asarray(d, dtype='<i4' if bdf else '<i2').view('u1')
+        if bdf:  # 3 lowest bytes of each sample
+            d = d.reshape(-1, 4)[:, :3]
+        records += [d.reshape(n_records, -1)]
+    if onsets is not None:  # annotation channel
+        tal = [('+%g\x14\x14\x00' % o).encode('utf-8') for o in onsets]
+        records += [np.frombuffer(b''.join([t.ljust(30 * n_bytes, b'\x00')
+                                            for t in tal]),
+                                  dtype='u1').reshape(n_records, -1)]
+        labels += ['BDF Annotations' if bdf else 'EDF Annotations']
+        n_samples_per_record = list(n_samples_per_record) + [30]
+        p_max += [1]
+
+    def _f(val, n):
+        return str(val).ljust(n)[:n].encode('utf-8')
+
+    n_sig = len(labels)
+    reserved = ('BDF+D' if bdf else 'EDF+D') if onsets is not None else (
+        '24BIT' if bdf else '')
+    hdr = b'\xffBIOSEMI' if bdf else _f(0, 8)
+    hdr += _f('subject', 80) + _f('recording', 80)
+    hdr += _f('01.02.18', 8) + _f('22.30.00', 8)
+    hdr += _f(256 * (n_sig + 1), 8) + _f(reserved, 44) + _f(n_records, 8)
+    hdr += _f(record_length, 8) + _f(n_sig, 4)
+    hdr += b''.join([_f(k, 16) for k in labels])
+    hdr += b''.join([_f('', 80) for k in range(n_sig)])
+    hdr += b''.join([_f('uV', 8) for k in range(n_sig)])
+    hdr += b''.join([_f(-k, 8) for k in p_max])
+    hdr += b''.join([_f(k, 8) for k in p_max])
+    hdr += b''.join([_f(-d_max, 8) for k in range(n_sig)])
+    hdr += b''.join([_f(d_max - 1, 8) for k in range(n_sig)])
+    hdr += b''.join([_f('', 80) for k in range(n_sig)])
+    hdr += b''.join([_f(k, 8) for k in n_samples_per_record])
+    hdr += b''.join([_f('', 32) for k in range(n_sig)])
+    with open(path, 'wb') as f:
+        f.write(hdr)
+        f.write(np.concatenate(records, axis=1).tobytes())
+
+
+def synthetic_hypno(n_pts, rnd, n_win=3000):
+    """Random hypnogram of shape (n_pts,).
+
+    Parameters
+    ----------
+    n_pts : int
+        Number of time points.
+    rnd : numpy.random.RandomState
+        Random state used to draw stages (from 0 to 4).
+    n_win : int | 3000
+        Number of time points of each scored window.
+    """
+    hypno = np.repeat(rnd.randint(0, 5, n_pts // n_win + 1), n_win)
+    return hypno[:n_pts].astype(float)
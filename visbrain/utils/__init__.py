@@ -1,3 +1,4 @@
+from .background import *
 from .cameras import *
 from .color import *
 from .filtering import *
@@ -0,0 +1,216 @@
+"""Least recently used cache of results computed in the background.
+
+- BackgroundCache : cache of results computed by a pool of threads
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+__all__ = ('BackgroundCache',)
+
+
+class BackgroundCache(object):
+    """Least recently used cache of results computed by a pool of threads.
+
+    Results are computed in the background (see submit). Pending jobs are
+    kept aside until they are moved into the cache (see collect). The cache
+    is bounded by the total size of its results, the least recently used
+    ones being dropped first.
+
+    Parameters
+    ----------
+    max_size : int | None
+        Maximum total size of the cached results. If None, the cache is not
+        bounded.
+    sizeof : function | None
+        Function returning the size of a result (e.g the number of bytes of
+        an array). If None, each result counts for one.
+    n_jobs : int | 1
+        Number of threads (started on the first submitted job).
+    on_error : function | None
+        Function called with the key and the exception of each job that
+        raised an error. If None, failed jobs are silently dropped.
+    """
+
+    def __init__(self, max_size=None, sizeof=None, n_jobs=1, on_error=None):
+        """Init."""
+        self.max_size, self._sizeof = max_size, sizeof
+        self._n_jobs = max(int(n_jobs), 1)
+        self._on_error = on_error
+        self.cache, self.pending = OrderedDict(), {}
+        self._executor = None
+
+    def __len__(self):
+        """Return the number of cached results."""
+        return len(self.cache)
+
+    def __contains__(self, key):
+        """Return if a result is cached."""
+        return key in self.cache
+
+    def submit(self, key, fcn, *args):
+        """Compute a result in the background (if not cached or pending).
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the result (hashable).
+        fcn : function
+            Function computing the result (thread safe).
+        args : tuple
+            Inputs sent to fcn.
+
+        Returns
+        -------
+        submitted : bool
+            Specify if a new job has been submitted.
+        """
+        if (key in self.cache) or (key in self.pending):
+            return False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self._n_jobs)
+        self.pending[key] = self._executor.submit(fcn, *args)
+        return True
+
+    def collect(self, keep=()):
+        """Move finished jobs into the cache, without blocking.
+
+        Parameters
+        ----------
+        keep : list | ()
+            Keys of the results that should not be dropped from the cache.
+
+        Returns
+        -------
+        finished : list
+            Keys of the jobs finished since the last call (failed jobs are
+            sent to on_error).
+        """
+        finished = []
+        for key in [k for k, f in self.pending.items() if f.done()]:
+            future = self.pending.pop(key)
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                if self._on_error is not None:
+                    self._on_error(key, future.exception())
+                continue
+            self.cache[key] = future.result()
+            finished.append(key)
+        self.trim(keep)
+        return finished
+
+    def trim(self, keep=()):
+        """Drop the least recently used results exceeding max_size.
+
+        Parameters
+        ----------
+        keep : list | ()
+            Keys of the results that should not be dropped.
+        """
+        if self.max_size is None:
+            return
+        sizeof = (lambda x: 1) if self._sizeof is None else self._sizeof
+        size = sum([sizeof(k) for k in self.cache.values()])
+        for key in [k for k in self.cache.keys() if k not in keep]:
+            if size <= self.max_size:
+                break
+            size -= sizeof(self.cache.pop(key))
+
+    def get(self, key):
+        """Get a cached result, without waiting for pending jobs.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the result.
+
+        Returns
+        -------
+        result :
+            The result or None if it is not cached.
+        """
+        if key not in self.cache:
+            return None
+        self.cache.move_to_end(key)
+        return self.cache[key]
+
+    def fetch(self, key):
+        """Get a cached result, waiting for it if it is being computed.
+
+        A job that is still queued is cancelled instead of waited for.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the result.
+
+        Returns
+        -------
+        result :
+            The result or None if it is not available (not submitted,
+            cancelled or failed).
+        """
+        self.collect()
+        future = self.pending.get(key, None)
+        if (future is not None) and not future.cancel():
+            wait_futures([future])
+            self.collect()
+        self.pending.pop(key, None)
+        return self.get(key)
+
+    def put(self, key, value):
+        """Cache a result computed outside of the pool.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the result.
+        value :
+            The result.
+        """
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        self.trim([key])
+
+    def wait(self, keys=None):
+        """Wait for pending jobs.
+
+        Parameters
+        ----------
+        keys : list | None
+            Keys of the jobs to wait for. If None, all pending jobs are
+            waited for.
+        """
+        keys = list(self.pending.keys()) if keys is None else keys
+        wait_futures([self.pending[k] for k in keys if k in self.pending])
+
+    def cancel(self, keys=None):
+        """Cancel pending jobs.
+
+        Parameters
+        ----------
+        keys : list | None
+            Keys of the jobs to cancel. If None, all pending jobs are
+            cancelled.
+        """
+        keys = list(self.pending.keys()) if keys is None else keys
+        for key in [k for k in keys if k in self.pending]:
+            self.pending.pop(key).cancel()
+
+    def clear(self):
+        """Cancel pending jobs and empty the cache."""
+        self.cancel()
+        self.cache = OrderedDict()
+
+    def shutdown(self, wait=True):
+        """Cancel pending jobs and shutdown the pool of threads.
+
+        Parameters
+        ----------
+        wait : bool | True
+            Wait for running jobs to finish.
+        """
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -1,10 +1,21 @@
 """Set of tools to filter data."""
+import weakref
+from functools import lru_cache
 
 import numpy as np
-from scipy.signal import butter, filtfilt, lfilter, bessel, welch, detrend
+from scipy.signal import (butter, sosfiltfilt, sosfilt, bessel, detrend,
+                          firwin, upfirdn, get_window)
+from scipy.fft import fft, ifft, rfft, rfftfreq, next_fast_len
 
-__all__ = ('filt', 'morlet', 'ndmorlet', 'morlet_power', 'welch_power',
-           'PrepareData')
+from .background import BackgroundCache
+
+__all__ = ('filt', 'StreamDecimator', 'morlet_bank', 'morlet', 'ndmorlet',
+           'morlet_power', 'welch_power', 'PrepareData')
+
+# Minimum number of FFT points of the Morlet filter bank :
+MORLET_MIN_FFT = 2 ** 15
+# Maximum number of samples of the segments transformed at once by welch :
+WELCH_CHUNK_SIZE = 2 ** 22
 
 #############################################################################
 # FILTERING
@@ -15,6 +26,9 @@ def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
          way='filtfilt', axis=0):
     """Filt data.
 
+    Filters are applied as second-order sections and their design is cached
+    (see _filter_design).
+
     Parameters
     ----------
     sf : float
@@ -41,6 +55,39 @@ def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
     xfilt : array_like
         Filtered data.
     """
+    # scipy requires writable sections :
+    sos = _filter_design(float(sf), tuple(np.ravel(f).astype(float)),
+                         int(order), method, btype).copy()
+
+    # Apply filter :
+    if way == 'filtfilt':
+        return sosfiltfilt(sos, x, axis=axis)
+    elif way == 'lfilter':
+        return sosfilt(sos, x, axis=axis)
+
+
+@lru_cache(maxsize=64)
+def _filter_design(sf, f, order, method, btype):
+    """Get (and cache) the second-order sections of a filter.
+
+    Parameters
+    ----------
+    sf : float
+        The sampling frequency
+    f : tuple
+        Frequency vector (2,)
+    order : int
+        The filter order.
+    method : {'butterworth', 'bessel'}
+        Filter type to use.
+    btype : {'bandpass', 'bandstop', 'highpass', 'lowpass'}
+        The filter type.
+
+    Returns
+    -------
+    sos : array_like
+        Read-only second-order sections of shape (n_sections, 6).
+    """
     # Normalize frequency vector according to btype :
     if btype in ['bandpass', 'bandstop']:
         fnorm = np.divide(f, .5 * sf)
@@ -51,15 +98,144 @@ def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
 
     # Get filter coefficients :
     if method == 'butterworth':
-        b, a = butter(order, fnorm, btype=btype)
+        sos = butter(order, fnorm, btype=btype, output='sos')
     elif method == 'bessel':
-        b, a = bessel(order, fnorm, btype=btype)
+        sos = bessel(order, fnorm, btype=btype, output='sos')
+    sos.setflags(write=False)
+    return sos
+
+#############################################################################
+# DECIMATION
+#############################################################################
+
+
+@lru_cache(maxsize=32)
+def _decimation_filter(q, n_taps):
+    """Get (and cache) the anti-aliasing FIR filter of a decimation.
+
+    Parameters
+    ----------
+    q : int
+        The decimation factor.
+    n_taps : int
+        Number of taps of the filter (odd).
+
+    Returns
+    -------
+    h : array_like
+        Read-only float32 filter coefficients of shape (n_taps,).
+    """
+    h = firwin(n_taps, 1. / q, window='hamming').astype(np.float32)
+    h.setflags(write=False)
+    return h
+
+
+class StreamDecimator(object):
+    """Anti-aliased decimation of a signal streamed chunk by chunk.
+
+    The signal is low-pass filtered with a zero-phase (centered) FIR filter
+    and only one sample over q is computed (polyphase implementation of
+    scipy.signal.upfirdn). The samples needed by the next output are carried
+    over from one chunk to the next so that the result does not depend on
+    the chunk sizes. Outputs are aligned with x[..., ::q].
+
+    Parameters
+    ----------
+    q : int
+        The decimation factor.
+    n_taps : int | None
+        Number of taps of the filter. By default, 20 * q + 1 taps are used
+        (same as scipy.signal.decimate).
+    """
+
+    def __init__(self, q, n_taps=None):
+        """Init."""
+        self.q = int(q)
+        n_taps = 20 * self.q + 1 if n_taps is None else int(n_taps)
+        n_taps += 1 - n_taps % 2  # odd number of taps (centered filter)
+        self.h = _decimation_filter(self.q, n_taps)
+        self._delay = (n_taps - 1) // 2
+        # Number of leading outputs of upfirdn without enough history :
+        self._n_skip = int(np.ceil(2. * self._delay / self.q))
+        self.reset()
+
+    def reset(self, start=0):
+        """Reset the state of the decimator.
+
+        Parameters
+        ----------
+        start : int | 0
+            Index (in decimated samples) of the next output. The next chunk
+            should then start at the original sample `first_sample` (or 0 if
+            negative, the missing samples being replaced by the first one).
+        """
+        self._n_next = int(start)
+        self._pos = self.first_sample
+        self._buf = None
+
+    @property
+    def first_sample(self):
+        """Get the original index of the first sample needed by the stream.
+
+        This is the sample at which the next chunk should start if the
+        decimator has just been reset.
+        """
+        return self._n_next * self.q + self._delay - self._n_skip * self.q
+
+    def stop_sample(self, n):
+        """Get the (excluded) last original sample a decimated one needs.
+
+        Parameters
+        ----------
+        n : int
+            Index of the decimated sample.
+        """
+        return n * self.q + self._delay + 1
+
+    def __call__(self, x, final=False):
+        """Decimate a new chunk of data.
+
+        Parameters
+        ----------
+        x : array_like
+            New chunk of data. The time dimension should be the last one.
+        final : bool | False
+            Specify if this is the last chunk of the signal. In that case,
+            the signal is padded with its last value to compute the last
+            outputs.
+
+        Returns
+        -------
+        y : array_like
+            Decimated samples that could be computed with this new chunk.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if self._buf is None:  # first chunk
+            n_pad = max(-self._pos, 0)
+            if n_pad:  # missing samples before the signal start
+                x = np.concatenate((np.repeat(x[..., [0]], n_pad, -1), x), -1)
+            buf = x
+        else:
+            buf = np.concatenate((self._buf, x), axis=-1)
+        if final:  # missing samples after the signal end
+            n_pad = self._delay
+            buf = np.concatenate((buf, np.repeat(buf[..., [-1]], n_pad, -1)),
+                                 -1)
+        # Number of decimated samples that can be computed :
+        p_end = self._pos + buf.shape[-1]
+        n_out = (p_end - 1 - self._delay) // self.q - self._n_next + 1
+        if n_out <= 0:
+            self._buf = buf
+            return np.zeros(buf.shape[:-1] + (0,), dtype=np.float32)
+        y = upfirdn(self.h, buf, 1, self.q, axis=-1)
+        y = y[..., self._n_skip:self._n_skip + n_out]
+        # Carry over the samples needed by the next outputs :
+        self._n_next += n_out
+        new_pos = self.first_sample
+        self._buf = buf[..., new_pos - self._pos:]
+        self._pos = new_pos
+        return y
 
-    # Apply filter :
-    if way == 'filtfilt':
-        return filtfilt(b, a, x, axis=axis)
-    elif way == 'lfilter':
-        return lfilter(b, a, x, axis=axis)
 
 #############################################################################
 # WAVELET
@@ -94,6 +270,130 @@ def _morlet_wlt(sf, f, width=7.0):
     return wlt
 
 
+@lru_cache(maxsize=4)
+def _morlet_spectra(sf, freqs, width, n_fft, pre, single):
+    """Get (and cache) the spectra of a bank of Morlet's wavelets.
+
+    Each wavelet is centered (circularly shifted) so that the product with
+    the spectrum of a signal gives outputs aligned with the signal. The
+    first sample of a signal is expected at index pre.
+
+    Parameters
+    ----------
+    sf : float
+        Sampling frequency.
+    freqs : tuple
+        Central frequency of each wavelet.
+    width : float
+        Width of the wavelets.
+    n_fft : int
+        Number of FFT points.
+    pre : int
+        Number of samples preceding the signal (zero-padding).
+    single : bool
+        Use single precision (complex64).
+
+    Returns
+    -------
+    spectra : array_like
+        Read-only array of shape (n_freqs, n_fft).
+    """
+    bank = np.zeros((len(freqs), n_fft), dtype=complex)
+    for k, f in enumerate(freqs):
+        wlt = _morlet_wlt(sf, f, width)
+        # Same alignment as the 'full' convolution cropped by morlet :
+        delay = int(np.ceil(len(wlt) / 2)) - 1
+        bank[k, np.arange(-delay, len(wlt) - delay) % n_fft] = wlt
+    # Shift outputs so that the signal starts at index 0 of the output :
+    bank = np.roll(bank, -pre, axis=-1)
+    spectra = fft(bank, axis=-1).astype(np.complex64 if single else complex)
+    spectra.setflags(write=False)
+    return spectra
+
+
+def morlet_bank(x, sf, freqs, width=7.0, get=None, dtype=None,
+                max_memory=2 ** 28):
+    """Complex decomposition of signals using a bank of Morlet's wavelets.
+
+    Signals are split into overlapping segments that are transformed once
+    (overlap-save). Each segment is multiplied by the cached spectra of the
+    wavelets of all frequencies and transformed back, by blocks of
+    frequencies whose size depends on max_memory. The result is the same as
+    the time-domain convolution of morlet.
+
+    Parameters
+    ----------
+    x : array_like
+        Signals of shape (..., n_times) (e.g (n_channels, n_times)).
+    sf : float
+        Sampling frequency.
+    freqs : array_like
+        Central frequencies of the wavelets.
+    width : float | 7.0
+        Width of the wavelets.
+    get : {None, 'amplitude', 'phase', 'power'}
+        Specify if the amplitude, phase or power of the decomposition have
+        to be returned or only the complex decomposition.
+    dtype : dtype | None
+        Floating point precision of outputs (e.g np.float32). By default,
+        outputs are in double precision.
+    max_memory : int | 2 ** 28
+        Approximative memory (in bytes) of the intermediate arrays.
+
+    Returns
+    -------
+    xout : array_like
+        Decomposition of shape (..., n_freqs, n_times).
+    """
+    x = np.asarray(x)
+    freqs = tuple(float(k) for k in np.atleast_1d(freqs))
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    single = dtype == np.float32
+    if not np.issubdtype(dtype, np.floating):
+        dtype, single = np.dtype(np.float64), False
+    ctype = np.complex64 if single else complex
+    shape, n_times = x.shape[:-1], x.shape[-1]
+    x = x.reshape(-1, n_times)
+    # Samples needed before / after each output :
+    lengths = [len(_morlet_wlt(sf, f, width)) for f in freqs]
+    pre = max([m - int(np.ceil(m / 2)) for m in lengths])
+    post = max([int(np.ceil(m / 2)) - 1 for m in lengths])
+    halo = pre + post
+    # Short signals use a single segment :
+    if n_times + halo <= max(4 * halo, MORLET_MIN_FFT):
+        n_fft = 2 ** int(np.ceil(np.log2(n_times + halo)))
+    else:
+        n_fft = next_fast_len(max(4 * halo, MORLET_MIN_FFT))
+    n_seg = n_fft - halo
+    spectra = _morlet_spectra(float(sf), freqs, float(width), n_fft, pre,
+                              single)
+    # Number of frequencies computed at once :
+    item = np.dtype(ctype).itemsize
+    n_block = max(1, int(max_memory // (2 * item * n_fft * x.shape[0])))
+    # Zero-padding of the signals (same as the 'full' convolution) :
+    xpad = np.zeros((x.shape[0], n_times + halo + n_seg),
+                    dtype=np.result_type(x.dtype, dtype))
+    xpad[:, pre:pre + n_times] = x
+    out_type = ctype if get is None else dtype
+    xout = np.zeros((x.shape[0], len(freqs), n_times), dtype=out_type)
+    for start in range(0, n_times, n_seg):
+        stop = min(start + n_seg, n_times)
+        xf = fft(xpad[:, start:start + n_fft], axis=-1, workers=-1)
+        for f in range(0, len(freqs), n_block):
+            sl = slice(f, f + n_block)
+            y = ifft(xf[:, np.newaxis, :] * spectra[sl, :], axis=-1,
+                     workers=-1)
+            y = y[..., :stop - start]
+            if get == 'amplitude':
+                y = np.abs(y)
+            elif get == 'power':
+                y = np.square(y.real) + np.square(y.imag)
+            elif get == 'phase':
+                y = np.angle(y)
+            xout[:, sl, start:stop] = y
+    return xout.reshape(shape + xout.shape[-2:])
+
+
 def morlet(x, sf, f, width=7.0):
     """Complex decomposition of a signal x using the morlet wavelet.
 
@@ -114,14 +414,7 @@ def morlet(x, sf, f, width=7.0):
     xout: array_like
         The complex decomposition of the signal x.
     """
-    # Get the wavelet :
-    m = _morlet_wlt(sf, f, width)
-
-    # Compute morlet :
-    y = np.convolve(x, m)
-    xout = y[int(np.ceil(len(m) / 2)) - 1:int(len(y) - np.floor(len(m) / 2))]
-
-    return xout
+    return morlet_bank(x, sf, [f], width)[0, :]
 
 
 def ndmorlet(x, sf, f, axis=0, get=None, width=7.0):
@@ -148,24 +441,8 @@ def ndmorlet(x, sf, f, axis=0, get=None, width=7.0):
         xout: array, same shape as x
             Complex decomposition of x.
     """
-    # Get the wavelet :
-    m = _morlet_wlt(sf, f, width)
-
-    # Define a morlet function :
-    def morlet_fcn(xt):
-        # Compute morlet :
-        y = np.convolve(xt, m)
-        return y[int(np.ceil(len(m) / 2)) - 1:int(len(y) - np.floor(
-            len(m) / 2))]
-
-    xf = np.apply_along_axis(morlet_fcn, axis, x)
-    # Get amplitude / power / phase :
-    if get == 'amplitude':
-        return np.abs(xf)
-    elif get == 'power':
-        return np.square(np.abs(xf))
-    elif get == 'phase':
-        return np.angle(xf)
+    xf = morlet_bank(np.moveaxis(x, axis, -1), sf, [f], width, get=get)
+    return np.moveaxis(xf[..., 0, :], -1, axis)
 
 
 def morlet_power(x, freqs, sf, norm=True):
@@ -174,7 +451,7 @@ def morlet_power(x, freqs, sf, norm=True):
     Parameters
     ----------
     x : array_like
-        Row vector signal.
+        Row vector signal (or signals of shape (n_channels, npts)).
     freqs : array_like
         Frequency bands for power computation. The power will be computed
         using successive frequency band (e.g freqs=(1., 2, .3)).
@@ -188,30 +465,56 @@ def morlet_power(x, freqs, sf, norm=True):
     -------
     xpow : array_like
         The power in the specified frequency bands of shape
-        (len(freqs)-1, npts).
+        (len(freqs)-1, npts) (or (n_channels, len(freqs)-1, npts)).
     """
     # Build frequency vector :
     f = np.c_[freqs[0:-1], freqs[1::]].mean(1)
-    # Get wavelet transform :
-    xpow = np.zeros((len(f), len(x)), dtype=np.float)
-    for num, k in enumerate(f):
-        xpow[num, :] = np.abs(morlet(x, sf, k))
-    # Compute inplace power :
-    np.power(xpow, 2, out=xpow)
+    # Get wavelet transform power :
+    xpow = morlet_bank(x, sf, f, get='power')
     # Normalize by the band sum :
     if norm:
-        sum_pow = xpow.sum(0).reshape(1, -1)
+        sum_pow = xpow.sum(-2, keepdims=True)
         np.divide(xpow, sum_pow, out=xpow)
     return xpow
 
 
-def welch_power(x, freqs, sf, window_s=10, norm=True):
+def _band_matrix(f, freqs):
+    """Get the matrix averaging a spectrum inside successive bands.
+
+    Parameters
+    ----------
+    f : array_like
+        Frequency vector of the spectrum of shape (n_freqs,).
+    freqs : array_like
+        Frequency bands (e.g freqs=(1., 2, .3)).
+
+    Returns
+    -------
+    bands : array_like
+        Array of shape (n_freqs, n_bands) such as spectrum @ bands is the
+        mean of the spectrum inside each band (NaN for empty bands).
+    """
+    idx = np.abs(np.subtract.outer(np.asarray(freqs, dtype=float),
+                                   f)).argmin(1)
+    fmin, fmax = idx[:-1], idx[1:]
+    inside = (np.arange(len(f))[:, np.newaxis] >= fmin) & (
+        np.arange(len(f))[:, np.newaxis] < fmax)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return inside / inside.sum(0)
+
+
+def welch_power(x, freqs, sf, window_s=10, norm=True, oversample=True):
     """Compute bandwise-normalized power of data using welch power.
 
+    The signal is split into epochs of window_s seconds. The power spectrum
+    of every epoch (Welch's method, segments of 10 seconds with a 50%
+    overlap) is computed at once, using strided windows, and then averaged
+    inside each frequency band.
+
     Parameters
     ----------
     x : array_like
-        Row vector signal.
+        Row vector signal (or signals of shape (n_channels, npts)).
     freqs : array_like
         Frequency bands for power computation. The power will be computed
         using successive frequency band (e.g freqs=(1., 2, .3)).
@@ -222,38 +525,104 @@ def welch_power(x, freqs, sf, window_s=10, norm=True):
     norm : bool | True
         If True, return bandwise normalized band power
         (For each time point, the sum of power in the 4 band equals 1)
+    oversample : bool | True
+        If True, repeat the power of each epoch for each time point.
+        Otherwise, only return the power of each epoch.
 
     Returns
     -------
     xpow : array_like
         The power in the specified frequency bands of shape
-        (len(freqs)-1, npts).
+        (len(freqs)-1, npts) or (len(freqs)-1, n_epochs) if oversample is
+        False (with an additional first dimension for several signals).
     """
+    x = np.asarray(x, dtype=float)
     sf = int(sf)
     freq_spacing = .1
-    n_epoch = max(1, int(len(x) / (window_s * sf)))
-
-    xpow = np.zeros((len(freqs) - 1, n_epoch), dtype=np.float)
-
-    for i in np.arange(0, len(x), window_s * sf):
-        f, pxx_spec = welch(x[int(i):int(i + window_s * sf)], sf,
-                            nperseg=sf * (1. / freq_spacing),
-                            scaling='spectrum')
-        epoch = int(i / (window_s * sf))
-
-        for num, k in enumerate(freqs[:-1]):
-            fmin = np.abs(f - k).argmin()
-            fmax = np.abs(f - freqs[num + 1]).argmin()
-            xpow[num, epoch] = np.mean(pxx_spec[fmin:fmax])
+    shape, n_pts = x.shape[:-1], x.shape[-1]
+    x = x.reshape(-1, n_pts)
+    # Epochs (the last incomplete one is ignored) :
+    n_win = int(window_s * sf)
+    n_epoch = max(1, int(n_pts / n_win))
+    n_win = min(n_win, n_pts)
+    epochs = x[:, :n_epoch * n_win].reshape(-1, n_win)
+    # Welch's segments of each epoch :
+    nperseg = min(int(sf * (1. / freq_spacing)), n_win)
+    step = nperseg - nperseg // 2
+    win = get_window('hann', nperseg)
+    scale = 1. / win.sum() ** 2
+    f = rfftfreq(nperseg, 1. / sf)
+    bands = _band_matrix(f, freqs)
+    # One-sided spectrum :
+    weights = np.full((len(f),), 2. * scale)
+    weights[0] = scale
+    if not nperseg % 2:
+        weights[-1] = scale
+    psd = np.zeros((epochs.shape[0], len(f)))
+    n_chunk = max(1, int(WELCH_CHUNK_SIZE // n_win))
+    for k in range(0, epochs.shape[0], n_chunk):
+        seg = np.lib.stride_tricks.sliding_window_view(
+            epochs[k:k + n_chunk, :], nperseg, axis=-1)[:, ::step, :]
+        seg = (seg - seg.mean(-1, keepdims=True)) * win
+        spec = rfft(seg, axis=-1)
+        pxx = np.square(spec.real) + np.square(spec.imag)
+        psd[k:k + n_chunk, :] = pxx.mean(1) * weights
+    xpow = (psd @ bands).reshape(x.shape[0], n_epoch, -1).swapaxes(1, 2)
 
     # Normalize by the band sum :
     if norm:
-        sum_pow = xpow.sum(0).reshape(1, -1)
+        sum_pow = xpow.sum(1, keepdims=True)
         np.divide(xpow, sum_pow, out=xpow)
 
     # Oversample
-    xpow = np.repeat(xpow, int(window_s * sf), axis=1)
-    return xpow
+    if oversample:
+        n_rep = np.full((n_epoch,), n_win)
+        n_rep[-1] += n_pts - n_epoch * n_win
+        xpow = np.repeat(xpow, n_rep, axis=-1)
+    return xpow.reshape(shape + xpow.shape[1:])
+
+
+def _filter_stage(data, axis, sf, fstart, fend, forder, way, filt_meth,
+                  btype, dispas):
+    """Filter (or decompose using a wavelet) data along an axis."""
+    if dispas == 'filter':
+        return filt(sf, np.array([fstart, fend]), data, btype=btype,
+                    order=forder, way=way, method=filt_meth, axis=axis)
+    else:
+        # Compute ndwavelet :
+        f = np.array([fstart, fend]).mean()
+        return ndmorlet(data, sf, f, axis=axis, get=dispas)
+
+
+def _prepare(data, axis, settings, filtered=False):
+    """Demean, detrend and filter data (see PrepareData._settings)."""
+    demean, detrend_, filt_settings = settings
+    # ============= DEMEAN =============
+    if demean:
+        mean = np.mean(data, axis=axis, keepdims=True)
+        np.subtract(data, mean, out=data)
+
+    # ============= DETREND =============
+    if detrend_:
+        data = detrend(data, axis=axis)
+
+    # ============= FILTERING =============
+    if (filt_settings is not None) and not filtered:
+        data = _filter_stage(data, axis, *filt_settings)
+
+    return data
+
+
+def _nbytes(x):
+    """Get the number of bytes of a filtered channel."""
+    return x.nbytes
+
+
+def _filter_channel(data, row, settings):
+    """Filter a whole channel (float32)."""
+    x = np.asarray(data[row, :], dtype=np.float32)
+    y = _filter_stage(x, -1, *settings)
+    return y.astype(np.complex64 if np.iscomplexobj(y) else np.float32)
 
 
 class PrepareData(object):
@@ -264,11 +633,18 @@ class PrepareData(object):
         - De-trending
         - Filtering
         - Decomposition (filter / amplitude / power / phase)
+
+    With whole=True, prepare_window filters each channel once over the whole
+    recording, in a background thread. Filtered channels are kept in a cache
+    of at most cache_size bytes and windows are then simple slices of them
+    (without edge effects at the window boundaries). Until a channel is
+    ready, only the window is filtered.
     """
 
     def __init__(self, axis=0, demean=False, detrend=False, filt=False,
                  fstart=12., fend=16., forder=3, way='lfilter',
-                 filt_meth='butterworth', btype='bandpass', dispas='filter'):
+                 filt_meth='butterworth', btype='bandpass', dispas='filter',
+                 whole=False, cache_size=2 ** 28):
         """Init."""
         # Axis along which to perform preparation :
         self.axis = axis
@@ -281,34 +657,139 @@ class PrepareData(object):
         self.forder, self.filt_meth = forder, filt_meth
         self.way, self.btype = way, btype
         self.dispas = dispas
+        # Filtering of whole channels :
+        self.whole = whole
+        self._filtered = BackgroundCache(cache_size, sizeof=_nbytes)
+        self._source = None
 
     def __bool__(self):
         """Return if data have to be prepared."""
         return any([self.demean, self.detrend, self.filt])
 
-    def _prepare_data(self, sf, data, time):
+    def _prepare_data(self, sf, data, time, filtered=False):
         """Prepare data before plotting."""
-        # ============= DEMEAN =============
-        if self.demean:
-            mean = np.mean(data, axis=self.axis, keepdims=True)
-            np.subtract(data, mean, out=data)
-
-        # ============= DETREND =============
-        if self.detrend:
-            data = detrend(data, axis=self.axis)
-
-        # ============= FILTERING =============
-        if self.filt:
-            if self.dispas == 'filter':
-                data = filt(sf, np.array([self.fstart, self.fend]), data,
-                            btype=self.btype, order=self.forder, way=self.way,
-                            method=self.filt_meth, axis=self.axis)
-            else:
-                # Compute ndwavelet :
-                f = np.array([self.fstart, self.fend]).mean()
-                data = ndmorlet(data, sf, f, axis=self.axis, get=self.dispas)
-
-        return data
+        return _prepare(data, self.axis, self._settings(sf), filtered)
+
+    def _settings(self, sf):
+        """Get a snapshot of the preparation settings.
+
+        Parameters
+        ----------
+        sf : float
+            The sampling frequency.
+
+        Returns
+        -------
+        settings : tuple
+            Tuple (demean, detrend, filter) where filter is the settings of
+            the filtering stage (None if data are not filtered). It can be
+            sent to another thread while the attributes of the object change.
+        """
+        filt = self._filter_settings(sf) if self.filt else None
+        return (bool(self.demean), bool(self.detrend), filt)
+
+    ###########################################################################
+    # WHOLE CHANNELS
+    ###########################################################################
+    def _filter_settings(self, sf):
+        """Get the settings of the filtering stage."""
+        return (float(sf), self.fstart, self.fend, self.forder, self.way,
+                self.filt_meth, self.btype, self.dispas)
+
+    def prepare_window(self, sf, data, sl, rows=None):
+        """Prepare a window of data.
+
+        Parameters
+        ----------
+        sf : float
+            The sampling frequency.
+        data : array_like
+            Data of shape (n_channels, n_times). It can also be a
+            LazySleepData.
+        sl : slice
+            Time slice of the window.
+        rows : array_like | None
+            Indices of the channels to prepare. If None, all channels are
+            used.
+
+        Returns
+        -------
+        window : array_like
+            Prepared data of shape (n_rows, n_times_window).
+        """
+        rows = np.arange(data.shape[0])[slice(None) if rows is None else rows]
+        rows = np.atleast_1d(rows)
+        channels = None
+        if self.filt and self.whole:
+            channels = self.precompute(sf, data, rows)
+        return self._prepare_rows(data, sl, rows, self._settings(sf),
+                                  channels)
+
+    def _prepare_rows(self, data, sl, rows, settings, channels=None):
+        """Prepare a window using whole filtered channels (if available).
+
+        Unlike prepare_window, this method only uses the settings it
+        receives (see _settings) and does not touch the cache of filtered
+        channels, so it can be called from another thread.
+        """
+        if channels is None:  # filter the window only
+            return _prepare(np.array(data[rows, sl]), self.axis, settings)
+        window = np.stack([k[sl] for k in channels])
+        return _prepare(window, self.axis, settings, filtered=True)
+
+    def precompute(self, sf, data, rows=None, wait_jobs=False):
+        """Filter whole channels in the background.
+
+        Channels are only filtered if all of the requested ones fit in the
+        cache. Otherwise, nothing is submitted and windows keep being
+        filtered on their own.
+
+        Parameters
+        ----------
+        sf : float
+            The sampling frequency.
+        data : array_like
+            Data of shape (n_channels, n_times).
+        rows : array_like | None
+            Indices of the channels to filter. If None, all channels are
+            filtered.
+        wait_jobs : bool | False
+            Wait for the channels to be filtered.
+
+        Returns
+        -------
+        channels : list | None
+            List of filtered channels if they are all available (None
+            otherwise).
+        """
+        rows = np.arange(data.shape[0])[slice(None) if rows is None else rows]
+        rows = np.atleast_1d(rows)
+        if (self._source is None) or (self._source() is not data):
+            self.clear_cache()
+            self._source = weakref.ref(data)
+        settings = self._filter_settings(sf)
+        jobs = self._filtered
+        # Forget jobs of previous settings :
+        jobs.cancel([k for k in jobs.pending if k[0] != settings])
+        # Requested channels that can't be cached together :
+        itemsize = 8 if self.dispas is None else 4  # complex64 / float32
+        if len(rows) * data.shape[1] * itemsize > jobs.max_size:
+            return None
+        keys = [(settings, int(r)) for r in rows]
+        for key in keys:
+            jobs.submit(key, _filter_channel, data, key[1], settings)
+        if wait_jobs:
+            jobs.wait(keys)
+        # Channels of the current request are never removed from the cache :
+        jobs.collect(keep=keys)
+        if not all([k in jobs for k in keys]):
+            return None
+        return [jobs.get(k) for k in keys]
+
+    def clear_cache(self):
+        """Cancel background filtering and empty the cache."""
+        self._filtered.clear()
+        self._source = None
 
     def update(self):
         """Update object."""
@@ -1,4 +1,5 @@
 """Usefull functions for graphical interface managment."""
+from time import perf_counter
 
 from PyQt5 import QtCore
 
@@ -11,7 +12,7 @@ __all__ = ('slider2opacity', 'textline2color', 'color2json',
            'disconnect_all', 'extend_combo_list', 'get_combo_list_index',
            'safely_set_cbox', 'safely_set_spin', 'safely_set_slider',
            'toggle_enable_tab', 'get_screen_size', 'set_widget_size',
-           'fill_pyqt_table')
+           'fill_pyqt_table', 'RedrawScheduler')
 
 
 def slider2opacity(value, thmin=0.0, thmax=100.0, vmin=-5.0, vmax=105.0,
@@ -230,6 +231,65 @@ class MouseEventControl(object):
             return False
 
 
+class RedrawScheduler(object):
+    """Coalesce redraw requests and run at most one redraw per frame.
+
+    Requests received while a redraw is pending are merged with it, so that
+    intermediate states (e.g. slider positions when an arrow key is held)
+    are skipped. A request is executed immediately when the previous redraw
+    ended more than one frame ago, and delayed otherwise.
+
+    Parameters
+    ----------
+    fcn : function
+        The redraw function (called without arguments).
+    fps : float | 60.
+        Maximum number of redraws per second.
+    timer : QtCore.QTimer | None
+        Timer used to delay redraws. If None, a new QTimer is created.
+    """
+
+    def __init__(self, fcn, fps=60., timer=None):
+        """Init."""
+        self._fcn, self._interval = fcn, 1. / fps
+        self._last = -np.inf
+        self._timer = QtCore.QTimer() if timer is None else timer
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.n_requests, self.n_redraws = 0, 0
+
+    @property
+    def pending(self):
+        """Get if a redraw is pending."""
+        return self._timer.isActive()
+
+    def request(self, *args):
+        """Request a redraw (arguments sent by Qt signals are ignored)."""
+        self.n_requests += 1
+        if self.pending:
+            return
+        wait = self._last + self._interval - perf_counter()
+        if wait <= 0.:
+            self.flush()
+        else:
+            self._timer.start(int(np.ceil(1000. * wait)))
+
+    def flush(self):
+        """Run the pending redraw now."""
+        self.cancel()
+        self.n_redraws += 1
+        self._fcn()
+        self.done()
+
+    def cancel(self):
+        """Cancel the pending redraw."""
+        self._timer.stop()
+
+    def done(self):
+        """Notify that a redraw has just been performed."""
+        self._last = perf_counter()
+
+
 def disconnect_all(obj):
     """Disconnect all functions related to an PyQt object.
 
@@ -1,2 +1,7 @@
 from .detection import *
+from .detection_pool import *
+from .features import *
+from .spectro_pool import *
+from .prefetch import *
+from .montage import *
 from .hypnoprocessing import *
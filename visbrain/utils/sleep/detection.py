@@ -11,15 +11,22 @@ Perform:
 - Peak detection
 """
 import numpy as np
-from scipy.signal import hilbert, detrend, welch
+from scipy.signal import hilbert, detrend
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
 
 from ..filtering import filt, morlet, morlet_power
 from ..sigproc import derivative, tkeo, smoothing, normalization
-from .event import (_events_distance_fill, _index_to_events, _events_to_index)
+from .event import IntervalSet
+from .streaming import (ChunkPlan, EventCollector, stream_ptp, stream_welch,
+                        _filter_halo, _morlet_halo, _smoothing_halo)
 
 __all__ = ('kcdetect', 'spindlesdetect', 'remdetect', 'slowwavedetect',
            'mtdetect', 'peakdetect')
 
+# Memory used by the detections for a single sample (in bytes), used to split
+# channels into chunks when a memory budget is given :
+BYTES_PER_SAMPLE = 512
+
 ###########################################################################
 # K-COMPLEX DETECTION
 ###########################################################################
@@ -28,7 +35,7 @@ __all__ = ('kcdetect', 'spindlesdetect', 'remdetect', 'slowwavedetect',
 def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
              kc_min_amp, kc_max_amp, fmin=.5, fmax=4., delta_thr=.75,
              smoothing_s=20, spindles_thresh=2., range_spin_sec=20,
-             min_distance_ms=500.):
+             min_distance_ms=500., max_memory=None, features=None):
     """Perform a K-complex detection.
 
     Parameters
@@ -71,6 +78,15 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
         -range_spin_sec/2 < KC < range_spin_sec/2
     min_distance_ms : float | 500.
         Minimum distance (ms) between two unique K-complexes
+    max_memory : int | None
+        Memory budget of the detection (in bytes). If the channel does not
+        fit, it is processed by overlapping chunks (see
+        visbrain.utils.sleep.streaming). If None, the channel is processed at
+        once.
+    features : ChannelFeatures | None
+        Cache of features of the channel (see
+        visbrain.utils.sleep.features.FeatureCache). Features that are
+        already cached are not computed again.
 
     Returns
     -------
@@ -79,104 +95,110 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
     """
     # Find if hypnogram is loaded :
     hyploaded = True if np.unique(hypno).size > 1 and nrem_only else False
-
-    # PRE DETECTION
-    # Compute delta band power using wavelet
-    freqs = np.array([0.1, 4., 8., 12., 16., 30.])
-    delta_npow = morlet_power(data, freqs, sf, norm=True)[0]
-    delta_nfpow = smoothing(delta_npow, smoothing_s * sf)
-    idx_no_delta = np.where(delta_nfpow < delta_thr)[0]
-    idx_loc_delta = np.where(delta_npow > np.median(delta_npow))[0]
-
-    # MAIN DETECTION
-    # Bandpass filtering
-    sig_filt = filt(sf, np.array([fmin, fmax]), data)
-    # Taiger-Keaser energy operator
-    sig_tkeo = tkeo(sig_filt)
+    n_pts = len(data)
+    feat_kw = dict(sf=sf, fmin=fmin, fmax=fmax, smoothing_s=smoothing_s)
+    halo = max(_morlet_halo(sf, 2.05) + _smoothing_halo(smoothing_s * sf),
+               _filter_halo(sf, [fmin, fmax]) + 2) + _smoothing_halo(sf)
+    plan = ChunkPlan(n_pts, halo, max_memory, BYTES_PER_SAMPLE, features)
+
+    # PRE DETECTION // MAIN DETECTION
+    # Delta band power and Taiger-Keaser energy operator statistics
+    tkeo_stats, delta_stats = plan.stats(), plan.stats()
+    for (_, delta_npow, sig_tkeo), _, core, start in plan.map(
+            _kc_features, data, **feat_kw):
+        tkeo_stats.update(sig_tkeo[core], start)
+        delta_stats.update(delta_npow[core], start)
     # Define hard and soft thresholds
-    hard_thr = np.nanmean(sig_tkeo) + amp_thr * np.nanstd(sig_tkeo)
+    hard_thr = tkeo_stats.mean + amp_thr * tkeo_stats.std
     soft_thr = 0.8 * hard_thr
 
-    with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(sig_tkeo > hard_thr)[0]
-        idx_soft = np.where(sig_tkeo > soft_thr)[0]
+    kc_hard, kc_soft = EventCollector(), EventCollector()
+    for (_, _, sig_tkeo), _, core, start in plan.map(_kc_features, data,
+                                                     **feat_kw):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            kc_hard.add(sig_tkeo[core] > hard_thr, start)
+            kc_soft.add(sig_tkeo[core] > soft_thr, start)
+    kc_hard, kc_soft = kc_hard.events(), kc_soft.events()
 
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
-
-    if idx_hard.size == 0:
+    if not len(kc_hard):
         return np.array([], dtype=int)
 
-    # Initialize K-complexes index vector
-    idx_kc = np.array([], dtype=int)
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
-    # Get where K-complex start / end :
-    idx_start, idx_stop = _events_to_index(idx_hard).T
-
+    kc_hard = kc_hard.fill_gaps(min_distance_ms / 1000. * sf)
     # Find true beginning / end using soft threshold
-    for s in idx_start:
-        d = s - idx_zc_soft
-        soft_beg = d[d > 0].min()
-        soft_end = np.abs(d[d < 0]).min()
-        idx_kc = np.append(idx_kc, np.arange(s - soft_beg, s + soft_end))
+    kc = _soft_threshold_bounds(kc_hard, kc_soft, n_pts)
 
     # Check if spindles are present in range_spin_sec
-    idx_spin = spindlesdetect(data, sf, spindles_thresh, hypno, False)[0]
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    spin_bool = np.array([], dtype=np.bool)
-
-    for idx, val in enumerate(idx_start):
-        step = 0.5 * range_spin_sec * sf
-        is_spin = np.in1d(np.arange(val - step, val + step, 1),
-                          idx_spin, assume_unique=True)
-        spin_bool = np.append(spin_bool, any(is_spin))
-
-    kc_spin = np.where(spin_bool)[0]
-    idx_kc_spin = _index_to_events(np.c_[idx_start, idx_stop][kc_spin])
+    idx_spin = spindlesdetect(data, sf, spindles_thresh, hypno, False,
+                              max_memory=max_memory, features=features)
+    spin = IntervalSet()
+    if idx_spin.size:
+        spin = IntervalSet(idx_spin[:, 0], idx_spin[:, 1] + 1)
+    kc_spin = kc[kc.near(spin, 0.5 * range_spin_sec * sf)]
 
     # Compute probability
-    proba = np.zeros(shape=data.shape)
-    proba[idx_kc] += 0.1
-    proba[idx_no_delta] += 0.1
-    proba[idx_loc_delta] += 0.1
-    proba[idx_kc_spin] += 0.1
-
-    if hyploaded:
-        proba[hypno == -1] += -0.1
-        proba[hypno == 0] += -0.2
-        proba[hypno == 1] += 0
-        proba[hypno == 2] += 0.1
-        proba[hypno == 3] += -0.1
-        proba[hypno == 4] += -0.2
-
-    # Smooth and normalize probability vector
-    proba = proba / 0.5 if hyploaded else proba / 0.4
-    proba = smoothing(proba, sf)
-    # Keep only proba >= proba_thr (user defined threshold)
-    idx_kc = np.intersect1d(idx_kc, np.where(proba >= proba_thr)[0], True)
-
-    if idx_kc.size == 0:
+    delta_median = delta_stats.percentile(50)
+    kc_proba = EventCollector()
+    for (delta_nfpow, delta_npow, _), sl, core, start in plan.map(
+            _kc_features, data, **feat_kw):
+        proba = np.zeros(shape=delta_npow.shape)
+        proba[_chunk_mask(kc, sl)] += 0.1
+        proba[delta_nfpow < delta_thr] += 0.1
+        proba[delta_npow > delta_median] += 0.1
+        proba[_chunk_mask(kc_spin, sl)] += 0.1
+
+        if hyploaded:
+            hyp = np.asarray(hypno[sl])
+            proba[hyp == -1] += -0.1
+            proba[hyp == 0] += -0.2
+            proba[hyp == 1] += 0
+            proba[hyp == 2] += 0.1
+            proba[hyp == 3] += -0.1
+            proba[hyp == 4] += -0.2
+
+        # Smooth and normalize probability vector
+        proba = proba / 0.5 if hyploaded else proba / 0.4
+        proba = smoothing(proba, sf)
+        # Keep only proba >= proba_thr (user defined threshold)
+        kc_proba.add(proba[core] >= proba_thr, start)
+    kc = kc & kc_proba.events()
+
+    if not len(kc):
         return np.array([], dtype=int)
 
     # Morphological criteria
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    duration_ms = (kc.durations - 1) * (1000 / sf)
 
     # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
-    idx_kc = _index_to_events(np.c_[idx_start, idx_stop][good_dur])
+    kc = kc[np.logical_and(duration_ms > tmin, duration_ms < tmax)]
 
     # Remove events with bad amplitude
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    amp = np.zeros(shape=idx_start.size)
-    for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[i] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > kc_min_amp,
-                                       amp < kc_max_amp))[0]
+    amp = stream_ptp(kc, data, plan)
+    kc = kc[np.logical_and(amp > kc_min_amp, amp < kc_max_amp)]
+
+    return kc.to_index()
 
-    return np.c_[idx_start, idx_stop][good_amp]
+
+def _kc_features(x, sf, fmin, fmax, smoothing_s):
+    """Get the delta band power and the TKEO used by kcdetect.
+
+    Returns
+    -------
+    delta_nfpow, delta_npow : array_like
+        Smoothed and raw normalized delta band power.
+    sig_tkeo : array_like
+        TKEO of the filtered signal (with two trailing NaN so that the three
+        outputs have the same length).
+    """
+    # Compute delta band power using wavelet
+    freqs = np.array([0.1, 4., 8., 12., 16., 30.])
+    delta_npow = morlet_power(x, freqs, sf, norm=True)[0]
+    delta_nfpow = smoothing(delta_npow, smoothing_s * sf)
+    # Bandpass filtering
+    sig_filt = filt(sf, np.array([fmin, fmax]), x)
+    # Taiger-Keaser energy operator
+    sig_tkeo = np.r_[tkeo(sig_filt), np.nan, np.nan]
+    return delta_nfpow, delta_npow, sig_tkeo
 
 
 ###########################################################################
@@ -185,7 +207,8 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
 
 def spindlesdetect(data, sf, threshold, hypno, nrem_only, fmin=12., fmax=14.,
                    tmin=300, tmax=3000, method='wavelet', min_distance_ms=300,
-                   sigma_thr=0.2, adapt_band=True, return_full=False):
+                   sigma_thr=0.2, adapt_band=True, return_full=False,
+                   max_memory=None, features=None):
     """Perform a sleep spindles detection.
 
     Parameters
@@ -219,118 +242,153 @@ def spindlesdetect(data, sf, threshold, hypno, nrem_only, fmin=12., fmax=14.,
     return_full : bool | False
         If true, return more variables (start, stop, sigma, hard and soft
         thresh) Used in function write_fig_spindles
+    max_memory : int | None
+        Memory budget of the detection (in bytes). If the channel does not
+        fit, it is processed by overlapping chunks (see
+        visbrain.utils.sleep.streaming). If None, the channel is processed at
+        once. return_full requires the channel to be processed at once and,
+        by chunks, the envelope of the 'hilbert' method is approximated
+        (the Hilbert transform is computed on each chunk).
+    features : ChannelFeatures | None
+        Cache of features of the channel (see
+        visbrain.utils.sleep.features.FeatureCache). Features that are
+        already cached are not computed again.
 
     Returns
     -------
     idx_spindles : array_like
         Indices of detected spindles of shape (n_events, 2)
     """
+    n_pts = len(data)
     # Pre-detection
     if adapt_band:
         # Find peak sigma frequency
-        f, pxx_den = welch(data, sf)
+        f, pxx_den = stream_welch(data, sf, ChunkPlan(n_pts, 0, max_memory,
+                                                      BYTES_PER_SAMPLE))
         mfs = f[pxx_den == pxx_den[np.where((f >= 11) & (f < 16))].max()][0]
         fmin = mfs - 1
         fmax = mfs + 1
 
-    # Compute relative sigma power
-    freqs = np.array([0.5, 4., 8., fmin, fmax])
-    sigma_npow = morlet_power(data, freqs, sf, norm=True)[-1]
-    sigma_nfpow = smoothing(sigma_npow, sf * (tmin / 1000))
-    # Vector of sigma power supra-threshold values
-    idx_sigma = np.where(sigma_nfpow > sigma_thr)[0]
-
-    # Get complex decomposition of filtered data :
-    if method == 'hilbert':
-        # Bandpass filter
-        data_filt = filt(sf, [fmin, fmax], data, order=4)
-        if data.size % 2:
-            analytic = hilbert(data_filt)
-        else:
-            analytic = hilbert(data_filt[:-1], len(data_filt))
-    elif method == 'wavelet':
-        analytic = morlet(data, sf, np.mean([fmin, fmax]))
-
-    # Get envelope
-    amplitude = np.abs(analytic)
-
     # Check "Detect only for NREM sleep"
-    if np.unique(hypno).size > 1 and nrem_only:
-        idx_zero = np.where(np.logical_or(hypno < 1, hypno == 4))[0]
-        amplitude[idx_zero] = np.nan
-        length = max(data.shape) - idx_zero.size
+    nrem = np.unique(hypno).size > 1 and nrem_only
+    if nrem:
+        length = n_pts - np.count_nonzero(np.logical_or(
+            np.asarray(hypno) < 1, np.asarray(hypno) == 4))
     else:
-        length = max(data.shape)
+        length = n_pts
+
+    feat_kw = dict(sf=sf, fmin=fmin, fmax=fmax, tmin=tmin, method=method)
+    halo = max(_morlet_halo(sf, 2.25) + _smoothing_halo(sf * tmin / 1000),
+               _filter_halo(sf, [fmin, fmax], order=4) if method == 'hilbert'
+               else _morlet_halo(sf, np.mean([fmin, fmax])))
+    plan = ChunkPlan(n_pts, halo, max_memory, BYTES_PER_SAMPLE, features)
+    if return_full and not plan.single:
+        raise ValueError("return_full requires the channel to be processed "
+                         "at once (increase max_memory).")
+
+    # Envelope statistics
+    amp_stats = plan.stats()
+    for (_, amplitude), sl, core, start in plan.map(_spindles_features, data,
+                                                    **feat_kw):
+        amplitude = _nan_stages(amplitude[core], hypno, sl, core, nrem, 0,
+                                -1, 4)
+        amp_stats.update(amplitude, start)
 
     # Define hard and soft thresholds
-    hard_thr = np.nanmean(amplitude) + threshold * np.nanstd(amplitude)
+    hard_thr = amp_stats.mean + threshold * amp_stats.std
     soft_thr = 0.5 * hard_thr
 
-    with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(amplitude > hard_thr)[0]
-        idx_soft = np.where(amplitude > soft_thr)[0]
+    sigma, sp_hard, sp_soft = (EventCollector(), EventCollector(),
+                               EventCollector())
+    for (sigma_nfpow, amplitude), sl, core, start in plan.map(
+            _spindles_features, data, **feat_kw):
+        amplitude = _nan_stages(amplitude[core], hypno, sl, core, nrem, 0,
+                                -1, 4)
+        # Periods of sigma power supra-threshold values
+        sigma.add(sigma_nfpow[core] > sigma_thr, start)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sp_hard.add(amplitude > hard_thr, start)
+            sp_soft.add(amplitude > soft_thr, start)
+    sigma, sp_hard, sp_soft = (sigma.events(), sp_hard.events(),
+                               sp_soft.events())
+
+    if not len(sp_hard):
+        return np.array([], dtype=int)
 
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
+    # Keep only period with high relative sigma power
+    sp_hard = sp_hard & sigma
 
-    if idx_hard.size > 0:
-        # Initialize spindles vector
-        idx_spindles = np.array([], dtype=int)
+    # Fill gap between events separated by less than min_distance_ms
+    min_distance = min_distance_ms / 1000. * sf
+    sp_hard = sp_hard.fill_gaps(min_distance)
+
+    # Find true beginning / end using soft threshold
+    spindles = _soft_threshold_bounds(sp_hard, sp_soft, n_pts)
 
-        # Keep only period with high relative sigma power
-        idx_hard = np.intersect1d(idx_hard, idx_sigma, True)
+    # Fill gap between events separated by less than min_distance_ms
+    spindles = spindles.fill_gaps(min_distance)
 
-        # Fill gap between events separated by less than min_distance_ms
-        idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
+    if not len(spindles):
+        return np.array([], dtype=int)
 
-        # Get where spindles start / end :
-        idx_start, idx_stop = _events_to_index(idx_hard).T
+    # Remove events with bad duration
+    duration_ms = (spindles.durations - 1) * (1000 / sf)
+    good_dur = np.logical_and(duration_ms > tmin, duration_ms < tmax)
+
+    if return_full:
+        # The channel is processed at once, hence sigma_nfpow and amplitude
+        # cover the whole channel
+        # Compute number, duration, density
+        idx_start, idx_stop = spindles[good_dur].to_index().T
+        number = idx_start.size
+        duration_ms = (idx_stop - idx_start) * (1000 / sf)
+        density = number / (length / sf / 60.)
+
+        # Compute mean power of each spindles
+        pwrs = np.zeros(shape=number)
+        for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
+            ind_pwr = morlet_power(data[start:stop], [fmin, fmax], sf,
+                                   norm=False)[0]
+            pwrs[i] = np.mean(ind_pwr)
+        # Normalize by dividing by the mean
+        normalization(pwrs, norm=2)
+
+        return (spindles.indices(), number, density, duration_ms, pwrs,
+                idx_start, idx_stop, hard_thr, soft_thr, sigma.indices(),
+                fmin, fmax, sigma_nfpow, amplitude, sigma_thr)
+    else:
+        return spindles[good_dur].to_index()
 
-        # Find true beginning / end using soft threshold
-        for s in idx_start:
-            d = s - idx_zc_soft
-            # Find distance to nearest soft threshold crossing before start
-            soft_beg = d[d > 0].min()
-            # Find distance to nearest soft threshold crossing after end
-            soft_end = np.abs(d[d < 0]).min()
-            idx_spindles = np.append(idx_spindles, np.arange(
-                                     s - soft_beg, s + soft_end))
 
-        # Fill gap between events separated by less than min_distance_ms
-        idx_spindles = _events_distance_fill(idx_spindles, min_distance_ms, sf)
+def _spindles_features(x, sf, fmin, fmax, tmin, method):
+    """Get the sigma band power and the envelope used by spindlesdetect.
 
-        # Get duration
-        idx_start, idx_stop = _events_to_index(idx_spindles).T
-        duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    Returns
+    -------
+    sigma_nfpow : array_like
+        Smoothed relative sigma power.
+    amplitude : array_like
+        Envelope of the signal in the sigma band.
+    """
+    # Compute relative sigma power
+    freqs = np.array([0.5, 4., 8., fmin, fmax])
+    sigma_npow = morlet_power(x, freqs, sf, norm=True)[-1]
+    sigma_nfpow = smoothing(sigma_npow, sf * (tmin / 1000))
 
-        # Remove events with bad duration
-        good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                           duration_ms < tmax))[0]
-
-        if idx_spindles.size == 0:
-            return np.array([], dtype=int)
-
-        if return_full:
-            # Compute number, duration, density
-            idx_start, idx_stop = np.c_[idx_start, idx_stop][good_dur].T
-            number = idx_start.size
-            duration_ms = (idx_stop - idx_start) * (1000 / sf)
-            density = number / (length / sf / 60.)
-
-            # Compute mean power of each spindles
-            pwrs = np.zeros(shape=number)
-            for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-                ind_pwr = morlet_power(data[start:stop], [fmin, fmax], sf,
-                                       norm=False)[0]
-                pwrs[i] = np.mean(ind_pwr)
-            # Normalize by dividing by the mean
-            normalization(pwrs, norm=2)
-
-            return (idx_spindles, number, density, duration_ms, pwrs,
-                    idx_start, idx_stop, hard_thr, soft_thr, idx_sigma,
-                    fmin, fmax, sigma_nfpow, amplitude, sigma_thr)
+    # Get complex decomposition of filtered data :
+    if method == 'hilbert':
+        # Bandpass filter
+        data_filt = filt(sf, [fmin, fmax], x, order=4)
+        if x.size % 2:
+            analytic = hilbert(data_filt)
         else:
-            return np.c_[idx_start, idx_stop][good_dur]
+            analytic = hilbert(data_filt[:-1], len(data_filt))
+    elif method == 'wavelet':
+        analytic = morlet(x, sf, np.mean([fmin, fmax]))
+
+    # Get envelope
+    amplitude = np.abs(analytic)
+    return sigma_nfpow, amplitude
 
 
 ###########################################################################
@@ -339,7 +397,8 @@ def spindlesdetect(data, sf, threshold, hypno, nrem_only, fmin=12., fmax=14.,
 
 
 def remdetect(data, sf, hypno, rem_only, threshold, tmin=300, tmax=800,
-              min_distance_ms=300, smoothing_ms=200, deriv_ms=50):
+              min_distance_ms=300, smoothing_ms=200, deriv_ms=50,
+              max_memory=None, features=None):
     """Perform a rapid eye movement (REM) detection.
 
     Function to perform a semi-automatic detection of rapid eye movements
@@ -370,75 +429,101 @@ def remdetect(data, sf, hypno, rem_only, threshold, tmin=300, tmax=800,
         Time (ms) window of the smoothing.
     deriv_ms : int | 50
         Time (ms) window of derivative computation
+    max_memory : int | None
+        Memory budget of the detection (in bytes). If the channel does not
+        fit, it is processed by overlapping chunks (see
+        visbrain.utils.sleep.streaming). If None, the channel is processed at
+        once.
+    features : ChannelFeatures | None
+        Cache of features of the channel (see
+        visbrain.utils.sleep.features.FeatureCache). Features that are
+        already cached are not computed again.
 
     Returns
     -------
     idx_rem: array_like
         Indices of detected REMs of shape (n_events, 2)
     """
-    # Compute relative beta power
-    freqs = np.array([0.5, 4., 8., 12, 40])
-    beta_npow = morlet_power(data, freqs, sf, norm=True)[-1]
-    beta_nfpow = smoothing(beta_npow, sf * (tmin / 1000))
-    # Vector of beta power supra-threshold values
-    idx_beta = np.where(beta_nfpow < np.percentile(beta_nfpow, 60))[0]
-
-    # Compute smoothed derivative
-    sm_sig = smoothing(data, sf * (smoothing_ms / 1000))
-    deriv = derivative(sm_sig, deriv_ms, sf)
-    deriv = smoothing(deriv, sf * (smoothing_ms / 1000))
-
-    if rem_only and 4 in hypno:
-        idx_zero = np.where(hypno < 4)[0]
-        deriv[idx_zero] = np.nan
+    n_pts = len(data)
+    rem_only = rem_only and 4 in hypno
+    feat_kw = dict(sf=sf, tmin=tmin, smoothing_ms=smoothing_ms,
+                   deriv_ms=deriv_ms)
+    n_smooth = sf * (smoothing_ms / 1000)
+    halo = max(_morlet_halo(sf, 2.25) + _smoothing_halo(sf * tmin / 1000),
+               2 * _smoothing_halo(n_smooth) + int(deriv_ms * sf / 1000))
+    plan = ChunkPlan(n_pts, halo, max_memory, BYTES_PER_SAMPLE, features)
+
+    # Relative beta power and derivative statistics
+    beta_stats, deriv_stats = plan.stats(), plan.stats()
+    for (beta_nfpow, deriv), sl, core, start in plan.map(
+            _rem_features, data, **feat_kw):
+        deriv = _nan_stages(deriv[core], hypno, sl, core, rem_only, -1, 0, 1,
+                            2, 3)
+        beta_stats.update(beta_nfpow[core], start)
+        deriv_stats.update(deriv, start)
 
     # Define hard and soft thresholds
-    hard_thr = np.nanmean(deriv) + threshold * np.nanstd(deriv)
+    hard_thr = deriv_stats.mean + threshold * deriv_stats.std
     soft_thr = 0.5 * hard_thr
-
-    with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(deriv > hard_thr)[0]
-        idx_soft = np.where(deriv > soft_thr)[0]
-
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
-
-    if idx_hard.size == 0:
+    beta_thr = beta_stats.percentile(60)
+
+    beta, rem_hard, rem_soft = (EventCollector(), EventCollector(),
+                                EventCollector())
+    for (beta_nfpow, deriv), sl, core, start in plan.map(
+            _rem_features, data, **feat_kw):
+        deriv = _nan_stages(deriv[core], hypno, sl, core, rem_only, -1, 0, 1,
+                            2, 3)
+        # Periods of beta power infra-threshold values
+        beta.add(beta_nfpow[core] < beta_thr, start)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rem_hard.add(deriv > hard_thr, start)
+            rem_soft.add(deriv > soft_thr, start)
+    beta, rem_hard, rem_soft = (beta.events(), rem_hard.events(),
+                                rem_soft.events())
+
+    if not len(rem_hard):
         return np.array([], dtype=int)
 
-    # Initialize rem vector
-    idx_rem = np.array([], dtype=int)
-
     # Keep only period with low relative beta power (i.e. remove artefact)
-    idx_hard = np.intersect1d(idx_hard, idx_beta, True)
+    rem_hard = rem_hard & beta
 
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
-
-    # Get where spindles start / end :
-    idx_start, idx_stop = _events_to_index(idx_hard).T
+    min_distance = min_distance_ms / 1000. * sf
+    rem_hard = rem_hard.fill_gaps(min_distance)
 
     # Find true beginning / end using soft threshold
-    for s in idx_start:
-        d = s - idx_zc_soft
-        # Find distance to nearest soft threshold crossing before start
-        soft_beg = d[d > 0].min()
-        # Find distance to nearest soft threshold crossing after end
-        soft_end = np.abs(d[d < 0]).min()
-        idx_rem = np.append(idx_rem, np.arange(s - soft_beg, s + soft_end))
+    rem = _soft_threshold_bounds(rem_hard, rem_soft, n_pts)
 
     # Fill gap between events separated by less than min_distance_ms
-    idx_rem = _events_distance_fill(idx_rem, min_distance_ms, sf)
-
-    # Get duration
-    idx_start, idx_stop = _events_to_index(idx_rem).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    rem = rem.fill_gaps(min_distance)
 
     # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
+    duration_ms = (rem.durations - 1) * (1000 / sf)
+    good_dur = np.logical_and(duration_ms > tmin, duration_ms < tmax)
+
+    return rem[good_dur].to_index()
 
-    return np.c_[idx_start, idx_stop][good_dur]
+
+def _rem_features(x, sf, tmin, smoothing_ms, deriv_ms):
+    """Get the beta band power and the derivative used by remdetect.
+
+    Returns
+    -------
+    beta_nfpow : array_like
+        Smoothed relative beta power.
+    deriv : array_like
+        Smoothed derivative of the smoothed signal.
+    """
+    # Compute relative beta power
+    freqs = np.array([0.5, 4., 8., 12, 40])
+    beta_npow = morlet_power(x, freqs, sf, norm=True)[-1]
+    beta_nfpow = smoothing(beta_npow, sf * (tmin / 1000))
+
+    # Compute smoothed derivative
+    sm_sig = smoothing(x, sf * (smoothing_ms / 1000))
+    deriv = derivative(sm_sig, deriv_ms, sf)
+    deriv = smoothing(deriv, sf * (smoothing_ms / 1000))
+    return beta_nfpow, deriv
 
 
 ###########################################################################
@@ -447,7 +532,8 @@ def remdetect(data, sf, hypno, rem_only, threshold, tmin=300, tmax=800,
 
 
 def slowwavedetect(data, sf, threshold, min_amp=70., max_amp=400., tmin=1000.,
-                   fmin=.5, fmax=4., smoothing_s=20):
+                   fmin=.5, fmax=4., smoothing_s=20, max_memory=None,
+                   features=None):
     """Perform a Slow Wave detection.
 
     Parameters
@@ -472,6 +558,15 @@ def slowwavedetect(data, sf, threshold, min_amp=70., max_amp=400., tmin=1000.,
         Low-pass frequency
     smoothing_s  : int | 20
         Smoothing window in seconds
+    max_memory : int | None
+        Memory budget of the detection (in bytes). If the channel does not
+        fit, it is processed by overlapping chunks (see
+        visbrain.utils.sleep.streaming). If None, the channel is processed at
+        once.
+    features : ChannelFeatures | None
+        Cache of features of the channel (see
+        visbrain.utils.sleep.features.FeatureCache). Features that are
+        already cached are not computed again.
 
     Returns
     -------
@@ -479,36 +574,39 @@ def slowwavedetect(data, sf, threshold, min_amp=70., max_amp=400., tmin=1000.,
         Indices of slow waves of shape (n_events, 2)
     """
     filt_fmax = np.minimum(45, sf / 2.0 - 0.75)  # protect Nyquist
-    data_filt = filt(sf, [.1, filt_fmax], data)
+    halo = _filter_halo(sf, [.1, filt_fmax]) + _morlet_halo(
+        sf, np.mean([fmin, fmax])) + _smoothing_halo(smoothing_s * sf)
+    plan = ChunkPlan(len(data), halo, max_memory, BYTES_PER_SAMPLE,
+                     features)
+
+    sw = EventCollector()
+    for delta_nfpow, _, core, start in plan.map(
+            _sw_features, data, sf=sf, fmin=fmin, fmax=fmax,
+            filt_fmax=filt_fmax, smoothing_s=smoothing_s):
+        # Normalized power criteria
+        sw.add(delta_nfpow[core] > threshold, start)
+    sw = sw.events()
 
-    # Compute relative delta band-power
-    delta_nfpow = morlet_power(data_filt, [fmin, fmax, 8, 12, 16, 30], sf,
-                               norm=True)[0, :]
-    delta_nfpow = smoothing(delta_nfpow, smoothing_s * sf)
-
-    # Normalized power criteria
-    idx_sw = np.where(delta_nfpow > threshold)[0]
+    # Check amplitude and duration
+    duration_ms = (sw.durations - 1) * (1000 / sf)
+    amp = stream_ptp(sw, data, plan)
+    good_amp = np.logical_and(amp > min_amp, amp < max_amp)
+    sw = sw[np.logical_and(good_amp, duration_ms > tmin)]
 
-    if idx_sw.size == 0:
+    if not len(sw):
         return np.array([], dtype=int)
 
-    # Get where slow waves start / end :
-    idx_start, idx_stop = _events_to_index(idx_sw).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    return sw.to_index()
 
-    # Check amplitude and duration
-    amp = np.zeros(shape=idx_start.shape)
-    for idx, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[idx] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > min_amp, amp < max_amp))[0]
-    good_dur = np.where(duration_ms > tmin)[0]
-    good_event = np.intersect1d(good_amp, good_dur, True)
-    idx_sw = np.c_[idx_start, idx_stop][good_event]
-
-    if idx_sw.size == 0:
-        return np.array([], dtype=int)
 
-    return idx_sw
+def _sw_features(x, sf, fmin, fmax, filt_fmax, smoothing_s):
+    """Get the smoothed relative delta power used by slowwavedetect."""
+    data_filt = filt(sf, [.1, filt_fmax], x)
+
+    # Compute relative delta band-power
+    delta_nfpow = morlet_power(data_filt, [fmin, fmax, 8, 12, 16, 30], sf,
+                               norm=True)[0, :]
+    return smoothing(delta_nfpow, smoothing_s * sf)
 
 
 ###########################################################################
@@ -518,7 +616,7 @@ def slowwavedetect(data, sf, threshold, min_amp=70., max_amp=400., tmin=1000.,
 
 def mtdetect(data, sf, threshold, hypno, rem_only, fmin=0., fmax=50.,
              tmin=800, tmax=2500, min_distance_ms=1000, min_amp=50,
-             max_amp=400):
+             max_amp=400, max_memory=None, features=None):
     """Perform a detection of muscle twitches (MT).
 
     Sampling frequency must be at least 1000 Hz.
@@ -553,63 +651,174 @@ def mtdetect(data, sf, threshold, hypno, rem_only, fmin=0., fmax=50.,
     max_amp : int | 400
         Maximum amplitude of Muscle Twitches. Above this threshold,
         detected events are probably artefacts
+    max_memory : int | None
+        Memory budget of the detection (in bytes). If the channel does not
+        fit, it is processed by overlapping chunks (see
+        visbrain.utils.sleep.streaming). If None, the channel is processed at
+        once.
+    features : ChannelFeatures | None
+        Cache of features of the channel (see
+        visbrain.utils.sleep.features.FeatureCache). Features that are
+        already cached are not computed again.
 
     Returns
     -------
     idx_mt : array_like
         Indices of MTs of shape (n_events, 2)
     """
-    # PRE DETECTION
-    # Morlet envelope
-    analytic = morlet(data, sf, np.mean([fmin, fmax]))
-    amplitude = np.abs(analytic)
-    amplitude = smoothing(amplitude, sf * (tmin / 1000))
-    # Morlet power in delta band
-    delta_nfpow = morlet_power(data, [0.5, 4], sf, norm=False)
-    idx_high_delta = np.where(delta_nfpow > np.percentile(delta_nfpow, 75))[0]
+    rem_only = rem_only and 4 in hypno
+    feat_kw = dict(sf=sf, fmin=fmin, fmax=fmax, tmin=tmin)
+    halo = max(_morlet_halo(sf, np.mean([fmin, fmax])) + _smoothing_halo(
+        sf * tmin / 1000), _morlet_halo(sf, 2.25))
+    plan = ChunkPlan(len(data), halo, max_memory, BYTES_PER_SAMPLE,
+                     features)
 
-    if rem_only and 4 in hypno:
-        idx_zero = np.where(hypno < 4)[0]
-        amplitude[idx_zero] = np.nan
+    # PRE DETECTION
+    # Envelope and delta power statistics
+    amp_stats, delta_stats = plan.stats(), plan.stats()
+    for (amplitude, delta_nfpow), sl, core, start in plan.map(
+            _mt_features, data, **feat_kw):
+        amplitude = _nan_stages(amplitude[core], hypno, sl, core, rem_only,
+                                -1, 0, 1, 2, 3)
+        amp_stats.update(amplitude, start)
+        delta_stats.update(delta_nfpow[core], start)
 
     # Define hard threshold
-    hard_thr = np.nanmean(amplitude) + threshold * np.nanstd(amplitude)
-
-    with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(amplitude > hard_thr)[0]
-
-    if idx_hard.size == 0:
+    hard_thr = amp_stats.mean + threshold * amp_stats.std
+    delta_thr = delta_stats.percentile(75)
+
+    high_delta, mt = EventCollector(), EventCollector()
+    for (amplitude, delta_nfpow), sl, core, start in plan.map(
+            _mt_features, data, **feat_kw):
+        amplitude = _nan_stages(amplitude[core], hypno, sl, core, rem_only,
+                                -1, 0, 1, 2, 3)
+        high_delta.add(delta_nfpow[core] > delta_thr, start)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mt.add(amplitude > hard_thr, start)
+    high_delta, mt = high_delta.events(), mt.events()
+
+    if not len(mt):
         return np.array([], dtype=int)
 
     # Keep only MT in period with low relative delta power
-    idx_hard = np.setdiff1d(idx_hard, idx_high_delta, True)
+    mt = mt - high_delta
 
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
+    mt = mt.fill_gaps(min_distance_ms / 1000. * sf)
 
     # MORPHOLOGICAL CRITERIA
-    idx_start, idx_stop = _events_to_index(idx_hard).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    duration_ms = (mt.durations - 1) * (1000 / sf)
 
     # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
-    idx_mt = _index_to_events(np.c_[idx_start, idx_stop][good_dur])
+    mt = mt[np.logical_and(duration_ms > tmin, duration_ms < tmax)]
 
     # Remove events with bad amplitude
-    idx_start, idx_stop = _events_to_index(idx_mt).T
-    amp = np.zeros(shape=idx_start.size)
-    for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[i] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > min_amp,
-                                       amp < max_amp))[0]
-    idx_mt = np.c_[idx_start, idx_stop][good_amp]
-
-    # Compute number, duration, density
-    if idx_mt.size == 0:
+    amp = stream_ptp(mt, data, plan)
+    mt = mt[np.logical_and(amp > min_amp, amp < max_amp)]
+
+    if not len(mt):
         return np.array([], dtype=int)
 
-    return idx_mt
+    return mt.to_index()
+
+
+def _mt_features(x, sf, fmin, fmax, tmin):
+    """Get the envelope and the delta power used by mtdetect.
+
+    Returns
+    -------
+    amplitude : array_like
+        Smoothed envelope of the signal.
+    delta_nfpow : array_like
+        Delta band power.
+    """
+    # Morlet envelope
+    analytic = morlet(x, sf, np.mean([fmin, fmax]))
+    amplitude = np.abs(analytic)
+    amplitude = smoothing(amplitude, sf * (tmin / 1000))
+    # Morlet power in delta band
+    delta_nfpow = morlet_power(x, [0.5, 4], sf, norm=False)[0, :]
+    return amplitude, delta_nfpow
+
+
+def _nan_stages(x, hypno, sl, core, apply, *stages):
+    """Replace values of a chunk by NaN during some sleep stages.
+
+    Parameters
+    ----------
+    x : array_like
+        Values of the core of the chunk.
+    hypno : array_like
+        Hypnogram of the whole channel.
+    sl, core : slice
+        Chunk bounds (see ChunkPlan).
+    apply : bool
+        If False, x is returned unchanged.
+    stages : int
+        Sleep stages to ignore.
+
+    Returns
+    -------
+    x : array_like
+        A copy of x with NaN during ignored stages (or x if apply is False).
+    """
+    if not apply:
+        return x
+    hyp = np.asarray(hypno[sl])[core]
+    return np.where(np.isin(hyp, stages), np.nan, x)
+
+
+def _chunk_mask(events, sl):
+    """Get a boolean vector of a chunk, True inside events.
+
+    Parameters
+    ----------
+    events : IntervalSet
+        Events of the whole channel.
+    sl : slice
+        Samples of the chunk.
+
+    Returns
+    -------
+    mask : array_like
+        Boolean vector of shape (sl.stop - sl.start,).
+    """
+    return IntervalSet(events.starts - sl.start,
+                       events.stops - sl.start).to_mask(sl.stop - sl.start)
+
+
+def _soft_threshold_bounds(events, soft, n_pts):
+    """Extend events up to the nearest soft threshold crossings.
+
+    Each event becomes the interval between the last soft threshold crossing
+    before its start and the first one after its start (excluded).
+
+    Parameters
+    ----------
+    events : IntervalSet
+        Supra-threshold events (hard threshold).
+    soft : IntervalSet
+        Supra-threshold events (soft threshold).
+    n_pts : int
+        Number of time points.
+
+    Returns
+    -------
+    events : IntervalSet
+        The extended events.
+    """
+    # Crossings are the first and last samples of soft events :
+    cross = soft.to_index().ravel()
+    if not cross.size:
+        return IntervalSet(np.zeros_like(events.starts),
+                           np.full_like(events.starts, n_pts))
+    before = np.searchsorted(cross, events.starts, side='left') - 1
+    after = np.searchsorted(cross, events.starts, side='right')
+    beg = np.where(before >= 0, cross[np.maximum(before, 0)], 0)
+    end = np.where(after < cross.size, cross[np.minimum(after,
+                                                        cross.size - 1)],
+                   n_pts)
+    return IntervalSet(beg, end)
 
 
 ###########################################################################
@@ -636,7 +845,9 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
     sf : float
         The sampling frequency.
     y_axis : array_like
-        Row vector containing the data.
+        Row vector containing the data. Can also be an array of shape
+        (n_channels, n_pts) in which case each channel is processed
+        independently.
     x_axis : array_like
         Row vector for the time axis. If omitted an index of the y_axis is
         used.
@@ -651,8 +862,6 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         to hinder the function from picking up false peaks towards to end
         of the signal. To work well delta should be set to
         delta >= RMSnoise * 5.
-        When omitted delta function causes a 20% decrease in speed.
-        When used Correctly it can double the speed of the function
     get : string | 'max'
         Get either minimum values ('min'), maximum ('max') or min and max
         ('minmax').
@@ -664,22 +873,22 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
     Returns
     -------
     index : array_like
-        A vector containing peak indices of shape (n_events, 2)
+        A vector containing peak indices of shape (n_events, 2). If y_axis
+        is a 2D array, a list of indices (one per channel) is returned.
     """
     # ============== CHECK DATA ==============
+    # Needs to be a numpy array
+    y_axis = np.asarray(y_axis)
+    length = y_axis.shape[-1]
     if x_axis is None:
-        x_axis = range(len(y_axis))
+        x_axis = range(length)
     # Check length :
-    if len(y_axis) != len(x_axis):
+    if length != len(x_axis):
         raise ValueError("Input vectors y_axis and x_axis must have same "
                          "length")
-    # Needs to be a numpy array
-    y_axis, x_axis = np.asarray(y_axis), np.asarray(x_axis)
-
-    # store data length for later use
-    length = len(y_axis)
 
     # Lookahead  & delta checking :
+    lookahead = int(lookahead)
     if lookahead < 1:
         raise ValueError("Lookahead must be '1' or above in value")
     if not (np.isscalar(delta) and delta >= 0):
@@ -690,83 +899,182 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         raise ValueError("The get parameter must either be 'min', 'max' or"
                          " 'minmax'")
 
-    # ============== PRE-ALLOCATION ==============
-    max_peaks, min_peaks = [], []
-    dump = []   # Used to pop the first hit which almost always is false
-
-    # maxima and minima candidates are temporarily stored in
-    # mx and mn respectively
-    mn, mx = np.Inf, -np.Inf
+    # ============== LOOKAHEAD EXTREMA ==============
+    # Maximum and minimum of y_axis[..., i:i + lookahead] for every i :
+    is_2d = y_axis.ndim == 2
+    y_2d = np.atleast_2d(y_axis)
+    if not np.issubdtype(y_2d.dtype, np.floating):
+        y_2d = y_2d.astype(float)
+    kw = dict(size=lookahead, axis=-1, mode='constant',
+              origin=-(lookahead // 2))
+    ahead_max = maximum_filter1d(y_2d, cval=-np.inf, **kw)
+    ahead_min = minimum_filter1d(y_2d, cval=np.inf, **kw)
 
     # ============== THRESHOLD ==============
     if threshold is not None:
-        if threshold is 'auto':
-            threshold = np.std(y_axis)
+        if isinstance(threshold, str) and (threshold == 'auto'):
+            threshold = np.std(y_2d, axis=-1)
+        threshold = np.broadcast_to(threshold, (y_2d.shape[0],))
         # Detrend / demean y-axis :
-        y_axisp = detrend(y_axis)
-        y_axisp -= y_axisp.mean()
+        y_axisp = detrend(y_2d, axis=-1)
+        y_axisp -= y_axisp.mean(axis=-1, keepdims=True)
         # Find values above threshold :
-        above = np.abs(y_axisp) >= threshold
-        zp = zip(np.arange(length)[above], x_axis[above], y_axis[above])
+        above = np.abs(y_axisp) >= threshold[:, np.newaxis]
     else:
-        zp = zip(np.arange(length)[:-lookahead], x_axis[:-lookahead],
-                 y_axis[:-lookahead])
+        # Only detect peak if there is 'lookahead' amount of points after it
+        above = np.zeros(y_2d.shape, dtype=bool)
+        above[:, :-lookahead] = True
 
     # ============== FIND MIN / MAX PEAKS ==============
-    # Only detect peak if there is 'lookahead' amount of points after it
-    for index, x, y in zp:
-        if y > mx:
-            mx = y
-        if y < mn:
-            mn = y
-
-        # ==== Look for max ====
-        if y < mx - delta and mx != np.Inf:
-            # Maxima peak candidate found
-            # look ahead in signal to ensure that this is a peak and not jitter
-            if y_axis[index:index + lookahead].max() < mx:
-                max_peaks.append(index)
-                dump.append(True)
-                # set algorithm to only find minima now
-                mx = np.Inf
-                mn = np.Inf
-                if index + lookahead >= length:
-                    # end is within lookahead no more peaks can be found
-                    break
-                continue
-
-        # ==== Look for max ====
-        if y > mn + delta and mn != -np.Inf:
-            # Minima peak candidate found
-            # look ahead in signal to ensure that this is a peak and not jitter
-            if y_axis[index:index + lookahead].min() > mn:
-                min_peaks.append(index)
-                dump.append(False)
-                # set algorithm to only find maxima now
-                mn = -np.Inf
-                mx = -np.Inf
-                if index + lookahead >= length:
-                    # end is within lookahead no more peaks can be found
-                    break
-
-    if min_peaks and max_peaks:
-        # ============== CLEAN ==============
-        # Remove the false hit on the first value of the y_axis
-        if threshold is None:
-            if dump[0]:
-                max_peaks.pop(0)
-            else:
-                min_peaks.pop(0)
-            del dump
-
-        # ============== MIN / MAX / MINMAX ==============
-        if get == 'max':
-            index = np.array(max_peaks)
-        elif get == 'min':
-            index = np.array(min_peaks)
-        elif get == 'minmax':
-            index = np.vstack((min_peaks, max_peaks))
-
-        return np.c_[index, index]
-    else:
-        return np.array([])
+    index = []
+    for y, a_max, a_min, ab in zip(y_2d, ahead_max, ahead_min, above):
+        pos = np.flatnonzero(ab)
+        min_peaks, max_peaks, first_max = _peakdetect_pos(
+            pos, y[pos], a_max[pos], a_min[pos], length, lookahead, delta)
+
+        if min_peaks.size and max_peaks.size:
+            # ============== CLEAN ==============
+            # Remove the false hit on the first value of the y_axis
+            if threshold is None:
+                if first_max:
+                    max_peaks = max_peaks[1:]
+                else:
+                    min_peaks = min_peaks[1:]
+
+            # ============== MIN / MAX / MINMAX ==============
+            if get == 'max':
+                idx = max_peaks
+            elif get == 'min':
+                idx = min_peaks
+            elif get == 'minmax':
+                idx = np.sort(np.r_[min_peaks, max_peaks])
+            index.append(np.c_[idx, idx])
+        else:
+            index.append(np.array([]))
+
+    return index if is_2d else index[0]
+
+
+def _peakdetect_pos(pos, y, a_max, a_min, length, lookahead, delta):
+    """Find alternating maxima and minima among candidate samples.
+
+    The search alternates between looking for a maximum and looking for a
+    minimum (both at first). A maximum is found at the first sample that is
+    lower than the running maximum of the current search minus delta and
+    whose lookahead maximum is also lower than the running maximum (and
+    conversely for minima). Minima are found as maxima of the opposite
+    signal.
+
+    Parameters
+    ----------
+    pos : array_like
+        Indices of the candidate samples.
+    y : array_like
+        Values of the candidate samples.
+    a_max, a_min : array_like
+        Maximum and minimum of the lookahead window of the candidate samples.
+    length : int
+        Number of time points of the signal.
+    lookahead : int
+        Distance to look ahead from a peak candidate.
+    delta : float
+        Minimum difference between a peak and the following points.
+
+    Returns
+    -------
+    min_peaks : array_like
+        Indices of minima.
+    max_peaks : array_like
+        Indices of maxima.
+    first_max : bool
+        True if the first peak found is a maximum.
+    """
+    n = len(pos)
+    if not n:
+        return pos, pos, False
+    n_lev = max(int(np.ceil(np.log2(4 * lookahead + 1))), 4)
+    window = 2 ** n_lev - 1
+    sig = {True: (y, a_max), False: (-y, -a_min)}
+    ends = {k: _peak_ends(v[0], v[1], delta, n_lev) for k, v in sig.items()}
+    peaks, is_max = [], []
+
+    def _end(kind, start):
+        end = ends[kind].item(start)
+        if end - start > window:  # long search, use running extrema
+            end = _scan_peak_end(sig[kind][0], sig[kind][1], delta, start,
+                                 window)
+        return end
+
+    # Search both a maximum and a minimum at the beginning (the maximum is
+    # tested first) :
+    k_max, k_min = _end(True, 0), _end(False, 0)
+    kind, k = (True, k_max) if k_max <= k_min else (False, k_min)
+    while k < n:
+        peaks.append(pos.item(k))
+        is_max.append(kind)
+        if peaks[-1] + lookahead >= length:
+            # end is within lookahead no more peaks can be found
+            break
+        # Set algorithm to only find the other kind of peak now :
+        kind = not kind
+        k = _end(kind, k + 1) if k + 1 < n else n
+    peaks, is_max = np.array(peaks, dtype=int), np.array(is_max, dtype=bool)
+    first_max = bool(is_max[0]) if is_max.size else False
+    return peaks[~is_max], peaks[is_max], first_max
+
+
+def _peak_ends(y, ahead, delta, n_lev, chunk=2 ** 16):
+    """Get where a search for a maximum started at each sample ends.
+
+    A search started at s ends at the first i >= s such that
+    max(y[s:i + 1]) - delta > y[i] and max(y[s:i + 1]) > ahead[i]. For each
+    i, the last sample j < i verifying y[j] - delta > y[i] and
+    y[j] > ahead[i] is searched among the 2 ** n_lev - 1 previous samples
+    using a sparse table of running maxima. The search started at s then
+    ends at the smallest i for which j >= s.
+
+    Returns
+    -------
+    ends : array_like
+        Array of shape (n,). If ends[s] - s is lower than 2 ** n_lev, it is
+        the end of the search started at s. Otherwise, the search has to be
+        performed by scanning (see _scan_peak_end).
+    """
+    n, window = len(y), 2 ** n_lev - 1
+    last = np.full((n,), -1, dtype=np.int64)
+    for c_start in range(0, n, chunk):
+        c_stop = min(c_start + chunk, n)
+        lo = max(c_start - window, 0)
+        # table[k][j] = max(seg[j:j + 2 ** k]) :
+        table = [y[lo:c_stop]]
+        for k in range(1, min(n_lev, int(np.log2(c_stop - lo)) + 1)):
+            half = 2 ** (k - 1)
+            table.append(np.maximum(table[-1][:-half], table[-1][half:]))
+        y_i, a_i = y[c_start:c_stop], ahead[c_start:c_stop]
+        cur = np.arange(c_start, c_stop) - lo
+        # Skip blocks of samples that cannot end a search at i :
+        for k in reversed(range(len(table))):
+            j = cur - 2 ** k
+            blk = table[k][np.maximum(j, 0)]
+            skip = (j >= 0) & ((blk <= a_i) | (blk - delta <= y_i))
+            cur = np.where(skip, j, cur)
+        j = np.maximum(cur - 1, 0)
+        val = table[0][j]
+        ok = (cur >= 1) & (val > a_i) & (val - delta > y_i)
+        last[c_start:c_stop] = np.where(ok, j + lo, -1)
+    # ends[s] = min{i, last[i] >= s} (i.e first i where the running maximum
+    # of last reaches s) :
+    return np.searchsorted(np.maximum.accumulate(last), np.arange(n))
+
+
+def _scan_peak_end(y, ahead, delta, start, chunk):
+    """Find the end of a search for a maximum by scanning running maxima."""
+    n, mx = len(y), -np.inf
+    while start < n:
+        sl = slice(start, min(start + chunk, n))
+        run = np.maximum(np.maximum.accumulate(y[sl]), mx)
+        cand = (y[sl] < run - delta) & (ahead[sl] < run)
+        if cand.any():
+            return start + cand.argmax()
+        mx, start, chunk = run[-1], sl.stop, 2 * chunk
+    return n
@@ -0,0 +1,251 @@
+"""Run sleep detections on several channels in parallel.
+
+- apply_detection : apply one of the default detections to a single channel
+- check_detection_index : check and format indices returned by a detection
+- DetectionPool : run detections channel by channel in a pool of processes
+"""
+import os
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .detection import (kcdetect, spindlesdetect, remdetect, slowwavedetect,
+                        mtdetect, peakdetect)
+from .event import _events_to_index
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('apply_detection', 'check_detection_index', 'DetectionPool')
+
+# Detection functions (data and sampling frequency first) :
+DETECTIONS = {'spindle': spindlesdetect, 'sw': slowwavedetect,
+              'kc': kcdetect, 'rem': remdetect, 'mt': mtdetect}
+# Detections that need the hypnogram :
+USE_HYPNO = ('spindle', 'kc', 'rem', 'mt')
+# Maximum number of samples (all channels included) copied at once :
+CHUNK_SIZE = 2 ** 22
+# Worker processes are never forked, as the calling process may run
+# background threads (spectrograms, filtering, prefetching...) :
+START_METHOD = ('forkserver' if 'forkserver' in
+                multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def check_detection_index(idx, n_pts):
+    """Check and format indices returned by a detection.
+
+    Parameters
+    ----------
+    idx : array_like
+        Indices of detected events. Should either be an array of shape
+        (n_events, 2), a boolean array of shape (n_pts,) or an array of
+        consecutive indices of detected events.
+    n_pts : int
+        Number of time points of the data.
+
+    Returns
+    -------
+    index : array_like
+        Array of shape (n_events, 2) with the first and last samples of each
+        event (or an empty array).
+    """
+    idx = np.asarray(idx)
+    if not idx.size:
+        return idx
+    # Check indices shape and format to (n_events, 2) :
+    if (idx.ndim == 2) and (idx.shape[1] == 2):  # (n_events, 2)
+        return idx.astype(int)
+    elif idx.ndim == 1:  # 1d vector
+        if idx.dtype == bool:  # boolean array
+            assert len(idx) == n_pts
+            idx = np.arange(n_pts)[idx]
+        return _events_to_index(idx)
+    else:
+        raise ValueError("Return indices should either be an (n_events"
+                         ", 2) array or a boolean array of shape "
+                         "(n_time_points,) or an array with "
+                         "consecutive detected events.")
+
+
+def apply_detection(method, data, sf, time, hypno, **kwargs):
+    """Apply one of the default detections to a single channel.
+
+    Parameters
+    ----------
+    method : {'spindle', 'sw', 'kc', 'rem', 'mt', 'peak'}
+        Detection method.
+    data : array_like
+        Data of a single channel of shape (n_pts,).
+    sf : float
+        The sampling frequency.
+    time : array_like
+        The time vector of shape (n_pts,).
+    hypno : array_like
+        The hypnogram of shape (n_pts,).
+    kwargs : dict | {}
+        Additional inputs sent to the detection function (e.g threshold or
+        features, the ChannelFeatures of the channel).
+
+    Returns
+    -------
+    index : array_like
+        Array of shape (n_events, 2) with the first and last samples of each
+        event (or an empty array).
+    """
+    if method == 'peak':
+        kwargs.pop('features', None)
+        idx = peakdetect(sf, data, time, **kwargs)
+    elif method in DETECTIONS.keys():
+        if method in USE_HYPNO:
+            kwargs['hypno'] = hypno
+        idx = DETECTIONS[method](data, sf, **kwargs)
+    else:
+        raise ValueError("method should either be %s" % ', '.join(
+            list(DETECTIONS.keys()) + ['peak']))
+    return check_detection_index(idx, len(data))
+
+
+###############################################################################
+# WORKERS
+###############################################################################
+_WORKER = {}
+
+
+def _init_worker(data, sf, time, hypno):
+    """Keep the shared inputs of the worker process."""
+    if isinstance(data, str):  # memory-mapped copy of the data
+        data = np.load(data, mmap_mode='r')
+    _WORKER.update(data=data, sf=sf, time=time, hypno=hypno)
+
+
+def _detect_channel(chan, method, kwargs):
+    """Run the detection on a single channel (inside a worker)."""
+    data = np.asarray(_WORKER['data'][chan, :])
+    return apply_detection(method, data, _WORKER['sf'], _WORKER['time'],
+                           _WORKER['hypno'], **kwargs)
+
+
+def _shutdown(executor, path):
+    """Stop the workers, then remove the copy of the data."""
+    executor.shutdown(wait=True)
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except OSError:  # still opened by a worker (Windows)
+        pass
+
+
+class DetectionPool(object):
+    """Run detections channel by channel in a pool of processes.
+
+    Worker processes are started with the 'forkserver' method ('spawn' where
+    it is not available) rather than forked, as threads running in the
+    background would be copied in an undefined state. Data are copied once
+    into a temporary memory-mapped file that is read by the workers. As for
+    any multiprocessing code, scripts should protect their entry point
+    with `if __name__ == '__main__':`.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of shape (n_channels, n_pts). It can also be a LazySleepData.
+    sf : float
+        The sampling frequency.
+    time : array_like
+        The time vector of shape (n_pts,).
+    hypno : array_like
+        The hypnogram of shape (n_pts,).
+    n_jobs : int | None
+        Number of worker processes. If None, the number of CPUs is used.
+    """
+
+    def __init__(self, data, sf, time, hypno, n_jobs=None):
+        """Init."""
+        n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+        self._tmp = None
+        context = multiprocessing.get_context(START_METHOD)
+        data = self._to_memmap(data)
+        self._executor = ProcessPoolExecutor(
+            max(int(n_jobs), 1), mp_context=context,
+            initializer=_init_worker, initargs=(data, sf, time, hypno))
+        self._pending = {}
+
+    def __len__(self):
+        """Return the number of pending detections."""
+        return len(self._pending)
+
+    def _to_memmap(self, data):
+        """Copy data into a temporary memory-mapped file."""
+        fid, self._tmp = tempfile.mkstemp(suffix='.npy')
+        os.close(fid)
+        n_chan, n_pts = data.shape
+        mm = np.lib.format.open_memmap(self._tmp, mode='w+',
+                                       dtype=np.float32, shape=(n_chan, n_pts))
+        n_cols = max(int(CHUNK_SIZE // max(n_chan, 1)), 1)
+        for k in range(0, n_pts, n_cols):
+            mm[:, k:k + n_cols] = data[:, k:k + n_cols]
+        mm.flush()
+        del mm
+        return self._tmp
+
+    def submit(self, method, chans, **kwargs):
+        """Submit a detection (one task per channel).
+
+        Parameters
+        ----------
+        method : {'spindle', 'sw', 'kc', 'rem', 'mt', 'peak'}
+            Detection method.
+        chans : array_like
+            Indices of the channels.
+        kwargs : dict | {}
+            Additional inputs sent to the detection function.
+        """
+        for k in chans:
+            future = self._executor.submit(_detect_channel, int(k), method,
+                                           kwargs)
+            self._pending[future] = int(k)
+
+    def poll(self):
+        """Get finished detections, without blocking.
+
+        Returns
+        -------
+        finished : list
+            List of (channel, future) of detections finished since the last
+            call. Use future.result() to get the indices (or the error).
+        """
+        done = [f for f in self._pending.keys() if f.done()]
+        return [(self._pending.pop(f), f) for f in done]
+
+    def __iter__(self):
+        """Iterate over (channel, future) as detections finish (blocking)."""
+        for f in as_completed(list(self._pending.keys())):
+            yield self._pending.pop(f), f
+
+    def cancel(self):
+        """Cancel pending detections and shutdown the pool."""
+        for f in self._pending.keys():
+            f.cancel()
+        self._pending = {}
+        self.shutdown(wait=False)
+
+    def shutdown(self, wait=True):
+        """Shutdown the pool of processes.
+
+        Parameters
+        ----------
+        wait : bool | True
+            Wait for running detections to finish. Otherwise, the temporary
+            copy of the data is removed in the background, once the workers
+            are stopped.
+        """
+        if wait:
+            _shutdown(self._executor, self._tmp)
+        else:  # workers may still be starting and open the file
+            threading.Thread(target=_shutdown, daemon=True,
+                             args=(self._executor, self._tmp)).start()
+        self._tmp = None
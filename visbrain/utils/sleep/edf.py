@@ -7,13 +7,16 @@ Values are slightly different from those computed by FieldTrip, however they
 are identical to those computed by Biosig and EDFBrowser. The difference is due
 to the calibration.
 
+BDF files (BioSemi, 24-bit samples) and discontinuous EDF+ / BDF+ files
+(EDF+D, records located in time by the annotation channel) are also supported.
 """
 from logging import getLogger
 
 from datetime import datetime
-from math import floor
+from os.path import getsize
 from re import findall
-from numpy import empty, asarray, frombuffer, iinfo
+from numpy import (empty, asarray, iinfo, dtype, memmap, newaxis, arange,
+                   diff, flatnonzero, r_, rint)
 
 
 lg = getLogger(__name__)
@@ -21,6 +24,10 @@ EDF_FORMAT = 'int16'  # by definition
 edf_iinfo = iinfo(EDF_FORMAT)
 DIGITAL_MAX = edf_iinfo.max
 DIGITAL_MIN = -1 * edf_iinfo.max  # so that digital 0 = physical 0
+BDF_VERSION = b'\xffBIOSEMI'
+ANNOTATIONS = ['EDF Annotations', 'BDF Annotations']
+# Maximum number of samples decoded at once (BDF) :
+CHUNK_SIZE = 2 ** 20
 
 
 def _assert_all_the_same(items):
@@ -28,6 +35,27 @@ def _assert_all_the_same(items):
     assert all(items[0] == x for x in items)
 
 
+def _decode_int24(raw):
+    """Decode little-endian 24-bit samples.
+
+    Parameters
+    ----------
+    raw : array_like
+        Array of uint8 whose last axis holds the 3 bytes of each sample.
+
+    Returns
+    -------
+    numpy.ndarray
+        int32 array of samples, of shape raw.shape[:-1]
+    """
+    # Bytes are shifted into the upper part of an int32 and shifted back
+    # to propagate the sign bit :
+    buf = empty(raw.shape[:-1] + (4,), dtype='u1')
+    buf[..., 0] = 0
+    buf[..., 1:] = raw
+    return buf.view('<i4')[..., 0] >> 8
+
+
 class Edf:
     """Provide class EDF, which can be used to read the header and the data.
 
@@ -58,7 +86,9 @@ class Edf:
 
             hdr = {}
             assert f.tell() == 0
-            assert f.read(8) == b'0       '
+            version = f.read(8)
+            assert version in [b'0       ', BDF_VERSION]
+            hdr['bdf'] = version == BDF_VERSION
 
             # recording info
             hdr['subject_id'] = f.read(80).decode('utf-8').strip()
@@ -74,7 +104,9 @@ class Edf:
 
             # misc
             hdr['header_n_bytes'] = int(f.read(8))
-            f.seek(44, 1)  # reserved for EDF+
+            # reserved ('24BIT' for BDF, 'EDF+C' / 'EDF+D' for EDF+) :
+            hdr['reserved'] = f.read(44).decode('utf-8').strip()
+            hdr['discontinuous'] = hdr['reserved'][:5] in ['EDF+D', 'BDF+D']
             hdr['n_records'] = int(f.read(8))
             hdr['record_length'] = float(f.read(8))  # in seconds
             nchannels = hdr['n_channels'] = int(f.read(4))
@@ -131,17 +163,207 @@ class Edf:
 
         chan_name = self.hdr['label']
 
-        n_samples = (self.hdr['n_samples_per_record'][0] *
-                     self.hdr['n_records'])
+        n_samples = self.n_samples(0)
 
         return subj_id, start_time, s_freq, chan_name, n_samples, self.hdr
 
+    @property
+    def record_dtype(self):
+        """Structured dtype of a single data record.
+
+        One field per signal (named 's0', 's1', ...), each holding the
+        `n_samples_per_record` samples of this signal in the record (int16
+        for EDF, three bytes per sample for BDF).
+        """
+        if self.hdr['bdf']:
+            return dtype([('s%i' % k, 'u1', (n, 3)) for k, n in enumerate(
+                self.hdr['n_samples_per_record'])])
+        return dtype([('s%i' % k, '<i2', (n,)) for k, n in enumerate(
+            self.hdr['n_samples_per_record'])])
+
+    def _memmap(self):
+        """Map the data area of the file as an array of records.
+
+        The number of records is deduced from the file size if the header
+        reports an unknown (-1) or inconsistent number of records.
+        """
+        if getattr(self, '_mm', None) is None:
+            rec_dt = self.record_dtype
+            n_bytes = getsize(self.filename) - self.hdr['header_n_bytes']
+            n_records = int(n_bytes // rec_dt.itemsize)
+            if 0 <= self.hdr['n_records'] < n_records:
+                n_records = self.hdr['n_records']
+            self._mm = memmap(self.filename, dtype=rec_dt, mode='r',
+                              offset=self.hdr['header_n_bytes'],
+                              shape=(n_records,))
+        return self._mm
+
+    def _chan_index(self, chan):
+        """Convert channel names and/or indices into a list of indices."""
+        labels = self.hdr['label']
+        return [labels.index(k) if isinstance(k, str) else int(k)
+                for k in chan]
+
+    @property
+    def record_onsets(self):
+        """Onset of each data record, in seconds from the start time.
+
+        Records are contiguous, except in discontinuous EDF+ / BDF+ files
+        (EDF+D) where onsets are read from the time-keeping annotation of
+        each record.
+        """
+        if getattr(self, '_onsets', None) is None:
+            n_records = len(self._memmap())
+            if self.hdr['discontinuous']:
+                self._onsets = self._read_record_onsets()
+            else:
+                self._onsets = arange(n_records) * self.hdr['record_length']
+        return self._onsets
+
+    def _read_record_onsets(self):
+        """Read the onset of each record from the annotation channel.
+
+        Each record of the annotation channel starts with a time-keeping
+        annotation '+onset\x14\x14\x00' giving the onset of the record.
+        """
+        labels = self.hdr['label']
+        i_ann = [k for k, c in enumerate(labels) if c in ANNOTATIONS]
+        if not i_ann:
+            raise ValueError("Discontinuous file without annotation "
+                             "channel.")
+        field = self._memmap()['s%i' % i_ann[0]]
+        tal = asarray(field).reshape(len(field), -1).view('u1')
+        ends = (tal == 20).argmax(axis=1)  # first '\x14' of each record
+        onsets = empty((len(tal),), dtype=float)
+        for k, e in enumerate(ends):
+            onsets[k] = float(tal[k, :e].tobytes().decode('utf-8'))
+        return onsets
+
+    def _segments(self):
+        """Get the continuous segments of records.
+
+        Returns
+        -------
+        onsets : numpy.ndarray
+            Onset of each segment (in seconds from the start time)
+        first : numpy.ndarray
+            Index of the first record of each segment
+        n_records : numpy.ndarray
+            Number of records of each segment
+        """
+        if getattr(self, '_segs', None) is None:
+            onsets = self.record_onsets
+            rec_len = self.hdr['record_length']
+            # Tolerance of half a sample of the fastest channel :
+            tol = .5 * rec_len / max(self.hdr['n_samples_per_record'])
+            first = r_[0, flatnonzero(abs(diff(onsets) - rec_len) > tol) + 1]
+            n_records = diff(r_[first, len(onsets)])
+            self._segs = (onsets[first], first, n_records)
+        return self._segs
+
+    def _segment_starts(self, i_chan):
+        """Get the index of the first sample of each segment of a channel."""
+        onsets, _, _ = self._segments()
+        n_rec = self.hdr['n_samples_per_record'][i_chan]
+        return rint(onsets * n_rec / self.hdr['record_length']).astype(int)
+
+    def n_samples(self, i_chan):
+        """Number of samples of a channel, gaps between records included.
+
+        Parameters
+        ----------
+        i_chan : int
+            index of the channel
+
+        Returns
+        -------
+        n_samples : int
+            number of samples from the start time to the end of the last
+            record
+        """
+        _, _, n_records = self._segments()
+        n_rec = self.hdr['n_samples_per_record'][i_chan]
+        return int(self._segment_starts(i_chan)[-1] + n_records[-1] * n_rec)
+
+    def _samples(self, raw):
+        """Convert raw samples read from the file into integers."""
+        return _decode_int24(raw) if self.hdr['bdf'] else raw
+
+    def _read_records(self, i_chan, begsam, endsam, out):
+        """Copy samples of a single channel stored in consecutive records.
+
+        Whole records are copied at once from the (n_records, n) strided
+        view of the channel field (decoded by blocks of at most CHUNK_SIZE
+        samples for BDF). Only the first and last records can be partially
+        read.
+
+        Parameters
+        ----------
+        i_chan : int
+            index of the channel to read
+        begsam : int
+            index of the first sample (counted in records)
+        endsam : int
+            index of the last sample (counted in records)
+        out : numpy.ndarray
+            Contiguous vector of length endsam - begsam to fill. Samples are
+            cast to out.dtype.
+        """
+        n_rec = self.hdr['n_samples_per_record'][i_chan]
+        field = self._memmap()['s%i' % i_chan]
+        begrec, begoff = divmod(begsam, n_rec)
+        endrec, endoff = divmod(endsam, n_rec)
+        if begrec == endrec:
+            out[:] = self._samples(field[begrec, begoff:endoff])
+            return out
+        i_out = 0
+        if begoff:  # first record partially read
+            out[:n_rec - begoff] = self._samples(field[begrec, begoff:])
+            i_out, begrec = n_rec - begoff, begrec + 1
+        n_full = (endrec - begrec) * n_rec
+        full = out[i_out:i_out + n_full].reshape(-1, n_rec)
+        step = max(CHUNK_SIZE // n_rec if self.hdr['bdf'] else len(full), 1)
+        for k in range(0, len(full), step):
+            full[k:k + step] = self._samples(field[begrec + k:min(
+                begrec + k + step, endrec)])
+        if endoff:  # last record partially read
+            out[i_out + n_full:] = self._samples(field[endrec, :endoff])
+        return out
+
+    def _read_into(self, i_chan, begsam, endsam, out, fill=0):
+        """Copy raw samples of a single channel into a contiguous array.
+
+        Parameters
+        ----------
+        i_chan : int
+            index of the channel to read
+        begsam : int
+            index of the first sample
+        endsam : int
+            index of the last sample
+        out : numpy.ndarray
+            Contiguous vector of length endsam - begsam to fill. Samples are
+            cast to out.dtype.
+        fill : float | 0
+            Value of the samples located between two records (EDF+D).
+        """
+        _, first, n_records = self._segments()
+        starts = self._segment_starts(i_chan)
+        if (len(starts) == 1) and (starts[0] == 0):  # continuous records
+            return self._read_records(i_chan, begsam, endsam, out)
+        n_rec = self.hdr['n_samples_per_record'][i_chan]
+        out[:] = fill
+        for start, rec, n in zip(starts, first, n_records):
+            beg, end = max(begsam, start), min(endsam, start + n * n_rec)
+            if beg < end:
+                offset = rec * n_rec - start
+                self._read_records(i_chan, beg + offset, end + offset,
+                                   out[beg - begsam:end - begsam])
+        return out
+
     def _read_dat(self, i_chan, begsam, endsam):
         """Read raw data from a single EDF channel.
 
-        Reads only one channel at the time. Very initial implementation, very
-        simple and probably not very fast
-
         Parameters
         ----------
         i_chan : int
@@ -155,62 +377,31 @@ class Edf:
         -------
         numpy.ndarray
             A vector with the data as written on file, in 16-bit precision
+            (32-bit for BDF)
         """
         assert begsam < endsam
+        begsam, endsam = int(begsam), int(endsam)
+        dat = empty(shape=(endsam - begsam,),
+                    dtype='int32' if self.hdr['bdf'] else 'int16')
+        return self._read_into(i_chan, begsam, endsam, dat)
 
-        begsam = float(begsam)
-        endsam = float(endsam)
-
-        n_sam_rec = self.hdr['n_samples_per_record']
-
-        begrec = int(floor(begsam / n_sam_rec[i_chan]))
-        begsam_rec = int(begsam % n_sam_rec[i_chan])
-
-        endrec = int(floor(endsam / n_sam_rec[i_chan]))
-        endsam_rec = int(endsam % n_sam_rec[i_chan])
-
-        dat = empty(shape=(int(endsam) - int(begsam)), dtype='int16')
-        i_dat = 0
-
-        with open(self.filename, 'rb') as f:
-            for rec in range(begrec, endrec + 1):
-                if rec == begrec:
-                    begpos_rec = begsam_rec
-                else:
-                    begpos_rec = 0
-
-                if rec == endrec:
-                    endpos_rec = endsam_rec
-                else:
-                    endpos_rec = n_sam_rec[i_chan]
-
-                begpos = begpos_rec + sum(n_sam_rec) * rec + sum(
-                    n_sam_rec[:i_chan])
-                endpos = endpos_rec + sum(n_sam_rec) * rec + sum(
-                    n_sam_rec[:i_chan])
-
-                f.seek(begpos * 2 + self.hdr['header_n_bytes'])
-                samples = f.read(2 * (endpos - begpos))
-
-                i_dat_end = i_dat + endpos - begpos
-                dat[i_dat:i_dat_end] = frombuffer(samples, dtype='<i2')
-                i_dat = i_dat_end
-
-        return dat
-
-    def return_dat(self, chan, begsam, endsam):
+    def return_dat(self, chan, begsam, endsam, dtype='float64'):
         """Read data from an EDF file.
 
-        Reads channel by channel, and adjusts the values by calibration.
+        Channels are read record-wise from the memory-mapped file and the
+        calibration is applied in place. Samples located between the records
+        of discontinuous files are set to 0.
 
         Parameters
         ----------
-        chan : list of str
-            index (indices) of the channels to read
+        chan : list of str or int
+            names or indices of the channels to read
         begsam : int
             index of the first sample
         endsam : int
             index of the last sample
+        dtype : string | 'float64'
+            Data type of the returned array.
 
         Returns
         -------
@@ -218,22 +409,30 @@ class Edf:
             A 2d matrix, where the first dimension is the channels and the
             second dimension are the samples.
         """
+        assert begsam < endsam
+        begsam, endsam = int(begsam), int(endsam)
         hdr = self.hdr
-        dig_min = hdr['digital_min']
-        phys_min = hdr['physical_min']
+        i_chan = self._chan_index(chan)
+        dig_min = hdr['digital_min'][i_chan]
+        phys_min = hdr['physical_min'][i_chan]
         phys_range = hdr['physical_max'] - hdr['physical_min']
         dig_range = hdr['digital_max'] - hdr['digital_min']
 
         # assert all(phys_range > 0)
         # assert all(dig_range > 0)
 
-        gain = phys_range / dig_range
+        gain = (phys_range / dig_range)[i_chan]
+
+        # Digital values of physical zeros (gaps between records) :
+        fill = dig_min - phys_min / gain
 
-        dat = empty(shape=(len(chan), endsam - begsam), dtype='float64')
+        dat = empty(shape=(len(i_chan), endsam - begsam), dtype=dtype)
+        for i, c in enumerate(i_chan):
+            self._read_into(c, begsam, endsam, dat[i, :], fill[i])
 
-        for i, i_chan in enumerate(chan):
-            d = self._read_dat(i, begsam, endsam).astype('float64')
-            dat[i, :] = (d - dig_min[i]) * gain[i] + phys_min[i]
+        # Calibration : (d - dig_min) * gain + phys_min
+        dat *= gain[:, newaxis].astype(dtype)
+        dat += (phys_min - dig_min * gain)[:, newaxis].astype(dtype)
 
         return dat
 
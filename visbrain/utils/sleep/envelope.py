@@ -0,0 +1,129 @@
+"""Multi-resolution min / max envelope of signals (level of detail)."""
+import numpy as np
+
+__all__ = ('MinMaxPyramid',)
+
+
+class MinMaxPyramid(object):
+    """Min / max envelope pyramid of multi-channel signals.
+
+    Each level of the pyramid summarizes consecutive bins of samples by their
+    minimum and maximum values. The first level uses bins of min_bin samples
+    and each following level groups `factor` bins of the previous one. The
+    envelope of a bin is represented by two points (minimum then maximum)
+    so that drawing a level as a line reproduces the aspect of the raw
+    signal when there are more samples than pixels.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of shape (n_channels, n_pts). It can also be a LazySleepData, in
+        which case data are read by chunks.
+    time : array_like
+        Time vector of shape (n_pts,).
+    min_bin : int | 8
+        Number of samples in the bins of the first level.
+    factor : int | 4
+        Number of bins of a level grouped in a bin of the next level.
+    chunk_size : int | 2 ** 22
+        Maximum number of samples (all channels included) processed at once
+        when building the first level.
+    """
+
+    def __init__(self, data, time, min_bin=8, factor=4, chunk_size=2 ** 22):
+        """Init."""
+        n_chan, n_pts = data.shape
+        self.shape = (n_chan, n_pts)
+        self.factor = int(factor)
+        self.bins, self._env, self._time = [], [], []
+        # ---------- FIRST LEVEL (chunk by chunk) ----------
+        bin_size = int(min_bin)
+        n_cols = max(int(chunk_size // max(n_chan, 1)) // bin_size, 1) * \
+            bin_size
+        mins, maxs = [], []
+        for k in range(0, n_pts, n_cols):
+            chunk = data[:, k:k + n_cols]
+            idx = np.arange(0, chunk.shape[1], bin_size)
+            mins.append(np.minimum.reduceat(chunk, idx, axis=1))
+            maxs.append(np.maximum.reduceat(chunk, idx, axis=1))
+        mins = np.concatenate(mins, axis=1).astype(np.float32, copy=False)
+        maxs = np.concatenate(maxs, axis=1).astype(np.float32, copy=False)
+        time = np.asarray(time)
+        self._add_level(bin_size, mins, maxs, time)
+        # ---------- NEXT LEVELS ----------
+        while mins.shape[1] > 1:
+            idx = np.arange(0, mins.shape[1], self.factor)
+            mins = np.minimum.reduceat(mins, idx, axis=1)
+            maxs = np.maximum.reduceat(maxs, idx, axis=1)
+            bin_size *= self.factor
+            self._add_level(bin_size, mins, maxs, time)
+
+    def __len__(self):
+        """Return the number of levels."""
+        return len(self.bins)
+
+    def _add_level(self, bin_size, mins, maxs, time):
+        """Add a level to the pyramid."""
+        n_pts = self.shape[1]
+        # Interleave minimum and maximum of each bin :
+        env = np.empty((mins.shape[0], 2 * mins.shape[1]), dtype=np.float32)
+        env[:, 0::2], env[:, 1::2] = mins, maxs
+        # Minimum at the bin start and maximum at its middle :
+        start = np.arange(0, n_pts, bin_size)
+        middle = np.minimum(start + bin_size // 2, n_pts - 1)
+        t = np.empty((2 * len(start),), dtype=np.float32)
+        t[0::2], t[1::2] = time[start], time[middle]
+        self.bins.append(bin_size)
+        self._env.append(env)
+        self._time.append(t)
+
+    def get_level(self, n_pts, n_pixels):
+        """Get the level to use to display n_pts samples on n_pixels.
+
+        Parameters
+        ----------
+        n_pts : int
+            Number of samples to display.
+        n_pixels : int
+            Number of horizontal pixels.
+
+        Returns
+        -------
+        level : int | None
+            The index of the coarsest level that still gives at least one bin
+            per pixel (i.e about two points per pixel). None if raw samples
+            should be used instead.
+        """
+        level = None
+        for num, k in enumerate(self.bins):
+            if n_pts / k >= n_pixels:
+                level = num
+        return level
+
+    def get(self, sl, n_pixels, rows=None):
+        """Get the envelope of a time window.
+
+        Parameters
+        ----------
+        sl : slice
+            Time slice of the window (in samples, step of 1).
+        n_pixels : int
+            Number of horizontal pixels.
+        rows : array_like | None
+            Channels to return (indices or boolean mask).
+
+        Returns
+        -------
+        envelope : tuple | None
+            Tuple (time, data) of the envelope where time has a shape of
+            (n_env,) and data (n_rows, n_env). None if raw samples should be
+            displayed instead (zoomed in).
+        """
+        start, stop, _ = sl.indices(self.shape[1])
+        level = self.get_level(stop - start, n_pixels)
+        if level is None:
+            return None
+        bin_size = self.bins[level]
+        b_sl = slice(2 * (start // bin_size), 2 * -(-stop // bin_size))
+        rows = slice(None) if rows is None else rows
+        return self._time[level][b_sl], self._env[level][rows, b_sl]
@@ -2,7 +2,272 @@
 
 import numpy as np
 
-__all__ = ('_events_distance_fill', '_events_to_index', '_index_to_events')
+__all__ = ('IntervalSet', '_events_distance_fill', '_events_to_index',
+           '_index_to_events')
+
+
+class IntervalSet(object):
+    """Set of events stored as sorted (start, stop) intervals.
+
+    Each event covers the samples start, start + 1, ..., stop - 1. Events are
+    kept sorted and disjoint : overlapping or contiguous intervals are merged
+    into a single event. Operations work on the intervals only, hence their
+    cost depends on the number of events and not on the number of samples.
+
+    Parameters
+    ----------
+    starts : array_like
+        First sample of each interval.
+    stops : array_like
+        Sample following the last sample of each interval.
+    """
+
+    def __init__(self, starts=(), stops=()):
+        """Init."""
+        starts = np.asarray(starts, dtype=np.int64).ravel()
+        stops = np.asarray(stops, dtype=np.int64).ravel()
+        if len(starts) != len(stops):
+            raise ValueError("starts and stops should have the same length.")
+        self._set(starts, stops)
+
+    def _set(self, starts, stops):
+        """Sort, remove empty intervals and merge overlapping ones."""
+        keep = stops > starts
+        starts, stops = starts[keep], stops[keep]
+        if len(starts) and np.any(np.diff(starts) < 0):
+            order = np.argsort(starts, kind='mergesort')
+            starts, stops = starts[order], stops[order]
+        if len(starts) > 1:
+            # An interval starts a new event if it begins after the end of
+            # all of the previous ones :
+            reach = np.maximum.accumulate(stops)
+            new = np.r_[True, starts[1:] > reach[:-1]]
+            first = np.flatnonzero(new)
+            starts = starts[first]
+            stops = reach[np.r_[first[1:] - 1, len(reach) - 1]]
+        self._starts, self._stops = starts, stops
+
+    ###########################################################################
+    # CONSTRUCTORS
+    ###########################################################################
+    @classmethod
+    def from_mask(cls, mask):
+        """Build intervals from a boolean vector.
+
+        Parameters
+        ----------
+        mask : array_like
+            Boolean array of shape (n_pts,).
+
+        Returns
+        -------
+        events : IntervalSet
+            Intervals of consecutive True values.
+        """
+        mask = np.asarray(mask, dtype=bool).ravel()
+        edges = np.flatnonzero(np.diff(np.r_[0, mask.view(np.int8), 0]))
+        return cls(edges[0::2], edges[1::2])
+
+    @classmethod
+    def from_index(cls, index):
+        """Build intervals from sorted indices of samples.
+
+        Parameters
+        ----------
+        index : array_like
+            Sorted indices of samples (e.g supra-threshold samples).
+
+        Returns
+        -------
+        events : IntervalSet
+            Intervals of consecutive indices.
+        """
+        index = np.asarray(index, dtype=np.int64).ravel()
+        if not index.size:
+            return cls()
+        cut = np.flatnonzero(np.diff(index) != 1) + 1
+        return cls(index[np.r_[0, cut]], index[np.r_[cut - 1, -1]] + 1)
+
+    ###########################################################################
+    # PROPERTIES / CONVERSIONS
+    ###########################################################################
+    def __len__(self):
+        """Return the number of events."""
+        return len(self._starts)
+
+    def __repr__(self):
+        """Representation."""
+        return "IntervalSet(n_events=%i)" % len(self)
+
+    def __getitem__(self, key):
+        """Select events (e.g using a boolean array of shape (n_events,))."""
+        return IntervalSet(self._starts[key], self._stops[key])
+
+    @property
+    def starts(self):
+        """Get the first sample of each event."""
+        return self._starts
+
+    @property
+    def stops(self):
+        """Get the sample following the last sample of each event."""
+        return self._stops
+
+    @property
+    def durations(self):
+        """Get the number of samples of each event."""
+        return self._stops - self._starts
+
+    def to_index(self):
+        """Get the (n_events, 2) array of (first, last) samples of events."""
+        return np.c_[self._starts, self._stops - 1].astype(int)
+
+    def to_mask(self, n_pts):
+        """Get a boolean vector of shape (n_pts,), True inside events."""
+        edges = np.bincount(np.clip(self._starts, 0, n_pts),
+                            minlength=n_pts + 1)
+        edges -= np.bincount(np.clip(self._stops, 0, n_pts),
+                             minlength=n_pts + 1)
+        return np.cumsum(edges[:-1]) > 0
+
+    def indices(self):
+        """Get the indices of every sample inside events."""
+        durations = self.durations
+        if not durations.size:
+            return np.array([], dtype=int)
+        offsets = np.repeat(self._starts - np.r_[0, np.cumsum(durations)[
+            :-1]], durations)
+        return (np.arange(durations.sum()) + offsets).astype(int)
+
+    ###########################################################################
+    # ALGEBRA
+    ###########################################################################
+    def union(self, other):
+        """Get samples that are inside events of either set."""
+        return IntervalSet(np.r_[self._starts, other.starts],
+                           np.r_[self._stops, other.stops])
+
+    def intersection(self, other):
+        """Get samples that are inside events of both sets."""
+        # Every pair of overlapping events gives one interval. Pairs are found
+        # by searching the events of other around each event of self :
+        first = np.searchsorted(other.stops, self._starts, side='right')
+        last = np.searchsorted(other.starts, self._stops, side='left')
+        n_pairs = np.maximum(last - first, 0)
+        i_self = np.repeat(np.arange(len(self)), n_pairs)
+        i_other = np.arange(n_pairs.sum()) + np.repeat(
+            first - np.r_[0, np.cumsum(n_pairs)[:-1]], n_pairs)
+        return IntervalSet(np.maximum(self._starts[i_self],
+                                      other.starts[i_other]),
+                           np.minimum(self._stops[i_self],
+                                      other.stops[i_other]))
+
+    def complement(self, n_pts):
+        """Get samples of [0, n_pts) that are outside events."""
+        starts = np.r_[0, self._stops]
+        stops = np.r_[self._starts, n_pts]
+        return IntervalSet(np.clip(starts, 0, n_pts), np.clip(stops, 0, n_pts))
+
+    def difference(self, other):
+        """Get samples that are inside events of self but not of other."""
+        if not len(self):
+            return IntervalSet()
+        return self.intersection(other.complement(int(self._stops[-1])))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    ###########################################################################
+    # QUERIES
+    ###########################################################################
+    def fill_gaps(self, min_distance):
+        """Merge events that are too close.
+
+        Parameters
+        ----------
+        min_distance : float
+            Two events are merged when the distance between the last sample
+            of the first one and the first sample of the second one is lower
+            than min_distance (in samples).
+
+        Returns
+        -------
+        events : IntervalSet
+            Events with filled gaps.
+        """
+        if len(self) < 2:
+            return self
+        distance = self._starts[1:] - (self._stops[:-1] - 1)
+        keep = np.r_[True, distance >= min_distance]
+        first = np.flatnonzero(keep)
+        return IntervalSet(self._starts[first],
+                           self._stops[np.r_[first[1:] - 1, len(self) - 1]])
+
+    def overlaps(self, starts, stops):
+        """Find if windows contain at least one sample of an event.
+
+        Parameters
+        ----------
+        starts, stops : array_like
+            First sample and following the last sample of each window.
+
+        Returns
+        -------
+        overlap : array_like
+            Boolean array with one value per window.
+        """
+        starts, stops = np.asarray(starts), np.asarray(stops)
+        # First event that ends after the beginning of each window :
+        idx = np.searchsorted(self._stops, starts, side='right')
+        found = idx < len(self)
+        first = np.full(starts.shape, np.iinfo(np.int64).max)
+        first[found] = self._starts[idx[found]]
+        return (first < stops) & (starts < stops)
+
+    def near(self, other, window):
+        """Find events starting close to an event of another set.
+
+        Parameters
+        ----------
+        other : IntervalSet
+            Other set of events.
+        window : float
+            Half-width of the window (in samples) centered on the start of
+            each event.
+
+        Returns
+        -------
+        near : array_like
+            Boolean array of shape (n_events,), True for events whose window
+            [start - window, start + window) contains a sample of other.
+        """
+        lo = np.ceil(self._starts - window).astype(np.int64)
+        hi = np.ceil(self._starts + window).astype(np.int64)
+        return other.overlaps(lo, hi)
+
+    def ptp(self, data):
+        """Get the peak-to-peak amplitude of data inside each event.
+
+        Parameters
+        ----------
+        data : array_like
+            Data vector of shape (n_pts,).
+
+        Returns
+        -------
+        amp : array_like
+            Peak-to-peak amplitude of each event.
+        """
+        if not len(self):
+            return np.array([])
+        data = np.asarray(data)
+        bounds = np.c_[self._starts, self._stops].ravel()
+        if bounds[-1] >= len(data):  # the last event reaches the end
+            bounds = bounds[:-1]
+        mx = np.maximum.reduceat(data, bounds)[0::2]
+        mn = np.minimum.reduceat(data, bounds)[0::2]
+        return mx - mn
 
 
 def _events_distance_fill(index, min_distance_ms, sf):
@@ -23,21 +288,8 @@ def _events_distance_fill(index, min_distance_ms, sf):
     f_index : array_like
         Filled (corrected) Indices of supra-threshold events
     """
-    # Convert min_distance_ms
-    min_distance = min_distance_ms / 1000. * sf
-    idx_diff = np.diff(index)
-    condition = idx_diff > 1
-    idx_distance = np.where(condition)[0]
-    distance = idx_diff[condition]
-    bad = idx_distance[np.where(distance < min_distance)[0]]
-    # Fill gap between events separated with less than min_distance_ms
-    if len(bad) > 0:
-        fill = np.hstack([np.arange(index[j] + 1, index[j + 1])
-                          for i, j in enumerate(bad)])
-        f_index = np.sort(np.append(index, fill))
-        return f_index
-    else:
-        return index
+    events = IntervalSet.from_index(index)
+    return events.fill_gaps(min_distance_ms / 1000. * sf).indices()
 
 
 def _events_to_index(x):
@@ -54,10 +306,13 @@ def _events_to_index(x):
         An array of shape (n_events, 2) where the dimension 2 refer to the
         indices where each event start and finish.
     """
+    x = np.asarray(x)
+    if not x.size:
+        return np.zeros((0, 2), dtype=int)
     # Split indices where it stopped :
-    sp = np.split(x, np.where(np.diff(x) != 1)[0] + 1)
+    cut = np.flatnonzero(np.diff(x) != 1) + 1
     # Return (start, end) :
-    return np.array([[k[0], k[-1]] for k in sp]).astype(int)
+    return np.c_[x[np.r_[0, cut]], x[np.r_[cut - 1, -1]]].astype(int)
 
 
 def _index_to_events(x):
@@ -73,7 +328,7 @@ def _index_to_events(x):
     index : array_like
         Continuous array of indicies.
     """
-    index = np.array([])
-    for k in range(x.shape[0]):
-        index = np.append(index, np.arange(x[k, 0], x[k, 1] + 1))
-    return index.astype(int)
+    x = np.asarray(x, dtype=np.int64).reshape(-1, 2)
+    n = np.maximum(x[:, 1] - x[:, 0] + 1, 0)
+    offsets = np.repeat(x[:, 0] - np.r_[0, np.cumsum(n)[:-1]], n)
+    return (np.arange(n.sum()) + offsets).astype(int)
@@ -0,0 +1,159 @@
+"""Cache features of channels shared by detections.
+
+- FeatureCache : least recently used cache of features, bounded in bytes
+- ChannelFeatures : features of a single channel (see FeatureCache.channel)
+"""
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('FeatureCache', 'ChannelFeatures')
+
+
+class FeatureCache(object):
+    """Least recently used cache of features computed on channels.
+
+    Features (e.g band powers, envelopes or TKEO of filtered signals) are
+    keyed by channel, feature function and parameters. Detections that need
+    a feature that has already been computed on the same channel with the
+    same parameters (e.g when a detection is applied again with a different
+    threshold) pull it from the cache.
+
+    Parameters
+    ----------
+    max_size : int | 2 ** 29
+        Maximum size of the cache (in bytes). Least recently used features
+        are removed above this size (the most recent one is always kept).
+
+    Examples
+    --------
+    >>> cache = FeatureCache()
+    >>> idx = spindlesdetect(data[0, :], sf, 2., hypno, True,
+    >>>                      features=cache.channel(0))
+    """
+
+    def __init__(self, max_size=2 ** 29):
+        """Init."""
+        self._max_size = max_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        """Return the number of cached features."""
+        return len(self._cache)
+
+    def __repr__(self):
+        """Represent the object."""
+        return "FeatureCache(n_features=%i, nbytes=%i)" % (
+            len(self), self.nbytes)
+
+    @property
+    def nbytes(self):
+        """Get the size of cached features (in bytes)."""
+        return sum([_nbytes(k) for k in self._cache.values()])
+
+    @staticmethod
+    def _key(chan, fcn, kwargs):
+        """Get the cache key of a feature."""
+        return (chan, fcn) + tuple(sorted(kwargs.items()))
+
+    def channel(self, chan):
+        """Get the features of a channel.
+
+        Parameters
+        ----------
+        chan : int | string
+            Channel index or name.
+
+        Returns
+        -------
+        features : ChannelFeatures
+            Features of the channel, to be sent to detections.
+        """
+        return ChannelFeatures(self, chan)
+
+    def get(self, chan, fcn, *arrays, **kwargs):
+        """Get a feature, computing it if it is not cached.
+
+        Parameters
+        ----------
+        chan : int | string
+            Channel index or name.
+        fcn : function
+            Function computing the feature. It is called with arrays,
+            followed by kwargs.
+        arrays : array_like
+            Data of the channel (they are not part of the key).
+        kwargs : dict | {}
+            Parameters of the feature (values should be hashable).
+
+        Returns
+        -------
+        feature :
+            Output of fcn.
+        """
+        key = self._key(chan, fcn, kwargs)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        logger.debug("Compute %s on channel %s" % (
+            getattr(fcn, '__name__', fcn), chan))
+        feature = fcn(*arrays, **kwargs)
+        self._cache[key] = feature
+        # Forget the least recently used features :
+        nbytes = self.nbytes
+        while (nbytes > self._max_size) and (len(self._cache) > 1):
+            nbytes -= _nbytes(self._cache.popitem(last=False)[1])
+        return feature
+
+    def clear(self, chan=None):
+        """Remove cached features.
+
+        Parameters
+        ----------
+        chan : int | string | None
+            Remove only features of this channel. If None, every feature is
+            removed.
+        """
+        if chan is None:
+            self._cache.clear()
+        else:
+            for key in [k for k in self._cache.keys() if k[0] == chan]:
+                self._cache.pop(key)
+
+
+class ChannelFeatures(object):
+    """Features of a single channel stored in a FeatureCache.
+
+    Parameters
+    ----------
+    cache : FeatureCache
+        The cache of features.
+    chan : int | string
+        Channel index or name.
+    """
+
+    def __init__(self, cache, chan):
+        """Init."""
+        self.cache, self.chan = cache, chan
+
+    def __repr__(self):
+        """Represent the object."""
+        return "ChannelFeatures(chan=%s)" % str(self.chan)
+
+    def get(self, fcn, *arrays, **kwargs):
+        """Get a feature of the channel (see FeatureCache.get)."""
+        return self.cache.get(self.chan, fcn, *arrays, **kwargs)
+
+    def clear(self):
+        """Remove cached features of the channel."""
+        self.cache.clear(self.chan)
+
+
+def _nbytes(feature):
+    """Get the size of a feature (array or tuple of arrays)."""
+    if isinstance(feature, (tuple, list)):
+        return sum([_nbytes(k) for k in feature])
+    return np.asarray(feature).nbytes if feature is not None else 0
@@ -2,7 +2,205 @@
 
 import numpy as np
 
-__all__ = ('transient', 'sleepstats')
+__all__ = ('RunLengthHypno', 'transient', 'sleepstats')
+
+
+class RunLengthHypno(object):
+    """Run-length encoded hypnogram.
+
+    The hypnogram is stored as a list of runs (onset, duration, stage) rather
+    than one value per sample. It can be indexed like a (n_pts,) array and is
+    only expanded into a per-sample vector when it is converted to an array
+    (e.g np.asarray(hypno)) or when a mask is requested.
+
+    Parameters
+    ----------
+    onsets : array_like
+        Index of the first sample of each run, in increasing order. The first
+        onset must be 0.
+    stages : array_like
+        Stage of each run.
+    n_pts : int
+        Number of samples of the hypnogram.
+    """
+
+    def __init__(self, onsets, stages, n_pts):
+        """Init."""
+        onsets = np.asarray(onsets, dtype=np.int64).ravel()
+        stages = np.asarray(stages).ravel()
+        if len(onsets) != len(stages):
+            raise ValueError("onsets and stages should have the same length.")
+        if len(onsets) and ((onsets[0] != 0) or np.any(np.diff(onsets) < 0)):
+            raise ValueError("onsets should be sorted and start at 0.")
+        self._n = int(n_pts)
+        self._set_runs(onsets, stages)
+
+    @classmethod
+    def from_array(cls, hypno):
+        """Build a run-length hypnogram from a per-sample hypnogram.
+
+        Parameters
+        ----------
+        hypno : array_like
+            Hypnogram of shape (n_pts,).
+
+        Returns
+        -------
+        hypno : RunLengthHypno
+            The run-length encoded hypnogram.
+        """
+        hypno = np.asarray(hypno).ravel()
+        onsets = np.flatnonzero(hypno[1:] != hypno[:-1]) + 1
+        onsets = np.r_[0, onsets] if len(hypno) else onsets
+        return cls(onsets, hypno[onsets], len(hypno))
+
+    def _set_runs(self, onsets, stages):
+        """Set runs, removing empty runs and merging identical stages."""
+        onsets = np.clip(onsets, 0, self._n)
+        keep = np.r_[onsets[1:], self._n] > onsets
+        onsets, stages = onsets[keep], stages[keep]
+        keep = np.r_[True, stages[1:] != stages[:-1]][:len(stages)]
+        self._onsets, self._stages = onsets[keep], stages[keep]
+
+    def __len__(self):
+        """Return the number of samples."""
+        return self._n
+
+    def __repr__(self):
+        """Represent the object."""
+        return "RunLengthHypno(n_pts=%i, n_runs=%i)" % (self._n,
+                                                        self.n_runs)
+
+    def __array__(self, dtype=None):
+        """Expand the hypnogram to one value per sample."""
+        hypno = np.repeat(self._stages, self.durations)
+        return hypno if dtype is None else hypno.astype(dtype, copy=False)
+
+    def _run_index(self, idx):
+        """Get the run containing each sample index."""
+        return np.searchsorted(self._onsets, idx, side='right') - 1
+
+    def __getitem__(self, key):
+        """Get the stage of samples."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._n)
+            idx = np.arange(start, stop, step)
+        else:
+            idx = np.arange(self._n)[key]
+        return self._stages[self._run_index(idx)]
+
+    def __setitem__(self, key, stage):
+        """Set the stage of consecutive samples."""
+        if isinstance(key, (int, np.integer)):
+            key = np.arange(self._n)[key]
+            key = slice(key, key + 1)
+        if not isinstance(key, slice) or (key.step not in [None, 1]):
+            raise IndexError("Stages can only be set on consecutive samples.")
+        self.set_stage(key.start, key.stop, stage)
+
+    def set_stage(self, start, stop, stage):
+        """Set the stage of the samples [start, stop).
+
+        The runs to edit are found by a binary search. Only the runs
+        arrays are then updated, without expanding the hypnogram.
+
+        Parameters
+        ----------
+        start : int | None
+            Index of the first sample.
+        stop : int | None
+            Index of the last sample (excluded).
+        stage : int | float
+            Stage value.
+        """
+        start, stop, _ = slice(start, stop).indices(self._n)
+        if stop <= start:
+            return
+        i_start, i_stop = self._run_index([start, stop])
+        onsets = [self._onsets[:i_start + 1], [start, stop],
+                  self._onsets[i_stop + 1:]]
+        stages = [self._stages[:i_start + 1], [stage, self._stages[i_stop]],
+                  self._stages[i_stop + 1:]]
+        self._set_runs(np.concatenate(onsets),
+                       np.concatenate(stages).astype(self._stages.dtype))
+
+    def mask(self, stage):
+        """Get the per-sample mask of one or several stages.
+
+        Parameters
+        ----------
+        stage : int | float | list
+            Stage(s) to find.
+
+        Returns
+        -------
+        mask : array_like
+            Boolean array of shape (n_pts,).
+        """
+        return np.repeat(np.isin(self._stages, stage), self.durations)
+
+    def decimate(self, step):
+        """Keep one sample over step (i.e hypno[::step]).
+
+        Parameters
+        ----------
+        step : int
+            Decimation factor.
+
+        Returns
+        -------
+        hypno : RunLengthHypno
+            The decimated hypnogram.
+        """
+        step = int(step)
+        return RunLengthHypno(-(-self._onsets // step), self._stages,
+                              -(-self._n // step))
+
+    def oversample(self, n):
+        """Oversample the hypnogram (see visbrain.io.oversample_hypno).
+
+        Parameters
+        ----------
+        n : int
+            The destination length.
+
+        Returns
+        -------
+        hypno : RunLengthHypno
+            The hypnogram of length n.
+        """
+        rep_nb = int(np.round(n / self._n))
+        return RunLengthHypno(self._onsets * rep_nb, self._stages, n)
+
+    def copy(self):
+        """Get a copy of the hypnogram."""
+        return RunLengthHypno(self._onsets.copy(), self._stages.copy(),
+                              self._n)
+
+    @property
+    def onsets(self):
+        """Get the index of the first sample of each run."""
+        return self._onsets
+
+    @property
+    def ends(self):
+        """Get the index of the last sample (excluded) of each run."""
+        return np.r_[self._onsets[1:], self._n]
+
+    @property
+    def durations(self):
+        """Get the number of samples of each run."""
+        return self.ends - self._onsets
+
+    @property
+    def stages(self):
+        """Get the stage of each run."""
+        return self._stages
+
+    @property
+    def n_runs(self):
+        """Get the number of runs."""
+        return len(self._stages)
 
 
 def transient(data, xvec=None):
@@ -10,7 +208,7 @@ def transient(data, xvec=None):
 
     Parameters
     ----------
-    data : array_like
+    data : array_like | RunLengthHypno
         The hypnogram data.
     xvec : array_like | None
         The time vector to use. If None, np.arange(len(data)) will be used
@@ -26,12 +224,12 @@ def transient(data, xvec=None):
     stages : array_like
         The stages for each segment.
     """
-    # Transient detection :
-    t = list(np.nonzero(np.abs(data[:-1] - data[1:]))[0])
-    # Add first and last points :
-    idx = np.vstack((np.array([-1] + t) + 1, np.array(t + [len(data) - 1]))).T
-    # Get stages :
-    stages = data[idx[:, 0]]
+    if not isinstance(data, RunLengthHypno):
+        data = RunLengthHypno.from_array(data)
+    # Transients are the last sample of each run (except the last one) :
+    t = list(data.ends[:-1] - 1)
+    idx = np.c_[data.onsets, data.ends - 1]
+    stages = data.stages
     # Convert (if needed) :
     if (xvec is not None) and (len(xvec) == len(data)):
         st = idx.copy().astype(float)
@@ -74,7 +272,7 @@ def sleepstats(hypno, sf_hyp):
 
     Parameters
     ----------
-    hypno : array_like
+    hypno : array_like | RunLengthHypno
         Hypnogram vector
     sf_hyp : float
         The sampling frequency of the hypnogram
@@ -88,31 +286,31 @@ def sleepstats(hypno, sf_hyp):
     tov = np.nan
 
     # Downsample to 1 value per second
-    hypno = hypno[::int(sf_hyp)]
+    if not isinstance(hypno, RunLengthHypno):
+        hypno = RunLengthHypno.from_array(hypno)
+    hypno = hypno.decimate(int(sf_hyp))
+    onsets, ends, stages = hypno.onsets, hypno.ends, hypno.stages
+    durations = ends - onsets
 
     stats['TIB'] = len(hypno)
-    stats['TDT'] = np.where(hypno != 0)[0].max() if np.nonzero(
-        hypno)[0].size else tov
+    stats['TDT'] = ends[stages != 0][-1] - 1 if np.any(stages != 0) else tov
 
     # Duration of each sleep stages
-    stats['Art'] = hypno[hypno == -1].size
-    stats['W'] = hypno[hypno == 0].size
-    stats['N1'] = hypno[hypno == 1].size
-    stats['N2'] = hypno[hypno == 2].size
-    stats['N3'] = hypno[hypno == 3].size
-    stats['REM'] = hypno[hypno == 4].size
+    for name, k in zip(['Art', 'W', 'N1', 'N2', 'N3', 'REM'], range(-1, 5)):
+        stats[name] = durations[stages == k].sum()
 
     # Sleep stage latencies
-    stats['LatN1'] = np.where(hypno == 1)[0].min() if 1 in hypno else tov
-    stats['LatN2'] = np.where(hypno == 2)[0].min() if 2 in hypno else tov
-    stats['LatN3'] = np.where(hypno == 3)[0].min() if 3 in hypno else tov
-    stats['LatREM'] = np.where(hypno == 4)[0].min() if 4 in hypno else tov
+    for name, k in zip(['LatN1', 'LatN2', 'LatN3', 'LatREM'], range(1, 5)):
+        stats[name] = onsets[stages == k][0] if k in stages else tov
 
     if not np.isnan(stats['LatN1']) and not np.isnan(stats['TDT']):
-        hypno_s = hypno[stats['LatN1']:stats['TDT']]
+        start, stop = stats['LatN1'], stats['TDT']
+        # Number of samples of each run inside [LatN1, TDT) :
+        n_in = np.minimum(ends, stop) - np.maximum(onsets, start)
+        n_in = np.clip(n_in, 0, None)
 
-        stats['SPT'] = hypno_s.size
-        stats['WASO'] = hypno_s[hypno_s == 0].size
+        stats['SPT'] = max(stop - start, 0)
+        stats['WASO'] = n_in[stages == 0].sum()
         stats['TST'] = stats['SPT'] - stats['WASO']
     else:
         stats['SPT'] = tov
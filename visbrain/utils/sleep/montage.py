@@ -0,0 +1,288 @@
+"""Montages applied on the fly to the displayed, detected or exported data.
+
+- Montage : channel-mixing (sparse) operator of a re-referencing method
+- MontageData : array-like view of data seen through a montage
+"""
+import logging
+
+import numpy as np
+from scipy.sparse import csr_matrix, identity
+
+from ..physio import rereferencing, bipolarization, commonaverage
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('Montage', 'MontageData')
+
+# Maximum number of samples (all channels included) read at once :
+CHUNK_SIZE = 2 ** 22
+
+
+class Montage(object):
+    """Channel-mixing operator of a montage.
+
+    A montage is a linear combination of the raw channels. It is stored as a
+    sparse (n_channels, n_channels) matrix and only applied to the windows
+    that are read (see MontageData), so that the raw data are never copied
+    nor modified. Use the class methods to build montages matching the
+    rereferencing, commonaverage and bipolarization functions.
+
+    Parameters
+    ----------
+    operator : array_like
+        Matrix of shape (n_channels, n_channels). The ith channel of the
+        montage is operator[i, :].dot(data).
+    channels : list
+        List of channel names of the montage.
+    consider : array_like | None
+        Boolean vector of channels that have to be considered during the
+        plotting process. If None, all channels are considered.
+    name : string | 'raw'
+        Name of the montage.
+    """
+
+    def __init__(self, operator, channels, consider=None, name='raw'):
+        """Init."""
+        self._op = csr_matrix(operator, dtype=np.float64)
+        n_chan = self._op.shape[0]
+        if self._op.shape != (n_chan, n_chan) or len(channels) != n_chan:
+            raise ValueError("The operator should be a (n_channels, "
+                             "n_channels) matrix and channels a list of "
+                             "length n_channels.")
+        self.channels = list(channels)
+        if consider is None:
+            consider = np.ones((n_chan,), dtype=bool)
+        self.consider = np.asarray(consider, dtype=bool)
+        self.name = name
+        self.is_identity = (self._op != identity(n_chan)).nnz == 0
+
+    def __repr__(self):
+        """Represent the object."""
+        return "Montage(name='%s', n_channels=%i)" % (self.name, len(self))
+
+    def __len__(self):
+        """Return the number of channels."""
+        return self._op.shape[0]
+
+    def __call__(self, data):
+        """Apply the montage to data of shape (n_channels, n_points).
+
+        Returns
+        -------
+        data : MontageData
+            Array-like view of the data through the montage.
+        """
+        return MontageData(data, self)
+
+    @staticmethod
+    def _from_physio(fcn, channels, *args):
+        """Build the operator of a re-referencing function.
+
+        The function is applied to the identity matrix so that the operator
+        exactly reproduces its (in place) combinations of channels.
+        """
+        n_chan = len(channels)
+        op, chans, consider = fcn(np.eye(n_chan), list(channels), *args)
+        return op, chans, consider
+
+    @classmethod
+    def raw(cls, channels):
+        """Montage leaving data untouched.
+
+        Parameters
+        ----------
+        channels : list
+            List of channel names.
+        """
+        return cls(identity(len(channels)), channels)
+
+    @classmethod
+    def reference(cls, channels, reference, to_ignore=None):
+        """Montage using a single channel as reference (see rereferencing).
+
+        Parameters
+        ----------
+        channels : list
+            List of channel names.
+        reference : int
+            The index of the channel to consider as a reference.
+        to_ignore : list | None
+            List of channels to ignore in the re-referencing.
+        """
+        op, chans, consider = cls._from_physio(rereferencing, channels,
+                                               reference, to_ignore)
+        return cls(op, chans, consider, name='reference')
+
+    @classmethod
+    def average(cls, channels, to_ignore=None):
+        """Common average montage (see commonaverage).
+
+        Parameters
+        ----------
+        channels : list
+            List of channel names.
+        to_ignore : list | None
+            List of channels to ignore in the re-referencing.
+        """
+        op, chans, consider = cls._from_physio(commonaverage, channels,
+                                               to_ignore)
+        return cls(op, chans, consider, name='average')
+
+    @classmethod
+    def bipolar(cls, channels, to_ignore=None):
+        """Bipolar montage (see bipolarization).
+
+        Parameters
+        ----------
+        channels : list
+            List of channel names.
+        to_ignore : list | None
+            List of channels to ignore in the bipolarization.
+        """
+        op, chans, consider = cls._from_physio(bipolarization, channels,
+                                               to_ignore)
+        return cls(op, chans, consider, name='bipolar')
+
+    @property
+    def operator(self):
+        """Get the sparse operator of shape (n_channels, n_channels)."""
+        return self._op
+
+
+class MontageData(object):
+    """Array-like view of data seen through a montage.
+
+    This object mimics a (n_channels, n_points) array. Indexing it only
+    reads the raw channels involved in the requested rows, over the
+    requested time points, and combines them using the operator of the
+    montage. Several montages of the same data can then be kept at the cost
+    of their (n_channels, n_channels) sparse operators.
+
+    Parameters
+    ----------
+    data : array_like
+        Raw data of shape (n_channels, n_points). It can also be a
+        LazySleepData.
+    montage : Montage
+        The montage to apply.
+    """
+
+    def __init__(self, data, montage):
+        """Init."""
+        if len(montage) != data.shape[0]:
+            raise ValueError("The montage has %i channels while data have "
+                             "%i channels" % (len(montage), data.shape[0]))
+        self._data, self.montage = data, montage
+        is_float = np.issubdtype(data.dtype, np.floating)
+        self._dtype = np.dtype(data.dtype if is_float else np.float64)
+
+    def __repr__(self):
+        """Represent the object."""
+        return "MontageData(montage='%s', n_channels=%i, n_points=%i)" % (
+            (self.montage.name,) + self.shape)
+
+    def __len__(self):
+        """Return the number of channels."""
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        """Load the full dataset through the montage."""
+        data = self[:, :]
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        """Read a window of data through the montage."""
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = tuple(slice(None) if k is Ellipsis else k for k in key)
+        if len(key) == 1:
+            key += (slice(None),)
+        if len(key) != 2:
+            raise IndexError("Too many indices for a 2D array.")
+        rows, cols = key
+        # ---------- CHANNELS ----------
+        idx = np.arange(self.shape[0])[rows]
+        squeeze_rows = np.ndim(idx) == 0
+        idx = np.atleast_1d(idx)
+        if self.montage.is_identity:
+            op, needed = None, idx
+        else:
+            # Only read raw channels used by the requested rows :
+            op = self.montage.operator[idx, :]
+            needed = np.unique(op.indices)
+            op = op[:, needed]
+        # ---------- TIME ----------
+        squeeze_cols = isinstance(cols, (int, np.integer))
+        if not isinstance(cols, slice):
+            cols = np.atleast_1d(np.arange(self.shape[1])[cols])
+        if isinstance(self._data, np.ndarray) and not isinstance(cols,
+                                                                 slice):
+            raw = self._data[np.ix_(needed, cols)]
+        else:
+            raw = self._data[needed, cols]
+        raw = np.asarray(raw)
+        data = np.asarray(raw if op is None else op.dot(raw),
+                          dtype=self._dtype)
+        # ---------- SHAPE ----------
+        if squeeze_cols:
+            data = data[:, 0]
+        return data[0, ...] if squeeze_rows else data
+
+    ###########################################################################
+    # REDUCTIONS
+    ###########################################################################
+    def _reduce(self, fcn, axis):
+        """Apply a reduction chunk by chunk along the time axis."""
+        if axis not in [1, -1]:
+            raise ValueError("Reductions of montages are only supported "
+                             "along the time axis (axis=1).")
+        n_cols = max(int(CHUNK_SIZE // max(len(self), 1)), 1)
+        return [fcn(self[:, k:k + n_cols]) for k in range(
+            0, self.shape[1], n_cols)]
+
+    def min(self, axis=1):
+        """Minimum of each channel."""
+        return np.min(self._reduce(lambda x: x.min(1), axis), axis=0)
+
+    def max(self, axis=1):
+        """Maximum of each channel."""
+        return np.max(self._reduce(lambda x: x.max(1), axis), axis=0)
+
+    def mean(self, axis=1):
+        """Mean of each channel."""
+        sums = self._reduce(lambda x: x.sum(1, dtype=np.float64), axis)
+        return (np.sum(sums, axis=0) / self.shape[1]).astype(self.dtype)
+
+    def std(self, axis=1):
+        """Standard deviation of each channel."""
+        mean = self.mean(axis).astype(np.float64)[:, np.newaxis]
+        sq = self._reduce(lambda x: ((x - mean) ** 2).sum(1), axis)
+        return np.sqrt(np.sum(sq, axis=0) / self.shape[1]).astype(self.dtype)
+
+    ###########################################################################
+    # PROPERTIES
+    ###########################################################################
+    @property
+    def base(self):
+        """Get the raw data."""
+        return self._data
+
+    @property
+    def shape(self):
+        """Get the (n_channels, n_points) shape of data."""
+        return tuple(self._data.shape)
+
+    @property
+    def ndim(self):
+        """Get the number of dimensions."""
+        return 2
+
+    @property
+    def dtype(self):
+        """Get the data type."""
+        return self._dtype
+
+    @property
+    def size(self):
+        """Get the number of elements."""
+        return self.shape[0] * self.shape[1]
@@ -0,0 +1,135 @@
+"""Prepare windows adjacent to the displayed one in the background.
+
+- WindowPrefetcher : compute and cache windows in a background thread
+"""
+import logging
+
+from ..background import BackgroundCache
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('WindowPrefetcher',)
+
+
+def _log_failure(key, e):
+    """Log a window that could not be prepared in the background."""
+    logger.debug("Prefetching failed (%s)" % e)
+
+
+class WindowPrefetcher(object):
+    """Compute and cache windows in a background thread.
+
+    While the user looks at a window, the next and previous ones are
+    prepared by a worker thread (see prefetch), so that moving to them only
+    requires to pick the prepared window from the cache (see get).
+
+    Parameters
+    ----------
+    fcn : function
+        Function preparing a window. It is called with the inputs sent to
+        get or prefetch and should be thread safe.
+    depth : int | 1
+        Number of windows prepared on each side of the current one (0
+        disables the prefetching).
+    max_size : int | None
+        Maximum number of windows in the cache. If None, 4 * depth + 2
+        windows are kept.
+    """
+
+    def __init__(self, fcn, depth=1, max_size=None):
+        """Init."""
+        self._fcn, self.depth = fcn, int(depth)
+        max_size = 4 * self.depth + 2 if max_size is None else max_size
+        self._jobs = BackgroundCache(max_size, on_error=_log_failure)
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        """Return the number of cached windows."""
+        return len(self._jobs)
+
+    def __repr__(self):
+        """Represent the object."""
+        return "WindowPrefetcher(depth=%i, hits=%i, misses=%i)" % (
+            self.depth, self.hits, self.misses)
+
+    @property
+    def hit_rate(self):
+        """Get the proportion of windows found in the cache."""
+        n = self.hits + self.misses
+        return self.hits / n if n else 0.
+
+    def stats(self):
+        """Get cache statistics.
+
+        Returns
+        -------
+        stats : dict
+            Dictionary with the number of hits and misses, the hit rate and
+            the number of cached and pending windows.
+        """
+        return dict(hits=self.hits, misses=self.misses,
+                    hit_rate=self.hit_rate, cached=len(self._jobs),
+                    pending=len(self._jobs.pending))
+
+    def get(self, key, *args):
+        """Get a window, computing it if it is not prepared yet.
+
+        A window that is being prepared in the background is waited for,
+        while a window that is still queued is computed immediately.
+
+        Parameters
+        ----------
+        key : tuple
+            Key of the window (hashable).
+        args : tuple
+            Inputs sent to fcn.
+
+        Returns
+        -------
+        window :
+            Output of fcn.
+        """
+        window = self._jobs.fetch(key)
+        if window is not None:
+            self.hits += 1
+            return window
+        self.misses += 1
+        window = self._fcn(*args)
+        self._jobs.put(key, window)
+        return window
+
+    def prefetch(self, windows, wait_jobs=False):
+        """Prepare windows in the background.
+
+        Pending windows that are not requested anymore are cancelled.
+
+        Parameters
+        ----------
+        windows : list
+            List of (key, args) tuples, by decreasing priority.
+        wait_jobs : bool | False
+            Wait for the windows to be prepared.
+        """
+        if not self.depth:
+            return
+        self._jobs.collect()
+        keys = [k for k, _ in windows]
+        self._jobs.cancel([k for k in self._jobs.pending if k not in keys])
+        for key, args in windows:
+            self._jobs.submit(key, self._fcn, *args)
+        if wait_jobs:
+            self._jobs.wait()
+
+    def clear(self):
+        """Cancel pending windows and empty the cache."""
+        self._jobs.clear()
+
+    def shutdown(self, wait=True):
+        """Cancel pending windows and shutdown the background thread.
+
+        Parameters
+        ----------
+        wait : bool | True
+            Wait for the running window to finish.
+        """
+        self._jobs.shutdown(wait=wait)
@@ -0,0 +1,215 @@
+"""Compute the spectrograms of every channel in the background.
+
+- compute_spectrogram : compute the image of the spectrogram of a channel
+- SpectrogramPool : compute and cache spectrograms in a pool of threads
+"""
+import logging
+
+import numpy as np
+from scipy.signal import spectrogram
+
+from ..background import BackgroundCache
+from ..filtering import morlet_bank
+from ..sigproc import averaging, normalization
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('compute_spectrogram', 'SpectrogramPool')
+
+# Maximum number of time points of wavelet images (large images can cause GL
+# bugs) :
+N_LIMITS = 4000
+
+
+def compute_spectrogram(data, sf, method='Fourier transform', nfft=30.,
+                        overlap=0., fstart=.5, fend=20., norm=0):
+    """Compute the image of the spectrogram of a channel.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of a single channel of shape (n_pts,).
+    sf : float
+        The sampling frequency.
+    method : {'Fourier transform', 'Wavelet', 'Multitaper'}
+        Computation method.
+    nfft : float | 30.
+        Number of fft points for the spectrogram (in seconds).
+    overlap : float | 0.
+        Ovelap proprotion (0 <= overlap <1).
+    fstart : float | .5
+        Frequency from which the spectrogram have to start.
+    fend : float | 20.
+        Frequency from which the spectrogram have to finish.
+    norm : int | 0
+        Normalization method for the wavelet time-frequency map.
+
+    Returns
+    -------
+    image : array_like
+        Image of shape (n_freqs, n_times) (power in dB for the Fourier
+        transform and multitaper methods).
+    freq : array_like
+        Frequency vector of shape (n_freqs,).
+    """
+    data = np.asarray(data)
+    nperseg = int(round(nfft * sf))
+    if method == 'Wavelet':
+        freq = np.arange(fstart, fend, 1.)
+        image = morlet_bank(data, sf, freq, get='power', dtype=data.dtype)
+        normalization(image, norm=norm, axis=1)
+        image = averaging(image, nperseg, axis=1, overlap=overlap,
+                          window='hamming')
+        if image.shape[1] > N_LIMITS:
+            image = image[:, ::int(np.round(image.shape[1] / N_LIMITS))]
+        return image, freq
+    noverlap = int(round(overlap * nperseg))
+    if method == 'Multitaper':
+        from visbrain.io import is_lspopt_installed
+        is_lspopt_installed(raise_error=True)
+        from lspopt import spectrogram_lspopt
+        freq, _, mesh = spectrogram_lspopt(data, fs=sf, nperseg=nperseg,
+                                           c_parameter=20, noverlap=noverlap)
+    elif method == 'Fourier transform':
+        freq, _, mesh = spectrogram(data, fs=sf, nperseg=nperseg,
+                                    noverlap=noverlap, window='hamming')
+    else:
+        raise ValueError("method should either be 'Fourier transform', "
+                         "'Wavelet' or 'Multitaper'")
+    with np.errstate(divide='ignore'):
+        mesh = 20 * np.log10(mesh)
+    # Find where freq is [fstart, fend] :
+    f = [0., 0.]
+    f[0] = np.abs(freq - fstart).argmin() if fstart else 0
+    f[1] = np.abs(freq - fend).argmin() if fend else len(freq)
+    sls = slice(f[0], f[1] + 1)
+    image, freq = mesh[sls, :], freq[sls]
+    # Replace -inf (null power) :
+    is_finite = np.isfinite(image)
+    image[~is_finite] = np.percentile(image[is_finite], 5)
+    return image, freq
+
+
+def _spectro_channel(data, chan, sf, kwargs):
+    """Compute the spectrogram of a channel (inside a thread)."""
+    return compute_spectrogram(np.asarray(data[chan, ...]), sf, **kwargs)
+
+
+def _log_failure(key, e):
+    """Log a spectrogram that failed in the background."""
+    logger.error("Spectrogram of channel %i failed (%s)" % (key[0], e))
+
+
+class SpectrogramPool(object):
+    """Compute and cache spectrograms in a pool of threads.
+
+    Spectrograms are kept in a least recently used cache, keyed by channel
+    and spectrogram parameters, so that switching between channels (or
+    going back to previous parameters) does not require a new computation.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of shape (n_channels, n_pts). It can also be a LazySleepData.
+    sf : float
+        The sampling frequency.
+    n_jobs : int | 1
+        Number of threads.
+    max_size : int | 64
+        Maximum number of spectrograms in the cache.
+    """
+
+    def __init__(self, data, sf, n_jobs=1, max_size=64):
+        """Init."""
+        self._data, self._sf = data, sf
+        self._jobs = BackgroundCache(max_size, n_jobs=n_jobs,
+                                     on_error=_log_failure)
+        self._n_submitted = 0
+
+    def __len__(self):
+        """Return the number of pending spectrograms."""
+        return len(self._jobs.pending)
+
+    @staticmethod
+    def _key(chan, kwargs):
+        """Get the cache key of a spectrogram."""
+        return (int(chan),) + tuple(sorted(kwargs.items()))
+
+    def submit(self, chans, **kwargs):
+        """Compute spectrograms in the background (one task per channel).
+
+        Parameters
+        ----------
+        chans : array_like
+            Indices of the channels.
+        kwargs : dict | {}
+            Spectrogram parameters (see compute_spectrogram).
+        """
+        if not len(self):
+            self._n_submitted = 0
+        for k in chans:
+            self._n_submitted += self._jobs.submit(
+                self._key(k, kwargs), _spectro_channel, self._data, int(k),
+                self._sf, kwargs)
+
+    def poll(self):
+        """Move finished spectrograms into the cache, without blocking.
+
+        Returns
+        -------
+        finished : list
+            List of channels of the spectrograms finished since the last
+            call.
+        """
+        return [k[0] for k in self._jobs.collect()]
+
+    def get(self, chan, wait=False, **kwargs):
+        """Get the spectrogram of a channel.
+
+        Parameters
+        ----------
+        chan : int
+            Index of the channel.
+        wait : bool | False
+            If the spectrogram is not cached, compute it in the calling
+            thread (or wait for it if it is already being computed). If the
+            background computation failed, it is computed again in the
+            calling thread, which raises the error if it fails again.
+        kwargs : dict | {}
+            Spectrogram parameters (see compute_spectrogram).
+
+        Returns
+        -------
+        spectrogram : tuple | None
+            The (image, freq) spectrogram or None if it is not computed yet.
+        """
+        key = self._key(chan, kwargs)
+        self.poll()
+        if not wait:
+            return self._jobs.get(key)
+        image = self._jobs.fetch(key)
+        if image is None:  # not submitted, cancelled or failed
+            image = _spectro_channel(self._data, int(chan), self._sf, kwargs)
+            self._jobs.put(key, image)
+        return image
+
+    def cancel(self):
+        """Cancel spectrograms that are not computed yet."""
+        self._jobs.cancel()
+
+    @property
+    def progress(self):
+        """Get the proportion of finished spectrograms (between 0 and 1)."""
+        if not self._n_submitted:
+            return 1.
+        return 1. - len(self) / self._n_submitted
+
+    def shutdown(self, wait=True):
+        """Cancel pending spectrograms and shutdown the pool of threads.
+
+        Parameters
+        ----------
+        wait : bool | True
+            Wait for running spectrograms to finish.
+        """
+        self._jobs.shutdown(wait=wait)
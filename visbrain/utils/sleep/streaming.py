@@ -0,0 +1,377 @@
+"""Process long channels by overlapping chunks, with bounded memory.
+
+- ChunkPlan : split a channel into overlapping chunks that fit in memory
+- RunningStats : mean, deviation and quantiles of a signal computed by chunks
+- EventCollector : stitch events found in successive chunks
+- stream_ptp : peak-to-peak amplitude of events, read chunk by chunk
+- stream_welch : power spectral density of a channel, read chunk by chunk
+"""
+import numpy as np
+from scipy.signal import welch, sosfilt
+
+from ..filtering import _filter_design
+from .event import IntervalSet
+
+__all__ = ('ChunkPlan', 'RunningStats', 'EventCollector', 'stream_ptp',
+           'stream_welch')
+
+# Maximum number of samples used to compute quantiles by chunks :
+QUANTILE_SAMPLES = 2 ** 20
+
+
+def _filter_halo(sf, f, order=3, btype='bandpass', method='butterworth',
+                 tol=1e-7):
+    """Get the number of samples after which a filter response vanishes.
+
+    Parameters
+    ----------
+    sf : float
+        The sampling frequency.
+    f : array_like
+        Frequency vector (2,).
+    order : int | 3
+        The filter order.
+    btype : {'bandpass', 'bandstop', 'highpass', 'lowpass'}
+        The filter type.
+    method : {'butterworth', 'bessel'}
+        Filter type to use.
+    tol : float | 1e-7
+        Relative amplitude of the impulse response below which it is
+        considered as null.
+
+    Returns
+    -------
+    halo : int
+        Length of the impulse response (in samples).
+    """
+    sos = _filter_design(float(sf), tuple(np.ravel(f).astype(float)),
+                         int(order), method, btype).copy()
+    n = int(sf)
+    while True:
+        impulse = np.zeros((n,))
+        impulse[0] = 1.
+        resp = np.abs(sosfilt(sos, impulse))
+        above = np.flatnonzero(resp > tol * resp.max())
+        if above[-1] < n // 2:
+            return int(above[-1]) + 1
+        n *= 2
+
+
+def _smoothing_halo(n_window):
+    """Get the number of samples needed on each side of a smoothing."""
+    return int(n_window) + 1
+
+
+def _morlet_halo(sf, f, width=7.):
+    """Get the number of samples needed on each side of a Morlet's wavelet.
+
+    Parameters
+    ----------
+    sf : float
+        The sampling frequency.
+    f : float
+        Lowest central frequency of the wavelets.
+    width : float | 7.
+        Width of the wavelets.
+    """
+    return int(np.ceil(width ** 2 / (4 * np.pi * f) * sf)) + 1
+
+
+class ChunkPlan(object):
+    """Split a channel into overlapping chunks that fit in memory.
+
+    Each chunk is made of a core, which tiles the channel, extended by a
+    halo on both sides. Quantities computed on a chunk are only kept on its
+    core, so that the halo absorbs edge effects of filters and smoothing
+    windows.
+
+    Parameters
+    ----------
+    n_pts : int
+        Number of time points of the channel.
+    halo : int
+        Number of samples added on each side of the core of chunks.
+    max_memory : int | None
+        Memory budget (in bytes). If None, the channel is processed at once.
+    bytes_per_sample : int | 256
+        Memory used by the processing of a single sample.
+    features : ChannelFeatures | None
+        Cache of features of the channel, used when the channel is processed
+        at once (see visbrain.utils.sleep.features).
+    """
+
+    def __init__(self, n_pts, halo, max_memory=None, bytes_per_sample=256,
+                 features=None):
+        """Init."""
+        self.n_pts, self.halo = int(n_pts), int(halo)
+        self._features = features
+        if max_memory is None:
+            self.size = self.n_pts
+        else:
+            n_max = int(max_memory // bytes_per_sample)
+            if n_max <= 3 * self.halo:
+                raise ValueError("max_memory is too small : at least %i "
+                                 "bytes are required to process chunks of "
+                                 "this channel." % (
+                                     3 * self.halo * bytes_per_sample + 1))
+            self.size = max(min(n_max - 2 * self.halo, self.n_pts), 1)
+        self._cache = {}
+
+    def __len__(self):
+        """Return the number of chunks."""
+        return int(np.ceil(self.n_pts / self.size)) if self.n_pts else 0
+
+    def __iter__(self):
+        """Iterate over chunks.
+
+        Yields
+        ------
+        sl : slice
+            Samples of the chunk (core and halo).
+        core : slice
+            Samples of the core, relative to the beginning of the chunk.
+        start : int
+            First sample of the core.
+        """
+        for start in range(0, self.n_pts, self.size):
+            stop = min(start + self.size, self.n_pts)
+            lo = max(start - self.halo, 0)
+            hi = min(stop + self.halo, self.n_pts)
+            yield slice(lo, hi), slice(start - lo, stop - lo), start
+
+    @property
+    def single(self):
+        """Get if the channel is processed at once."""
+        return len(self) <= 1
+
+    def map(self, fcn, *arrays, **kwargs):
+        """Apply a function on each chunk.
+
+        When the channel is processed at once, outputs are cached (per
+        function, arrays and kwargs, or in the cache of features of the
+        channel) so that successive passes over the channel do not compute
+        them again.
+
+        Parameters
+        ----------
+        fcn : function
+            Function called with the chunk of each array, followed by kwargs.
+        arrays : array_like
+            Arrays of shape (n_pts,) to split into chunks. None is sent as is
+            (e.g. no hypnogram).
+        kwargs : dict | {}
+            Additional inputs of fcn.
+
+        Yields
+        ------
+        out : tuple
+            Output of fcn for the chunk.
+        sl, core, start :
+            Chunk bounds (see __iter__).
+        """
+        # Arrays are kept with outputs, hence their id can't be reused :
+        key = (fcn,) + tuple(id(k) for k in arrays) + tuple(sorted(
+            kwargs.items()))
+        for sl, core, start in self:
+            chunks = [None if k is None else np.asarray(k[sl])
+                      for k in arrays]
+            if self.single and (key in self._cache):
+                out = self._cache[key][1]
+            elif self.single and (self._features is not None):
+                out = self._features.get(fcn, *chunks, **kwargs)
+            else:
+                out = fcn(*chunks, **kwargs)
+            if self.single:
+                self._cache[key] = (arrays, out)
+            yield out, sl, core, start
+
+    def stats(self):
+        """Get running statistics of a signal of the channel.
+
+        Quantiles are exact when the channel is processed at once (see
+        RunningStats).
+        """
+        return RunningStats(self.n_pts, None if self.single else
+                            QUANTILE_SAMPLES)
+
+
+class RunningStats(object):
+    """Mean, deviation and quantiles of a signal computed by chunks.
+
+    Mean and standard deviation ignore NaN values and are combined across
+    chunks exactly. Quantiles are computed on evenly spaced samples of the
+    signal (every sample if the signal has less than max_samples points).
+
+    Parameters
+    ----------
+    n_pts : int
+        Number of time points of the whole signal.
+    max_samples : int | None
+        Maximum number of samples kept for quantiles. If None, every sample
+        is kept.
+    """
+
+    def __init__(self, n_pts, max_samples=QUANTILE_SAMPLES):
+        """Init."""
+        self._count, self._mean, self._m2 = 0, 0., 0.
+        self._step, self._copy = 1, max_samples is not None
+        if self._copy:
+            self._step = max(int(np.ceil(n_pts / max_samples)), 1)
+        self._samples = []
+
+    def update(self, x, start=0):
+        """Add a chunk of the signal.
+
+        Parameters
+        ----------
+        x : array_like
+            Chunk of the signal.
+        start : int | 0
+            Position of the first sample of the chunk in the signal.
+        """
+        x = np.asarray(x)
+        # Samples are copied so that chunks can be released :
+        samples = x[(-start) % self._step::self._step]
+        self._samples.append(samples.copy() if self._copy else samples)
+        n = x.size - np.count_nonzero(np.isnan(x))
+        if not n:
+            return
+        mean, m2 = np.nanmean(x), np.nanvar(x) * n
+        if not self._count:
+            self._count, self._mean, self._m2 = n, mean, m2
+            return
+        # Combine with previous chunks (Chan et al.) :
+        count = self._count + n
+        delta = mean - self._mean
+        self._mean += delta * n / count
+        self._m2 += m2 + delta ** 2 * self._count * n / count
+        self._count = count
+
+    @property
+    def mean(self):
+        """Get the mean of non-NaN values."""
+        return self._mean if self._count else np.nan
+
+    @property
+    def std(self):
+        """Get the standard deviation of non-NaN values."""
+        return np.sqrt(self._m2 / self._count) if self._count else np.nan
+
+    def percentile(self, q):
+        """Get the q-th percentile of the signal (see np.percentile)."""
+        return np.percentile(np.concatenate(self._samples), q)
+
+
+class EventCollector(object):
+    """Stitch events found in successive chunks.
+
+    Events that touch the boundary between two cores are merged.
+    """
+
+    def __init__(self):
+        """Init."""
+        self._starts, self._stops = [], []
+
+    def add(self, mask, start=0):
+        """Add events of a chunk.
+
+        Parameters
+        ----------
+        mask : array_like
+            Boolean vector of the core of the chunk.
+        start : int | 0
+            Position of the first sample of the core.
+        """
+        events = IntervalSet.from_mask(mask)
+        self._starts.append(events.starts + start)
+        self._stops.append(events.stops + start)
+
+    def events(self):
+        """Get the stitched events.
+
+        Returns
+        -------
+        events : IntervalSet
+            Events of the whole channel.
+        """
+        if not self._starts:
+            return IntervalSet()
+        return IntervalSet(np.concatenate(self._starts),
+                           np.concatenate(self._stops))
+
+
+def stream_ptp(events, data, plan):
+    """Get the peak-to-peak amplitude of events, reading data by chunks.
+
+    Parameters
+    ----------
+    events : IntervalSet
+        Events.
+    data : array_like
+        Data vector of shape (n_pts,).
+    plan : ChunkPlan
+        Chunks used to read data (halos are not read).
+
+    Returns
+    -------
+    amp : array_like
+        Peak-to-peak amplitude of each event.
+    """
+    mx = np.full((len(events),), -np.inf)
+    mn = np.full((len(events),), np.inf)
+    starts, stops = events.starts, events.stops
+    for _, _, start in plan:
+        stop = min(start + plan.size, plan.n_pts)
+        first = np.searchsorted(stops, start, side='right')
+        last = np.searchsorted(starts, stop, side='left')
+        if last <= first:
+            continue
+        x = np.asarray(data[start:stop])
+        bounds = np.c_[np.maximum(starts[first:last], start),
+                       np.minimum(stops[first:last], stop)].ravel() - start
+        if bounds[-1] >= len(x):
+            bounds = bounds[:-1]
+        sl = slice(first, last)
+        mx[sl] = np.maximum(mx[sl], np.maximum.reduceat(x, bounds)[0::2])
+        mn[sl] = np.minimum(mn[sl], np.minimum.reduceat(x, bounds)[0::2])
+    return mx - mn
+
+
+def stream_welch(data, sf, plan, nperseg=256):
+    """Get the power spectral density of a channel, reading data by chunks.
+
+    The result is the one of scipy.signal.welch(data, sf) (Hann window of
+    nperseg samples and half overlapping segments).
+
+    Parameters
+    ----------
+    data : array_like
+        Data vector of shape (n_pts,).
+    sf : float
+        The sampling frequency.
+    plan : ChunkPlan
+        Chunks used to read data.
+    nperseg : int | 256
+        Length of each segment.
+
+    Returns
+    -------
+    f : array_like
+        Frequency vector.
+    pxx : array_like
+        Power spectral density.
+    """
+    n_pts, step = plan.n_pts, nperseg // 2
+    if n_pts < 2 * nperseg:
+        return welch(np.asarray(data), sf)
+    # Segments start every step samples. Each chunk computes the segments
+    # starting inside of its core :
+    n_seg = (n_pts - nperseg) // step + 1
+    n_chunk = max(plan.size // step, 1)
+    pxx, f = 0., None
+    for k in range(0, n_seg, n_chunk):
+        n_k = min(n_chunk, n_seg - k)
+        x = np.asarray(data[k * step:(k + n_k - 1) * step + nperseg])
+        f, p = welch(x, sf, nperseg=nperseg)
+        pxx = pxx + p * n_k
+    return f, pxx / n_seg
@@ -3,7 +3,9 @@ import numpy as np
 
 from visbrain.utils.sleep.detection import (kcdetect, spindlesdetect,
                                             remdetect, slowwavedetect,
-                                            mtdetect, peakdetect)
+                                            mtdetect, peakdetect,
+                                            _soft_threshold_bounds)
+from visbrain.utils.sleep.event import IntervalSet
 from visbrain.utils import generate_eeg
 
 """If tests continue to failed, one idea could be to save in a npz file the
@@ -29,6 +31,24 @@ class TestDetections(object):
         """Test function kcdetect."""
         kcdetect(signal, sf, .8, 1., hypno, True, 100, 200, .2, .6)
 
+    def test_soft_threshold_bounds(self):
+        """Test extending events up to the soft threshold crossings."""
+        rnd = np.random.RandomState(0)
+        x = np.convolve(rnd.randn(2000), np.ones(10), 'same')
+        hard = IntervalSet.from_mask(x > 4.)
+        soft = IntervalSet.from_mask(x > 2.)
+        events = _soft_threshold_bounds(hard, soft, len(x))
+        # Crossings searched one event at a time :
+        cross = soft.to_index().ravel()
+        beg, end = [], []
+        for s in hard.starts:
+            d = s - cross
+            beg += [s - d[d > 0].min(initial=s)]
+            end += [s + np.abs(d[d < 0]).min(initial=len(x) - s)]
+        assert len(hard) and (len(events) <= len(hard))
+        np.testing.assert_array_equal(events.to_mask(len(x)),
+                                      IntervalSet(beg, end).to_mask(len(x)))
+
     def test_spindlesdetect(self):
         """Test function spindlesdetect."""
         spindlesdetect(signal, sf, .1, hypno, True)
@@ -52,3 +72,76 @@ class TestDetections(object):
         peakdetect(sf, data, get='min')
         peakdetect(sf, data, get='max')
         peakdetect(sf, data, get='minmax', threshold=.6)
+        # Peaks are found where the signal moves away from the extremum :
+        y = np.sin(2 * np.pi * np.arange(300) / 50.)
+        kw = dict(lookahead=10, delta=.1)
+        p_max = peakdetect(sf, y, get='max', threshold=None, **kw)
+        p_min = peakdetect(sf, y, get='min', threshold=None, **kw)
+        p_thr = peakdetect(sf, y, get='min', threshold=.5, **kw)
+        assert np.array_equal(p_max[:, 0], [17, 67, 117, 167, 217, 267])
+        assert np.array_equal(p_min[:, 0], [42, 92, 142, 192, 242])
+        assert np.array_equal(p_thr[:, 0], [8, 42, 92, 142, 192, 242, 292])
+        minmax = peakdetect(sf, y, get='minmax', threshold=None, **kw)
+        assert np.array_equal(minmax, np.sort(np.r_[p_max, p_min], axis=0))
+        # Multi-channel input :
+        data = generate_eeg(sf=sf, n_pts=2000, n_channels=3,
+                            random_state=0)[0]
+        for get in ['min', 'max', 'minmax']:
+            index = peakdetect(sf, data, lookahead=20, get=get)
+            assert len(index) == 3
+            for k in range(3):
+                np.testing.assert_array_equal(index[k], peakdetect(
+                    sf, data[k, :], lookahead=20, get=get))
+
+    def test_no_event(self):
+        """Test detections without any event or soft threshold crossing."""
+        assert not len(spindlesdetect(signal, sf, 100., hypno, False))
+        assert not len(remdetect(signal, sf, hypno, False, 100.))
+        assert not len(mtdetect(signal, sf, 3., hypno, False))
+        assert not len(kcdetect(signal, sf, .8, 100., hypno, True, 100, 200,
+                                .2, .6))
+        # Spindle starting with the recording (no soft crossing before) :
+        x = np.random.RandomState(0).randn(6000)
+        x[:150] += 20. * np.sin(2 * np.pi * 13. * np.arange(150) / sf)
+        spin = spindlesdetect(x, sf, 2., np.zeros_like(x), False)
+        assert spin[0, 0] == 0
+
+    def test_soft_threshold_merge(self):
+        """Test that events sharing a soft threshold crossing are merged."""
+        x = np.random.RandomState(0).randn(6000)
+        # Spindle with two supra hard threshold periods :
+        env = np.r_[np.full(100, 20.), np.full(80, 6.), np.full(100, 20.)]
+        x[3000:3280] += env * np.sin(2 * np.pi * 13. * np.arange(280) / sf)
+        spin = spindlesdetect(x, sf, 2., np.zeros_like(x), False, tmax=5000)
+        assert spin.shape == (1, 2)
+
+    def test_mtdetect_high_delta(self):
+        """Test that muscle twitches are not found in high delta periods."""
+        n = 12000
+        time = np.arange(n) / sf
+        x = np.random.RandomState(0).randn(n)
+        # High delta power during the first 36 seconds :
+        x[:3600] += 100. * np.sin(2 * np.pi * 1.5 * time[:3600])
+        # Twitches inside and outside of the high delta period :
+        for k in [1200, 2400, 6000, 9000]:
+            x[k:k + 150] += 40. * np.sin(2 * np.pi * 25. * time[:150])
+        mt = mtdetect(x, sf, 2., np.zeros(n), False, min_amp=10.,
+                      max_amp=1e4)
+        np.testing.assert_array_equal(mt[:, 0], [6000, 9000])
+
+    def test_kcdetect_spindles(self):
+        """Test the spindles criterion of kcdetect."""
+        # No spindle found :
+        kc = kcdetect(signal, sf, .8, 1., hypno, True, 100, 200, .2, .6,
+                      spindles_thresh=100.)
+        assert isinstance(kc, np.ndarray)
+
+    def test_slowwavedetect_amplitude(self):
+        """Test that the amplitude of slow waves includes the last sample."""
+        n = 6000
+        x = np.random.RandomState(0).randn(n)
+        x[3000:] += 100. * np.sin(np.pi * np.arange(3000) / sf - np.pi / 2.)
+        # The event ends with the recording, on its maximum :
+        x[-1] += 400.
+        sw = slowwavedetect(x, sf, .3, min_amp=250., max_amp=1000.)
+        np.testing.assert_array_equal(sw, [[5515, n - 1]])
@@ -0,0 +1,76 @@
+"""Test functions in detection_pool.py."""
+import numpy as np
+
+from visbrain.utils.sleep.detection_pool import (apply_detection,
+                                                 check_detection_index,
+                                                 DetectionPool)
+from visbrain.utils import generate_eeg
+
+sf, n_pts = 100., 10014
+data = generate_eeg(sf=sf, n_pts=n_pts, n_channels=4, random_state=1)[0]
+data = data.astype(np.float32)
+time = np.arange(n_pts) / sf
+hypno = np.repeat([0, 1, 2, 3, 4, -1], n_pts // 6 + 1)[:n_pts]
+kwargs = {'spindle': dict(threshold=.1, nrem_only=True),
+          'sw': dict(threshold=.5),
+          'peak': dict(lookahead=20, get='minmax')}
+
+
+class TestDetectionPool(object):
+    """Test functions in detection_pool.py."""
+
+    def test_check_detection_index(self):
+        """Test function check_detection_index."""
+        index = np.array([[2, 5], [10, 11]])
+        mask = np.zeros((20,), dtype=bool)
+        mask[2:6] = mask[10:12] = True
+        consecutive = np.r_[2, 3, 4, 5, 10, 11]
+        for idx in [index, mask, consecutive]:
+            assert np.array_equal(check_detection_index(idx, 20), index)
+        assert not check_detection_index([], 20).size
+
+    def test_apply_detection(self):
+        """Test function apply_detection."""
+        for method, kw in kwargs.items():
+            index = apply_detection(method, data[0, :], sf, time, hypno, **kw)
+            assert (index.ndim == 2) or not index.size
+
+    def test_detection_pool(self):
+        """Test that parallel detections match serial ones."""
+        for method, kw in kwargs.items():
+            pool = DetectionPool(data, sf, time, hypno, n_jobs=2)
+            pool.submit(method, [3, 0, 2], **kw)
+            assert len(pool) == 3
+            results = {k: f.result() for k, f in pool}
+            pool.shutdown()
+            assert not len(pool) and (sorted(results.keys()) == [0, 2, 3])
+            for k, index in results.items():
+                serial = apply_detection(method, data[k, :], sf, time, hypno,
+                                         **kw)
+                np.testing.assert_array_equal(index, serial)
+
+    def test_start_method(self):
+        """Test that workers are not forked from a threaded process."""
+        import threading
+        from visbrain.utils import BackgroundCache
+        # A thread is running in the background :
+        event = threading.Event()
+        jobs = BackgroundCache()
+        jobs.submit(0, event.wait)
+        pool = DetectionPool(data, sf, time, hypno, n_jobs=1)
+        assert pool._executor._mp_context.get_start_method() != 'fork'
+        pool.submit('sw', [1], threshold=.5)
+        index = [f.result() for _, f in pool][0]
+        pool.shutdown()
+        assert pool._tmp is None
+        np.testing.assert_array_equal(index, apply_detection(
+            'sw', data[1, :], sf, time, hypno, threshold=.5))
+        event.set()
+        jobs.shutdown()
+
+    def test_cancel(self):
+        """Test cancelling detections."""
+        pool = DetectionPool(data, sf, time, hypno, n_jobs=1)
+        pool.submit('sw', range(4), threshold=.5)
+        pool.cancel()
+        assert not len(pool) and not pool.poll()
@@ -0,0 +1,123 @@
+"""Test functions in edf.py."""
+import os
+
+import numpy as np
+
+from visbrain.io import path_to_tmp
+from visbrain.utils.sleep.edf import Edf
+from visbrain.tests._tests_visbrain import write_edf
+
+
+class TestEdf(object):
+    """Test functions in edf.py."""
+
+    @staticmethod
+    def _get_edf(n_samples_per_record=[100, 100, 50, 100], n_records=20,
+                 bdf=False, onsets=None):
+        path = path_to_tmp(file='test_edf.bdf' if bdf else 'test_edf.edf')
+        d_max = 2 ** 23 if bdf else 2 ** 15
+        data = [np.random.randint(-d_max, d_max - 1, (n * n_records,))
+                for n in n_samples_per_record]
+        p_max = [3200 * (k + 1) for k in range(len(n_samples_per_record))]
+        write_edf(path, data, n_samples_per_record, physical_max=p_max,
+                  bdf=bdf, onsets=onsets)
+        return path, data
+
+    def test_read_hdr(self):
+        """Test function _read_hdr."""
+        path, _ = self._get_edf()
+        edf = Edf(path)
+        _, _, sf, chan, n_samples, hdr = edf.return_hdr()
+        assert sf == 100.
+        assert chan == ['chan0', 'chan1', 'chan2', 'chan3']
+        assert n_samples == 2000
+        assert edf.record_dtype.itemsize == 2 * 350
+        os.remove(path)
+
+    def test_read_dat(self):
+        """Test function _read_dat."""
+        path, data = self._get_edf()
+        edf = Edf(path)
+        for beg, end in [(0, 2000), (150, 151), (99, 1201), (1900, 2000)]:
+            for c in [0, 1, 3]:
+                assert np.array_equal(edf._read_dat(c, beg, end),
+                                      data[c][beg:end])
+        assert np.array_equal(edf._read_dat(2, 10, 60), data[2][10:60])
+        os.remove(path)
+
+    def test_return_dat(self):
+        """Test function return_dat."""
+        path, data = self._get_edf()
+        edf = Edf(path)
+        gain = 6400. * np.array([1, 2, 4]) / 65535.
+        dat = edf.return_dat(['chan0', 'chan1', 'chan3'], 37, 1789)
+        for k, c in enumerate([0, 1, 3]):
+            ref = (data[c][37:1789] + 32768.) * gain[k] - 3200 * (c + 1)
+            np.testing.assert_allclose(dat[k, :], ref)
+        # Channel indices and float32 output :
+        dat_32 = edf.return_dat([3, 0], 0, 2000, dtype='float32')
+        assert dat_32.dtype == np.float32
+        np.testing.assert_allclose(dat_32[1, :], edf.return_dat([0], 0,
+                                   2000)[0, :], rtol=1e-5, atol=1e-3)
+        os.remove(path)
+
+    def test_read_edf_lazy(self):
+        """Test reading an EDF file on demand."""
+        from visbrain.io.read_sleep import read_edf
+        path, data = self._get_edf()
+        out_full = read_edf(path, 20.)
+        out_lazy = read_edf(path, 20., preload=False)
+        assert out_full[0:3] == out_lazy[0:3] == (100., 20., 5)
+        assert out_lazy[4] == ['chan0', 'chan1', 'chan3']  # 50Hz chan ignored
+        np.testing.assert_array_equal(out_full[3], out_lazy[3][:, :])
+        np.testing.assert_array_equal(out_lazy[3][1, 7:9], out_full[3][1, 7:9])
+        assert out_full[3].shape == (3, 400)
+        os.remove(path)
+        # BDF :
+        path, data = self._get_edf(bdf=True)
+        out_bdf = read_edf(path, 100., preload=False)
+        assert out_bdf[4] == ['chan0', 'chan1', 'chan3']
+        np.testing.assert_allclose(out_bdf[3][2, 100:200], Edf(
+            path).return_dat([3], 100, 200)[0, :], rtol=1e-6)
+        os.remove(path)
+
+    def test_read_bdf(self):
+        """Test reading 24-bit BDF files."""
+        path, data = self._get_edf(bdf=True)
+        edf = Edf(path)
+        assert edf.hdr['bdf'] and (edf.record_dtype.itemsize == 3 * 350)
+        for beg, end in [(0, 2000), (150, 151), (99, 1201)]:
+            for c in [0, 1, 3]:
+                assert np.array_equal(edf._read_dat(c, beg, end),
+                                      data[c][beg:end])
+        gain = 6400. * np.array([1, 2, 4]) / (2 ** 24 - 1)
+        dat = edf.return_dat(['chan0', 'chan1', 'chan3'], 37, 1789)
+        for k, c in enumerate([0, 1, 3]):
+            ref = (data[c][37:1789] + 2 ** 23) * gain[k] - 3200 * (c + 1)
+            np.testing.assert_allclose(dat[k, :], ref)
+        os.remove(path)
+
+    def test_read_discontinuous(self):
+        """Test reading discontinuous EDF+ / BDF+ files."""
+        # Records 0-2, gap of 2s, records 3-4, gap of .5s, records 5-9 :
+        onsets = [0., 1., 2., 5., 6., 7.5, 8.5, 9.5, 10.5, 11.5]
+        for bdf in [False, True]:
+            path, data = self._get_edf([100, 50], 10, bdf=bdf, onsets=onsets)
+            edf = Edf(path)
+            assert edf.hdr['discontinuous']
+            np.testing.assert_array_equal(edf.record_onsets, onsets)
+            assert (edf.n_samples(0) == 1250) and (edf.n_samples(1) == 625)
+            # Samples of records are placed at their onset :
+            raw = edf._read_dat(0, 0, 1250)
+            np.testing.assert_array_equal(raw[:300], data[0][:300])
+            np.testing.assert_array_equal(raw[500:700], data[0][300:500])
+            np.testing.assert_array_equal(raw[750:], data[0][500:])
+            # Gaps are set to physical zeros :
+            assert not raw[300:500].any() and not raw[700:750].any()
+            gap = edf.return_dat([0], 290, 510)[0, 10:210]
+            np.testing.assert_allclose(gap, 0., atol=1e-6)
+            np.testing.assert_allclose(edf.return_dat([1], 0, 625)[0, 150:250],
+                                       0., atol=1e-6)
+            np.testing.assert_array_equal(edf._read_dat(1, 380, 390),
+                                          data[1][255:265])
+            os.remove(path)
@@ -0,0 +1,43 @@
+"""Test functions in envelope.py."""
+import numpy as np
+
+from visbrain.utils.sleep.envelope import MinMaxPyramid
+
+
+class TestEnvelope(object):
+    """Test functions in envelope.py."""
+
+    @staticmethod
+    def _get_data(n_pts=100003):
+        data = np.random.rand(3, n_pts).astype(np.float32)
+        return data, np.arange(n_pts, dtype=np.float32) / 100.
+
+    def test_pyramid_levels(self):
+        """Test building levels."""
+        data, time = self._get_data()
+        pyr = MinMaxPyramid(data, time, chunk_size=1000)
+        assert pyr.bins[:3] == [8, 32, 128]
+        assert pyr._env[-1].shape == (3, 2)
+        for b, env in zip(pyr.bins, pyr._env):
+            n_bins = int(np.ceil(data.shape[1] / b))
+            assert env.shape == (3, 2 * n_bins)
+            np.testing.assert_array_equal(env[:, 0], data[:, :b].min(1))
+            np.testing.assert_array_equal(env[:, -1], data[:, (n_bins - 1) *
+                                                           b:].max(1))
+
+    def test_pyramid_get(self):
+        """Test getting the envelope of a window."""
+        data, time = self._get_data()
+        pyr = MinMaxPyramid(data, time)
+        # Zoomed in : raw samples
+        assert pyr.get(slice(100, 2100), 1000) is None
+        # Zoomed out : between 1 and 4 bins per pixel
+        for sl in [slice(0, 100003), slice(1000, 50000), slice(5, 16005)]:
+            t, env = pyr.get(sl, 1000, rows=[True, False, True])
+            assert 2000 <= env.shape[1] <= 8000 + 4
+            assert env.shape == (2, len(t))
+            assert t[0] <= time[sl.start]
+            np.testing.assert_array_equal(env.min(1) <= data[[0, 2],
+                                          sl].min(1), True)
+            np.testing.assert_array_equal(env.max(1) >= data[[0, 2],
+                                          sl].max(1), True)
@@ -1,7 +1,7 @@
 """Test functions in events.py."""
 import numpy as np
 
-from visbrain.utils.sleep.event import (_events_distance_fill,
+from visbrain.utils.sleep.event import (IntervalSet, _events_distance_fill,
                                         _events_to_index, _index_to_events)
 
 
@@ -22,13 +22,45 @@ class TestEvent(object):
 
     def test_events_distance_fill(self):
         """Test function events_distance_fill."""
-        _events_distance_fill(self._get_index(), 200., 100.)
+        index = _events_distance_fill(self._get_index(), 200., 100.)
+        assert np.array_equal(index, np.arange(20))
+        index = _events_distance_fill(self._get_index(), 40., 100.)
+        assert np.array_equal(index, np.r_[0:11, 14:20])
 
     def test_event_to_index(self):
         """Test function event_to_index."""
-        _events_to_index(self._get_index())
+        idx = _events_to_index(self._get_index())
+        assert np.array_equal(idx, [[0, 4], [7, 10], [14, 19]])
+        assert _events_to_index([]).shape == (0, 2)
 
     def test_index_to_event(self):
         """Test function index_to_event."""
         idx = _events_to_index(self._get_index())
-        _index_to_events(idx)
+        assert np.array_equal(_index_to_events(idx), self._get_index())
+
+    def test_interval_set(self):
+        """Test the IntervalSet type."""
+        rnd = np.random.RandomState(0)
+        for k in range(20):
+            a, b = rnd.rand(2, 300) > rnd.rand(2, 1)
+            ev_a, ev_b = IntervalSet.from_mask(a), IntervalSet.from_mask(b)
+            assert np.array_equal(ev_a.to_mask(300), a)
+            assert np.array_equal(ev_a.indices(), np.flatnonzero(a))
+            assert np.array_equal((ev_a | ev_b).to_mask(300), a | b)
+            assert np.array_equal((ev_a & ev_b).to_mask(300), a & b)
+            assert np.array_equal((ev_a - ev_b).to_mask(300), a & ~b)
+        # Overlapping, contiguous and unsorted intervals are merged :
+        events = IntervalSet([10, 0, 12, 30, 40], [12, 5, 20, 30, 45])
+        assert np.array_equal(events.to_index(), [[0, 4], [10, 19],
+                                                  [40, 44]])
+        assert np.array_equal(events.durations, [5, 10, 5])
+        filled = IntervalSet.from_index(self._get_index()).fill_gaps(4)
+        assert np.array_equal(filled.to_index(), [[0, 10], [14, 19]])
+        # Queries :
+        assert np.array_equal(events.overlaps([5, 5, 18], [10, 11, 40]),
+                              [False, True, True])
+        assert np.array_equal(events.near(IntervalSet([24], [25]), 15),
+                              [False, True, False])
+        data = np.arange(50.) ** 2
+        assert np.array_equal(events.ptp(data), [16., 19 ** 2 - 100.,
+                                                 44 ** 2 - 40 ** 2])
@@ -0,0 +1,102 @@
+"""Test functions in features.py."""
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.tests._tests_visbrain import synthetic_hypno
+from visbrain.utils.sleep.features import FeatureCache, ChannelFeatures
+from visbrain.utils.sleep.detection import (kcdetect, spindlesdetect,
+                                            remdetect, slowwavedetect,
+                                            mtdetect)
+
+sf, n_pts = 100., 180000
+rnd = np.random.RandomState(0)
+signal = 50. * uniform_filter1d(rnd.randn(n_pts), 10)
+signal += 30. * np.sin(2 * np.pi * 13. * np.arange(n_pts) / sf) * (
+    rnd.rand(n_pts) > .5)
+hypno = synthetic_hypno(n_pts, rnd)
+
+
+class _Counter(object):
+    """Count calls to a feature function."""
+
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, x, scale=1.):
+        self.n += 1
+        return x * scale
+
+
+class TestFeatures(object):
+    """Test functions in features.py."""
+
+    def test_cache_hit(self):
+        """Test that a feature is only computed once."""
+        cache, fcn = FeatureCache(), _Counter()
+        x = np.ones((100,))
+        feat = cache.channel(0)
+        assert isinstance(feat, ChannelFeatures)
+        out = feat.get(fcn, x, scale=2.)
+        assert feat.get(fcn, x, scale=2.) is out
+        assert fcn.n == 1
+        # Different parameters or channel :
+        feat.get(fcn, x, scale=3.)
+        cache.get(1, fcn, x, scale=2.)
+        assert (fcn.n == 3) and (len(cache) == 3)
+        assert cache.nbytes == 3 * x.nbytes
+
+    def test_eviction(self):
+        """Test that least recently used features are removed."""
+        cache, fcn = FeatureCache(max_size=2 * 800), _Counter()
+        x = np.ones((100,))
+        cache.get(0, fcn, x)
+        cache.get(1, fcn, x)
+        cache.get(0, fcn, x)
+        cache.get(2, fcn, x)
+        assert len(cache) == 2
+        cache.get(0, fcn, x)
+        assert fcn.n == 3
+        cache.get(1, fcn, x)
+        assert fcn.n == 4
+        # The most recent feature is kept even if it is too large :
+        cache.get(3, fcn, np.ones((1000,)))
+        assert len(cache) == 1
+
+    def test_clear(self):
+        """Test removing features."""
+        cache, fcn = FeatureCache(), _Counter()
+        x = np.ones((100,))
+        for k in range(3):
+            cache.get(k, fcn, x)
+        cache.channel(1).clear()
+        assert len(cache) == 2
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_detections(self):
+        """Test detections using cached features."""
+        cache = FeatureCache()
+        feat = cache.channel(0)
+        # Two thresholds of each detection :
+        detections = [(spindlesdetect, (sf, 2., hypno, True)),
+                      (spindlesdetect, (sf, 3., hypno, True)),
+                      (kcdetect, (sf, .8, 2., hypno, True, 200, 1500,
+                                  40, 400)),
+                      (kcdetect, (sf, .5, 1., hypno, True, 200, 1500,
+                                  40, 400)),
+                      (remdetect, (sf, hypno, True, 2.)),
+                      (remdetect, (sf, hypno, True, 1.5)),
+                      (slowwavedetect, (sf, 3.)),
+                      (slowwavedetect, (sf, 2.)),
+                      (mtdetect, (sf, 2., hypno, False)),
+                      (mtdetect, (sf, 3., hypno, False))]
+        for fcn, args in detections:
+            ref = fcn(signal, *args)
+            idx = fcn(signal, *args, features=feat)
+            for r, i in zip(ref, idx):
+                np.testing.assert_array_equal(np.asarray(r), np.asarray(i))
+        # Features do not depend on thresholds :
+        n_features = len(cache)
+        for fcn, args in detections:
+            fcn(signal, *args, features=feat)
+        assert len(cache) == n_features
@@ -1,12 +1,41 @@
 """Test functions in hypnoprocessing.py."""
 import numpy as np
 
-from visbrain.utils.sleep.hypnoprocessing import (transient, sleepstats)
+from visbrain.utils.sleep.hypnoprocessing import (RunLengthHypno, transient,
+                                                  sleepstats)
 
 
 class TestHypnoprocessing(object):
     """Test functions in hypnoprocessing.py."""
 
+    def test_run_length_hypno(self):
+        """Test the RunLengthHypno class."""
+        data = np.array([0, 0, 0, 1, 1, 2, 2, 2, 3, 4, 4, 5])
+        hyp = RunLengthHypno.from_array(data)
+        assert len(hyp) == len(data) and hyp.n_runs == 6
+        assert np.array_equal(hyp.onsets, [0, 3, 5, 8, 9, 11])
+        assert np.array_equal(hyp.durations, [3, 2, 3, 1, 2, 1])
+        assert np.array_equal(np.asarray(hyp), data)
+        # Indexing :
+        assert hyp[4] == 1 and hyp[-1] == 5
+        assert np.array_equal(hyp[2:10:3], data[2:10:3])
+        assert np.array_equal(hyp[[11, 0, 5]], data[[11, 0, 5]])
+        assert np.array_equal(hyp.mask([1, 4]), np.isin(data, [1, 4]))
+        # Stage edition :
+        hyp.set_stage(1, 4, 2)
+        hyp[-2:] = 3
+        data[1:4], data[-2:] = 2, 3
+        assert np.array_equal(np.asarray(hyp), data)
+        assert np.array_equal(hyp.stages, [0, 2, 1, 2, 3, 4, 3])
+        # Decimation / oversampling :
+        for step in [1, 2, 5]:
+            assert np.array_equal(np.asarray(hyp.decimate(step)),
+                                  data[::step])
+        from visbrain.io.rw_hypno import oversample_hypno
+        for n in [36, 40, 30]:
+            assert np.array_equal(np.asarray(hyp.oversample(n)),
+                                  oversample_hypno(data, n))
+
     def test_transient(self):
         """Test function transient."""
         data = np.array([0, 0, 0, 1, 1, 2, 2, 2, 3, 4, 4, 5])
@@ -18,8 +47,16 @@ class TestHypnoprocessing(object):
         assert np.array_equal(stages, [0, 1, 2, 3, 4, 5])
         _, idx_time, _ = transient(data, time)
         assert np.array_equal(index / 2., idx_time)
+        tr_rle, idx_rle, _ = transient(RunLengthHypno.from_array(data))
+        assert np.array_equal(tr, tr_rle)
+        assert np.array_equal(idx, idx_rle)
 
     def test_sleepstats(self):
         """Test function sleepstats."""
         hypno = np.random.randint(-1, 3, (2000,))
         sleepstats(hypno, 100.)
+        hypno = np.repeat([0, 1, 2, 0, 3, 4, 0], 60)
+        stats = sleepstats(RunLengthHypno.from_array(hypno), 1.)
+        assert stats == sleepstats(hypno, 1.)
+        assert stats['LatN1'] == 1. and stats['TDT'] == 6. - 1. / 60
+        assert stats['WASO'] == 1. and stats['SPT'] == 5. - 1. / 60
@@ -0,0 +1,53 @@
+"""Test functions in montage.py."""
+import numpy as np
+import pytest
+
+from visbrain.utils.physio import (rereferencing, bipolarization,
+                                   commonaverage)
+from visbrain.utils.sleep.montage import Montage, MontageData
+
+channels = ['Fp1', 'Fp2', 'C3', 'C4', 'EEG1', 'EEG2', 'EEG3', 'EOG1']
+to_ignore = [False] * 7 + [True]
+data = np.random.RandomState(0).randn(len(channels), 1000).astype(np.float32)
+
+
+class TestMontage(object):
+    """Test functions in montage.py."""
+
+    def test_montages(self):
+        """Test that montages match re-referencing functions."""
+        montages = [(Montage.reference(channels, 2, to_ignore),
+                     rereferencing, (2, to_ignore)),
+                    (Montage.average(channels, to_ignore), commonaverage,
+                     (to_ignore,)),
+                    (Montage.bipolar(channels, to_ignore), bipolarization,
+                     (to_ignore,))]
+        for montage, fcn, args in montages:
+            ref, chans, consider = fcn(data.copy(), list(channels), *args)
+            m_data = montage(data)
+            assert isinstance(m_data, MontageData)
+            assert m_data.shape == data.shape
+            assert montage.channels == chans
+            np.testing.assert_array_equal(montage.consider, consider)
+            np.testing.assert_allclose(np.asarray(m_data), ref, atol=1e-5)
+            np.testing.assert_allclose(m_data.std(1), ref.std(1), rtol=1e-5)
+        # Raw data are untouched :
+        assert np.array_equal(data, np.random.RandomState(0).randn(
+            len(channels), 1000).astype(np.float32))
+
+    def test_indexing(self):
+        """Test reading windows through a montage."""
+        montage = Montage.bipolar(channels, to_ignore)
+        ref = bipolarization(data.copy(), list(channels), to_ignore)[0]
+        m_data = montage(data)
+        keys = [(slice(None), slice(100, 300)), (5, slice(None)),
+                ([6, 1], slice(0, 10, 2)), (4, [10, 2, 7]), (Ellipsis, 3),
+                5]
+        for key in keys:
+            np.testing.assert_allclose(m_data[key], ref[key], atol=1e-5)
+        # Raw montage :
+        raw = Montage.raw(channels)
+        assert raw.is_identity
+        np.testing.assert_array_equal(raw(data)[2:4, 10:20], data[2:4, 10:20])
+        with pytest.raises(ValueError):
+            Montage.raw(channels[1:])(data)
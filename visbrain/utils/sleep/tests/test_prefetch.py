@@ -0,0 +1,61 @@
+"""Test functions in prefetch.py."""
+import threading
+
+import numpy as np
+
+from visbrain.utils.sleep.prefetch import WindowPrefetcher
+
+data = np.random.RandomState(0).rand(4, 1000)
+
+
+def _window(sl, scale):
+    """Prepare a window."""
+    return data[:, sl] * scale
+
+
+class TestPrefetch(object):
+    """Test functions in prefetch.py."""
+
+    def test_get(self):
+        """Test windows computed without prefetching."""
+        pf = WindowPrefetcher(_window, depth=0)
+        sl = slice(0, 100)
+        out = pf.get((0, 100, 2.), sl, 2.)
+        np.testing.assert_array_equal(out, data[:, sl] * 2.)
+        assert pf.get((0, 100, 2.), sl, 2.) is out
+        pf.prefetch([((100, 200, 2.), (slice(100, 200), 2.))])
+        assert len(pf) == 1
+        assert (pf.hits == 1) and (pf.misses == 1) and (pf.hit_rate == .5)
+
+    def test_prefetch(self):
+        """Test windows prepared in the background."""
+        pf = WindowPrefetcher(_window, depth=1)
+        windows = [((k, k + 100), (slice(k, k + 100), 1.)) for k in
+                   [100, 200, 300]]
+        pf.prefetch(windows, wait_jobs=True)
+        for key, (sl, scale) in windows:
+            np.testing.assert_array_equal(pf.get(key, sl, scale), data[:, sl])
+        stats = pf.stats()
+        assert (stats['hits'] == 3) and (stats['misses'] == 0)
+        # Cache size :
+        assert len(pf) <= 6
+        pf.clear()
+        assert len(pf) == 0
+        pf.shutdown()
+
+    def test_cancel(self):
+        """Test cancelling windows that are not requested anymore."""
+        event = threading.Event()
+
+        def _slow(sl):
+            event.wait(5.)
+            return data[:, sl]
+
+        pf = WindowPrefetcher(_slow, depth=1)
+        pf.prefetch([(k, (slice(k, k + 10),)) for k in range(3)])
+        pf.prefetch([(5, (slice(5, 15),))])
+        assert list(pf._jobs.pending.keys()) == [5]
+        event.set()
+        np.testing.assert_array_equal(pf.get(5, slice(5, 15)), data[:, 5:15])
+        assert pf.hits + pf.misses == 1
+        pf.shutdown()
@@ -0,0 +1,76 @@
+"""Test functions in spectro_pool.py."""
+import threading
+
+import numpy as np
+from scipy.signal import spectrogram
+
+from visbrain.utils.sleep.spectro_pool import (compute_spectrogram,
+                                               SpectrogramPool)
+from visbrain.utils import generate_eeg
+
+sf, n_pts = 100., 10000
+data = generate_eeg(sf=sf, n_pts=n_pts, n_channels=4, random_state=1)[0]
+data = data.astype(np.float32)
+
+
+class TestSpectroPool(object):
+    """Test functions in spectro_pool.py."""
+
+    def test_compute_spectrogram(self):
+        """Test function compute_spectrogram."""
+        # Fourier transform :
+        image, freq = compute_spectrogram(data[0, :], sf, nfft=4., fstart=1.,
+                                          fend=20.)
+        f, _, mesh = spectrogram(data[0, :], fs=sf, nperseg=400,
+                                 noverlap=0, window='hamming')
+        sl = (f >= 1.) & (f <= 20.)
+        np.testing.assert_allclose(freq, f[sl])
+        np.testing.assert_allclose(image, 20 * np.log10(mesh[sl, :]),
+                                   rtol=1e-4)
+        # Wavelet :
+        image, freq = compute_spectrogram(data[0, :], sf, method='Wavelet',
+                                          nfft=2., overlap=.5, fstart=2.,
+                                          fend=10.)
+        assert np.array_equal(freq, np.arange(2., 10., 1.))
+        assert (image.shape[0] == len(freq)) and np.isfinite(image).all()
+
+    def test_spectrogram_pool(self):
+        """Test that cached spectrograms match the direct computation."""
+        kw = dict(nfft=4., overlap=.5, fend=30.)
+        pool = SpectrogramPool(data, sf, n_jobs=2, max_size=3)
+        pool.submit(range(4), **kw)
+        image, freq = pool.get(2, wait=True, **kw)
+        image_d, freq_d = compute_spectrogram(data[2, :], sf, **kw)
+        np.testing.assert_array_equal(image, image_d)
+        np.testing.assert_array_equal(freq, freq_d)
+        for k in range(4):
+            pool.get(k, wait=True, **kw)
+        assert not len(pool) and (pool.progress == 1.)
+        # Least recently used spectrograms are dropped :
+        assert len(pool._jobs) == 3
+        assert pool.get(0, **kw) is None
+        assert pool.get(3, **kw) is not None
+        # Other settings are computed again :
+        assert pool.get(3, nfft=2.) is None
+        pool.submit([3], nfft=2.)
+        pool.cancel()
+        assert not len(pool)
+        pool.shutdown()
+
+    def test_spectrogram_pool_failure(self):
+        """Test spectrograms that failed in the background."""
+        class _MainThreadData(object):
+            shape = data.shape
+
+            def __getitem__(self, key):
+                assert threading.current_thread() is threading.main_thread()
+                return data[key]
+
+        pool = SpectrogramPool(_MainThreadData(), sf)
+        pool.submit([1], nfft=4.)
+        pool._jobs.wait()
+        # Computed again in the calling thread :
+        image, _ = pool.get(1, wait=True, nfft=4.)
+        np.testing.assert_array_equal(image, compute_spectrogram(
+            data[1, :], sf, nfft=4.)[0])
+        pool.shutdown()
@@ -0,0 +1,127 @@
+"""Test functions in streaming.py."""
+import numpy as np
+from scipy.signal import welch
+from scipy.ndimage import uniform_filter1d
+
+from visbrain.tests._tests_visbrain import synthetic_hypno
+from visbrain.utils.sleep.streaming import (ChunkPlan, RunningStats,
+                                            EventCollector, stream_ptp,
+                                            stream_welch)
+from visbrain.utils.sleep.detection import (kcdetect, spindlesdetect,
+                                            remdetect, slowwavedetect,
+                                            mtdetect)
+from visbrain.utils.sleep.event import IntervalSet
+
+sf, n_pts = 100., 360000
+rnd = np.random.RandomState(0)
+signal = 50. * uniform_filter1d(rnd.randn(n_pts), 10)
+signal += 30. * np.sin(2 * np.pi * 13. * np.arange(n_pts) / sf) * (
+    rnd.rand(n_pts) > .5)
+hypno = synthetic_hypno(n_pts, rnd)
+
+
+class TestStreaming(object):
+    """Test functions in streaming.py."""
+
+    def test_chunk_plan(self):
+        """Test that chunks tile the channel."""
+        plan = ChunkPlan(1000, 10, max_memory=100 * 8, bytes_per_sample=8)
+        assert (plan.size == 80) and (len(plan) == 13) and not plan.single
+        covered = np.zeros((1000,), dtype=int)
+        for sl, core, start in plan:
+            assert sl.start == max(start - 10, 0)
+            covered[sl][core] += 1
+        assert np.all(covered == 1)
+        assert ChunkPlan(1000, 10).single
+        np.testing.assert_raises(ValueError, ChunkPlan, 1000, 10, 100)
+
+    def test_chunk_plan_cache(self):
+        """Test that outputs are cached per function, arrays and kwargs."""
+        calls = []
+
+        def _fcn(x, scale=1.):
+            calls.append(scale)
+            return x * scale
+        plan = ChunkPlan(100, 0)
+        x, y = np.arange(100.), np.ones((100,))
+        for arr, kw, ref in [(x, {}, x), (x, {}, x), (y, {}, y),
+                             (x, dict(scale=2.), 2 * x)]:
+            out = next(plan.map(_fcn, arr, **kw))[0]
+            np.testing.assert_array_equal(out, ref)
+        assert calls == [1., 1., 2.]
+
+    def test_running_stats(self):
+        """Test statistics computed by chunks."""
+        x = rnd.randn(10000)
+        x[::7] = np.nan
+        stats = RunningStats(len(x))
+        for k in range(0, len(x), 999):
+            stats.update(x[k:k + 999], k)
+        np.testing.assert_allclose(stats.mean, np.nanmean(x))
+        np.testing.assert_allclose(stats.std, np.nanstd(x))
+        y = rnd.rand(10000)
+        stats = RunningStats(len(y))
+        for k in range(0, len(y), 999):
+            stats.update(y[k:k + 999], k)
+        assert stats.percentile(60) == np.percentile(y, 60)
+        # Sub-sampled quantiles :
+        stats = RunningStats(len(y), max_samples=1000)
+        for k in range(0, len(y), 999):
+            stats.update(y[k:k + 999], k)
+        assert stats.percentile(50) == np.median(y[::10])
+
+    def test_event_collector(self):
+        """Test stitching events across chunks."""
+        mask = rnd.rand(1000) > .4
+        events = EventCollector()
+        for k in range(0, 1000, 64):
+            events.add(mask[k:k + 64], k)
+        ref = IntervalSet.from_mask(mask)
+        np.testing.assert_array_equal(events.events().to_index(),
+                                      ref.to_index())
+
+    def test_stream_ptp(self):
+        """Test the peak-to-peak amplitude of events read by chunks."""
+        events = IntervalSet.from_mask(signal[:5000] > 20.)
+        plan = ChunkPlan(5000, 0, max_memory=300, bytes_per_sample=1)
+        np.testing.assert_array_equal(stream_ptp(events, signal, plan),
+                                      events.ptp(signal[:5000]))
+
+    def test_stream_welch(self):
+        """Test the power spectral density computed by chunks."""
+        plan = ChunkPlan(n_pts, 0, max_memory=2 ** 16, bytes_per_sample=8)
+        f, pxx = stream_welch(signal, sf, plan)
+        f_ref, pxx_ref = welch(signal, sf)
+        np.testing.assert_array_equal(f, f_ref)
+        np.testing.assert_allclose(pxx, pxx_ref)
+
+    def test_chunked_detections(self):
+        """Test that detections by chunks match detections at once."""
+        rem = np.full((n_pts,), 4.) * (hypno > 2)
+        detections = [
+            (kcdetect, (signal, sf, .8, 3., hypno, True, 200., 2500., 10.,
+                        400.), {}),
+            (spindlesdetect, (signal, sf, 2., hypno, True), {}),
+            (remdetect, (signal, sf, rem, True, 2.), {}),
+            (slowwavedetect, (signal, sf, .3), dict(min_amp=5.)),
+            (mtdetect, (signal, sf, 2., hypno, False), dict(
+                fmin=5., fmax=40., min_amp=5.))]
+        for fcn, args, kwargs in detections:
+            ref = fcn(*args, **kwargs)
+            assert len(ref)
+            idx = fcn(*args, max_memory=2 ** 24, **kwargs)
+            np.testing.assert_array_equal(idx, ref)
+
+    def test_detections_without_hypnogram(self):
+        """Test detections when no hypnogram is given."""
+        x, no_hyp = signal[:60000], np.zeros((60000,))
+        detections = [
+            (kcdetect, (sf, .8, 3.), (False, 200., 2500., 10., 400.)),
+            (spindlesdetect, (sf, 2.), (False,)),
+            (remdetect, (sf,), (False, 2.)),
+            (mtdetect, (sf, 2.), (False,))]
+        for fcn, before, after in detections:
+            for max_memory in [None, 2 ** 22]:
+                ref = fcn(x, *before, no_hyp, *after, max_memory=max_memory)
+                idx = fcn(x, *before, None, *after, max_memory=max_memory)
+                np.testing.assert_array_equal(idx, ref)
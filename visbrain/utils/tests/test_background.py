@@ -0,0 +1,76 @@
+"""Test functions in background.py."""
+import threading
+
+import numpy as np
+
+from visbrain.utils.background import BackgroundCache
+
+
+def _square(x):
+    """Compute a result."""
+    return np.full((10,), x ** 2)
+
+
+def _fail(x):
+    """Compute a result that raises an error."""
+    raise ValueError(x)
+
+
+class TestBackground(object):
+    """Test functions in background.py."""
+
+    def test_submit_collect(self):
+        """Test results computed in the background."""
+        bc = BackgroundCache()
+        assert bc.submit(2, _square, 2) and not bc.submit(2, _square, 2)
+        bc.wait()
+        assert bc.collect() == [2] and (2 in bc)
+        np.testing.assert_array_equal(bc.get(2), _square(2))
+        assert not bc.submit(2, _square, 2)
+        bc.shutdown()
+
+    def test_failure(self):
+        """Test jobs that raised an error."""
+        errors = []
+        bc = BackgroundCache(on_error=lambda k, e: errors.append(k))
+        bc.submit(0, _fail, 0)
+        assert bc.fetch(0) is None
+        assert (errors == [0]) and not len(bc) and not bc.pending
+        bc.shutdown()
+
+    def test_lru(self):
+        """Test the bounded cache."""
+        nbytes = _square(0).nbytes
+        bc = BackgroundCache(max_size=2 * nbytes, sizeof=lambda x: x.nbytes)
+        for k in range(3):
+            bc.put(k, _square(k))
+        assert list(bc.cache.keys()) == [1, 2]
+        bc.get(1)
+        bc.put(3, _square(3))
+        assert list(bc.cache.keys()) == [1, 3]
+        # Kept results :
+        bc.max_size = nbytes
+        bc.trim(keep=[1, 3])
+        assert list(bc.cache.keys()) == [1, 3]
+        bc.clear()
+        assert not len(bc)
+
+    def test_fetch_cancel(self):
+        """Test fetching running and queued jobs."""
+        event = threading.Event()
+
+        def _slow(x):
+            event.wait(5.)
+            return x
+
+        bc = BackgroundCache()
+        bc.submit(0, _slow, 0)
+        bc.submit(1, _slow, 1)
+        # The queued job is cancelled, the running one is waited for :
+        assert bc.fetch(1) is None
+        event.set()
+        assert bc.fetch(0) == 0
+        bc.submit(2, _slow, 2)
+        bc.cancel([2])
+        assert not bc.pending
+        bc.shutdown()
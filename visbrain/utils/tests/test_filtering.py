@@ -2,9 +2,12 @@
 import numpy as np
 import math
 from itertools import product
+from scipy.signal import welch, butter, lfilter, sosfiltfilt
 
-from visbrain.utils.filtering import (filt, morlet, ndmorlet, morlet_power,
-                                      welch_power, PrepareData)
+from visbrain.utils.filtering import (filt, StreamDecimator, morlet_bank,
+                                      morlet, ndmorlet, morlet_power,
+                                      welch_power, PrepareData, _morlet_wlt,
+                                      _filter_design)
 
 
 class TestFiltering(object):
@@ -31,6 +34,60 @@ class TestFiltering(object):
         x, f, sf = self._get_data()
         for k in self:
             filt(sf, f, x, *k)
+        # Same as the (well conditioned) transfer function :
+        b, a = butter(3, np.divide([20., 60.], sf / 2.), btype='bandpass')
+        np.testing.assert_allclose(filt(sf, [20., 60.], x, way='lfilter'),
+                                   lfilter(b, a, x), atol=1e-10)
+        # Designs are cached :
+        assert _filter_design(sf, tuple(f), 3, 'butterworth', 'bandpass') is \
+            _filter_design(sf, tuple(f), 3, 'butterworth', 'bandpass')
+        # Stable at high orders :
+        xf = filt(sf, [.5, 4.], np.random.RandomState(0).randn(20000),
+                  order=8)
+        assert np.all(np.isfinite(xf)) and (np.abs(xf).max() < 10.)
+
+    def test_stream_decimator(self):
+        """Test StreamDecimator class."""
+        sf, q = 500., 5
+        t = np.arange(10007) / sf
+        x = np.c_[np.sin(2 * np.pi * 10 * t), np.sin(2 * np.pi * 70 * t)].T
+        dec = StreamDecimator(q)
+        y = dec(x, final=True)
+        assert y.shape == x[:, ::q].shape
+        # Chunk independent :
+        dec.reset()
+        y_chunk = [dec(x[:, k:k + 333], final=k + 333 >= x.shape[1])
+                   for k in range(0, x.shape[1], 333)]
+        np.testing.assert_allclose(np.concatenate(y_chunk, -1), y, atol=1e-6)
+        # Start in the middle of the signal :
+        dec.reset(100)
+        np.testing.assert_allclose(dec(x[:, dec.first_sample:], final=True),
+                                   y[:, 100:], atol=1e-6)
+        # 10Hz is kept and 70Hz (aliased to 30Hz by striding) is removed :
+        np.testing.assert_allclose(y[0, 50:-50], x[0, ::q][50:-50], atol=.02)
+        assert np.abs(y[1, 50:-50]).max() < .01
+
+    def test_morlet_bank(self):
+        """Test morlet_bank function."""
+        def _convolve(x, sf, f):
+            m = _morlet_wlt(sf, f)
+            y = np.convolve(x, m)
+            return y[int(np.ceil(len(m) / 2)) - 1:len(y) - len(m) // 2]
+
+        sf, freqs = 100., [.5, 2., 13., 30.]
+        x = np.random.RandomState(0).randn(2, 50000)  # several segments
+        xf = morlet_bank(x, sf, freqs)
+        pw = morlet_bank(x, sf, freqs, get='power', dtype=np.float32,
+                         max_memory=2 ** 20)
+        assert (xf.shape == (2, 4, 50000)) and (pw.dtype == np.float32)
+        for c, (k, f) in product(range(2), enumerate(freqs)):
+            ref = _convolve(x[c, :], sf, f)
+            np.testing.assert_allclose(xf[c, k, :], ref, atol=1e-8)
+            np.testing.assert_allclose(pw[c, k, :], np.abs(ref) ** 2,
+                                       rtol=1e-3, atol=1e-3)
+        # Signals shorter than wavelets :
+        np.testing.assert_allclose(morlet(x[0, :20], sf, 2.),
+                                   _convolve(x[0, :20], sf, 2.), atol=1e-10)
 
     def test_morlet(self):
         """Test morlet function."""
@@ -56,6 +113,20 @@ class TestFiltering(object):
         f = [5, 10., 15]
         sf = 100.
         assert math.isclose(welch_power(x, f, sf, norm=True).sum(0).max(), 1.)
+        # Compare with scipy.signal.welch, epoch by epoch :
+        x = np.random.RandomState(0).randn(2, 6500)
+        pw = welch_power(x, f, sf, window_s=20, norm=False, oversample=False)
+        assert pw.shape == (2, 2, 3)
+        for c, e in product(range(2), range(3)):
+            freqs, pxx = welch(x[c, e * 2000:(e + 1) * 2000], sf,
+                               nperseg=1000, scaling='spectrum')
+            np.testing.assert_allclose(pw[c, :, e], [pxx[50:100].mean(),
+                                                     pxx[100:150].mean()])
+        # Per-sample power (the last incomplete epoch uses the last power) :
+        pw_full = welch_power(x, f, sf, window_s=20, norm=False)
+        assert pw_full.shape == (2, 2, 6500)
+        np.testing.assert_array_equal(pw_full[..., ::2000], pw[..., [0, 1,
+                                                                     2, 2]])
 
     def test_prepare_data(self):
         """Test class PrepareData."""
@@ -70,3 +141,49 @@ class TestFiltering(object):
                 p.way = k[3]
                 p.dispas = i
                 p._prepare_data(sf, x, time)
+
+    def test_prepare_data_whole(self):
+        """Test filtering whole channels of PrepareData."""
+        sf, sl = 100., slice(1000, 1500)
+        x = np.random.RandomState(0).randn(3, 5000)
+        p = PrepareData(axis=1, filt=True, fstart=1., fend=10.,
+                        way='filtfilt', whole=True)
+        # Window only (channels are filtered in the background) :
+        window = p.prepare_window(sf, x, sl, [2, 0])
+        sos = _filter_design(sf, (1., 10.), 3, 'butterworth', 'bandpass')
+        sos = sos.copy()
+        np.testing.assert_allclose(window, sosfiltfilt(sos, x[[2, 0], sl]))
+        assert len(p.precompute(sf, x, [2, 0], wait_jobs=True)) == 2
+        # Slices of whole filtered channels :
+        window = p.prepare_window(sf, x, sl, [2, 0])
+        np.testing.assert_allclose(window, sosfiltfilt(sos, x[[2, 0], :])[
+            :, sl], atol=1e-5)
+        # New settings / data :
+        p.fend = 20.
+        assert p.precompute(sf, x, [0]) is None
+        p.precompute(sf, x.copy(), wait_jobs=True)
+        assert len(p._filtered) == 3
+        # Bounded cache :
+        p._filtered.max_size = 2 * x[0, :].astype(np.float32).nbytes
+        p._filtered.trim()
+        assert list(k[1] for k in p._filtered.cache.keys()) == [1, 2]
+        p.clear_cache()
+
+    def test_prepare_data_whole_budget(self):
+        """Test requests of PrepareData that don't fit in the cache."""
+        sf, sl = 100., slice(1000, 1500)
+        x = np.random.RandomState(0).randn(4, 5000)
+        p = PrepareData(axis=1, filt=True, fstart=1., fend=10., whole=True,
+                        cache_size=3 * x[0, :].astype(np.float32).nbytes)
+        # Too many channels : windows are filtered without background jobs
+        for k in range(5):
+            window = p.prepare_window(sf, x, sl)
+            assert not p._filtered.pending and not len(p._filtered)
+        np.testing.assert_allclose(window, p._prepare_data(sf, x[:, sl],
+                                                           None))
+        # Channels of the current request are never evicted :
+        assert len(p.precompute(sf, x, [0, 1], wait_jobs=True)) == 2
+        assert len(p.precompute(sf, x, [2, 3], wait_jobs=True)) == 2
+        assert [k[1] for k in p._filtered.cache.keys()] == [1, 2, 3]
+        assert len(p.precompute(sf, x, [3, 2], wait_jobs=True)) == 2
+        p.clear_cache()
@@ -1,4 +1,6 @@
 """Test functions in guitools.py."""
+from types import SimpleNamespace
+
 import pytest
 from PyQt5 import QtWidgets, QtCore
 
@@ -9,7 +11,27 @@ from visbrain.utils.guitools import (slider2opacity, textline2color,
                                      get_combo_list_index, safely_set_cbox,
                                      safely_set_spin, safely_set_slider,
                                      toggle_enable_tab, get_screen_size,
-                                     set_widget_size)
+                                     set_widget_size, RedrawScheduler)
+
+
+class _Timer(object):
+    """Single-shot timer that only fires when flushed (no QApplication)."""
+
+    def __init__(self):
+        self._active = False
+        self.timeout = SimpleNamespace(connect=lambda fcn: None)
+
+    def setSingleShot(self, single):  # noqa
+        pass
+
+    def start(self, msec):
+        self._active = True
+
+    def stop(self):
+        self._active = False
+
+    def isActive(self):  # noqa
+        return self._active
 
 
 class TestGuitools(object):
@@ -161,3 +183,21 @@ class TestGuitools(object):
         app = QtWidgets.QApplication([])
         w = QtWidgets.QWidget()
         set_widget_size(app, w)
+
+    def test_redraw_scheduler(self):
+        """Test class RedrawScheduler."""
+        calls = []
+        sched = RedrawScheduler(lambda: calls.append(1), fps=1.,
+                                timer=_Timer())
+        # First request is immediate, next ones are coalesced :
+        sched.request()
+        assert (len(calls) == 1) and not sched.pending
+        for k in range(10):
+            sched.request(k)
+        assert (len(calls) == 1) and sched.pending
+        sched.flush()
+        assert (len(calls) == 2) and not sched.pending
+        assert (sched.n_requests == 11) and (sched.n_redraws == 2)
+        sched.request()
+        sched.cancel()
+        assert (len(calls) == 2) and not sched.pending
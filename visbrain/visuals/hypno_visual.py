@@ -10,7 +10,8 @@ from vispy import gloo, visuals
 from vispy.visuals.shaders import Function
 from vispy.scene.visuals import create_visual_node
 
-from visbrain.utils import vispy_array, wrap_properties, color2vb, transient
+from visbrain.utils import (vispy_array, wrap_properties, color2vb,
+                            RunLengthHypno)
 # from visbrain.io import is_opengl_installed
 
 
@@ -87,9 +88,12 @@ void main() {
 class HypogramVisual(visuals.Visual):
     """Visual class for grid of signals.
 
+    The hypnogram is internally stored as runs of stages (RunLengthHypno)
+    and only a handful of vertices per run are sent to the GPU.
+
     Parameters
     ----------
-    data : array_like
+    data : array_like | RunLengthHypno
         Array of data of shape (n_pts,).
     time : array_like | None
         Array of time points of shape (n_pts,)
@@ -164,23 +168,42 @@ class HypogramVisual(visuals.Visual):
 
         Parameters
         ----------
-        data : array_like
+        data : array_like | RunLengthHypno
             Array of data of shape (n_pts,).
         time : array_like | None
             Array of time points of shape (n_pts,)
         """
-        data = np.asarray(data)
-        assert data.ndim == 1
+        if isinstance(data, RunLengthHypno):
+            data = data.copy()
+        else:
+            data = np.asarray(data)
+            assert data.ndim == 1
+            data = RunLengthHypno.from_array(data)
+        self._hypno = data
         self._n = len(data)
         time = np.arange(len(data)) if time is None else np.asarray(time)
         assert len(time) == len(self)
+        self._time = time
+        self._update_runs()
 
-        # Transient detection :
-        self.transient = data
+    def _update_runs(self):
+        """Send the vertices of each run to the GPU.
 
-        #
-        self._pos = vispy_array(np.c_[time, data])
+        Only the first two and the last two samples of each run are used,
+        which gives the same line (and color gradients) as using every
+        samples.
+        """
+        first, last = self._hypno.onsets, self._hypno.ends - 1
+        idx = np.unique(np.c_[first, np.minimum(first + 1, last),
+                              np.maximum(last - 1, first), last])
+        data = self._hypno[idx]
+        self._pos = vispy_array(np.c_[self._time[idx], data])
         self._position_vbo.set_data(self._pos)
+        # Transients (last sample of a run and first sample of the next) :
+        self._transient = np.full((len(idx),), 10., dtype=np.float32)
+        is_transient = np.isin(idx, np.r_[last[:-1], first[1:]])
+        self._transient[is_transient] = data[is_transient]
+        self._transient_vbo.set_data(self._transient)
 
     def set_stage(self, stage, idx_start, idx_end):
         """Set stage.
@@ -198,8 +221,8 @@ class HypogramVisual(visuals.Visual):
         if isinstance(stage, str):
             assert stage in STAGES
             stage = eval('self.%s' % stage)
-        self._pos[idx_start:idx_end, 1] = stage
-        self.transient = self._pos[:, 1]
+        self._hypno.set_stage(idx_start, idx_end, stage)
+        self._update_runs()
 
     def _prepare_transforms(self, view):
         """Call for the first rendering."""
@@ -236,13 +259,19 @@ class HypogramVisual(visuals.Visual):
     @property
     def time(self):
         """Get the time value."""
-        return self._pos[:, 0]
+        return self._time
 
     # ----------- DATA -----------
     @property
     def data(self):
         """Get the data value."""
-        return self._pos[:, 1]
+        return np.asarray(self._hypno, dtype=np.float32)
+
+    # ----------- HYPNO -----------
+    @property
+    def hypno(self):
+        """Get the run-length encoded hypnogram."""
+        return self._hypno
 
     # ----------- ART -----------
     @property
@@ -499,19 +528,9 @@ class HypogramVisual(visuals.Visual):
     # ----------- TRANSIENT -----------
     @property
     def transient(self):
-        """Get the transient value."""
+        """Get the transient value (of each vertex)."""
         return self._transient
 
-    @transient.setter
-    def transient(self, value):
-        """Set transient value."""
-        assert isinstance(value, np.ndarray) and len(value) == len(self)
-        self._transient = np.full((len(self),), 10., dtype=np.float32)
-        idx = transient(value)[0]
-        idx_double = np.r_[idx, idx + 1]
-        self._transient[idx_double] = value[idx_double]
-        self._transient_vbo.set_data(self._transient)
-
     # ----------- LINE_WIDTH -----------
     @property
     def line_width(self):
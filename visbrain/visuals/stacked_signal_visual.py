@@ -0,0 +1,313 @@
+"""Display stacked signals using a single draw call.
+
+All channels are packed into one vertex buffer and drawn with a single call,
+the segments of each channel being listed in an index buffer. The vertical
+offset and amplitude of each channel are read from a small
+texture in the vertex shader so that showing / hiding channels or changing
+their amplitude does not require to send the vertices again.
+"""
+import numpy as np
+
+from vispy import gloo, visuals
+from vispy.scene.visuals import create_visual_node
+
+from visbrain.utils import color2vb
+
+
+__all__ = ('StackedSignal',)
+
+
+vertex_shader = """
+#version 120
+varying float v_visible;
+void main() {
+    // (ymin, 1 / (ymax - ymin), row, visible) of the channel :
+    vec4 chan = texture2D($u_chans, vec2(($a_chan + .5) / $u_n_chan, .5));
+    // Each channel is drawn inside [row, row + 1] :
+    float y = ($a_position.y - chan.x) * chan.y - .5;
+    y = chan.z + .5 + $u_space * y;
+    gl_Position = $transform(vec4($a_position.x, y, 0., 1.));
+    v_visible = chan.w;
+}
+"""
+
+fragment_shader = """
+#version 120
+varying float v_visible;
+void main() {
+    // Discard hidden channels :
+    if (v_visible < .5)
+        discard;
+    gl_FragColor = $u_color;
+}
+"""
+
+
+class StackedSignalVisual(visuals.Visual):
+    """Visual class for stacked signals.
+
+    Visible channels are stacked from top to bottom, the kth visible channel
+    (starting from the bottom) being drawn between y=k and y=k+1 in scene
+    coordinates.
+
+    Parameters
+    ----------
+    n_channels : int
+        Number of channels.
+    color : array_like/string | 'black'
+        Color of the signals.
+    width : float | 1.
+        Line width.
+    method : {'gl', 'agg'}
+        Plotting method. 'gl' is faster but 'agg' should be antialiased.
+    space : float | .9
+        Proportion of each row used by the signal.
+    """
+
+    def __len__(self):
+        """Return the number of channels."""
+        return self._n_chan
+
+    def __init__(self, n_channels, color='black', width=1., method='gl',
+                 space=.9):
+        """Init."""
+        # =========================== VISUALS ===========================
+        visuals.Visual.__init__(self, vertex_shader, fragment_shader)
+        self.set_gl_state('translucent', depth_test=False, cull_face=False)
+        self._draw_mode = 'lines'
+
+        # =========================== DATA ===========================
+        self._n_chan = int(n_channels)
+        self._chans = np.zeros((1, self._n_chan, 4), dtype=np.float32)
+        self._ylim = np.tile(np.array([[-1., 1.]], dtype=np.float32),
+                             (self._n_chan, 1))
+        self._chan_visible = np.ones((self._n_chan,), dtype=bool)
+        self._xlim = (0., 1.)
+
+        # =========================== BUFFERS ===========================
+        self._dbuffer = gloo.VertexBuffer(np.zeros((1, 2), dtype=np.float32))
+        self._cbuffer = gloo.VertexBuffer(np.zeros((1,), dtype=np.float32))
+        self._ibuffer = gloo.IndexBuffer(np.zeros((2,), dtype=np.uint32))
+        self._index_buffer = self._ibuffer
+        self._tex = gloo.Texture2D(self._chans, interpolation='nearest',
+                                   internalformat='rgba32f')
+        # Send to the program :
+        self.shared_program.vert['a_position'] = self._dbuffer
+        self.shared_program.vert['a_chan'] = self._cbuffer
+        self.shared_program.vert['u_chans'] = self._tex
+        self.shared_program.vert['u_n_chan'] = float(self._n_chan)
+        self.color = color
+        self.width = width
+        self.method = method
+        self.space = space
+        self._update_chans()
+        self.freeze()
+
+    def set_data(self, data, time, channels=None):
+        """Set data of channels.
+
+        Parameters
+        ----------
+        data : array_like
+            Array of data of shape (n_rows, n_times).
+        time : array_like
+            Time vector of shape (n_times,) or (n_rows, n_times).
+        channels : array_like | None
+            Index of the channel of each row of data. If None, data should
+            contain all channels. Other channels are not drawn.
+        """
+        data = np.asarray(data, dtype=np.float32)
+        channels = np.arange(len(self)) if channels is None else np.asarray(
+            channels)
+        assert (data.ndim == 2) and (data.shape[0] == len(channels))
+        n_rows, n_times = data.shape
+        time = np.broadcast_to(np.asarray(time, dtype=np.float32),
+                               data.shape)
+        pos = np.empty((data.size, 2), dtype=np.float32)
+        pos[:, 0], pos[:, 1] = time.ravel(), data.ravel()
+        chan = np.repeat(channels.astype(np.float32), n_times)
+        # Segments inside each channel (none between two channels) :
+        start = np.arange(n_times - 1, dtype=np.uint32)[np.newaxis, :]
+        start = start + np.arange(n_rows, dtype=np.uint32)[:, np.newaxis] * \
+            n_times
+        index = np.stack((start.ravel(), start.ravel() + 1), axis=1)
+        self._dbuffer.set_data(pos)
+        self._cbuffer.set_data(chan)
+        self._ibuffer.set_data(index.ravel().astype(np.uint32))
+        self._xlim = (float(time.min()), float(time.max()))
+        self.update()
+
+    def channel_at(self, y):
+        """Get the channel displayed at a given height.
+
+        Parameters
+        ----------
+        y : float
+            Position along the y-axis in scene coordinates.
+
+        Returns
+        -------
+        chan : int | None
+            Index of the channel or None if there's no channel at this
+            position.
+        """
+        row = int(np.floor(y))
+        idx = np.where(self._chan_visible & (self._chans[0, :, 2] == row))[0]
+        return int(idx[0]) if len(idx) else None
+
+    def row_mapping(self, chan):
+        """Get how the data of a channel are mapped into its row.
+
+        Parameters
+        ----------
+        chan : int
+            Index of the channel.
+
+        Returns
+        -------
+        scale, offset : float
+            The data y of the channel is displayed at offset + scale * y in
+            scene coordinates.
+        """
+        ymin, iamp, row = self._chans[0, chan, 0:3]
+        scale = self._space * iamp
+        return float(scale), float(row + .5 - self._space * .5 - scale * ymin)
+
+    def _update_chans(self):
+        """Send the offset, scale, row and visibility of each channel."""
+        n_visible = int(self._chan_visible.sum())
+        amp = self._ylim[:, 1] - self._ylim[:, 0]
+        amp[amp == 0.] = 1.
+        self._chans[0, :, 0] = self._ylim[:, 0]
+        self._chans[0, :, 1] = 1. / amp
+        # First visible channel on top :
+        self._chans[0, :, 2] = n_visible - np.cumsum(self._chan_visible)
+        self._chans[0, :, 3] = self._chan_visible
+        self._tex.set_data(self._chans)
+        self.update()
+
+    def _prepare_transforms(self, view):
+        """Call for the first rendering."""
+        tr = view.transforms
+        view_vert = view.view_program.vert
+        view_vert['transform'] = tr.get_transform()
+
+    def _prepare_draw(self, view=None):
+        """Function called everytime there's a camera update."""
+        try:
+            import OpenGL.GL as GL  # noqa
+            GL.glLineWidth(self._width)
+            if self._smooth_line:
+                GL.glEnable(GL.GL_LINE_SMOOTH)
+            else:
+                GL.glDisable(GL.GL_LINE_SMOOTH)
+        except Exception:  # can be other than ImportError sometimes
+            pass
+
+    # ========================================================================
+    # ========================================================================
+    # PROPERTIES
+    # ========================================================================
+    # ========================================================================
+    # ----------- YLIM -----------
+    @property
+    def ylim(self):
+        """Get the ylim value."""
+        return self._ylim
+
+    @ylim.setter
+    def ylim(self, value):
+        """Set ylim value (array of shape (n_channels, 2))."""
+        self._ylim = np.array(value, dtype=np.float32).reshape(len(self), 2)
+        self._update_chans()
+
+    # ----------- VISIBLE_CHANNELS -----------
+    @property
+    def visible_channels(self):
+        """Get the visible_channels value."""
+        return self._chan_visible
+
+    @visible_channels.setter
+    def visible_channels(self, value):
+        """Set visible_channels value (boolean vector of length n_chan)."""
+        self._chan_visible = np.array(value, dtype=bool).reshape(len(self))
+        self._update_chans()
+
+    # ----------- ROWS -----------
+    @property
+    def rows(self):
+        """Get the row of each channel (meaningless for hidden channels)."""
+        return self._chans[0, :, 2].astype(int)
+
+    # ----------- RECT -----------
+    @property
+    def rect(self):
+        """Get the rectangle containing visible channels."""
+        return (self._xlim[0], 0., self._xlim[1] - self._xlim[0],
+                float(max(self._chan_visible.sum(), 1)))
+
+    # ----------- SPACE -----------
+    @property
+    def space(self):
+        """Get the space value."""
+        return self._space
+
+    @space.setter
+    def space(self, value):
+        """Set space value."""
+        self._space = float(value)
+        self.shared_program.vert['u_space'] = self._space
+        self.update()
+
+    # ----------- COLOR -----------
+    @property
+    def color(self):
+        """Get the color value."""
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        """Set color value."""
+        self._color = color2vb(value).ravel()
+        self.shared_program.frag['u_color'] = self._color
+        self.update()
+
+    # ----------- WIDTH -----------
+    @property
+    def width(self):
+        """Get the width value."""
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        """Set width value."""
+        self._width = value
+        self.update()
+
+    # ----------- METHOD -----------
+    @property
+    def method(self):
+        """Get the method value."""
+        return self._method
+
+    @method.setter
+    def method(self, value):
+        """Set method value."""
+        self._method = value
+        self._smooth_line = value == 'agg'
+        self.update()
+
+    # ----------- ANTIALIAS -----------
+    @property
+    def antialias(self):
+        """Get the antialias value."""
+        return self._smooth_line
+
+    @antialias.setter
+    def antialias(self, value):
+        """Set antialias value."""
+        self._smooth_line = bool(value)
+        self.update()
+
+
+StackedSignal = create_visual_node(StackedSignalVisual)
@@ -0,0 +1,62 @@
+"""Test StackedSignal visual."""
+import numpy as np
+
+from visbrain.visuals import StackedSignal
+
+n_chan, n_times = 4, 100
+time = np.linspace(10., 20., n_times)
+data = np.random.RandomState(0).rand(n_chan, n_times)
+
+
+class TestStackedSignal(object):
+    """Test StackedSignal visual."""
+
+    def test_set_data(self):
+        """Test function set_data."""
+        stack = StackedSignal(n_chan)
+        stack.set_data(data, time)
+        pos = stack._dbuffer
+        assert pos.size == n_chan * n_times
+        # Only segments inside each channel are drawn :
+        index = stack._ibuffer
+        assert stack._index_buffer is index
+        assert index.size == 2 * n_chan * (n_times - 1)
+        # A subset of channels :
+        stack.set_data(data[[1, 3], :], time, channels=[1, 3])
+        assert stack._dbuffer.size == 2 * n_times
+        assert stack._ibuffer.size == 4 * (n_times - 1)
+        assert stack.rect[0] == 10. and stack.rect[2] == 10.
+
+    def test_rows(self):
+        """Test the row of each channel and the displayed rectangle."""
+        stack = StackedSignal(n_chan)
+        stack.set_data(data, time)
+        # First channel on top :
+        np.testing.assert_array_equal(stack.rows, [3, 2, 1, 0])
+        assert stack.rect == (10., 0., 10., 4.)
+        # Hidden channels are removed from the stack :
+        stack.visible_channels = [True, False, True, False]
+        assert list(stack.rows[[0, 2]]) == [1, 0]
+        assert stack.rect[3] == 2.
+        stack.visible_channels = [False] * n_chan
+        assert stack.rect[3] == 1.
+
+    def test_channel_at(self):
+        """Test function channel_at."""
+        stack = StackedSignal(n_chan)
+        stack.visible_channels = [True, False, True, True]
+        assert stack.channel_at(2.5) == 0
+        assert stack.channel_at(1.2) == 2
+        assert stack.channel_at(0.) == 3
+        assert stack.channel_at(3.5) is None
+        assert stack.channel_at(-.5) is None
+
+    def test_row_mapping(self):
+        """Test the mapping of data into rows."""
+        stack = StackedSignal(n_chan, space=.8)
+        stack.ylim = [[-2., 2.]] * n_chan
+        stack.visible_channels = [False, True, True, True]
+        scale, offset = stack.row_mapping(1)
+        # ylim of the channel fills space of its row (row 2) :
+        np.testing.assert_allclose(offset + scale * np.array([-2., 2.]),
+                                   [2.1, 2.9])
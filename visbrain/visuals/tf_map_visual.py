@@ -10,7 +10,7 @@ import vispy.visuals.transforms as vist
 from vispy.scene.visuals import Image
 
 from ..visuals import CbarBase
-from ..utils import (morlet, cmap_to_glsl, averaging, normalization)
+from ..utils import (morlet_bank, cmap_to_glsl, averaging, normalization)
 
 
 __all__ = ('TFmapsMesh')
@@ -88,11 +88,9 @@ class TFmapsMesh(CbarBase):
         self._n = len(data)
         freqs = np.arange(f_min, f_max, f_step)  # frequency vector
         time = np.arange(len(self)) / sf
-        tf = np.zeros((len(freqs), len(self)), dtype=data.dtype)
 
         # ======================= COMPUTE TF =======================
-        for i, k in enumerate(freqs):
-            tf[i, :] = np.square(np.abs(morlet(data, sf, k)))
+        tf = morlet_bank(data, sf, freqs, get='power', dtype=data.dtype)
 
         # ======================= NORMALIZATION =======================
         normalization(tf, norm=norm, baseline=baseline, axis=1)
@@ -108,6 +106,23 @@ class TFmapsMesh(CbarBase):
             downsample = int(np.round(tf.shape[1] / self._n_limits))
             tf = tf[:, ::downsample]
 
+        self.set_tf(tf, time, freqs, contrast=contrast, **kwargs)
+
+    def set_tf(self, tf, time, freqs, contrast=.1, **kwargs):
+        """Set a computed time-frequency map.
+
+        Parameters
+        ----------
+        tf : array_like
+            Time-frequency map of shape (n_freqs, n_times).
+        time : array_like
+            Time vector of the data.
+        freqs : array_like
+            Frequency vector of shape (n_freqs,).
+        contrast : float | .1
+            Contrast of the colormap.
+        """
+        self._n = len(time)
         # ======================= CLIM // CMAP =======================
         # Get contrast (if defined) :
         self._clim = kwargs.get('clim', None)
@@ -136,7 +151,7 @@ class TFmapsMesh(CbarBase):
         self._image.transform.translate = tr
 
         # ======================= CAMERA =======================
-        self.rect = (time[0], f_min, t_max - t_min, fr_max - fr_min)
+        self.rect = (time[0], fr_min, t_max - t_min, fr_max - fr_min)
         self.freqs = freqs
 
     def update(self):
@@ -12,6 +12,7 @@ Authors: Etienne Combrisson <e.combrisson@gmail.com>
 License: BSD (3-clause)
 """
 import logging
+from functools import lru_cache
 
 import numpy as np
 from scipy.interpolate import interp2d
@@ -30,6 +31,50 @@ logger = logging.getLogger('visbrain')
 __all__ = ('TopoMesh')
 
 
+def _tps_kernel(d):
+    """Thin-plate spline kernel (0 for null distances)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g = (d * d) * (np.log(d) - 1.)
+    g[d == 0] = 0.
+    return g
+
+
+@lru_cache(maxsize=8)
+def _thin_plate_cached(xy, grid):
+    """Compute the thin-plate spline operator (see _thin_plate_operator)."""
+    xy = np.frombuffer(xy, dtype=complex)
+    grid = np.frombuffer(grid, dtype=complex)
+    g = _tps_kernel(np.abs(xy[:, None] - xy[None, :]))
+    g_grid = _tps_kernel(np.abs(grid[:, None] - xy[None, :]))
+    # Weights are g^-1 v so grids are g_grid g^-1 v (g is symmetric) :
+    op = np.linalg.solve(g, g_grid.T).T
+    op.setflags(write=False)
+    return op
+
+
+def _thin_plate_operator(x, y, xi, yi):
+    """Get (and cache) the thin-plate spline interpolation operator.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Coordinates of the channels of shape (n_channels,).
+    xi, yi : array_like
+        Coordinates of the grid of shape (m, n).
+
+    Returns
+    -------
+    op : array_like
+        Read-only operator of shape (m * n, n_channels). The grid of a
+        topography v of shape (n_channels,) is op.dot(v).reshape(m, n).
+    """
+    xy = np.asarray(x, dtype=float).ravel() - 1j * np.asarray(
+        y, dtype=float).ravel()
+    grid = np.asarray(xi, dtype=float).ravel() - 1j * np.asarray(
+        yi, dtype=float).ravel()
+    return _thin_plate_cached(xy.tobytes(), grid.tobytes())
+
+
 class TopoMesh(object):
     """Create a TopoMesh VisPy object.
 
@@ -481,35 +526,18 @@ class TopoMesh(object):
 
     @staticmethod
     def _griddata(x, y, v, xi, yi):
-        """Make griddata."""
-        xy = x.ravel() + y.ravel() * -1j
-        d = xy[None, :] * np.ones((len(xy), 1))
-        d = np.abs(d - d.T)
-        n = d.shape[0]
-        d.flat[::n + 1] = 1.
+        """Make griddata.
 
-        g = (d * d) * (np.log(d) - 1.)
-        g.flat[::n + 1] = 0.
-        weights = np.linalg.solve(g, v.ravel())
-
-        m, n = xi.shape
-        zi = np.zeros_like(xi)
-        xy = xy.T
-
-        g = np.empty(xy.shape)
-        for i in range(m):
-            for j in range(n):
-                d = np.abs(xi[i, j] + -1j * yi[i, j] - xy)
-                mask = np.where(d == 0)[0]
-                if len(mask):
-                    d[mask] = 1.
-                np.log(d, out=g)
-                g -= 1.
-                g *= d * d
-                if len(mask):
-                    g[mask] = 0.
-                zi[i, j] = g.dot(weights)
-        return zi
+        The thin-plate spline operator of the channel layout and grid is
+        computed once (see _thin_plate_operator). v is either a vector of
+        shape (n_channels,) or a stack of topographies of shape
+        (n_channels, n_times), in which case grids are stacked along the
+        last axis.
+        """
+        op = _thin_plate_operator(x, y, xi, yi)
+        v = np.asarray(v, dtype=float)
+        v = v.reshape(op.shape[1], -1) if v.ndim > 1 else v.ravel()
+        return op.dot(v).reshape(xi.shape + v.shape[1:])
 
     @staticmethod
     def array_project_radial_to3d(points_2d):